@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+"""Measure the memory taken per task by the in-memory persistence layer,
+and the cost of the attribute and relationship accesses that the logic
+layer makes on its tasks:
+
+    python -m benchmarks.in_memory_footprint --num-tasks 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from benchmarks.in_memory_task_index import populate
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+from persistence.in_memory.models.task import Task
+
+
+def measure_models(num_tasks):
+    # the domain objects alone, without anything the layer keeps about them
+    gc.collect()
+    tracemalloc.start()
+    tasks = [Task('task {}'.format(i)) for i in range(num_tasks)]
+    for i in range(1, num_tasks):
+        tasks[i].parent = tasks[(i - 1) // 10]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / num_tasks, tasks
+
+
+def measure_store(num_tasks, seed):
+    gc.collect()
+    tracemalloc.start()
+    pl = InMemoryPersistenceLayer()
+    populate(pl, num_tasks, seed)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / num_tasks
+
+
+def per_call_ns(func, tasks):
+    start = time.perf_counter()
+    for task in tasks:
+        func(task)
+    return (time.perf_counter() - start) / len(tasks) * 1e9
+
+
+def measure_accesses(tasks):
+    def toggle(task):
+        task.is_done = not task.is_done
+
+    accesses = {
+        'read summary': lambda task: task.summary,
+        'set is_done': toggle,
+        'iterate children': lambda task: list(task.children),
+        'check tags': lambda task: len(task.tags),
+    }
+    return {name: per_call_ns(func, tasks) for name, func in accesses.items()}
+
+
+def run(num_tasks, seed):
+    print('{} tasks:'.format(num_tasks))
+    model_bytes, tasks = measure_models(num_tasks)
+    print('  {:.0f} bytes per task (models only)'.format(model_bytes))
+    for name, ns in measure_accesses(tasks).items():
+        print('  {}: {:.0f} ns'.format(name, ns))
+    del tasks
+    store_bytes = measure_store(num_tasks, seed)
+    print('  {:.0f} bytes per task (committed to the layer)'.format(
+        store_bytes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-tasks', type=int, nargs='+',
+                        default=[100000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for num_tasks in args.num_tasks:
+        run(num_tasks, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+"""Measure what the journal of the durable in-memory persistence layer
+costs on each commit, and how long it takes to load a store from the
+journal and from a snapshot:
+
+    python -m benchmarks.in_memory_journal --num-tasks 20000 --commits 1000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+
+from benchmarks.in_memory_task_index import populate
+from persistence.in_memory.durable import DurableInMemoryPersistenceLayer
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+
+
+def time_commits(pl, num_commits, rng):
+    tasks = list(pl.get_tasks())
+    start = time.perf_counter()
+    for _ in range(num_commits):
+        task = rng.choice(tasks)
+        task.is_done = not task.is_done
+        pl.commit()
+    return (time.perf_counter() - start) / num_commits
+
+
+def time_load(path):
+    start = time.perf_counter()
+    pl = DurableInMemoryPersistenceLayer(path, compact_every=10 ** 9)
+    elapsed = time.perf_counter() - start
+    return elapsed, pl
+
+
+def run(num_tasks, num_commits, seed):
+    print('{} tasks:'.format(num_tasks))
+    pl = InMemoryPersistenceLayer()
+    populate(pl, num_tasks, seed)
+    print('  in memory only: {:.3f} ms per commit'.format(
+        time_commits(pl, num_commits, random.Random(seed)) * 1000))
+
+    for fsync in (False, True):
+        with tempfile.TemporaryDirectory() as path:
+            pl = DurableInMemoryPersistenceLayer(
+                path, compact_every=10 ** 9, fsync=fsync)
+            populate(pl, num_tasks, seed)
+            per_commit = time_commits(pl, num_commits, random.Random(seed))
+            print('  journal, fsync={}: {:.3f} ms per commit'.format(
+                fsync, per_commit * 1000))
+            pl.close()
+            if not fsync:
+                continue
+
+            elapsed, pl = time_load(path)
+            print('  load from the journal: {:.2f} s'.format(elapsed))
+            start = time.perf_counter()
+            pl.compact()
+            print('  write a snapshot: {:.2f} s'.format(
+                time.perf_counter() - start))
+            pl.close()
+            elapsed, pl = time_load(path)
+            print('  load from the snapshot: {:.2f} s'.format(elapsed))
+            pl.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-tasks', type=int, nargs='+', default=[20000])
+    parser.add_argument('--commits', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for num_tasks in args.num_tasks:
+        run(num_tasks, args.commits, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+
+"""Compare the latency of the task queries that the views run against the
+in-memory persistence layer, planned with its task index and as a scan over
+every task:
+
+    python -m benchmarks.in_memory_task_index --num-tasks 100000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+
+
+def populate(pl, num_tasks, seed):
+    rng = random.Random(seed)
+    now = datetime(2020, 1, 1)
+    users = [pl.create_user('user{}@example.com'.format(i))
+             for i in range(1, 11)]
+    tags = [pl.create_tag('tag{}'.format(i)) for i in range(1, 51)]
+    for obj in users + tags:
+        pl.add(obj)
+
+    tasks = []
+    for i in range(num_tasks):
+        task = pl.create_task(
+            'task {}'.format(i), is_done=rng.random() < 0.3,
+            is_deleted=rng.random() < 0.05, is_public=rng.random() < 0.2,
+            deadline=(now + timedelta(days=rng.randint(0, 365))
+                      if rng.random() < 0.1 else None))
+        task.order_num = rng.randint(0, num_tasks)
+        # a shallow, wide tree: about 1% of tasks are at the top level
+        if tasks and rng.random() > 0.01:
+            task.parent = rng.choice(tasks)
+        task.users.add(rng.choice(users))
+        for tag in rng.sample(tags, rng.randint(0, 2)):
+            task.tags.add(tag)
+        pl.add(task)
+        tasks.append(task)
+    pl.commit()
+    return users[0], tags[0]
+
+
+def get_query_shapes(pl, user, tag, rng):
+    top_level_ids = [t.id for t in pl.get_tasks(parent_id=None)]
+    order = [[pl.ORDER_NUM, pl.DESCENDING]]
+    return {
+        'index page (top level, active)': dict(
+            parent_id=None, is_done=False, is_deleted=False, order_by=order),
+        'children of a task': dict(
+            parent_id=rng.choice(top_level_ids), is_deleted=False,
+            order_by=order),
+        'next tree level (load)': dict(
+            parent_id_in=rng.sample(top_level_ids,
+                                    min(20, len(top_level_ids))),
+            is_done=False, is_deleted=False),
+        'tasks with a tag': dict(tags_contains=tag),
+        'tasks of a user': dict(users_contains=user, is_done=False),
+        'deadlines page': dict(deadline_is_not_none=True, is_done=False,
+                               is_deleted=False,
+                               order_by=[pl.DEADLINE]),
+        'non-admin page (unindexed)': dict(
+            is_public_or_users_contains=user, order_num_greq_than=0),
+    }
+
+
+def measure(query, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = len(list(query()))
+        timings.append(time.perf_counter() - start)
+    return count, statistics.median(timings) * 1000
+
+
+def run(num_tasks, repeat, seed):
+    pl = InMemoryPersistenceLayer()
+    print('Populating {} tasks...'.format(num_tasks))
+    user, tag = populate(pl, num_tasks, seed)
+    shapes = get_query_shapes(pl, user, tag, random.Random(seed))
+
+    def planned(kwargs):
+        return lambda: pl.get_tasks(**kwargs)
+
+    def scanned(kwargs):
+        def query():
+            # skip the planner, the way get_tasks worked before there was a
+            # task index
+            pl._get_task_candidates = lambda **_: pl._tasks
+            try:
+                return list(pl.get_tasks(**kwargs))
+            finally:
+                del pl._get_task_candidates
+        return query
+
+    for name, kwargs in shapes.items():
+        count, planned_ms = measure(planned(kwargs), repeat)
+        scan_count, scan_ms = measure(scanned(kwargs), repeat)
+        assert count == scan_count
+        print('{} ({} tasks, {} rows): {:.3f} ms -> {:.3f} ms'.format(
+            name, num_tasks, count, scan_ms, planned_ms))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-tasks', type=int, nargs='+',
+                        default=[100000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for num_tasks in args.num_tasks:
+        run(num_tasks, args.repeat, args.seed)
+
+
+if __name__ == '__main__':
+    main()
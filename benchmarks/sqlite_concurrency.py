@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+
+"""Measure throughput and lock errors with several worker processes, each
+with several threads, reading and writing the same SQLite file, the way
+gunicorn runs the app. Compares the plain connection settings with the
+SQLite profile, with and without the in-process write queue:
+
+    python -m benchmarks.sqlite_concurrency --workers 4 --threads 4
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks.task_indexes import populate
+from tudor import generate_app
+
+CONFIGURATIONS = [
+    ('no profile', ''),
+    ('profile', 'sqlite_profile=true'),
+    ('profile + write queue', 'sqlite_write_queue=true'),
+]
+
+
+def run_thread(app, duration, write_ratio, seed, results):
+    rng = random.Random(seed)
+    pl = app.pl
+    reads = []
+    writes = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        with app.app_context():
+            try:
+                if is_write:
+                    task = pl.create_task('benchmark task')
+                    pl.add(task)
+                    pl.commit()
+                else:
+                    pl.get_paginated_tasks(
+                        is_done=False, is_deleted=False, parent_id=None,
+                        order_by=[[pl.ORDER_NUM, pl.DESCENDING]],
+                        page_num=1, tasks_per_page=20)
+            except Exception:
+                pl.rollback()
+                errors += 1
+                continue
+        elapsed = (time.perf_counter() - started) * 1000
+        (writes if is_write else reads).append(elapsed)
+    results.append((reads, writes, errors))
+
+
+def run_worker(db_path, db_options, threads, duration, write_ratio, seed):
+    app = generate_app(db_uri='sqlite:///' + db_path, db_options=db_options)
+    results = []
+    workers = [
+        threading.Thread(target=run_thread,
+                         args=(app, duration, write_ratio, seed * 100 + i,
+                               results))
+        for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    reads = [ms for r, w, e in results for ms in r]
+    writes = [ms for r, w, e in results for ms in w]
+    errors = sum(e for r, w, e in results)
+    retries = 0
+    if app.sqlite_profile is not None:
+        retries = app.sqlite_profile.retries
+    with app.app_context():
+        pool_wait = sum(stats['wait_seconds']
+                        for stats in app.pl.get_pool_stats().values())
+    return reads, writes, errors, retries, pool_wait
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    if len(values) < 2:
+        return values[0]
+    return statistics.quantiles(values, n=100)[p - 1]
+
+
+def run(name, db_options, args, db_dir):
+    db_path = os.path.join(db_dir, 'concurrency.db')
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    app = generate_app(db_uri='sqlite:///' + db_path, db_options=db_options)
+    with app.app_context():
+        app.pl.create_all()
+        populate(app.pl, args.num_tasks, args.seed)
+        app.pl.db.engine.dispose()
+
+    with multiprocessing.Pool(args.workers) as pool:
+        outcomes = pool.starmap(run_worker, [
+            (db_path, db_options, args.threads, args.duration,
+             args.write_ratio, args.seed + i)
+            for i in range(args.workers)])
+    reads = [ms for r, w, e, n, p in outcomes for ms in r]
+    writes = [ms for r, w, e, n, p in outcomes for ms in w]
+    errors = sum(e for r, w, e, n, p in outcomes)
+    retries = sum(n for r, w, e, n, p in outcomes)
+    pool_wait = sum(p for r, w, e, n, p in outcomes)
+
+    print()
+    print('{}: {:.0f} ops/s, {} lock errors, {} retries, {:.3f} s waiting '
+          'for connections'.format(
+              name, (len(reads) + len(writes)) / args.duration, errors,
+              retries, pool_wait))
+    print('  reads:  {:6d}, p50 {:8.3f} ms, p99 {:8.3f} ms'.format(
+        len(reads), percentile(reads, 50), percentile(reads, 99)))
+    print('  writes: {:6d}, p50 {:8.3f} ms, p99 {:8.3f} ms'.format(
+        len(writes), percentile(writes, 50), percentile(writes, 99)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=10,
+                        help='Seconds to run each configuration for.')
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--num-tasks', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-dir',
+                        help='Directory to put the SQLite file in. Defaults '
+                             'to a temporary directory, which is removed '
+                             'afterwards.')
+    args = parser.parse_args()
+
+    def run_all(db_dir):
+        for name, db_options in CONFIGURATIONS:
+            run(name, db_options, args, db_dir)
+
+    if args.db_dir:
+        run_all(args.db_dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_all(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+
+"""Compare query plans and latency of the user and tag filters on the task
+query, written as joins (the way _get_tasks_query used to build them) and
+as EXISTS predicates on the link tables (the way it builds them now).
+Uses a throwaway SQLite file for each size by default:
+
+    python -m benchmarks.task_access_filters --num-tasks 10000 100000 1000000
+"""
+
+import argparse
+import os
+import tempfile
+
+from sqlalchemy import func, or_, select
+
+from benchmarks.task_indexes import measure, populate
+from tudor import generate_app
+
+
+def add_shared_tasks(pl):
+    # populate() links every task to a single user; link every fifth task to
+    # a second one, which is what makes a join return duplicate rows
+    conn = pl.db.session.connection()
+    conn.exec_driver_sql(
+        'INSERT INTO users_tasks (user_id, task_id) '
+        'SELECT user_id % 10 + 1, task_id FROM users_tasks '
+        'WHERE task_id % 5 = 0')
+    conn.exec_driver_sql('ANALYZE')
+    pl.db.session.commit()
+
+
+def get_query_shapes(pl):
+    DbTask = pl.DbTask
+    users_tasks = pl.users_tasks_table
+    user = pl.db.session.get(pl.DbUser, 1)
+    tag = pl.db.session.get(pl.DbTag, 1)
+
+    def count(query):
+        return select(func.count()).select_from(query.subquery())
+
+    legacy_visible = select(DbTask).outerjoin(
+        users_tasks, users_tasks.c.task_id == DbTask.id).where(
+        or_(users_tasks.c.user_id == user.id, DbTask.is_public),
+        DbTask.is_done.is_(False), DbTask.is_deleted.is_(False))
+    visible = pl._get_tasks_query(is_public_or_users_contains=user,
+                                  is_done=False, is_deleted=False)
+    order = [[pl.ORDER_NUM, pl.DESCENDING]]
+
+    return {
+        'non-admin index page': (
+            legacy_visible.where(DbTask.parent_id.is_(None)).order_by(
+                DbTask.order_num.desc()).limit(20),
+            pl._get_tasks_query(
+                is_public_or_users_contains=user, is_done=False,
+                is_deleted=False, parent_id=None, order_by=order,
+                limit=20)),
+        'non-admin page count': (count(legacy_visible), count(visible)),
+        'tasks of a user': (
+            select(DbTask).where(DbTask.users.any(id=user.id)),
+            pl._get_tasks_query(users_contains=user)),
+        'tasks with a tag': (
+            select(DbTask).where(DbTask.tags.any(id=tag.id)),
+            pl._get_tasks_query(tags_contains=tag)),
+    }
+
+
+def run(num_tasks, repeat, seed, db_path):
+    app = generate_app(db_uri='sqlite:///' + db_path)
+    pl = app.pl
+    with app.app_context():
+        pl.create_all()
+        print('Populating {} tasks...'.format(num_tasks))
+        populate(pl, num_tasks, seed)
+        add_shared_tasks(pl)
+        shapes = get_query_shapes(pl)
+        results = {}
+        for name, (join_stmt, exists_stmt) in shapes.items():
+            results[(name, 'join')] = measure(pl, join_stmt, repeat)
+            results[(name, 'exists')] = measure(pl, exists_stmt, repeat)
+
+    for name in shapes:
+        join_plan, join_ms = results[(name, 'join')]
+        exists_plan, exists_ms = results[(name, 'exists')]
+        print()
+        print('{} ({} tasks): {:.3f} ms -> {:.3f} ms'.format(
+            name, num_tasks, join_ms, exists_ms))
+        print('  join:')
+        for line in join_plan:
+            print('    ' + line)
+        print('  exists:')
+        for line in exists_plan:
+            print('    ' + line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-tasks', type=int, nargs='+',
+                        default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-dir',
+                        help='Directory to put the SQLite files in. Defaults '
+                             'to a temporary directory, which is removed '
+                             'afterwards.')
+    args = parser.parse_args()
+
+    def run_all(db_dir):
+        for num_tasks in args.num_tasks:
+            db_path = os.path.join(db_dir,
+                                   'benchmark-{}.db'.format(num_tasks))
+            run(num_tasks, args.repeat, args.seed, db_path)
+
+    if args.db_dir:
+        run_all(args.db_dir)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_all(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
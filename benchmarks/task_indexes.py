@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+
+"""Compare query plans and latency of the task query shapes that the views
+run, with and without the composite and partial indexes added in schema
+v0.18. Uses a throwaway SQLite file by default:
+
+    python -m benchmarks.task_indexes --num-tasks 100000
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import Index, insert
+
+from tudor import generate_app
+
+# the indexes added in v0.18, by table
+NEW_INDEXES = {
+    'task': ['ix_task_parent_id_order_num',
+             'ix_task_parent_id_is_deleted_is_done_order_num',
+             'ix_task_deadline'],
+    'users_tasks': ['ix_users_tasks_user_id_task_id'],
+    'tags_tasks': ['ix_tags_tasks_task_id'],
+    'comment': ['ix_comment_task_id'],
+}
+
+
+def populate(pl, num_tasks, seed):
+    rng = random.Random(seed)
+    conn = pl.db.session.connection()
+    now = datetime(2020, 1, 1)
+
+    conn.execute(insert(pl.DbUser.__table__), [
+        {'id': i, 'email': 'user{}@example.com'.format(i),
+         'hashed_password': None, 'is_admin': False}
+        for i in range(1, 11)])
+    conn.execute(insert(pl.DbTag.__table__), [
+        {'id': i, 'value': 'tag{}'.format(i)} for i in range(1, 51)])
+
+    tasks = []
+    for i in range(1, num_tasks + 1):
+        # a shallow, wide tree: about 1% of tasks are at the top level
+        parent_id = None
+        if i > 1 and rng.random() > 0.01:
+            parent_id = rng.randint(1, i - 1)
+        tasks.append({
+            'id': i,
+            'summary': 'task {}'.format(i),
+            'description': '',
+            'is_done': rng.random() < 0.3,
+            'is_deleted': rng.random() < 0.05,
+            'order_num': rng.randint(0, num_tasks),
+            'deadline': (now + timedelta(days=rng.randint(0, 365))
+                         if rng.random() < 0.1 else None),
+            'is_public': rng.random() < 0.2,
+            'parent_id': parent_id,
+        })
+    conn.execute(insert(pl.DbTask.__table__), tasks)
+    conn.execute(insert(pl.users_tasks_table), [
+        {'user_id': rng.randint(1, 10), 'task_id': i}
+        for i in range(1, num_tasks + 1)])
+    conn.execute(insert(pl.tags_tasks_table), [
+        {'tag_id': tag_id, 'task_id': i}
+        for i in range(1, num_tasks + 1)
+        for tag_id in rng.sample(range(1, 51), rng.randint(0, 2))])
+    conn.execute(insert(pl.DbComment.__table__), [
+        {'content': 'comment', 'task_id': rng.randint(1, num_tasks)}
+        for _ in range(num_tasks // 10)])
+    pl.db.session.commit()
+
+
+def get_query_shapes(pl, parent_id):
+    user = pl.db.session.get(pl.DbUser, 1)
+    shapes = {
+        'index page (top level, active)': pl._get_tasks_query(
+            parent_id=None, is_done=False, is_deleted=False,
+            order_by=[[pl.ORDER_NUM, pl.DESCENDING]], limit=20),
+        'task page (children, active)': pl._get_tasks_query(
+            parent_id=parent_id, is_done=False, is_deleted=False,
+            order_by=[[pl.ORDER_NUM, pl.DESCENDING]], limit=20),
+        'task page (children, all)': pl._get_tasks_query(
+            parent_id=parent_id,
+            order_by=[[pl.ORDER_NUM, pl.DESCENDING]], limit=20),
+        'deadlines page': pl._get_tasks_query(
+            is_done=False, is_deleted=False, deadline_is_not_none=True,
+            order_by=pl.DEADLINE),
+        'non-admin index page': pl._get_tasks_query(
+            parent_id=None, is_done=False, is_deleted=False,
+            is_public_or_users_contains=user,
+            order_by=[[pl.ORDER_NUM, pl.DESCENDING]], limit=20),
+        'tags of a task': pl.DbTag.query.join(pl.tags_tasks_table).filter(
+            pl.tags_tasks_table.c.task_id == parent_id).statement,
+        'comments of a task': pl.DbComment.query.filter_by(
+            task_id=parent_id).statement,
+    }
+    return shapes
+
+
+def set_indexes(pl, enabled):
+    conn = pl.db.session.connection()
+    tables = pl.db.metadata.tables
+    for table_name, index_names in NEW_INDEXES.items():
+        for index in tables[table_name].indexes:
+            if index.name in index_names:
+                if enabled:
+                    index.create(conn, checkfirst=True)
+                else:
+                    index.drop(conn, checkfirst=True)
+    # the single-column index that the composite one replaced
+    old_index = Index('ix_users_tasks_user_id',
+                      tables['users_tasks'].c.user_id)
+    if enabled:
+        old_index.drop(conn, checkfirst=True)
+    else:
+        old_index.create(conn, checkfirst=True)
+    pl.db.session.commit()
+    conn = pl.db.session.connection()
+    conn.exec_driver_sql('ANALYZE')
+    pl.db.session.commit()
+
+
+def measure(pl, stmt, repeat):
+    conn = pl.db.session.connection()
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    sql = str(compiled)
+    plan = [row[-1] for row in conn.exec_driver_sql(
+        'EXPLAIN QUERY PLAN ' + sql, params)]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.exec_driver_sql(sql, params).fetchall()
+        timings.append(time.perf_counter() - start)
+    return plan, statistics.median(timings) * 1000
+
+
+def run(num_tasks, repeat, seed, db_path):
+    app = generate_app(db_uri='sqlite:///' + db_path)
+    pl = app.pl
+    with app.app_context():
+        pl.create_all()
+        print('Populating {} tasks...'.format(num_tasks))
+        populate(pl, num_tasks, seed)
+        # a task with plenty of children
+        parent_id = pl.db.session.connection().exec_driver_sql(
+            'SELECT parent_id FROM task WHERE parent_id IS NOT NULL '
+            'GROUP BY parent_id ORDER BY count(*) DESC LIMIT 1').scalar()
+        shapes = get_query_shapes(pl, parent_id)
+
+        results = {}
+        for label, enabled in (('before', False), ('after', True)):
+            set_indexes(pl, enabled)
+            for name, stmt in shapes.items():
+                results[(name, label)] = measure(pl, stmt, repeat)
+
+    for name in shapes:
+        before_plan, before_ms = results[(name, 'before')]
+        after_plan, after_ms = results[(name, 'after')]
+        print()
+        print('{}: {:.3f} ms -> {:.3f} ms'.format(name, before_ms, after_ms))
+        print('  before:')
+        for line in before_plan:
+            print('    ' + line)
+        print('  after:')
+        for line in after_plan:
+            print('    ' + line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--num-tasks', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db-path',
+                        help='SQLite file to use. Defaults to a temporary '
+                             'file, which is removed afterwards.')
+    args = parser.parse_args()
+
+    if args.db_path:
+        run(args.num_tasks, args.repeat, args.seed, args.db_path)
+    else:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run(args.num_tasks, args.repeat, args.seed,
+                os.path.join(tmpdir, 'benchmark.db'))
+
+
+if __name__ == '__main__':
+    main()
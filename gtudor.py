@@ -1,9 +1,14 @@
-from tudor import generate_app, Config, get_db_uri, get_secret_key
+from tudor import generate_app, Config, get_db_uri, get_db_options, \
+    get_secret_key, get_db_pool_options_from_config
 
 config = Config.from_environ()
 config.DB_URI = get_db_uri(config.DB_URI, config.DB_URI_FILE)
+config.DB_OPTIONS = get_db_options(config.DB_OPTIONS, config.DB_OPTIONS_FILE)
 config.SECRET_KEY = get_secret_key(config.SECRET_KEY, config.SECRET_KEY_FILE)
 config = Config.combine(config, Config.from_defaults())
-app = generate_app(db_uri=config.DB_URI, upload_folder=config.UPLOAD_FOLDER,
+app = generate_app(db_uri=config.DB_URI, db_options=config.DB_OPTIONS,
+                   db_replica_uri=config.DB_REPLICA_URI,
+                   db_pool_options=get_db_pool_options_from_config(config),
+                   upload_folder=config.UPLOAD_FOLDER,
                    secret_key=config.SECRET_KEY,
                    allowed_extensions=config.ALLOWED_EXTENSIONS)
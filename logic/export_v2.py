@@ -0,0 +1,112 @@
+import json
+import zlib
+
+from models.object_types import ObjectTypes
+
+FORMAT_JSON = 'json'
+FORMAT_NDJSON = 'ndjson'
+FORMATS = (FORMAT_JSON, FORMAT_NDJSON)
+
+# the keys of the export document, in the order they are written
+EXPORT_TYPES = [
+    ('tasks', ObjectTypes.Task),
+    ('tags', ObjectTypes.Tag),
+    ('comments', ObjectTypes.Comment),
+    ('attachments', ObjectTypes.Attachment),
+    ('users', ObjectTypes.User),
+    ('options', ObjectTypes.Option),
+]
+
+# how much text to collect before handing a piece to the caller
+BUFFER_SIZE = 64 * 1024
+
+
+def generate_json(pl, types_to_export, batch_size=1000):
+    """Yield the same document as LogicLayer.do_export_data, one object at a
+    time, so that it can be written out as it's read from the database."""
+    yield '{"format_version": 2'
+    for key, object_type in EXPORT_TYPES:
+        if key not in types_to_export:
+            continue
+        yield ', {}: ['.format(json.dumps(key))
+        separator = ''
+        for row in pl.get_export_rows(object_type, batch_size=batch_size):
+            yield separator + json.dumps(row)
+            separator = ', '
+        yield ']'
+    yield '}\n'
+
+
+def generate_ndjson(pl, types_to_export, batch_size=1000):
+    """Yield the export as newline-delimited JSON. The first line holds the
+    format version and the exported types, and each following line holds
+    one object as {"type": <key>, "data": <object>}, where key is "tasks",
+    "tags", etc., as in the JSON document."""
+    types = [key for key, object_type in EXPORT_TYPES
+             if key in types_to_export]
+    yield json.dumps({'format_version': 2, 'types': types}) + '\n'
+    for key, object_type in EXPORT_TYPES:
+        if key not in types_to_export:
+            continue
+        for row in pl.get_export_rows(object_type, batch_size=batch_size):
+            yield json.dumps({'type': key, 'data': row}) + '\n'
+
+
+def read_ndjson(lines):
+    """Turn lines written by generate_ndjson back into the dict that
+    do_import_data expects."""
+    src = {}
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if 'format_version' in record:
+            src['format_version'] = record['format_version']
+            for key in record.get('types', ()):
+                src.setdefault(key, [])
+        else:
+            src.setdefault(record['type'], []).append(record['data'])
+    return src
+
+
+def encode_chunks(pieces, buffer_size=BUFFER_SIZE):
+    """Collect small pieces of text into chunks of about buffer_size bytes,
+    so the response isn't written one object at a time."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of bytes into the gzip format as it goes."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def generate_export(pl, types_to_export, fmt=FORMAT_JSON, compress=False,
+                    batch_size=1000):
+    if fmt == FORMAT_NDJSON:
+        pieces = generate_ndjson(pl, types_to_export, batch_size=batch_size)
+    elif fmt == FORMAT_JSON:
+        pieces = generate_json(pl, types_to_export, batch_size=batch_size)
+    else:
+        raise ValueError('Unknown export format: {}'.format(fmt))
+    chunks = encode_chunks(pieces)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
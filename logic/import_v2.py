@@ -1,13 +1,23 @@
+from datetime import datetime, UTC
+from itertools import islice
+
+from dateutil.parser import parse as dparse
 import werkzeug.exceptions
 
 from conversions import money_from_str
 import logging_util
+from models.object_types import ObjectTypes
 from .data_import_error import DataImportError
 
 _logger = logging_util.get_logger_by_name(__name__, 'LogicLayer')
 
+# the number of task ids to check for conflicts per query, to stay under the
+# engines' limits on bound parameters
+ID_CHECK_BATCH_SIZE = 500
+
 
-def import_data(pl, src, keep_id_numbers=True):
+def import_data(pl, src, keep_id_numbers=True, bulk=False, chunk_size=None,
+                progress=None):
     # TODO: check for id conflicts for tags
     # TODO: check for id conflicts for comments
     # TODO: check for id conflicts for attachments
@@ -44,6 +54,10 @@ def import_data(pl, src, keep_id_numbers=True):
 
     # TODO: tests
 
+    if bulk:
+        return _import_data_bulk(pl, src, keep_id_numbers=keep_id_numbers,
+                                 chunk_size=chunk_size, progress=progress)
+
     try:
         tasks_by_id = {task['id']: task for task in src['tasks']}
     except Exception as e:
@@ -176,6 +190,14 @@ def import_data(pl, src, keep_id_numbers=True):
             if 'parent_id' in task and task['parent_id'] is not None:
                 t.parent = \
                     tasks_by_id[task['parent_id']]['__object__']
+            if 'dependee_ids' in task:
+                for dependee_id in task['dependee_ids']:
+                    t.dependees.append(
+                        tasks_by_id[dependee_id]['__object__'])
+            if 'prioritize_before_ids' in task:
+                for before_id in task['prioritize_before_ids']:
+                    t.prioritize_before.append(
+                        tasks_by_id[before_id]['__object__'])
         except Exception as e:
             raise DataImportError('Error connecting task', task, exc=e)
 
@@ -197,3 +219,235 @@ def import_data(pl, src, keep_id_numbers=True):
     for dbo in db_objects:
         pl.add(dbo)
     pl.commit()
+
+
+def _clean_datetime(dt):
+    if isinstance(dt, str):
+        return dparse(dt)
+    return dt
+
+
+def _chunks(items, chunk_size):
+    if not chunk_size:
+        if items:
+            yield items
+        return
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _import_data_bulk(pl, src, keep_id_numbers, chunk_size, progress):
+    """Import with executemany inserts instead of one ORM object at a time.
+    Rows are built and every cross-reference is checked up front, so bad
+    data is rejected before anything is written. Then each object type is
+    inserted in chunks, followed by the task parents and the association
+    tables. If chunk_size is given, each chunk is committed separately, so
+    a database error part-way through leaves the earlier chunks in place.
+    Otherwise everything is committed once at the end.
+
+    progress, if given, is called as progress(stage, done, total) after
+    each chunk."""
+
+    try:
+        tasks_by_id = {task['id']: task for task in src['tasks']}
+    except Exception as e:
+        raise DataImportError('Error collecting tasks', exc=e)
+    try:
+        tags_by_id = {tag['id']: tag for tag in src['tags']}
+    except Exception as e:
+        raise DataImportError('Error collecting tags', exc=e)
+    try:
+        users_by_id = {user['id']: user for user in src['users']}
+    except Exception as e:
+        raise DataImportError('Error collecting users', exc=e)
+
+    def with_id(row, obj):
+        if keep_id_numbers:
+            row['id'] = obj['id']
+        return row
+
+    # stamped the way create_task does on the ORM path
+    now = datetime.now(UTC)
+    task_rows = []
+    for task in src['tasks']:
+        try:
+            order_num = task.get('order_num', None)
+            task_rows.append(with_id({
+                'summary': task['summary'],
+                'description': task.get('description', ''),
+                'is_done': not not task.get('is_done', False),
+                'is_deleted': not not task.get('is_deleted', False),
+                'deadline': _clean_datetime(task.get('deadline', None)),
+                'expected_duration_minutes':
+                    task.get('expected_duration_minutes'),
+                'expected_cost': money_from_str(task.get('expected_cost')),
+                'order_num': order_num if order_num is not None else 0,
+                'is_public': False,
+                'date_created': now,
+                'date_last_updated': now,
+            }, task))
+        except Exception as e:
+            raise DataImportError('Error loading task', task, exc=e)
+
+    if keep_id_numbers:
+        task_ids = list(tasks_by_id)
+        for i in range(0, len(task_ids), ID_CHECK_BATCH_SIZE):
+            batch = task_ids[i:i + ID_CHECK_BATCH_SIZE]
+            if pl.count_tasks(task_id_in=batch) > 0:
+                raise werkzeug.exceptions.Conflict(
+                    "Some specified task id's already exist in the "
+                    "database")
+
+    tag_rows = []
+    for tag in src['tags']:
+        try:
+            tag_rows.append(with_id({
+                'value': tag['value'],
+                'description': tag.get('description', ''),
+            }, tag))
+        except Exception as e:
+            raise DataImportError('Error loading tag', tag, exc=e)
+
+    comment_rows = []
+    for comment in src['comments']:
+        try:
+            comment_rows.append(with_id({
+                'content': comment['content'],
+                'timestamp': _clean_datetime(comment['timestamp']),
+            }, comment))
+        except Exception as e:
+            raise DataImportError('Error loading comment', comment, exc=e)
+
+    attachment_rows = []
+    for attachment in src['attachments']:
+        try:
+            attachment_rows.append(with_id({
+                'timestamp': _clean_datetime(attachment['timestamp']),
+                'path': attachment['path'],
+                'filename': attachment['filename'],
+                'description': attachment['description'],
+            }, attachment))
+        except Exception as e:
+            raise DataImportError('Error loading attachment',
+                                  attachment, exc=e)
+
+    user_rows = []
+    for user in src['users']:
+        try:
+            user_rows.append(with_id({
+                'email': user['email'],
+                'hashed_password': user['hashed_password'],
+                'is_admin': user['is_admin'],
+            }, user))
+        except Exception as e:
+            raise DataImportError('Error loading user', user, exc=e)
+
+    option_rows = []
+    for option in src['options']:
+        try:
+            option_rows.append({'key': option['key'],
+                                'value': option['value']})
+        except Exception as e:
+            raise DataImportError('Error loading option', option, e)
+
+    # check every reference before writing anything. links are kept in
+    # terms of the ids in src, and mapped to the new ids after insertion.
+    parents = []
+    links = {'tags': [], 'users': [], 'dependees': [],
+             'prioritize_before': []}
+    for task in src['tasks']:
+        try:
+            for tag_id in task.get('tag_ids', ()):
+                tags_by_id[tag_id]
+                links['tags'].append((task['id'], tag_id))
+            for user_id in task.get('user_ids', ()):
+                users_by_id[user_id]
+                links['users'].append((task['id'], user_id))
+            if task.get('parent_id') is not None:
+                tasks_by_id[task['parent_id']]
+                parents.append((task['id'], task['parent_id']))
+            for dependee_id in task.get('dependee_ids', ()):
+                tasks_by_id[dependee_id]
+                links['dependees'].append((task['id'], dependee_id))
+            for before_id in task.get('prioritize_before_ids', ()):
+                tasks_by_id[before_id]
+                links['prioritize_before'].append((task['id'], before_id))
+        except Exception as e:
+            raise DataImportError('Error connecting task', task, exc=e)
+
+    for comment, row in zip(src['comments'], comment_rows):
+        try:
+            row['task_id'] = comment['task_id']
+            tasks_by_id[comment['task_id']]
+        except Exception as e:
+            raise DataImportError('Error connecting comment', comment, exc=e)
+
+    for attachment, row in zip(src['attachments'], attachment_rows):
+        try:
+            row['task_id'] = attachment['task_id']
+            tasks_by_id[attachment['task_id']]
+        except Exception as e:
+            raise DataImportError('Error connecting attachment',
+                                  attachment, exc=e)
+
+    #########
+
+    def report(stage, done, total):
+        _logger.debug('%s: %s/%s', stage, done, total)
+        if progress is not None:
+            progress(stage, done, total)
+
+    def run_in_chunks(stage, items, func):
+        done = 0
+        results = []
+        for chunk in _chunks(items, chunk_size):
+            results.extend(func(chunk) or ())
+            if chunk_size:
+                pl.commit()
+            done += len(chunk)
+            report(stage, done, len(items))
+        return results
+
+    def insert_objects(stage, object_type, objs, rows):
+        new_ids = run_in_chunks(
+            stage, rows, lambda chunk: pl.bulk_insert(object_type, chunk))
+        return {obj['id']: new_id for obj, new_id in zip(objs, new_ids)}
+
+    task_ids = insert_objects('tasks', ObjectTypes.Task, src['tasks'],
+                              task_rows)
+    tag_ids = insert_objects('tags', ObjectTypes.Tag, src['tags'], tag_rows)
+    user_ids = insert_objects('users', ObjectTypes.User, src['users'],
+                              user_rows)
+    for row in comment_rows:
+        row['task_id'] = task_ids[row['task_id']]
+    insert_objects('comments', ObjectTypes.Comment, src['comments'],
+                   comment_rows)
+    for row in attachment_rows:
+        row['task_id'] = task_ids[row['task_id']]
+    insert_objects('attachments', ObjectTypes.Attachment,
+                   src['attachments'], attachment_rows)
+    run_in_chunks('options', option_rows,
+                  lambda chunk: pl.bulk_insert(ObjectTypes.Option, chunk))
+
+    # parents are set after all of the tasks exist, so that the order of
+    # the tasks in src doesn't matter
+    parents = [(task_ids[task_id], task_ids[parent_id])
+               for task_id, parent_id in parents]
+    run_in_chunks('task parents', parents, pl.bulk_set_task_parents)
+
+    other_ids_by_attr = {'tags': tag_ids, 'users': user_ids,
+                         'dependees': task_ids,
+                         'prioritize_before': task_ids}
+    for attr_name, pairs in links.items():
+        other_ids = other_ids_by_attr[attr_name]
+        pairs = [(task_ids[task_id], other_ids[other_id])
+                 for task_id, other_id in pairs]
+        run_in_chunks(
+            'task {}'.format(attr_name.replace('_', ' ')), pairs,
+            lambda chunk: pl.bulk_insert_task_links(attr_name, chunk))
+
+    pl.commit()
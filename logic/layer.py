@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 
 import os
-from datetime import datetime, UTC
+import re
+from datetime import datetime, timedelta, UTC
 from numbers import Number
 
 from dateutil.parser import parse as dparse
@@ -12,9 +13,18 @@ from werkzeug.utils import secure_filename
 import logging_util
 from conversions import int_from_str, money_from_str
 from exception import UserCannotViewTaskException
+from . import export_v2
 from .data_import_error import DataImportError
 from models.object_types import ObjectTypes
 from models.task_user_ops import TaskUserOps
+from persistence.pager import Pager, decode_cursor
+
+# the distance between the order_nums of neighboring siblings, leaving room
+# to move a task between two others without renumbering anything else
+ORDER_NUM_GAP = 1024
+
+# the task fields that can be set on a whole subtree at once
+SUBTREE_FIELDS = ('is_done', 'is_deleted', 'is_public')
 
 
 class LogicLayer(object):
@@ -49,16 +59,19 @@ class LogicLayer(object):
         return list(get_sorted_order(root))
 
     def get_index_data(self, show_deleted, show_done,
-                       current_user, page_num=None, tasks_per_page=None):
+                       current_user, page_num=None, tasks_per_page=None,
+                       cursor=None):
         _pager = []
-        tasks = self.load_no_hierarchy(
-            current_user=current_user, include_done=show_done,
-            include_deleted=show_deleted, order_by_order_num=True,
-            parent_id_is_none=True, paginate=True, pager=_pager,
-            page_num=page_num, tasks_per_page=tasks_per_page)
-        pager = _pager[0]
-
-        all_tags = list(self.pl.get_tags())
+        with self.pl.read_only():
+            tasks = self.load_no_hierarchy(
+                current_user=current_user, include_done=show_done,
+                include_deleted=show_deleted, order_by_order_num=True,
+                parent_id_is_none=True, paginate=True, pager=_pager,
+                page_num=page_num, tasks_per_page=tasks_per_page,
+                cursor=cursor)
+            pager = _pager[0]
+
+            all_tags = list(self.pl.get_tags())
         return {
             'show_deleted': show_deleted,
             'show_done': show_done,
@@ -69,12 +82,13 @@ class LogicLayer(object):
 
     def get_index_hierarchy_data(self, show_deleted, show_done, current_user):
         max_depth = None
-        tasks_h = self.load(current_user, root_task_id=None,
-                            max_depth=max_depth, include_done=show_done,
-                            include_deleted=show_deleted)
-        tasks_h = self.sort_by_hierarchy(tasks_h)
+        with self.pl.read_only():
+            tasks_h = self.load(current_user, root_task_id=None,
+                                max_depth=max_depth, include_done=show_done,
+                                include_deleted=show_deleted)
+            tasks_h = self.sort_by_hierarchy(tasks_h)
 
-        all_tags = list(self.pl.get_tags())
+            all_tags = list(self.pl.get_tags())
         return {
             'show_deleted': show_deleted,
             'show_done': show_done,
@@ -83,10 +97,11 @@ class LogicLayer(object):
         }
 
     def get_deadlines_data(self, current_user):
-        deadline_tasks = self.load_no_hierarchy(
-            current_user,
-            exclude_undeadlined=True,
-            order_by_deadline=True)
+        with self.pl.read_only():
+            deadline_tasks = self.load_no_hierarchy(
+                current_user,
+                exclude_undeadlined=True,
+                order_by_deadline=True)
         return {
             'deadline_tasks': deadline_tasks,
         }
@@ -108,20 +123,11 @@ class LogicLayer(object):
             date_last_updated=date_last_updated,
         )
 
-        if order_num is None:
-            self._logger.debug('order_num not set, calculating')
-            order_num = self.get_lowest_order_num()
-            if order_num is not None:
-                order_num -= 2
-            else:
-                order_num = 0
-
-        task.order_num = order_num
-
+        parent = None
         if parent_id is not None:
             self._logger.debug('parent_id specified. looking it up (%d)',
                                parent_id)
-            parent = self.pl.get_task(parent_id)
+            parent = self._get_unarchived_task(parent_id)
             if (parent is not None and
                     not TaskUserOps.is_user_authorized_or_admin(parent,
                                                                 current_user)):
@@ -130,6 +136,17 @@ class LogicLayer(object):
                 raise werkzeug.exceptions.Forbidden()
             task.parent = parent
 
+        if order_num is None:
+            self._logger.debug('order_num not set, calculating')
+            order_num = self.get_lowest_sibling_order_num(
+                parent.id if parent is not None else None)
+            if order_num is not None:
+                order_num -= ORDER_NUM_GAP
+            else:
+                order_num = 0
+
+        task.order_num = order_num
+
         self._logger.debug('authorizing the current user for this task')
         task.users.append(current_user)
 
@@ -141,64 +158,91 @@ class LogicLayer(object):
         self._logger.debug('end')
         return task
 
-    def clone_task_children_recursive(self, original_task_id, new_parent_id, current_user):
-        self._logger.debug('cloning children of task %d to new parent %d', original_task_id, new_parent_id)
-        original_task = self.pl.get_task(original_task_id)
+    def clone_task_children_recursive(self, original_task_id, new_parent_id,
+                                      current_user, deep=False):
+        """Copy all of the descendants of one task to be descendants of
+        another. The original subtree is read with a single query, and the
+        copies, their parents and their tags are written in bulk and
+        committed once. If deep is True, the comments, dependees and
+        prioritize_before links of the copied tasks are copied as well;
+        links between two copied tasks point to the new copies. Returns a
+        dict mapping the ids of the original tasks to the ids of the
+        copies."""
+        self._logger.debug('cloning children of task %d to new parent %d',
+                           original_task_id, new_parent_id)
+        original_task = self._get_unarchived_task(original_task_id)
         if not original_task:
-            self._logger.warning('original task %d not found', original_task_id)
-            return
-        children = list(self.pl.get_tasks(parent_id=original_task_id))
-        for child in children:
-            self._logger.debug('cloning child task %d', child.id)
-            new_child = self.create_new_task(
-                summary=child.summary,
-                description=child.description,
-                is_done=False,
-                is_deleted=False,
-                deadline=child.deadline,
-                expected_duration_minutes=child.expected_duration_minutes,
-                expected_cost=child.expected_cost,
-                order_num=child.order_num,
-                parent_id=new_parent_id,
-                is_public=child.is_public,
-                current_user=current_user
-            )
-            # copy tags
-            for tag in child.tags:
-                self.do_add_tag_to_task(new_child, tag.value, current_user)
-            # recursively clone grandchildren
-            self.clone_task_children_recursive(child.id, new_child.id, current_user)
-
-    def get_lowest_order_num(self):
-        self._logger.debug('getting lowest order task')
-        tasks = self.pl.get_tasks(
-            order_by=[[self.pl.ORDER_NUM, self.pl.ASCENDING]], limit=1)
-        self._logger.debug('rendering list')
-        lowest_order_num_tasks = list(tasks)
-        self._logger.debug('checking list size')
-        if len(lowest_order_num_tasks) > 0:
-            self._logger.debug('list size > 0, lowest order_num == %d',
-                               lowest_order_num_tasks[0].order_num)
-            return lowest_order_num_tasks[0].order_num
-        self._logger.debug('list size == 0')
-        return None
+            self._logger.warning('original task %d not found',
+                                 original_task_id)
+            return {}
+        new_parent = self._get_unarchived_task(new_parent_id)
+        if not new_parent:
+            raise werkzeug.exceptions.NotFound(
+                'No task found for the id "{}"'.format(new_parent_id))
+        if not (TaskUserOps.is_user_authorized_or_admin(original_task,
+                                                        current_user) and
+                TaskUserOps.is_user_authorized_or_admin(new_parent,
+                                                        current_user)):
+            raise werkzeug.exceptions.Forbidden()
 
-    def get_highest_order_num(self):
-        self._logger.debug('getting highest order task')
-        tasks = self.pl.get_tasks(
-            order_by=[[self.pl.ORDER_NUM, self.pl.DESCENDING]], limit=1)
-        self._logger.debug('rendering list')
-        highest_order_num_tasks = list(tasks)
-        self._logger.debug('checking list size')
-        if len(highest_order_num_tasks) > 0:
-            self._logger.debug('list size > 0, highest order_num == %d',
-                               highest_order_num_tasks[0].order_num)
-            return highest_order_num_tasks[0].order_num
-        self._logger.debug('list size == 0')
-        return None
+        originals = [task for task, depth in
+                     self.pl.get_subtree(root_ids=[original_task_id])
+                     if depth > 0]
+        if not originals:
+            return {}
+
+        now = datetime.now(UTC)
+        rows = [{
+            'summary': task.summary,
+            'description': task.description,
+            'is_done': False,
+            'is_deleted': False,
+            'deadline': task.deadline,
+            'expected_duration_minutes': task.expected_duration_minutes,
+            'expected_cost': task.expected_cost,
+            'order_num': task.order_num,
+            'is_public': task.is_public,
+            'date_created': now,
+            'date_last_updated': now,
+        } for task in originals]
+        new_ids = self.pl.bulk_insert(ObjectTypes.Task, rows)
+        id_map = {task.id: new_id for task, new_id in zip(originals, new_ids)}
+
+        parent_ids = dict(id_map)
+        parent_ids[original_task_id] = new_parent_id
+        self.pl.bulk_set_task_parents(
+            [(id_map[task.id], parent_ids[task.parent_id])
+             for task in originals])
+
+        self.pl.bulk_insert_task_links(
+            'users', [(new_id, current_user.id) for new_id in new_ids])
+        # links to other tasks are only remapped if they point into the
+        # copied subtree
+        remap_by_attr = {'tags': {}}
+        if deep:
+            remap_by_attr['dependees'] = id_map
+            remap_by_attr['prioritize_before'] = id_map
+        for attr_name, remap in remap_by_attr.items():
+            link_ids = self.pl.get_task_link_ids(attr_name, list(id_map))
+            self.pl.bulk_insert_task_links(
+                attr_name, [(id_map[task_id], remap.get(other_id, other_id))
+                            for task_id, other_ids in link_ids.items()
+                            for other_id in other_ids])
+
+        if deep:
+            comments = self.pl.get_comments(task_id_in=list(id_map))
+            self.pl.bulk_insert(ObjectTypes.Comment, [{
+                'content': comment.content,
+                'timestamp': comment.timestamp,
+                'date_last_updated': comment.date_last_updated,
+                'task_id': id_map[comment.task_id],
+            } for comment in comments])
+
+        self.pl.commit()
+        return id_map
 
     def task_set_done(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if not task:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -209,7 +253,7 @@ class LogicLayer(object):
         return task
 
     def task_unset_done(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if not task:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -220,7 +264,7 @@ class LogicLayer(object):
         return task
 
     def task_set_deleted(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if not task:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -231,7 +275,7 @@ class LogicLayer(object):
         return task
 
     def task_unset_deleted(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if not task:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -241,8 +285,46 @@ class LogicLayer(object):
         self.pl.commit()
         return task
 
+    def update_subtree(self, id, current_user, field, value):
+        """Set one of SUBTREE_FIELDS to value on a task and all of its
+        descendants. The user only needs to be authorized for the task at
+        the top of the subtree. Returns the number of tasks changed."""
+        if field not in SUBTREE_FIELDS:
+            raise ValueError('Unknown subtree field: {}'.format(field))
+        task = self._get_unarchived_task(id)
+        if not task:
+            raise werkzeug.exceptions.NotFound()
+        if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
+            raise werkzeug.exceptions.Forbidden()
+        return len(self.set_task_field(task.id, field, value,
+                                       descendants=True))
+
+    def set_task_field(self, id, field, value, descendants=False):
+        """Set one of SUBTREE_FIELDS to value on a task, and on all of its
+        descendants if descendants is True, without checking anyone's
+        authorization; that is left to the caller. Returns the ids of the
+        tasks changed, or None if there is no such task."""
+        if field not in SUBTREE_FIELDS:
+            raise ValueError('Unknown subtree field: {}'.format(field))
+        task = self._get_unarchived_task(id)
+        if not task:
+            return None
+        values = {field: value, 'date_last_updated': datetime.now(UTC)}
+        if descendants:
+            archived_ids = [t.id for t, depth in self.pl.get_subtree(
+                root_ids=[task.id], include_archived=True) if t.is_archived]
+            self.pl.unarchive_tasks(archived_ids)
+            ids = self.pl.update_subtree(task.id, values)
+        else:
+            for attr_name, attr_value in values.items():
+                setattr(task, attr_name, attr_value)
+            ids = [task.id]
+        self.pl.commit()
+        return ids
+
     def get_task_data(self, id, current_user, include_deleted=True,
-                      include_done=True, page_num=1, tasks_per_page=20):
+                      include_done=True, page_num=1, tasks_per_page=20,
+                      cursor=None):
 
         if page_num is not None and not isinstance(page_num, Number):
             raise TypeError('page_num must be a number')
@@ -254,7 +336,7 @@ class LogicLayer(object):
         if tasks_per_page is not None and tasks_per_page < 1:
             raise ValueError('tasks_per_page must be greater than zero')
 
-        task = self.pl.get_task(id)
+        task = self._get_task_for_reading(id)
         # TODO: normalize access restrictions and exceptions in LogicLayer
         if task is None:
             raise werkzeug.exceptions.NotFound()
@@ -274,7 +356,8 @@ class LogicLayer(object):
                                              order_by_order_num=True,
                                              parent_id=task.id, paginate=True,
                                              pager=_pager, page_num=page_num,
-                                             tasks_per_page=tasks_per_page)
+                                             tasks_per_page=tasks_per_page,
+                                             cursor=cursor)
         pager = _pager[0]
 
         hierarchy_sort = True
@@ -289,7 +372,7 @@ class LogicLayer(object):
 
     def get_task_hierarchy_data(self, id, current_user, include_deleted=True,
                                 include_done=True):
-        task = self.pl.get_task(id)
+        task = self._get_task_for_reading(id)
         # TODO: normalize access restrictions and exceptions in LogicLayer
         if task is None:
             raise werkzeug.exceptions.NotFound()
@@ -314,7 +397,7 @@ class LogicLayer(object):
         }
 
     def create_new_comment(self, task_id, content, current_user):
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -330,7 +413,7 @@ class LogicLayer(object):
         comment = self.pl.get_comment(comment_id)
         if comment is None:
             raise werkzeug.exceptions.NotFound()
-        task = self.pl.get_task(comment.task_id)
+        task = self._get_unarchived_task(comment.task_id)
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
         comment.content = content
@@ -343,7 +426,7 @@ class LogicLayer(object):
                  order_num=None, duration=None, expected_cost=None,
                  parent_id=None, is_public=False):
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -368,7 +451,7 @@ class LogicLayer(object):
         elif parent_id == '':
             parent = None
         else:
-            parent = self.pl.get_task(parent_id)
+            parent = self._get_unarchived_task(parent_id)
             if parent:
                 pass
             else:
@@ -400,7 +483,7 @@ class LogicLayer(object):
         return task
 
     def get_edit_task_data(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_task_for_reading(id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
@@ -420,7 +503,7 @@ class LogicLayer(object):
     def create_new_attachment(self, task_id, f, description, current_user,
                               timestamp=None):
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 'No task found for the task_id "{}"'.format(task_id))
@@ -447,135 +530,130 @@ class LogicLayer(object):
             tasks[i].order_num = 2 * (N - i)
             self.pl.add(tasks[i])
 
-    def do_move_task_up(self, id, show_deleted, current_user):
-        update_timestamp = datetime.now(UTC)
-        task = self.pl.get_task(id)
-        if task is None:
-            raise werkzeug.exceptions.NotFound()
-        if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
-            raise werkzeug.exceptions.Forbidden()
+    def _get_end_sibling(self, parent_id, direction):
+        tasks = list(self.pl.get_tasks(
+            parent_id=parent_id, order_by=[[self.pl.ORDER_NUM, direction]],
+            limit=1))
+        if tasks:
+            return tasks[0]
+        return None
 
+    def get_lowest_sibling_order_num(self, parent_id):
+        task = self._get_end_sibling(parent_id, self.pl.ASCENDING)
+        if task is not None:
+            return task.order_num
+        return None
+
+    def get_highest_sibling_order_num(self, parent_id):
+        task = self._get_end_sibling(parent_id, self.pl.DESCENDING)
+        if task is not None:
+            return task.order_num
+        return None
+
+    def _get_next_sibling(self, task, above, exclude_ids=(),
+                          include_deleted=True):
+        # the closest sibling above or below task, which may have the same
+        # order_num as task
         kwargs = {
             'parent_id': task.parent_id,
-            'order_num_greq_than': task.order_num,
-            'task_id_not_in': [task.id],
-            'order_by': self.pl.ORDER_NUM,
-            'limit': 1
+            'task_id_not_in': [task.id] + list(exclude_ids),
+            'limit': 1,
         }
-
-        if not show_deleted:
+        if above:
+            kwargs['order_num_greq_than'] = task.order_num
+            kwargs['order_by'] = [[self.pl.ORDER_NUM, self.pl.ASCENDING]]
+        else:
+            kwargs['order_num_lesseq_than'] = task.order_num
+            kwargs['order_by'] = [[self.pl.ORDER_NUM, self.pl.DESCENDING]]
+        if not include_deleted:
             kwargs['is_deleted'] = False
+        siblings = list(self.pl.get_tasks(**kwargs))
+        if siblings:
+            return siblings[0]
+        return None
 
-        higher_siblings = list(self.pl.get_tasks(**kwargs))
-        if higher_siblings:
-            next_task = higher_siblings[0]
-            if task.order_num == next_task.order_num:
-                tasks_to_reorder = self.pl.get_tasks(
-                    parent_id=task.parent_id,
-                    order_by=[[
-                        self.pl.ORDER_NUM,
-                        self.pl.DESCENDING]])
-                self.reorder_tasks(tasks_to_reorder)
-                for ttr in tasks_to_reorder:
-                    ttr.date_last_updated = update_timestamp
-            if next_task.order_num > task.order_num:
-                new_order_num = next_task.order_num
-                task.order_num, next_task.order_num = \
-                    new_order_num, task.order_num
-
-            # TODO: remove all redundant add()'s everywhere
-            task.date_last_updated = update_timestamp
-            next_task.date_last_updated = update_timestamp
-            self.pl.add(task)
-            self.pl.add(next_task)
-
-        self.pl.commit()
-
-        return task
+    def _place_task_next_to(self, task, reference, above, update_timestamp):
+        """Give task an order_num that puts it immediately above (or below)
+        reference, a sibling of task's. Only task is changed, unless there is
+        no room left between reference and its neighbor, in which case the
+        siblings are spread out again first."""
+        neighbor = self._get_next_sibling(reference, above,
+                                          exclude_ids=[task.id])
+        if (neighbor is not None and
+                abs(neighbor.order_num - reference.order_num) < 2):
+            self._logger.debug('no room next to task %d, rebalancing',
+                               reference.id)
+            # this has to happen before the move rather than after the
+            # request: without room, any order_num given to the task now
+            # would put it in the wrong place until the rebalance ran. It
+            # is a single UPDATE of this parent's children that keeps their
+            # order, and with gaps of ORDER_NUM_GAP it takes about ten moves
+            # into the same spot before one is needed.
+            self.pl.renumber_siblings(task.parent_id, update_timestamp,
+                                      gap=ORDER_NUM_GAP)
+            neighbor = self._get_next_sibling(reference, above,
+                                              exclude_ids=[task.id])
+        if neighbor is None:
+            offset = ORDER_NUM_GAP if above else -ORDER_NUM_GAP
+            task.order_num = reference.order_num + offset
+        else:
+            task.order_num = (neighbor.order_num + reference.order_num) // 2
+        task.date_last_updated = update_timestamp
+        self.pl.add(task)
 
-    def do_move_task_to_top(self, id, current_user):
-        task = self.pl.get_task(id)
+    def _do_move_task(self, id, show_deleted, current_user, above):
+        update_timestamp = datetime.now(UTC)
+        task = self._get_unarchived_task(id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
-        kwargs = {
-            'parent_id': task.parent_id,
-            'order_by': [[self.pl.ORDER_NUM, self.pl.DESCENDING]],
-            'limit': 1
-        }
 
-        top_task = list(self.pl.get_tasks(**kwargs))
-        if top_task and top_task[0] is not task:
-            task.order_num = top_task[0].order_num + 1
-            task.date_last_updated = datetime.now(UTC)
-            self.pl.add(task)
+        next_task = self._get_next_sibling(task, above,
+                                           include_deleted=show_deleted)
+        if next_task is not None:
+            self._place_task_next_to(task, next_task, above,
+                                     update_timestamp)
 
         self.pl.commit()
 
         return task
 
-    def do_move_task_down(self, id, show_deleted, current_user):
-        update_timestamp = datetime.now(UTC)
-        task = self.pl.get_task(id)
+    def do_move_task_up(self, id, show_deleted, current_user):
+        return self._do_move_task(id, show_deleted, current_user, above=True)
+
+    def do_move_task_to_top(self, id, current_user):
+        task = self._get_unarchived_task(id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        kwargs = {
-            'parent_id': task.parent_id,
-            'order_num_lesseq_than': task.order_num,
-            'task_id_not_in': [task.id],
-            'order_by': [[self.pl.ORDER_NUM, self.pl.DESCENDING]],
-            'limit': 1,
-        }
-
-        if not show_deleted:
-            kwargs['is_deleted'] = False
-
-        lower_siblings = list(self.pl.get_tasks(**kwargs))
-        if lower_siblings:
-            next_task = lower_siblings[0]
-            if task.order_num == next_task.order_num:
-                tasks_to_reorder = self.pl.get_tasks(
-                    parent_id=task.parent_id,
-                    order_by=[[
-                        self.pl.ORDER_NUM,
-                        self.pl.DESCENDING]])
-                self.reorder_tasks(tasks_to_reorder)
-                for ttr in tasks_to_reorder:
-                    ttr.date_last_updated = update_timestamp
-            if next_task.order_num < task.order_num:
-                new_order_num = next_task.order_num
-                task.order_num, next_task.order_num = \
-                    new_order_num, task.order_num
-
-            task.date_last_updated = update_timestamp
-            next_task.date_last_updated = update_timestamp
+        top_task = self._get_end_sibling(task.parent_id, self.pl.DESCENDING)
+        if top_task is not None and top_task is not task:
+            task.order_num = top_task.order_num + ORDER_NUM_GAP
+            task.date_last_updated = datetime.now(UTC)
             self.pl.add(task)
-            self.pl.add(next_task)
 
         self.pl.commit()
 
         return task
 
+    def do_move_task_down(self, id, show_deleted, current_user):
+        return self._do_move_task(id, show_deleted, current_user,
+                                  above=False)
+
     def do_move_task_to_bottom(self, id, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if task is None:
             raise werkzeug.exceptions.NotFound()
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        kwargs = {
-            'parent_id': task.parent_id,
-            'order_by': [[self.pl.ORDER_NUM, self.pl.ASCENDING]],
-            'limit': 1,
-        }
-
-        bottom_task = list(self.pl.get_tasks(**kwargs))
-        if bottom_task and bottom_task[0] is not task:
-            task.order_num = bottom_task[0].order_num - 2
+        bottom_task = self._get_end_sibling(task.parent_id,
+                                            self.pl.ASCENDING)
+        if bottom_task is not None and bottom_task is not task:
+            task.order_num = bottom_task.order_num - ORDER_NUM_GAP
             task.date_last_updated = datetime.now(UTC)
             self.pl.add(task)
 
@@ -585,11 +663,11 @@ class LogicLayer(object):
 
     def do_long_order_change(self, task_to_move_id, target_id, current_user):
         update_timestamp = datetime.now(UTC)
-        task_to_move = self.pl.get_task(task_to_move_id)
+        task_to_move = self._get_unarchived_task(task_to_move_id)
         if task_to_move is None:
             raise werkzeug.exceptions.NotFound(
                 "No task object found for id '{}'".format(task_to_move_id))
-        target = self.pl.get_task(target_id)
+        target = self._get_unarchived_task(target_id)
         if target is None:
             raise werkzeug.exceptions.NotFound(
                 "No task object found for id '{}'".format(target_id))
@@ -608,34 +686,16 @@ class LogicLayer(object):
                     task_to_move_id, target_id, task_to_move.parent_id,
                     target.parent_id))
 
-        siblings = list(self.pl.get_tasks(parent_id=target.parent_id))
-        siblings2 = sorted(siblings, key=lambda t: t.order_num,
-                           reverse=True)
-
-        k = len(siblings) * 2
-        for s in siblings2:
-            s.order_num = k
-            s.date_last_updated = update_timestamp
-            k -= 2
-
-        task_to_move.order_num = target.order_num + 1
-        task_to_move.date_last_updated = update_timestamp
-        siblings2 = sorted(siblings, key=lambda t: t.order_num,
-                           reverse=True)
-
-        k = len(siblings) * 2
-        for s in siblings2:
-            s.order_num = k
-            s.date_last_updated = update_timestamp
-            k -= 2
-            self.pl.add(s)
+        if task_to_move is not target:
+            self._place_task_next_to(task_to_move, target, True,
+                                     update_timestamp)
 
         self.pl.commit()
 
         return task_to_move, target
 
     def do_add_tag_to_task_by_id(self, id, value, current_user):
-        task = self.pl.get_task(id)
+        task = self._get_unarchived_task(id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(id))
@@ -647,13 +707,14 @@ class LogicLayer(object):
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        tag = self.get_or_create_tag(value)
+        # get_or_create_tag commits on its own; make both part of one
+        # transaction
+        with self.pl.transaction():
+            tag = self.get_or_create_tag(value)
 
-        if tag not in task.tags:
-            task.tags.append(tag)
-            self.pl.add(task)
-
-        self.pl.commit()
+            if tag not in task.tags:
+                task.tags.append(tag)
+                self.pl.add(task)
 
         return tag
 
@@ -669,7 +730,7 @@ class LogicLayer(object):
         if tag_id is None:
             raise ValueError("No tag_id was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
@@ -712,7 +773,7 @@ class LogicLayer(object):
         if user_email is None or user_email == '':
             raise ValueError("No user_email was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
@@ -733,7 +794,7 @@ class LogicLayer(object):
         if user_id is None:
             raise ValueError("No user_id was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
@@ -756,7 +817,7 @@ class LogicLayer(object):
         if current_user is None:
             raise ValueError("No current_user was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
@@ -835,51 +896,75 @@ class LogicLayer(object):
     def do_reset_order_nums(self, current_user):
         update_timestamp = datetime.now(UTC)
         tasks_h = self.load(current_user, root_task_id=None, max_depth=None,
-                            include_done=True, include_deleted=True)
+                            include_done=True, include_deleted=True,
+                            include_archived=False)
         tasks_h = self.sort_by_hierarchy(tasks_h)
 
-        k = len(tasks_h) + 1
+        # tasks_h lists each task's children in order, highest first, so
+        # number them from the top down within each parent
+        tasks_by_parent_id = {}
         for task in tasks_h:
             if task is None:
                 continue
-            task.order_num = 2 * k
-            task.date_last_updated = update_timestamp
-            self.pl.add(task)
-            k -= 1
-
+            tasks_by_parent_id.setdefault(task.parent_id, []).append(task)
+        order_nums_by_id = {}
+        for siblings in tasks_by_parent_id.values():
+            for i, task in enumerate(siblings):
+                order_nums_by_id[task.id] = \
+                    ORDER_NUM_GAP * (len(siblings) - i)
+
+        self.pl.set_task_order_nums(order_nums_by_id, update_timestamp)
         self.pl.commit()
 
         return tasks_h
 
     def do_export_data(self, types_to_export):
         results = {'format_version': 2}
-        if 'tasks' in types_to_export:
-            results['tasks'] = [t.to_flat_dict() for t in self.pl.get_tasks()]
-        if 'tags' in types_to_export:
-            results['tags'] = [t.to_flat_dict() for t in self.pl.get_tags()]
-        if 'comments' in types_to_export:
-            results['comments'] = [t.to_flat_dict() for t in self.pl.get_comments()]
-        if 'attachments' in types_to_export:
-            results['attachments'] = [t.to_flat_dict() for t in
-                                      self.pl.get_attachments()]
-        if 'users' in types_to_export:
-            results['users'] = [t.to_flat_dict() for t in self.pl.get_users()]
-        if 'options' in types_to_export:
-            results['options'] = [t.to_flat_dict() for t in
-                                  self.pl.get_options()]
+        with self.pl.read_only():
+            for key, object_type in export_v2.EXPORT_TYPES:
+                if key in types_to_export:
+                    results[key] = list(self.pl.get_export_rows(object_type))
         return results
 
-    def do_import_data(self, src, keep_id_numbers=True):
+    def generate_export_data(self, types_to_export, fmt=None, compress=False,
+                             batch_size=1000):
+        """Return an iterator of bytes holding the export, produced as it's
+        read from the database. See export_v2 for the formats."""
+        if fmt is None:
+            fmt = export_v2.FORMAT_JSON
+        if fmt not in export_v2.FORMATS:
+            raise werkzeug.exceptions.BadRequest(
+                'Unknown export format: {}'.format(fmt))
+        return self._read_only_chunks(export_v2.generate_export(
+            self.pl, types_to_export, fmt=fmt, compress=compress,
+            batch_size=batch_size))
+
+    def _read_only_chunks(self, chunks):
+        # the export is read as the response is sent, after the request's
+        # unit of work has ended, so it holds one of its own until the last
+        # chunk; a layer that keeps its objects in memory needs that to stop
+        # other requests changing them mid-export
+        with self.pl.transaction():
+            with self.pl.read_only():
+                yield from chunks
+
+    def do_import_data(self, src, keep_id_numbers=True, bulk=False,
+                       chunk_size=None, progress=None):
         if 'format_version' not in src:
             raise werkzeug.exceptions.BadRequest('Missing format_version')
 
+        if keep_id_numbers:
+            self._unarchive_imported_ids(src)
+
         try:
             if src['format_version'] == 1:
                 from . import import_v1
                 return import_v1.import_data(self.pl, src, keep_id_numbers)
             elif src['format_version'] == 2:
                 from . import import_v2
-                return import_v2.import_data(self.pl, src, keep_id_numbers)
+                return import_v2.import_data(self.pl, src, keep_id_numbers,
+                                             bulk=bulk, chunk_size=chunk_size,
+                                             progress=progress)
             else:
                 raise werkzeug.exceptions.BadRequest('Bad format_version')
         except werkzeug.exceptions.HTTPException as e:
@@ -895,7 +980,8 @@ class LogicLayer(object):
 
     def get_task_crud_data(self, current_user):
         return self.load_no_hierarchy(current_user, include_done=True,
-                                      include_deleted=True)
+                                      include_deleted=True,
+                                      include_archived=False)
 
     def do_submit_task_crud(self, crud_data, current_user):
         if current_user is None:
@@ -908,9 +994,24 @@ class LogicLayer(object):
 
         current_timestamp = datetime.now(UTC)
 
-        # TODO: only load tasks that are specified in crud_data
+        # only load the tasks named in crud_data, and only those the user can
+        # see
+        task_ids = set()
+        for key in crud_data:
+            match = re.match(r'task_(\d+)_', key)
+            if match:
+                task_ids.add(int(match.group(1)))
         tasks = self.load_no_hierarchy(current_user, include_done=True,
-                                       include_deleted=True)
+                                       include_deleted=True,
+                                       task_id_in=task_ids,
+                                       include_archived=False)
+
+        # resolve all of the referenced parents with a single query
+        parent_ids = set(
+            int_from_str(crud_data.get('task_{}_parent_id'.format(task.id)))
+            for task in tasks)
+        parent_ids.discard(None)
+        parents_by_id = self.pl.get_tasks_by_ids(parent_ids)
 
         for task in tasks:
             # TODO: re-arrange so that alll statements related to a given
@@ -962,8 +1063,11 @@ class LogicLayer(object):
             if task.expected_cost != cost:
                 task.expected_cost = cost
                 changed = True
-            new_parent = self.pl.get_task(parent_id)
-            if task.parent != new_parent:
+            new_parent = parents_by_id.get(parent_id)
+            # compare ids, so that the current parent isn't loaded just for
+            # the comparison
+            new_parent_id = new_parent.id if new_parent is not None else None
+            if task.parent_id != new_parent_id:
                 task.parent = new_parent
                 changed = True
 
@@ -975,15 +1079,17 @@ class LogicLayer(object):
         self.pl.commit()
 
     def get_tags(self):
-        return list(self.pl.get_tags())
+        with self.pl.read_only():
+            return list(self.pl.get_tags())
 
     def get_tag_data(self, tag_id, current_user):
-        tag = self.pl.get_tag(tag_id)
-        if not tag:
-            raise werkzeug.exceptions.NotFound(
-                "No tag found for the id '{}'".format(tag_id))
-        tasks = self.load_no_hierarchy(current_user, include_done=True,
-                                       include_deleted=True, tag=tag)
+        with self.pl.read_only():
+            tag = self.pl.get_tag(tag_id)
+            if not tag:
+                raise werkzeug.exceptions.NotFound(
+                    "No tag found for the id '{}'".format(tag_id))
+            tasks = self.load_no_hierarchy(current_user, include_done=True,
+                                           include_deleted=True, tag=tag)
         return {
             'tag': tag,
             'tasks': tasks,
@@ -1008,7 +1114,7 @@ class LogicLayer(object):
         return tag
 
     def get_task(self, task_id, current_user):
-        task = self.pl.get_task(task_id)
+        task = self._get_task_for_reading(task_id)
         # TODO: normalize access restrictions and exceptions in LogicLayer
         if task is None:
             raise werkzeug.exceptions.NotFound()
@@ -1027,6 +1133,11 @@ class LogicLayer(object):
                 "No task found for the id '{}'".format(id))
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
+        if task.is_archived:
+            # the task and its children are changed below
+            self.pl.unarchive_tasks([task.id] +
+                                    [child.id for child in task.children])
+            task = self.pl.get_task(task_id)
 
         if self.pl.count_tags(value=task.summary) > 0:
             raise werkzeug.exceptions.Conflict(
@@ -1055,7 +1166,12 @@ class LogicLayer(object):
 
     def load(self, current_user, root_task_id=None, max_depth=0,
              include_done=False, include_deleted=False,
-             exclude_undeadlined=False):
+             exclude_undeadlined=False, include_archived=None):
+        # archived tasks are all done or deleted, so the archive tier is only
+        # read for listings that show those, unless include_archived says
+        # otherwise
+        if include_archived is None:
+            include_archived = include_done or include_deleted
 
         if root_task_id is not None:
             root_task = self.get_task(root_task_id, current_user)
@@ -1083,59 +1199,16 @@ class LogicLayer(object):
         if exclude_undeadlined:
             kwargs['deadline_is_not_none'] = True
 
-        if root_task_id is None:
-            kwargs['parent_id'] = None
-        else:
-            kwargs['task_id_in'] = [root_task_id]
-
-        kwargs['order_by'] = [
-            [self.pl.TASK_ID, self.pl.ASCENDING],
-            [self.pl.ORDER_NUM, self.pl.DESCENDING],
-        ]
+        if root_task_id is not None:
+            kwargs['root_ids'] = [root_task_id]
 
-        tasks = list(self.pl.get_tasks(**kwargs))
+        tasks = []
+        if include_archived:
+            kwargs['include_archived'] = True
 
-        depth = 0
-        for task in tasks:
+        for task, depth in self.pl.get_subtree(max_depth=max_depth, **kwargs):
             task.depth = depth
-
-        if max_depth is None or max_depth > 0:
-
-            buckets = [tasks]
-            next_ids = [t.id for t in tasks]
-            already_ids = set()
-            already_ids.update(next_ids)
-
-            while ((max_depth is None or depth < max_depth) and
-                   len(next_ids) > 0):
-
-                depth += 1
-
-                kwargs = {}
-                if current_user is None or current_user.is_anonymous:
-                    kwargs['is_public'] = True
-                elif not current_user.is_admin:
-                    kwargs['is_public_or_users_contains'] = current_user
-                kwargs['parent_id_in'] = next_ids
-                kwargs['task_id_not_in'] = already_ids
-                if not include_done:
-                    kwargs['is_done'] = False
-                if not include_deleted:
-                    kwargs['is_deleted'] = False
-                if exclude_undeadlined:
-                    kwargs['deadline_is_not_none'] = True
-
-                children = list(self.pl.get_tasks(**kwargs))
-
-                for child in children:
-                    child.depth = depth
-
-                child_ids = set(map(lambda t: t.id, children))
-                next_ids = child_ids - already_ids
-                already_ids.update(child_ids)
-                buckets.append(children)
-            tasks = list(
-                set([task for bucket in buckets for task in bucket]))
+            tasks.append(task)
 
         return tasks
 
@@ -1145,7 +1218,11 @@ class LogicLayer(object):
                           tag=None, paginate=False, pager=None, page_num=None,
                           tasks_per_page=None, parent_id_is_none=False,
                           parent_id=None, order_by_order_num=False,
-                          order_by_deadline=False):
+                          order_by_deadline=False, cursor=None,
+                          task_id_in=None, include_archived=None):
+        # see load
+        if include_archived is None:
+            include_archived = include_done or include_deleted
 
         kwargs = {}
 
@@ -1171,6 +1248,9 @@ class LogicLayer(object):
         elif parent_id is not None:
             kwargs['parent_id'] = parent_id
 
+        if task_id_in is not None:
+            kwargs['task_id_in'] = task_id_in
+
         if tag is not None:
             if tag == str(tag):
                 value = tag
@@ -1197,9 +1277,20 @@ class LogicLayer(object):
         if order_by:
             kwargs['order_by'] = order_by
 
+        if include_archived:
+            kwargs['include_archived'] = True
+
         if paginate:
             kwargs['page_num'] = page_num
             kwargs['tasks_per_page'] = tasks_per_page
+            if cursor is not None:
+                # keyset pagination; an empty cursor means the first page
+                if cursor:
+                    try:
+                        decode_cursor(cursor)
+                    except ValueError as e:
+                        raise werkzeug.exceptions.BadRequest(str(e))
+                kwargs['cursor'] = cursor
             _pager = self.pl.get_paginated_tasks(**kwargs)
             tasks = list(_pager.items)
             for task in tasks:
@@ -1219,16 +1310,52 @@ class LogicLayer(object):
 
     def search(self, search_query, current_user):
 
-        kwargs = {
-            'summary_description_search_term': search_query
-        }
+        kwargs = {}
 
         if not current_user.is_admin:
             kwargs['users_contains'] = current_user
 
-        results = self.pl.get_tasks(**kwargs)
+        with self.pl.read_only():
+            results = list(self.pl.search_tasks(search_query, **kwargs))
 
-        return results
+        return (result.task for result in results)
+
+    def get_search_data(self, search_query, current_user, page_num=None,
+                        tasks_per_page=None):
+
+        if page_num is not None and not isinstance(page_num, Number):
+            raise TypeError('page_num must be a number')
+        if page_num is not None and page_num < 1:
+            raise ValueError('page_num must be greater than zero')
+        if tasks_per_page is not None and not isinstance(tasks_per_page,
+                                                         Number):
+            raise TypeError('tasks_per_page must be a number')
+        if tasks_per_page is not None and tasks_per_page < 1:
+            raise ValueError('tasks_per_page must be greater than zero')
+
+        if page_num is None:
+            page_num = 1
+        if tasks_per_page is None:
+            tasks_per_page = 20
+
+        kwargs = {}
+        if not current_user.is_admin:
+            kwargs['users_contains'] = current_user
+
+        with self.pl.read_only():
+            total = self.pl.count_search_results(search_query, **kwargs)
+            results = list(self.pl.search_tasks(
+                search_query, limit=tasks_per_page,
+                offset=(page_num - 1) * tasks_per_page, **kwargs))
+        num_pages = (total + tasks_per_page - 1) // tasks_per_page
+        pager = Pager(page=page_num, per_page=tasks_per_page, items=results,
+                      total=total, num_pages=num_pages, _pager=None)
+
+        return {
+            'query': search_query,
+            'results': results,
+            'pager': pager,
+        }
 
     def do_add_dependee_to_task(self, task_id, dependee_id, current_user):
         if task_id is None:
@@ -1238,14 +1365,14 @@ class LogicLayer(object):
         if current_user is None:
             raise ValueError("No current_user was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        dependee = self.pl.get_task(dependee_id)
+        dependee = self._get_unarchived_task(dependee_id)
         if dependee is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(dependee_id))
@@ -1267,14 +1394,14 @@ class LogicLayer(object):
         if current_user is None:
             raise ValueError("No current_user was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        dependee = self.pl.get_task(dependee_id)
+        dependee = self._get_unarchived_task(dependee_id)
         if dependee is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(dependee_id))
@@ -1325,14 +1452,14 @@ class LogicLayer(object):
         if current_user is None:
             raise ValueError("No current_user was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        prioritize_before = self.pl.get_task(prioritize_before_id)
+        prioritize_before = self._get_unarchived_task(prioritize_before_id)
         if prioritize_before is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(prioritize_before_id))
@@ -1357,14 +1484,14 @@ class LogicLayer(object):
         if current_user is None:
             raise ValueError("No current_user was specified.")
 
-        task = self.pl.get_task(task_id)
+        task = self._get_unarchived_task(task_id)
         if task is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(task_id))
         if not TaskUserOps.is_user_authorized_or_admin(task, current_user):
             raise werkzeug.exceptions.Forbidden()
 
-        prioritize_before = self.pl.get_task(prioritize_before_id)
+        prioritize_before = self._get_unarchived_task(prioritize_before_id)
         if prioritize_before is None:
             raise werkzeug.exceptions.NotFound(
                 "No task found for the id '{}'".format(prioritize_before_id))
@@ -1417,25 +1544,93 @@ class LogicLayer(object):
             raise Exception(
                 "Task (id {}) has not been deleted.".format(task.id))
 
-        self.pl.delete(task)
-        self.pl.commit()
+        return self._purge_deleted_tasks(task_ids=[task.id])
 
     def purge_all_deleted_tasks(self, current_user):
         if not current_user.is_admin:
             raise Forbidden('Current user is not authorized to purge tasks.')
-        n = 0
-        deleted_tasks = list(self.pl.get_tasks(is_deleted=True))
-        for task in deleted_tasks:
-            self.purge_task(task, current_user)
-            n += 1
-        self.pl.commit()
-        return n
+        return self._purge_deleted_tasks()
+
+    def _purge_deleted_tasks(self, task_ids=None):
+        with self.pl.transaction():
+            if task_ids is None:
+                self.pl.unarchive_tasks(
+                    self.pl.get_archived_task_ids(is_deleted=True))
+            else:
+                self.pl.unarchive_tasks(task_ids)
+            counts, paths = self.pl.purge_deleted_tasks(task_ids=task_ids)
+            # the files are only removed once the records are gone for good
+            self.pl.call_after_commit(
+                lambda: self._delete_attachment_files(paths))
+        self._logger.info(
+            'purged %d tasks, %d comments, %d attachments and %d links; '
+            '%d children moved to the top level', counts['tasks'],
+            counts['comments'], counts['attachments'], counts['links'],
+            counts['children'])
+        return counts
+
+    def _delete_attachment_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(os.path.join(self.upload_folder, path))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                self._logger.warning('could not delete attachment file %s',
+                                     path, exc_info=True)
+
+    def _get_task_for_reading(self, task_id):
+        # an archived task that is only being looked at is read where it is,
+        # so that viewing it writes nothing
+        return self.pl.get_task(task_id, include_archived=True)
+
+    def _get_unarchived_task(self, task_id):
+        # an archived task that is about to be changed is moved back into
+        # the task table first, so that everything that changes tasks only
+        # ever has to deal with tasks in the hot tier
+        task = self.pl.get_task(task_id)
+        if task is None and self.pl.unarchive_tasks([task_id]):
+            task = self.pl.get_task(task_id)
+        return task
+
+    def archive_finished_tasks(self, days):
+        """Move tasks that have been done or deleted for more than the given
+        number of days into the archive tier. Returns a dict of counts."""
+        updated_before = datetime.now(UTC) - timedelta(days=days)
+        with self.pl.transaction():
+            counts = self.pl.archive_tasks(updated_before)
+        self._logger.info(
+            'archived %d tasks, %d comments, %d attachments and %d links',
+            counts['tasks'], counts['comments'], counts['attachments'],
+            counts['links'])
+        return counts
+
+    def _unarchive_imported_ids(self, src):
+        # an imported id that is already taken in the archive would only
+        # clash once the archived row is moved back, so the archived tasks
+        # holding any of the ids are moved back now, and the import then
+        # treats them the same as ids taken in the task table
+        def get_ids(key):
+            return [obj['id'] for obj in src.get(key) or ()
+                    if isinstance(obj, dict) and obj.get('id') is not None]
+
+        comment_key = 'notes' if src['format_version'] == 1 else 'comments'
+        with self.pl.transaction():
+            task_ids = self.pl.unarchive_tasks(
+                self.pl.get_archived_task_ids_owning(
+                    task_ids=get_ids('tasks'),
+                    comment_ids=get_ids(comment_key),
+                    attachment_ids=get_ids('attachments')))
+        if task_ids:
+            self._logger.info('moved %d archived tasks back for import, '
+                              'because their ids are in the import',
+                              len(task_ids))
 
     def pl_get_task(self, task_id):
-        return self.pl.get_task(task_id)
+        return self._get_task_for_reading(task_id)
 
     def pl_get_attachment(self, attachment_id):
-        return self.pl.get_attachment(attachment_id)
+        return self.pl.get_attachment(attachment_id, include_archived=True)
 
     def pl_get_user_by_email(self, email):
         return self.pl.get_user_by_email(email)
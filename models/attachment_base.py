@@ -6,6 +6,7 @@ from .object_types import ObjectTypes
 
 
 class AttachmentBase(object):
+    __slots__ = ()
 
     FIELD_ID = 'ID'
     FIELD_PATH = 'PATH'
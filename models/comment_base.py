@@ -6,6 +6,7 @@ from models.object_types import ObjectTypes
 
 
 class CommentBase(object):
+    __slots__ = ()
 
     FIELD_ID = 'ID'
     FIELD_CONTENT = 'CONTENT'
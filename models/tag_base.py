@@ -4,6 +4,7 @@ from models.object_types import ObjectTypes
 
 
 class TagBase(object):
+    __slots__ = ()
 
     FIELD_ID = 'ID'
     FIELD_VALUE = 'VALUE'
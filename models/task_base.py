@@ -6,7 +6,12 @@ from models.object_types import ObjectTypes
 
 
 class TaskBase(object):
+    # the in-memory models use __slots__, which only saves anything if
+    # every base class has them too
+    __slots__ = ()
+
     depth = 0
+    is_archived = False
 
     FIELD_ID = 'ID'
     FIELD_SUMMARY = 'SUMMARY'
@@ -0,0 +1,90 @@
+import collections
+import threading
+import time
+
+
+class CountCache(object):
+    """Remembers the number of rows matched by a filtered task query, so that
+    moving between the pages of one listing doesn't count the whole listing
+    again each time.
+
+    Any write to the tasks calls invalidate(), which empties the cache and
+    starts a new generation. A count is only stored if no invalidation
+    happened while it was being computed, so that a count of data that has
+    since changed can't get in after the fact.
+
+    The cache lives in a single process. ttl (in seconds) bounds how stale a
+    count can get when other processes write to the same database; use None
+    to keep entries until the next invalidation."""
+
+    def __init__(self, maxsize=1024, ttl=30, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Get the cached count for key, or None if there isn't one."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                count, expires = entry
+                if expires is None or self._clock() < expires:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return count
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, count, generation):
+        """Store count for key, unless the cache has been invalidated since
+        generation was read."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            expires = None
+            if self.ttl is not None:
+                expires = self._clock() + self.ttl
+            self._entries[key] = (count, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        count = self.get(key)
+        if count is not None:
+            return count
+        generation = self.generation
+        count = compute()
+        self.set(key, count, generation)
+        return count
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+
+def make_count_key(**filters):
+    """Build a hashable cache key out of the task filters passed to
+    get_paginated_tasks. Users and tags are reduced to their ids; e.g. every
+    non-admin user gets their own visibility class through
+    is_public_or_users_contains, while admins (with no user filter) all share
+    one."""
+    key = []
+    for name in sorted(filters):
+        value = filters[name]
+        if hasattr(value, 'object_type'):
+            value = (value.object_type, value.id)
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            value = tuple(sorted(value, key=repr))
+        key.append((name, value))
+    return tuple(key)
@@ -0,0 +1,327 @@
+import threading
+from datetime import datetime
+
+from dateutil.parser import parse as dparse
+from sqlalchemy.engine import make_url
+
+import logging_util
+from collections_util import assign
+from conversions import bool_from_str, money_from_str
+from models.object_types import ObjectTypes
+from persistence.in_memory.journal import Journal, JournalError
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+from persistence.in_memory.models.attachment import Attachment
+from persistence.in_memory.models.comment import Comment
+from persistence.in_memory.models.option import Option
+from persistence.in_memory.models.tag import Tag
+from persistence.in_memory.models.task import Task
+from persistence.in_memory.models.user import User
+
+JOURNAL_URI_SCHEME = 'memory+journal'
+
+DEFAULT_COMPACT_EVERY = 1000
+
+_CLASSES = {
+    ObjectTypes.Task: Task,
+    ObjectTypes.Tag: Tag,
+    ObjectTypes.Comment: Comment,
+    ObjectTypes.Attachment: Attachment,
+    ObjectTypes.User: User,
+    ObjectTypes.Option: Option,
+}
+
+# each relationship is written down on one side only; the other side is
+# filled in by the models when that one is set
+_DERIVED_FIELDS = {
+    ObjectTypes.Task: ('children_ids', 'dependant_ids',
+                       'prioritize_after_ids', 'comment_ids',
+                       'attachment_ids'),
+    ObjectTypes.Tag: ('task_ids',),
+    ObjectTypes.User: ('task_ids',),
+}
+
+_LINK_FIELDS = {
+    ObjectTypes.Task: ('parent_id', 'tag_ids', 'user_ids', 'dependee_ids',
+                       'prioritize_before_ids'),
+    ObjectTypes.Comment: ('task_id',),
+    ObjectTypes.Attachment: ('task_id',),
+}
+
+_DATETIME_FIELDS = {
+    ObjectTypes.Task: ('deadline', 'date_created', 'date_last_updated'),
+    ObjectTypes.Comment: ('timestamp', 'date_last_updated'),
+    ObjectTypes.Attachment: ('timestamp',),
+}
+
+
+def is_journal_uri(db_uri):
+    return db_uri is not None and \
+        db_uri.startswith(JOURNAL_URI_SCHEME + ':')
+
+
+def _to_row(domobj):
+    row = domobj.to_flat_dict()
+    for field in _DERIVED_FIELDS.get(domobj.object_type, ()):
+        row.pop(field, None)
+    # to_flat_dict leaves a parent or task of None under its own name
+    for field in ('parent', 'task'):
+        if field in row:
+            row[field + '_id'] = row.pop(field)
+    return row
+
+
+def _parse_datetime(value):
+    # the rows hold str(datetime), which fromisoformat reads far faster than
+    # dateutil does
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return dparse(value)
+
+
+def _from_row(object_type, row):
+    values = dict(row)
+    links = {field: values.pop(field)
+             for field in _LINK_FIELDS.get(object_type, ()) if field in values}
+    for field in _DATETIME_FIELDS.get(object_type, ()):
+        if values.get(field) is not None:
+            values[field] = _parse_datetime(values[field])
+    if object_type == ObjectTypes.Task and \
+            values.get('expected_cost') is not None:
+        values['expected_cost'] = money_from_str(values['expected_cost'])
+    return values, links
+
+
+class DurableInMemoryPersistenceLayer(InMemoryPersistenceLayer):
+    """An InMemoryPersistenceLayer that keeps its contents on disk, in a
+    Journal in the directory at path. Each commit is appended to the
+    journal before commit() returns, and every compact_every commits the
+    whole store is written to a snapshot and the journal is started over.
+    When the layer is made, it loads the snapshot and the journal after it.
+
+    Everything is still served from memory, so the layer is meant for one
+    process; the journal's lock keeps a second one from opening the same
+    directory. Units of work from different threads take turns.
+
+    A commit is applied to memory before it is written down, so if the
+    journal can't be appended to, a snapshot is written in its place. If
+    that fails too, the commit raises and the layer refuses to commit
+    anything else until a snapshot has been written, which is tried again
+    at the start of each unit of work, or can be done with compact()."""
+
+    _logger = logging_util.get_logger_by_name(
+        __name__, 'DurableInMemoryPersistenceLayer')
+
+    def __init__(self, path, compact_every=DEFAULT_COMPACT_EVERY, fsync=True):
+        super(DurableInMemoryPersistenceLayer, self).__init__()
+        self.compact_every = compact_every
+        self._unit_of_work_lock = threading.RLock()
+        self._local = threading.local()
+        self._journal = None
+        self._journal_error = None
+        journal = Journal(path, fsync=fsync)
+        count = 0
+        for record in journal.load():
+            self._apply(record)
+            count += 1
+        self._logger.info('loaded %d records from %s', count, path)
+        self._journal = journal
+        if journal.records_since_snapshot >= compact_every:
+            self.compact()
+
+    @staticmethod
+    def from_uri(db_uri):
+        """Make a layer from a URI such as memory+journal:///data/tudor.
+        As with SQLite URIs, three slashes are followed by a relative path
+        and four by an absolute one. The query can set compact_every=N and
+        fsync=false."""
+        url = make_url(db_uri)
+        if url.drivername != JOURNAL_URI_SCHEME:
+            raise ValueError('Not a {} URI: {}'.format(JOURNAL_URI_SCHEME,
+                                                       db_uri))
+        if not url.database:
+            raise ValueError('No directory given in {}'.format(db_uri))
+        query = dict(url.query)
+        compact_every = int(query.pop('compact_every', DEFAULT_COMPACT_EVERY))
+        fsync = bool_from_str(query.pop('fsync', 'true'))
+        if query:
+            raise ValueError('Unknown options in {}: {}'.format(
+                db_uri, ', '.join(sorted(query))))
+        return DurableInMemoryPersistenceLayer(
+            url.database, compact_every=compact_every, fsync=fsync)
+
+    def close(self):
+        self._journal.close()
+
+    def _get_transaction_scope(self):
+        return getattr(self._local, 'scope', None)
+
+    def _set_transaction_scope(self, scope):
+        self._local.scope = scope
+
+    def begin_transaction(self, expire_on_commit=True):
+        self._unit_of_work_lock.acquire()
+        try:
+            if self._journal_error is not None and \
+                    not self.in_transaction():
+                self._try_to_recover()
+            return super(DurableInMemoryPersistenceLayer,
+                         self).begin_transaction(expire_on_commit)
+        except BaseException:
+            self._unit_of_work_lock.release()
+            raise
+
+    def end_transaction(self, error=False):
+        if not self.in_transaction():
+            return super(DurableInMemoryPersistenceLayer,
+                         self).end_transaction(error)
+        try:
+            return super(DurableInMemoryPersistenceLayer,
+                         self).end_transaction(error)
+        finally:
+            self._unit_of_work_lock.release()
+
+    def _committed_key(self, domobj):
+        values = self._values_by_object[domobj]
+        if domobj.object_type == ObjectTypes.Option:
+            return values['key']
+        return values['id']
+
+    def _commit(self, expire_on_commit=True):
+        if self._journal is None:
+            super(DurableInMemoryPersistenceLayer, self)._commit(
+                expire_on_commit)
+            return
+        if self._journal_error is not None and (
+                self._added_objects or self._deleted_objects or
+                self._changed_objects):
+            raise JournalError(
+                'Nothing can be committed until a snapshot has been '
+                'written, because an earlier commit could not be written '
+                'to the journal: {}'.format(self._journal_error))
+        deletes = [[domobj.object_type, self._committed_key(domobj)]
+                   for domobj in self._deleted_objects]
+        changed = [(domobj, self._committed_key(domobj))
+                   for domobj in self._changed_objects
+                   if domobj not in self._deleted_objects]
+        added = list(self._added_objects)
+        super(DurableInMemoryPersistenceLayer, self)._commit(expire_on_commit)
+
+        puts = [[domobj.object_type, key, _to_row(domobj)]
+                for domobj, key in changed]
+        puts.extend([domobj.object_type, None, _to_row(domobj)]
+                    for domobj in added)
+        if not puts and not deletes:
+            return
+        try:
+            self._journal.append(puts, deletes)
+        except Exception as e:
+            # the change is already in memory, and a snapshot of the whole
+            # store covers it just as well as the record would have. it also
+            # starts the journal over, dropping whatever part of the record
+            # made it to disk.
+            self._logger.exception('could not append to the journal; '
+                                   'writing a snapshot instead')
+            try:
+                self.compact()
+            except Exception:
+                self._logger.exception('could not write a snapshot either')
+                self._journal_error = e
+                raise e
+            return
+        if self._journal.records_since_snapshot >= self.compact_every:
+            try:
+                self.compact()
+            except Exception:
+                # the commit is in the journal already; compacting is tried
+                # again after the next one
+                self._logger.exception('could not compact the journal')
+
+    def _try_to_recover(self):
+        # with nothing pending, a snapshot holds exactly what has been
+        # committed, including the commit that never made it to the journal
+        if self._added_objects or self._deleted_objects or \
+                self._changed_objects:
+            return
+        try:
+            self.compact()
+        except Exception:
+            self._logger.exception('still unable to write a snapshot')
+
+    def compact(self):
+        """Write everything to a new snapshot and start the journal over.
+        This also lets the layer commit again after the journal failed."""
+        if self._added_objects or self._deleted_objects or \
+                self._changed_objects:
+            raise Exception('There are changes that have not been committed.')
+        puts = []
+        for objects in (self._tasks, self._tags, self._users, self._options,
+                        self._comments, self._attachments):
+            puts.extend([domobj.object_type, None, _to_row(domobj)]
+                        for domobj in objects)
+        self._journal.write_snapshot(puts)
+        if self._journal_error is not None:
+            self._logger.info('the journal is working again')
+            self._journal_error = None
+        self._logger.info('wrote a snapshot of %d objects at record %d',
+                          len(puts), self._journal.seq)
+
+    def _apply(self, record):
+        """Make the changes in a journal record or snapshot, and commit them
+        without writing them to the journal again."""
+        deleted = [self._get_objects_by_id(object_type)[key]
+                   for object_type, key in record['delete']]
+
+        applied = []
+        for object_type, key, row in record['put']:
+            values, links = _from_row(object_type, row)
+            domobj = None
+            if key is not None:
+                domobj = self._get_objects_by_id(object_type).get(key)
+            if domobj is None:
+                domobj = _CLASSES[object_type].from_dict(values)
+                # nothing is rolled back while loading, so this skips the
+                # copy of the values that add() keeps for that
+                self._added_objects.add(domobj)
+            else:
+                domobj.update_from_dict(values)
+            applied.append((domobj, links))
+
+        # the links can point at objects from anywhere in the record, so
+        # they're set once all of them are in place
+        put_by_id = {(domobj.object_type, domobj.id): domobj
+                     for domobj, links in applied}
+
+        def get(object_type, object_id):
+            if object_id is None:
+                return None
+            domobj = put_by_id.get((object_type, object_id))
+            if domobj is None:
+                domobj = self._get_objects_by_id(object_type)[object_id]
+            return domobj
+
+        def get_all(object_type, object_ids):
+            return [get(object_type, _) for _ in object_ids]
+
+        for domobj, links in applied:
+            if 'parent_id' in links:
+                domobj.parent = get(ObjectTypes.Task, links['parent_id'])
+            if 'task_id' in links:
+                domobj.task = get(ObjectTypes.Task, links['task_id'])
+            if 'tag_ids' in links:
+                assign(domobj.tags, get_all(ObjectTypes.Tag,
+                                            links['tag_ids']))
+            if 'user_ids' in links:
+                assign(domobj.users, get_all(ObjectTypes.User,
+                                             links['user_ids']))
+            if 'dependee_ids' in links:
+                assign(domobj.dependees, get_all(ObjectTypes.Task,
+                                                 links['dependee_ids']))
+            if 'prioritize_before_ids' in links:
+                assign(domobj.prioritize_before,
+                       get_all(ObjectTypes.Task,
+                               links['prioritize_before_ids']))
+
+        for domobj in deleted:
+            self.delete(domobj)
+        super(DurableInMemoryPersistenceLayer, self)._commit()
@@ -0,0 +1,179 @@
+import json
+import mmap
+import os
+import pickle
+
+import logging_util
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+SNAPSHOT_FILENAME = 'snapshot'
+JOURNAL_FILENAME = 'journal'
+LOCK_FILENAME = 'lock'
+
+SNAPSHOT_FORMAT = 1
+
+
+class JournalError(Exception):
+    pass
+
+
+class _RowUnpickler(pickle.Unpickler):
+    # a snapshot only holds dicts, lists, strings and numbers, so there is
+    # never a class to look up, and refusing them all means a snapshot can't
+    # be made to run code when it's loaded
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(
+            'Snapshots cannot refer to {}.{}'.format(module, name))
+
+
+class Journal(object):
+    """The files behind a durable in-memory store, kept in one directory.
+
+    Every commit is a record: {"seq": N, "put": [...], "delete": [...]},
+    appended to the journal as a line of JSON and synced before append()
+    returns. Now and then the whole store is written out as a snapshot,
+    a record of the same shape, pickled, that covers everything up to its
+    seq, and the journal is started over. Loading reads the snapshot from
+    a memory map and then the journal records that come after it.
+
+    A crash can leave the last line of the journal half-written. That
+    commit never returned, so the line is dropped when the journal is
+    read. Any other line that can't be read means the journal is damaged,
+    and that is raised rather than quietly losing what comes after it.
+
+    Only one process can have the directory open at a time."""
+
+    _logger = logging_util.get_logger_by_name(__name__, 'Journal')
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.seq = 0
+        self.records_since_snapshot = 0
+        os.makedirs(path, exist_ok=True)
+        self._lock_file = self._lock()
+        self._file = None
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(self.path, SNAPSHOT_FILENAME)
+
+    @property
+    def journal_path(self):
+        return os.path.join(self.path, JOURNAL_FILENAME)
+
+    def _lock(self):
+        lock_file = open(os.path.join(self.path, LOCK_FILENAME), 'a')
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise JournalError(
+                    '{} is in use by another process'.format(self.path))
+        return lock_file
+
+    def load(self):
+        """Yield the snapshot, if there is one, and then each journal
+        record after it, and leave the journal open for appending."""
+        snapshot = self._read_snapshot()
+        if snapshot is not None:
+            self.seq = snapshot['seq']
+            yield snapshot
+        for record in self._read_journal():
+            if record['seq'] <= self.seq:
+                # compaction was interrupted after the snapshot was in
+                # place but before the journal was started over
+                continue
+            self.seq = record['seq']
+            self.records_since_snapshot += 1
+            yield record
+        self._file = open(self.journal_path, 'ab')
+
+    def _read_snapshot(self):
+        try:
+            f = open(self.snapshot_path, 'rb')
+        except FileNotFoundError:
+            return None
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            snapshot = _RowUnpickler(m).load()
+        if snapshot.get('format') != SNAPSHOT_FORMAT:
+            raise JournalError('Unknown snapshot format: {}'.format(
+                snapshot.get('format')))
+        return snapshot
+
+    def _read_journal(self):
+        try:
+            f = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            lines = f.read().split(b'\n')
+        # everything before the last newline was written in full; whatever
+        # follows it is a torn write
+        complete, tail = lines[:-1], lines[-1]
+        offset = 0
+        for number, line in enumerate(complete, 1):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise JournalError(
+                    'The journal in {} is damaged at line {}'.format(
+                        self.path, number))
+            yield record
+            offset += len(line) + 1
+        if tail:
+            self._logger.warning('dropping %d bytes of an unfinished commit '
+                                 'from the end of the journal', len(tail))
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(offset)
+                self._sync(f)
+
+    def append(self, puts, deletes):
+        self.seq += 1
+        record = {'seq': self.seq, 'put': puts, 'delete': deletes}
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        self._file.write(line.encode('utf-8'))
+        self._file.flush()
+        self._sync(self._file)
+        self.records_since_snapshot += 1
+
+    def write_snapshot(self, puts):
+        """Write a snapshot holding puts, which must be everything in the
+        store as of the last record appended, and start the journal over."""
+        snapshot = {'format': SNAPSHOT_FORMAT, 'seq': self.seq,
+                    'put': puts, 'delete': []}
+        tmp_path = self.snapshot_path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            self._sync(f)
+        os.replace(tmp_path, self.snapshot_path)
+        self._sync_directory()
+        self._file.close()
+        self._file = open(self.journal_path, 'wb')
+        self._sync(self._file)
+        self.records_since_snapshot = 0
+
+    def _sync(self, f):
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def _sync_directory(self):
+        # makes the rename of the snapshot itself durable
+        if self.fsync and hasattr(os, 'O_DIRECTORY'):
+            fd = os.open(self.path, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._lock_file.close()
@@ -1,4 +1,5 @@
 
+from contextlib import contextmanager
 from datetime import datetime, UTC
 from itertools import islice
 from numbers import Number
@@ -12,39 +13,52 @@ from persistence.in_memory.models.tag import Tag
 from persistence.in_memory.models.task import Task
 from persistence.in_memory.models.user import User
 from persistence.sqlalchemy.layer import is_iterable
-from persistence.pager import Pager
+from persistence.in_memory.ordered_set import OrderedSet
+from persistence.in_memory.search import InvertedIndex
+from persistence.in_memory.task_index import TaskIndex
+from persistence.pager import Pager, decode_cursor, generate_cursor_pager
+from persistence.search import SearchResult, make_snippet, tokenize
+from persistence.transaction import TransactionMixin
 
 
-class InMemoryPersistenceLayer(object):
+class InMemoryPersistenceLayer(TransactionMixin):
     _logger = logging_util.get_logger_by_name(__name__,
                                               'InMemoryPersistenceLayer')
 
     def __init__(self):
-        self._added_objects = set()
+        # kept in the order they were added, so that they're committed, and
+        # take their ids, in that order
+        self._added_objects = OrderedSet()
         self._deleted_objects = set()
         self._changed_objects = set()
         self._values_by_object = {}
 
-        self._tasks = []  # TODO: change these to sets
+        self._tasks = OrderedSet()
         self._tasks_by_id = {}
 
-        self._tags = []
+        self._tags = OrderedSet()
         self._tags_by_id = {}
         self._tags_by_value = {}
 
-        self._users = []
+        self._users = OrderedSet()
         self._users_by_id = {}
         self._users_by_email = {}
 
-        self._options = []
+        self._options = OrderedSet()
         self._options_by_key = {}
 
-        self._comments = []
+        self._comments = OrderedSet()
         self._comments_by_id = {}
 
-        self._attachments = []
+        self._attachments = OrderedSet()
         self._attachments_by_id = {}
 
+        self._search_index = InvertedIndex()
+        self._task_index = TaskIndex()
+
+        self._transaction_scope = None
+        self._flush_count = 0
+
     UNSPECIFIED = object()
 
     ASCENDING = object()
@@ -77,9 +91,14 @@ class InMemoryPersistenceLayer(object):
                     date_last_updated=date_last_updated,
                     lazy=lazy)
 
-    def get_task(self, task_id):
+    def get_task(self, task_id, include_archived=False):
+        # there is no archive tier in memory, so include_archived is ignored
         return self._tasks_by_id.get(task_id)
 
+    def get_tasks_by_ids(self, task_ids):
+        return {task_id: self._tasks_by_id[task_id] for task_id in task_ids
+                if task_id in self._tasks_by_id}
+
     def get_tasks(self, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
                   parent_id=UNSPECIFIED, parent_id_in=UNSPECIFIED,
                   users_contains=UNSPECIFIED, task_id_in=UNSPECIFIED,
@@ -89,9 +108,15 @@ class InMemoryPersistenceLayer(object):
                   summary_description_search_term=UNSPECIFIED,
                   order_num_greq_than=UNSPECIFIED,
                   order_num_lesseq_than=UNSPECIFIED, order_by=UNSPECIFIED,
-                  limit=UNSPECIFIED):
+                  limit=UNSPECIFIED, include_archived=False):
+        # there is no archive tier in memory, so include_archived is ignored
 
-        query = self._tasks
+        query = self._get_task_candidates(
+            is_done=is_done, is_deleted=is_deleted, is_public=is_public,
+            parent_id=parent_id, parent_id_in=parent_id_in,
+            users_contains=users_contains, task_id_in=task_id_in,
+            deadline_is_not_none=deadline_is_not_none,
+            tags_contains=tags_contains)
 
         if is_done is not self.UNSPECIFIED:
             query = (_ for _ in query if _.is_done == is_done)
@@ -172,6 +197,38 @@ class InMemoryPersistenceLayer(object):
 
         return query
 
+    def _get_task_candidates(self, is_done, is_deleted, is_public, parent_id,
+                             parent_id_in, users_contains, task_id_in,
+                             deadline_is_not_none, tags_contains):
+        # a small query planner: of the criteria that the task index covers,
+        # start from whichever one matches the fewest tasks, and leave the
+        # rest of the criteria to the filters in get_tasks. without any
+        # indexed criteria, fall back to scanning every task.
+        index = self._task_index
+        candidates = []
+        if is_done is not self.UNSPECIFIED:
+            candidates.append(index.get_by_is_done(is_done))
+        if is_deleted is not self.UNSPECIFIED:
+            candidates.append(index.get_by_is_deleted(is_deleted))
+        if is_public is not self.UNSPECIFIED:
+            candidates.append(index.get_by_is_public(is_public))
+        if parent_id is not self.UNSPECIFIED:
+            candidates.append(index.get_by_parent_id(parent_id))
+        if parent_id_in is not self.UNSPECIFIED:
+            candidates.append(index.get_by_parent_ids(parent_id_in))
+        if users_contains is not self.UNSPECIFIED:
+            candidates.append(index.get_by_user(users_contains))
+        if task_id_in is not self.UNSPECIFIED:
+            candidates.append(index.get_by_ids(task_id_in))
+        if deadline_is_not_none:
+            candidates.append(index.get_with_deadline())
+        if tags_contains is not self.UNSPECIFIED:
+            candidates.append(index.get_by_tag(tags_contains))
+        if not candidates:
+            return self._tasks
+        # keep the tasks in the order a scan would find them in
+        return sorted(min(candidates, key=len), key=index.position)
+
     def _get_sort_key_by_order_field(self, order_by):
         if order_by is self.ORDER_NUM:
             return lambda task: task.order_num
@@ -192,7 +249,8 @@ class InMemoryPersistenceLayer(object):
                             order_num_greq_than=UNSPECIFIED,
                             order_num_lesseq_than=UNSPECIFIED,
                             order_by=UNSPECIFIED, limit=UNSPECIFIED,
-                            page_num=None, tasks_per_page=None):
+                            page_num=None, tasks_per_page=None,
+                            cursor=UNSPECIFIED, include_archived=False):
 
         if page_num is not None and not isinstance(page_num, Number):
             raise TypeError('page_num must be a number')
@@ -220,6 +278,9 @@ class InMemoryPersistenceLayer(object):
             order_num_greq_than=order_num_greq_than,
             order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
             limit=limit)
+        if cursor is not self.UNSPECIFIED:
+            return self._get_cursor_paginated_tasks(query, cursor,
+                                                    tasks_per_page)
         tasks = list(query)
         start_task = (page_num - 1) * tasks_per_page
         items = list(islice(tasks, start_task, start_task+tasks_per_page))
@@ -231,6 +292,24 @@ class InMemoryPersistenceLayer(object):
                      items=items, total=total_tasks,
                      num_pages=num_pages, _pager=None)
 
+    def _get_cursor_paginated_tasks(self, query, cursor, tasks_per_page):
+        def key(task):
+            return task.order_num, task.id
+
+        direction = 'n'
+        position = None
+        if cursor:
+            cursor_order_num, cursor_task_id, direction = decode_cursor(cursor)
+            position = (cursor_order_num, cursor_task_id)
+            if direction == 'n':
+                query = (_ for _ in query if key(_) < position)
+            else:
+                query = (_ for _ in query if key(_) > position)
+        tasks = sorted(query, key=key, reverse=(direction == 'n'))
+        tasks = tasks[:tasks_per_page + 1]
+        return generate_cursor_pager(tasks, tasks_per_page, direction,
+                                     position)
+
     def count_tasks(self, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
                     parent_id=UNSPECIFIED, parent_id_in=UNSPECIFIED,
                     users_contains=UNSPECIFIED, task_id_in=UNSPECIFIED,
@@ -240,7 +319,7 @@ class InMemoryPersistenceLayer(object):
                     summary_description_search_term=UNSPECIFIED,
                     order_num_greq_than=UNSPECIFIED,
                     order_num_lesseq_than=UNSPECIFIED, order_by=UNSPECIFIED,
-                    limit=UNSPECIFIED):
+                    limit=UNSPECIFIED, include_archived=False):
 
         return len(list(self.get_tasks(
             is_done=is_done, is_deleted=is_deleted, parent_id=parent_id,
@@ -254,6 +333,94 @@ class InMemoryPersistenceLayer(object):
             order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
             limit=limit)))
 
+    def _task_matches_subtree_criteria(
+            self, task, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
+            is_public=UNSPECIFIED, is_public_or_users_contains=UNSPECIFIED,
+            deadline_is_not_none=False):
+        if is_done is not self.UNSPECIFIED and task.is_done != is_done:
+            return False
+        if is_deleted is not self.UNSPECIFIED and \
+                task.is_deleted != is_deleted:
+            return False
+        if is_public is not self.UNSPECIFIED and task.is_public != is_public:
+            return False
+        if is_public_or_users_contains is not self.UNSPECIFIED and \
+                not (task.is_public or
+                     is_public_or_users_contains in task.users):
+            return False
+        if deadline_is_not_none and task.deadline is None:
+            return False
+        return True
+
+    def get_subtree(self, root_ids=UNSPECIFIED, max_depth=None,
+                    is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
+                    is_public=UNSPECIFIED,
+                    is_public_or_users_contains=UNSPECIFIED,
+                    deadline_is_not_none=False, include_archived=False):
+        filters = dict(
+            is_done=is_done, is_deleted=is_deleted, is_public=is_public,
+            is_public_or_users_contains=is_public_or_users_contains,
+            deadline_is_not_none=deadline_is_not_none)
+
+        def sort_key(task):
+            return -task.order_num, task.id
+
+        if root_ids is self.UNSPECIFIED:
+            level = list(self._task_index.get_by_parent_id(None))
+        else:
+            level = [self._tasks_by_id[_] for _ in root_ids
+                     if _ in self._tasks_by_id]
+        level = [t for t in level
+                 if self._task_matches_subtree_criteria(t, **filters)]
+
+        results = []
+        seen = set()
+        depth = 0
+        while level:
+            level = sorted(set(level) - seen, key=sort_key)
+            seen.update(level)
+            results.extend((t, depth) for t in level)
+            if max_depth is not None and depth >= max_depth:
+                break
+            depth += 1
+            level = [child for t in level for child in t.children
+                     if self._task_matches_subtree_criteria(child,
+                                                             **filters)]
+        return (_ for _ in results)
+
+    def update_subtree(self, root_id, values):
+        ids = []
+        for task, depth in self.get_subtree(root_ids=[root_id]):
+            for attr_name, value in values.items():
+                setattr(task, attr_name, value)
+            ids.append(task.id)
+        return ids
+
+    def _get_search_results(self, term, users_contains=UNSPECIFIED):
+        tokens = tokenize(term)
+        if not tokens:
+            return [], tokens, {}
+        scores = self._search_index.search(tokens)
+        tasks = (self._tasks_by_id[_] for _ in scores)
+        if users_contains is not self.UNSPECIFIED:
+            tasks = (_ for _ in tasks if users_contains in _.users)
+        return list(tasks), tokens, scores
+
+    def search_tasks(self, term, users_contains=UNSPECIFIED, limit=UNSPECIFIED,
+                     offset=UNSPECIFIED):
+        tasks, tokens, scores = self._get_search_results(
+            term, users_contains=users_contains)
+        tasks.sort(key=lambda t: (-scores[t.id], t.id))
+        start = 0 if offset is self.UNSPECIFIED else offset
+        stop = None if limit is self.UNSPECIFIED else start + limit
+        return (SearchResult(_, scores[_.id], make_snippet(_, tokens))
+                for _ in islice(tasks, start, stop))
+
+    def count_search_results(self, term, users_contains=UNSPECIFIED):
+        tasks, tokens, scores = self._get_search_results(
+            term, users_contains=users_contains)
+        return len(tasks)
+
     def create_tag(self, value, description=None, lazy=None):
         return Tag(value=value, description=description, lazy=lazy)
 
@@ -281,7 +448,7 @@ class InMemoryPersistenceLayer(object):
         return Attachment(path=path, description=description,
                           timestamp=timestamp, filename=filename, lazy=lazy)
 
-    def get_attachment(self, attachment_id):
+    def get_attachment(self, attachment_id, include_archived=False):
         if attachment_id is None:
             raise ValueError('No attachment_id provided.')
         return self._attachments_by_id.get(attachment_id)
@@ -304,14 +471,18 @@ class InMemoryPersistenceLayer(object):
             raise ValueError('No comment_id provided.')
         return self._comments_by_id.get(comment_id)
 
-    def get_comments(self, comment_id_in=UNSPECIFIED):
+    def get_comments(self, comment_id_in=UNSPECIFIED, task_id_in=UNSPECIFIED):
         query = self._comments
         if comment_id_in is not self.UNSPECIFIED:
             query = (_ for _ in query if _.id in comment_id_in)
+        if task_id_in is not self.UNSPECIFIED:
+            query = (_ for _ in query if _.task_id in task_id_in)
         return query
 
-    def count_comments(self, comment_id_in=UNSPECIFIED):
-        return len(list(self.get_comments(comment_id_in=comment_id_in)))
+    def count_comments(self, comment_id_in=UNSPECIFIED,
+                       task_id_in=UNSPECIFIED):
+        return len(list(self.get_comments(comment_id_in=comment_id_in,
+                                          task_id_in=task_id_in)))
 
     def create_option(self, key, value):
         return Option(key=key, value=value)
@@ -384,7 +555,195 @@ class InMemoryPersistenceLayer(object):
                 'The object (id={}) has already been added.'.format(obj.id))
         self._deleted_objects.add(obj)
 
-    def commit(self):
+    def _get_objects_by_id(self, object_type):
+        if object_type == ObjectTypes.Task:
+            return self._tasks_by_id
+        if object_type == ObjectTypes.Tag:
+            return self._tags_by_id
+        if object_type == ObjectTypes.Comment:
+            return self._comments_by_id
+        if object_type == ObjectTypes.Attachment:
+            return self._attachments_by_id
+        if object_type == ObjectTypes.User:
+            return self._users_by_id
+        if object_type == ObjectTypes.Option:
+            return self._options_by_key
+        raise Exception('Unknown object type: {}'.format(object_type))
+
+    def _get_pending_objects_by_id(self, object_type):
+        objects_by_id = dict(self._get_objects_by_id(object_type))
+        for domobj in self._added_objects:
+            if self._get_object_type(domobj) == object_type:
+                key = (domobj.key if object_type == ObjectTypes.Option
+                       else domobj.id)
+                objects_by_id[key] = domobj
+        return objects_by_id
+
+    def bulk_insert(self, object_type, rows):
+        objects_by_id = self._get_pending_objects_by_id(object_type)
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        next_id = max((_ for _ in objects_by_id if _ is not None),
+                      default=0) + 1
+        ids = []
+        for row in rows:
+            row = dict(row)
+            task_id = row.pop('task_id', None)
+            parent_id = row.pop('parent_id', None)
+            if object_type == ObjectTypes.Task:
+                domobj = Task.from_dict(row)
+            elif object_type == ObjectTypes.Tag:
+                domobj = Tag.from_dict(row)
+            elif object_type == ObjectTypes.Comment:
+                domobj = Comment.from_dict(row)
+            elif object_type == ObjectTypes.Attachment:
+                domobj = Attachment.from_dict(row)
+            elif object_type == ObjectTypes.User:
+                domobj = User.from_dict(row)
+            else:
+                domobj = Option.from_dict(row)
+            if object_type != ObjectTypes.Option and domobj.id is None:
+                domobj.id = next_id
+            if object_type != ObjectTypes.Option:
+                next_id = max(next_id, domobj.id + 1)
+            if task_id is not None:
+                domobj.task = tasks_by_id[task_id]
+            if parent_id is not None:
+                domobj.parent = tasks_by_id[parent_id]
+            self.add(domobj)
+            ids.append(domobj.key if object_type == ObjectTypes.Option
+                       else domobj.id)
+        return ids
+
+    def bulk_insert_task_links(self, attr_name, pairs):
+        if attr_name == 'tags':
+            object_type = ObjectTypes.Tag
+        elif attr_name == 'users':
+            object_type = ObjectTypes.User
+        elif attr_name in ('dependees', 'prioritize_before'):
+            object_type = ObjectTypes.Task
+        else:
+            raise Exception('Unknown task relationship: {}'.format(attr_name))
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        others_by_id = self._get_pending_objects_by_id(object_type)
+        for task_id, other_id in pairs:
+            getattr(tasks_by_id[task_id], attr_name).append(
+                others_by_id[other_id])
+
+    def get_task_link_ids(self, attr_name, task_ids):
+        if attr_name not in ('tags', 'users', 'dependees',
+                             'prioritize_before'):
+            raise Exception('Unknown task relationship: {}'.format(attr_name))
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        return {task_id: sorted(other.id for other in
+                                getattr(tasks_by_id[task_id], attr_name))
+                for task_id in task_ids}
+
+    def bulk_set_task_parents(self, pairs):
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        for task_id, parent_id in pairs:
+            tasks_by_id[task_id].parent = tasks_by_id.get(parent_id)
+
+    def renumber_siblings(self, parent_id, date_last_updated, gap=2):
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        siblings = sorted((task for task in tasks_by_id.values()
+                           if task.parent_id == parent_id),
+                          key=lambda task: (-task.order_num, task.id))
+        for i, task in enumerate(siblings):
+            task.order_num = gap * (len(siblings) - i)
+            task.date_last_updated = date_last_updated
+
+    def set_task_order_nums(self, order_nums_by_id, date_last_updated):
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        for task_id, order_num in order_nums_by_id.items():
+            task = tasks_by_id[task_id]
+            task.order_num = order_num
+            task.date_last_updated = date_last_updated
+
+    def purge_deleted_tasks(self, task_ids=None):
+        tasks_by_id = self._get_pending_objects_by_id(ObjectTypes.Task)
+        purged = [task for task in tasks_by_id.values()
+                  if task.is_deleted and
+                  (task_ids is None or task.id in task_ids)]
+        purged_ids = set(task.id for task in purged)
+
+        links = set()
+        comments = []
+        attachments = []
+        children = 0
+        for task in purged:
+            links.update(('tags', task.id, tag.id) for tag in task.tags)
+            links.update(('users', task.id, user.id) for user in task.users)
+            links.update(('dependencies', other.id, task.id)
+                         for other in task.dependees)
+            links.update(('dependencies', task.id, other.id)
+                         for other in task.dependants)
+            links.update(('prioritize', other.id, task.id)
+                         for other in task.prioritize_before)
+            links.update(('prioritize', task.id, other.id)
+                         for other in task.prioritize_after)
+            comments.extend(task.comments)
+            attachments.extend(task.attachments)
+            for child in list(task.children):
+                if child.id not in purged_ids:
+                    child.parent = None
+                    children += 1
+
+        purged_attachment_ids = set(att.id for att in attachments)
+        remaining_paths = set(
+            att.path for att in self._attachments
+            if att.id not in purged_attachment_ids)
+        paths = sorted(set(att.path for att in attachments) - remaining_paths)
+
+        for obj in comments + attachments + purged:
+            if obj in self._added_objects:
+                # never committed, so there is nothing to delete
+                self._added_objects.remove(obj)
+                obj.clear_relationships()
+            else:
+                self.delete(obj)
+
+        counts = {'tasks': len(purged), 'comments': len(comments),
+                  'attachments': len(attachments), 'links': len(links),
+                  'children': children}
+        return counts, paths
+
+    def archive_tasks(self, updated_before):
+        # everything is in memory anyway, so there is no archive tier to
+        # move tasks into
+        return {'tasks': 0, 'comments': 0, 'attachments': 0, 'links': 0}
+
+    def unarchive_tasks(self, task_ids):
+        return []
+
+    def get_archived_task_ids(self, is_deleted=None):
+        return []
+
+    def get_archived_task_ids_owning(self, task_ids=(), comment_ids=(),
+                                     attachment_ids=()):
+        return []
+
+    def get_export_rows(self, object_type, batch_size=None):
+        objects = self._get_objects_by_id(object_type)
+        for key in sorted(objects):
+            yield objects[key].to_flat_dict()
+
+    def _get_transaction_scope(self):
+        return self._transaction_scope
+
+    def _set_transaction_scope(self, scope):
+        self._transaction_scope = scope
+
+    def _get_flush_count(self):
+        return self._flush_count
+
+    def _flush(self):
+        # there is nothing between the objects and the storage, so a flush
+        # applies the changes right away, and rolling back a unit of work
+        # only undoes what came after its last commit() call
+        self._commit()
+
+    def _commit(self, expire_on_commit=True):
+        self._flush_count += 1
         for domobj in list(self._added_objects):
             tt = self._get_object_type(domobj)
             if tt != ObjectTypes.Option and domobj.id is None:
@@ -397,22 +756,24 @@ class InMemoryPersistenceLayer(object):
                     raise Exception(
                         'There already exists an attachment with id '
                         '{}'.format(domobj.id))
-                self._attachments.append(domobj)
+                self._attachments.add(domobj)
                 self._attachments_by_id[domobj.id] = domobj
             elif tt == ObjectTypes.Comment:
                 if domobj.id in self._comments_by_id:
                     raise Exception(
                         'There already exists a comment with id {}'.format(
                             domobj.id))
-                self._comments.append(domobj)
+                self._comments.add(domobj)
                 self._comments_by_id[domobj.id] = domobj
             elif tt == ObjectTypes.Task:
                 if domobj.id in self._tasks_by_id:
                     raise Exception(
                         'There already exists a task with id {}'.format(
                             domobj.id))
-                self._tasks.append(domobj)
+                self._tasks.add(domobj)
                 self._tasks_by_id[domobj.id] = domobj
+                self._search_index.add(domobj)
+                self._task_index.add(domobj)
             elif tt == ObjectTypes.Tag:
                 if domobj.id in self._tags_by_id:
                     raise Exception(
@@ -422,7 +783,7 @@ class InMemoryPersistenceLayer(object):
                     raise Exception(
                         'There already exists a tag with value "{}"'.format(
                             domobj.value))
-                self._tags.append(domobj)
+                self._tags.add(domobj)
                 self._tags_by_id[domobj.id] = domobj
                 self._tags_by_value[domobj.value] = domobj
             elif tt == ObjectTypes.Option:
@@ -430,7 +791,7 @@ class InMemoryPersistenceLayer(object):
                     raise Exception(
                         'There already exists an option with key {}'.format(
                             domobj.id))
-                self._options.append(domobj)
+                self._options.add(domobj)
                 self._options_by_key[domobj.id] = domobj
             else:  # tt == ObjectTypes.User
                 if domobj.id in self._users_by_id:
@@ -441,16 +802,21 @@ class InMemoryPersistenceLayer(object):
                     raise Exception(
                         'There already exists a user with email "{}"'.format(
                             domobj.email))
-                self._users.append(domobj)
+                self._users.add(domobj)
                 self._users_by_id[domobj.id] = domobj
                 self._users_by_email[domobj.email] = domobj
             self._values_by_object[domobj] = domobj.to_dict()
             self._added_objects.remove(domobj)
+            domobj.register_changing_listener(self._object_changing)
+            domobj.register_changed_listener(self._object_changed)
         self._added_objects.clear()
 
         for domobj in list(self._deleted_objects):
             tt = self._get_object_type(domobj)
             domobj.clear_relationships()
+            domobj.unregister_change_listener(self._object_changed)
+            self._changed_objects.discard(domobj)
+            self._values_by_object.pop(domobj, None)
             if tt == ObjectTypes.Attachment:
                 self._attachments.remove(domobj)
                 del self._attachments_by_id[domobj.id]
@@ -460,6 +826,8 @@ class InMemoryPersistenceLayer(object):
             elif tt == ObjectTypes.Task:
                 self._tasks.remove(domobj)
                 del self._tasks_by_id[domobj.id]
+                self._search_index.remove(domobj.id)
+                self._task_index.remove(domobj)
             elif tt == ObjectTypes.Tag:
                 self._tags.remove(domobj)
                 del self._tags_by_id[domobj.id]
@@ -485,43 +853,43 @@ class InMemoryPersistenceLayer(object):
                 del collection[old_value]
                 collection[new_value] = domobj
 
-        for domobj in self._tasks:
-            new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'task', 'id',
-                                  self._tasks_by_id)
-            if 'order_num' in new_values and new_values['order_num'] is None:
-                raise ValueError(
-                    'order_num cannot be None, Task "{}" ({})'.format(
-                        domobj.summary, domobj.id))
-            self._values_by_object[domobj] = new_values
-        for domobj in self._tags:
-            new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'tag', 'id',
-                                  self._tags_by_id)
-            _process_changed_attr(domobj, new_values, 'tag', 'value',
-                                  self._tags_by_value)
-            self._values_by_object[domobj] = new_values
-        for domobj in self._comments:
-            new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'comment', 'id',
-                                  self._comments_by_id)
-            self._values_by_object[domobj] = new_values
-        for domobj in self._attachments:
-            new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'attachment', 'id',
-                                  self._attachments_by_id)
-            self._values_by_object[domobj] = new_values
-        for domobj in self._users:
-            new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'user', 'id',
-                                  self._users_by_id)
-            _process_changed_attr(domobj, new_values, 'user', 'email',
-                                  self._users_by_email)
-            self._values_by_object[domobj] = new_values
-        for domobj in self._options:
+        # only the objects that have changed since the last commit need to
+        # be looked at, not everything in the store
+        for domobj in list(self._changed_objects):
+            tt = self._get_object_type(domobj)
             new_values = domobj.to_dict()
-            _process_changed_attr(domobj, new_values, 'option', 'key',
-                                  self._options_by_key)
+            if tt == ObjectTypes.Task:
+                old_values = self._values_by_object[domobj]
+                _process_changed_attr(domobj, new_values, 'task', 'id',
+                                      self._tasks_by_id)
+                if any(old_values[_] != new_values[_]
+                       for _ in ('id', 'summary', 'description')):
+                    self._search_index.remove(old_values['id'])
+                    self._search_index.add(domobj)
+                if ('order_num' in new_values and
+                        new_values['order_num'] is None):
+                    raise ValueError(
+                        'order_num cannot be None, Task "{}" ({})'.format(
+                            domobj.summary, domobj.id))
+            elif tt == ObjectTypes.Tag:
+                _process_changed_attr(domobj, new_values, 'tag', 'id',
+                                      self._tags_by_id)
+                _process_changed_attr(domobj, new_values, 'tag', 'value',
+                                      self._tags_by_value)
+            elif tt == ObjectTypes.Comment:
+                _process_changed_attr(domobj, new_values, 'comment', 'id',
+                                      self._comments_by_id)
+            elif tt == ObjectTypes.Attachment:
+                _process_changed_attr(domobj, new_values, 'attachment', 'id',
+                                      self._attachments_by_id)
+            elif tt == ObjectTypes.User:
+                _process_changed_attr(domobj, new_values, 'user', 'id',
+                                      self._users_by_id)
+                _process_changed_attr(domobj, new_values, 'user', 'email',
+                                      self._users_by_email)
+            else:  # tt == ObjectTypes.Option
+                _process_changed_attr(domobj, new_values, 'option', 'key',
+                                      self._options_by_key)
             self._values_by_object[domobj] = new_values
 
         self._clear_affected_objects()
@@ -566,12 +934,30 @@ class InMemoryPersistenceLayer(object):
             'Unknown object type: {}'.format(objtype))
 
     def rollback(self):
-        for t, d in self._values_by_object.items():
-            t.update_from_dict(d)
+        for t in list(self._changed_objects | self._added_objects):
+            t.update_from_dict(self._values_by_object[t])
         for t in self._added_objects:
             del self._values_by_object[t]
         self._clear_affected_objects()
 
+    def _object_changing(self, domobj, field, value):
+        self._changed_objects.add(domobj)
+        if domobj.object_type == ObjectTypes.Task:
+            self._task_index.task_changing(domobj, field, value)
+
+    def _object_changed(self, domobj, field, operation, value):
+        self._changed_objects.add(domobj)
+        if domobj.object_type == ObjectTypes.Task:
+            self._task_index.task_changed(domobj, field, operation, value)
+
+    def get_pool_stats(self):
+        return {}
+
+    @contextmanager
+    def read_only(self):
+        # there is no replica to read from
+        yield
+
     def _clear_affected_objects(self):
         self._changed_objects.clear()
         self._added_objects.clear()
@@ -1,25 +1,29 @@
 
 import logging_util
 from models.attachment_base import AttachmentBase
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 
 
 class Attachment(Changeable, AttachmentBase):
     _logger = logging_util.get_logger_by_name(__name__, 'Attachment')
 
-    _id = None
-    _timestamp = None
-    _path = None
-    _filename = None
-    _description = ''
-
-    _task = None
+    __slots__ = ('_id', '_timestamp', '_path', '_filename', '_description',
+                 '_task', '_task_lazy')
 
     def __init__(self, path, description=None, timestamp=None, filename=None,
                  lazy=None):
+        self._id = None
+        self._timestamp = None
+        self._path = None
+        self._filename = None
+        self._description = ''
+        self._task = None
+        self._task_lazy = None
         super(Attachment, self).__init__(path, description, timestamp,
                                          filename)
-        self._logger.debug('Attachment.__init__ %s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('Attachment.__init__ %s', self)
 
         if lazy is None:
             lazy = {}
@@ -92,7 +96,8 @@ class Attachment(Changeable, AttachmentBase):
 
     def _populate_task(self):
         if self._task_lazy:
-            self._logger.debug('populating task from lazy %s', self)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('populating task from lazy %s', self)
             value = self._task_lazy()
             self._task_lazy = None
             self.task = value
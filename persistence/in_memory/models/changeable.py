@@ -1,5 +1,6 @@
 
 class Changeable(object):
+    __slots__ = ('changed_listener', 'changing_listener')
 
     OP_SET = 'SET'
     OP_ADD = 'ADD'
@@ -31,4 +32,5 @@ class Changeable(object):
         self.changed_listener = changed_listener
 
     def unregister_change_listener(self, callable):
-        self.change_listener = None
+        self.changing_listener = None
+        self.changed_listener = None
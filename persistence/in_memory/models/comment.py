@@ -1,23 +1,27 @@
 
 import logging_util
 from models.comment_base import CommentBase
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 
 
 class Comment(Changeable, CommentBase):
     _logger = logging_util.get_logger_by_name(__name__, 'Comment')
 
-    _id = None
-    _content = ''
-    _timestamp = None
-    _date_last_updated = None
-
-    _task = None
+    __slots__ = ('_id', '_content', '_timestamp', '_date_last_updated',
+                 '_task', '_task_lazy')
 
     def __init__(self, content, timestamp=None, date_last_updated=None,
                  lazy=None):
+        self._id = None
+        self._content = ''
+        self._timestamp = None
+        self._date_last_updated = None
+        self._task = None
+        self._task_lazy = None
         super(Comment, self).__init__(content, timestamp, date_last_updated)
-        self._logger.debug('Comment.__init__ %s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('Comment.__init__ %s', self)
 
         if lazy is None:
             lazy = {}
@@ -80,7 +84,8 @@ class Comment(Changeable, CommentBase):
 
     def _populate_task(self):
         if self._task_lazy:
-            self._logger.debug('populating task from lazy %s', self)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('populating task from lazy %s', self)
             value = self._task_lazy()
             self._task_lazy = None
             self.task = value
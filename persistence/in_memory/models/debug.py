@@ -0,0 +1,5 @@
+# The in-memory models can log every attribute change and every operation on
+# their collections at debug level. That is a lot of calls for a large store,
+# even with debug logging turned off, so they are only made while this is
+# switched on.
+DEBUG_LOGGING = False
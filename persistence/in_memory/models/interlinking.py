@@ -1,35 +1,48 @@
 import collections.abc
 
 import logging_util
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 
 
 class InterlinkedSet(collections.abc.MutableSet):
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedSet')
 
+    __slots__ = ('container', '_set', '_lazy')
+
     __change_field__ = None
     __attr_counterpart__ = None
 
     def __init__(self, container, lazy=None):
-        self._logger.debug('__init__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__init__')
         if container is None:
             raise ValueError('container cannot be None')
 
         self.container = container
-        self.set = set()
+        # most relationships of most objects stay empty, so the backing set
+        # isn't made until something is put in it
+        self._set = None
         self._lazy = lazy
 
+    @property
+    def set(self):
+        if self._set is None:
+            self._set = set()
+        return self._set
+
     def __repr__(self):
-        self._logger.debug('__repr__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__repr__')
         cls = type(self).__name__
         if self._lazy:
             return '{}(<lazy>)'.format(cls)
         return '{}({})'.format(cls, self.set)
 
     def _populate(self):
-        self._logger.debug('_populate')
         if self._lazy:
-            self._logger.debug('populating the collection')
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('populating the collection')
             self.set.update(self._lazy)
             self._lazy = None
 
@@ -38,41 +51,52 @@ class InterlinkedSet(collections.abc.MutableSet):
         return self.container
 
     def __len__(self):
-        self._logger.debug('__len__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__len__')
         self._populate()
-        return len(self.set)
+        if self._set is None:
+            return 0
+        return len(self._set)
 
     def __contains__(self, item):
-        self._logger.debug('__contains__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__contains__')
         self._populate()
-        return self.set.__contains__(item)
+        return self._set is not None and item in self._set
 
     def __iter__(self):
-        self._logger.debug('__iter__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__iter__')
         self._populate()
-        return self.set.__iter__()
+        if self._set is None:
+            return iter(())
+        return iter(self._set)
 
     def append(self, item):
-        self._logger.debug('append')
-        self._logger.debug('%s: %s', self.c, item)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('append %s: %s', self.c, item)
         self._populate()
         self.add(item)
 
     def __str__(self):
-        self._logger.debug('__str__')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('__str__')
         if self._lazy:
             return 'set(<lazy>)'
         return str(self.set)
 
     def _add(self, item):
-        self._logger.debug('_add')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('_add')
         self._populate()
         self.set.add(item)
 
     def _discard(self, item):
-        self._logger.debug('_discard')
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('_discard')
         self._populate()
-        self.set.discard(item)
+        if self._set is not None:
+            self._set.discard(item)
 
     def count(self):
         return len(self)
@@ -81,11 +105,14 @@ class InterlinkedSet(collections.abc.MutableSet):
 class OneToManySet(InterlinkedSet):
     _logger = logging_util.get_logger_by_name(__name__, 'OneToManySet')
 
+    __slots__ = ()
+
     def add(self, item):
-        self._logger.debug('add')
-        self._logger.debug('%s: %s', self.c, item)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('add %s: %s', self.c, item)
         if item not in self:
-            self._logger.debug('adding the item')
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('adding the item')
             self.container._on_attr_changing(self.__change_field__, None)
             self._add(item)
             setattr(item, self.__attr_counterpart__, self.container)
@@ -93,10 +120,11 @@ class OneToManySet(InterlinkedSet):
                                             Changeable.OP_ADD, item)
 
     def discard(self, item):
-        self._logger.debug('discard')
-        self._logger.debug('%s: %s', self.c, item)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('discard %s: %s', self.c, item)
         if item in self:
-            self._logger.debug('discarding the item')
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('discarding the item')
             self.container._on_attr_changing(self.__change_field__, None)
             self._discard(item)
             setattr(item, self.__attr_counterpart__, None)
@@ -107,11 +135,14 @@ class OneToManySet(InterlinkedSet):
 class ManyToManySet(InterlinkedSet):
     _logger = logging_util.get_logger_by_name(__name__, 'ManyToManySet')
 
+    __slots__ = ()
+
     def add(self, item):
-        self._logger.debug('add')
-        self._logger.debug('%s: %s', self.c, item)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('add %s: %s', self.c, item)
         if item not in self:
-            self._logger.debug('adding the item')
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('adding the item')
             self.container._on_attr_changing(self.__change_field__, None)
             self._add(item)
             getattr(item, self.__attr_counterpart__).add(self.container)
@@ -119,10 +150,11 @@ class ManyToManySet(InterlinkedSet):
                                             Changeable.OP_ADD, item)
 
     def discard(self, item):
-        self._logger.debug('discard')
-        self._logger.debug('%s: %s', self.c, item)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('discard %s: %s', self.c, item)
         if item in self:
-            self._logger.debug('discarding the item')
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('discarding the item')
             self.container._on_attr_changing(self.__change_field__, None)
             self._discard(item)
             getattr(item, self.__attr_counterpart__).discard(self.container)
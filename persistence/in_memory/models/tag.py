@@ -1,6 +1,7 @@
 
 import logging_util
 from models.tag_base import TagBase
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 from persistence.in_memory.models.interlinking import ManyToManySet
 
@@ -8,15 +9,15 @@ from persistence.in_memory.models.interlinking import ManyToManySet
 class Tag(Changeable, TagBase):
     _logger = logging_util.get_logger_by_name(__name__, 'Tag')
 
-    _id = None
-    _value = None
-    _description = None
-
-    _tasks = None
+    __slots__ = ('_id', '_value', '_description', '_tasks')
 
     def __init__(self, value, description=None, lazy=None):
+        self._id = None
+        self._value = None
+        self._description = None
         super(Tag, self).__init__(value=value, description=description)
-        self._logger.debug('Tag.__init__ %s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('Tag.__init__ %s', self)
 
         if lazy is None:
             lazy = {}
@@ -30,7 +31,8 @@ class Tag(Changeable, TagBase):
     @id.setter
     def id(self, value):
         if value != self._id:
-            self._logger.debug('%s: %s -> %s', self, self._id, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self._id, value)
             self._on_attr_changing(self.FIELD_ID, self._id)
             self._id = value
             self._on_attr_changed(self.FIELD_ID, self.OP_SET, self._id)
@@ -42,7 +44,8 @@ class Tag(Changeable, TagBase):
     @value.setter
     def value(self, value):
         if value != self._value:
-            self._logger.debug('%s: %s -> %s', self, self._value, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self._value, value)
             self._on_attr_changing(self.FIELD_VALUE, self._value)
             self._value = value
             self._on_attr_changed(self.FIELD_VALUE, self.OP_SET, self._value)
@@ -54,7 +57,9 @@ class Tag(Changeable, TagBase):
     @description.setter
     def description(self, value):
         if value != self._description:
-            self._logger.debug('%s: %s -> %s', self, self._description, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self._description,
+                                   value)
             self._on_attr_changing(self.FIELD_DESCRIPTION, self._description)
             self._description = value
             self._on_attr_changed(self.FIELD_DESCRIPTION, self.OP_SET,
@@ -69,5 +74,6 @@ class Tag(Changeable, TagBase):
 
 
 class InterlinkedTasks(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TagBase.FIELD_TASKS
     __attr_counterpart__ = 'tags'
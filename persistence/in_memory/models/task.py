@@ -1,5 +1,6 @@
 import logging_util
 from models.task_base import TaskBase
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 from persistence.in_memory.models.interlinking import OneToManySet, \
     ManyToManySet
@@ -8,19 +9,13 @@ from persistence.in_memory.models.interlinking import OneToManySet, \
 class Task(Changeable, TaskBase):
     _logger = logging_util.get_logger_by_name(__name__, 'Task')
 
-    _id = None
-    _summary = None
-    _description = None
-    _is_done = None
-    _is_deleted = None
-    _order_num = None
-    _deadline = None
-    _expected_duration_minutes = None
-    _expected_cost = None
-    _parent = None
-    _is_public = None
-    _date_created = None
-    _date_last_updated = None
+    __slots__ = ('_id', '_summary', '_description', '_is_done', '_is_deleted',
+                 '_order_num', '_deadline', '_expected_duration_minutes',
+                 '_expected_cost', '_parent', '_is_public', '_date_created',
+                 '_date_last_updated', '_parent_lazy', '_lazy', '_dependees',
+                 '_dependants', '_prioritize_before', '_prioritize_after',
+                 '_tags', '_users', '_children', '_comments', '_attachments',
+                 'depth')
 
     def __init__(self, summary, description='', is_done=False,
                  is_deleted=False, deadline=None,
@@ -29,39 +24,59 @@ class Task(Changeable, TaskBase):
                  date_created=None,
                  date_last_updated=None,
                  lazy=None):
+        self._id = None
+        self._summary = None
+        self._description = None
+        self._is_done = None
+        self._is_deleted = None
+        self._order_num = None
+        self._deadline = None
+        self._expected_duration_minutes = None
+        self._expected_cost = None
+        self._parent = None
+        self._is_public = None
+        self._date_created = None
+        self._date_last_updated = None
+        self.depth = TaskBase.depth
+
         super(Task, self).__init__(
             summary, description, is_done, is_deleted, deadline,
             expected_duration_minutes, expected_cost, is_public,
             date_created,
             date_last_updated)
 
-        self._logger.debug('Task.__init__ %s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('Task.__init__ %s', self)
 
         if lazy is None:
             lazy = {}
 
         self._parent_lazy = lazy.get('parent')
 
+        # the collections are made on first use, from the lazy source for
+        # them if there is one. a task in a large store usually only ever
+        # has a few of its relationships filled in.
+        self._lazy = lazy or None
         # self depends on self.dependees
-        self._dependees = InterlinkedDependees(
-            self, lazy=lazy.get('dependees'))
+        self._dependees = None
         # self.dependants depend on self
-        self._dependants = InterlinkedDependants(
-            self, lazy=lazy.get('dependants'))
+        self._dependants = None
         # self is after self.prioritize_before's
         # self has lower priority than self.prioritize_before's
-        self._prioritize_before = InterlinkedPrioritizeBefore(
-            self, lazy=lazy.get('prioritize_before'))
+        self._prioritize_before = None
         # self is before self.prioritize_after's
         # self has higher priority than self.prioritize_after's
-        self._prioritize_after = InterlinkedPrioritizeAfter(
-            self, lazy=lazy.get('prioritize_after'))
-        self._tags = InterlinkedTags(self, lazy=lazy.get('tags'))
-        self._users = InterlinkedUsers(self, lazy=lazy.get('users'))
-        self._children = InterlinkedChildren(self, lazy=lazy.get('children'))
-        self._comments = InterlinkedComments(self, lazy=lazy.get('comments'))
-        self._attachments = InterlinkedAttachments(
-            self, lazy=lazy.get('attachments'))
+        self._prioritize_after = None
+        self._tags = None
+        self._users = None
+        self._children = None
+        self._comments = None
+        self._attachments = None
+
+    def _pop_lazy(self, name):
+        if self._lazy is None:
+            return None
+        return self._lazy.pop(name, None)
 
     @property
     def id(self):
@@ -70,7 +85,8 @@ class Task(Changeable, TaskBase):
     @id.setter
     def id(self, value):
         if value != self._id:
-            self._logger.debug('%s: %s -> %s', self, self.id, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.id, value)
             self._on_attr_changing(self.FIELD_ID, self._id)
             self._id = value
             self._on_attr_changed(self.FIELD_ID, self.OP_SET, self._id)
@@ -82,8 +98,9 @@ class Task(Changeable, TaskBase):
     @summary.setter
     def summary(self, value):
         if value != self._summary:
-            self._logger.debug('%s: %s -> %s',
-                               self, repr(self.summary), repr(value))
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s',
+                                   self, repr(self.summary), repr(value))
             self._on_attr_changing(self.FIELD_SUMMARY, self._summary)
             self._summary = value
             self._on_attr_changed(self.FIELD_SUMMARY, self.OP_SET,
@@ -96,7 +113,9 @@ class Task(Changeable, TaskBase):
     @description.setter
     def description(self, value):
         if value != self._description:
-            self._logger.debug('%s: %s -> %s', self, self.description, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.description,
+                                   value)
             self._on_attr_changing(self.FIELD_DESCRIPTION, self._description)
             self._description = value
             self._on_attr_changed(self.FIELD_DESCRIPTION, self.OP_SET,
@@ -109,7 +128,8 @@ class Task(Changeable, TaskBase):
     @is_done.setter
     def is_done(self, value):
         if value != self._is_done:
-            self._logger.debug('%s: %s -> %s', self, self.is_done, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.is_done, value)
             self._on_attr_changing(self.FIELD_IS_DONE, self._is_done)
             self._is_done = value
             self._on_attr_changed(self.FIELD_IS_DONE, self.OP_SET,
@@ -122,7 +142,9 @@ class Task(Changeable, TaskBase):
     @is_deleted.setter
     def is_deleted(self, value):
         if value != self._is_deleted:
-            self._logger.debug('%s: %s -> %s', self, self.is_deleted, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.is_deleted,
+                                   value)
             self._on_attr_changing(self.FIELD_IS_DELETED, self._is_deleted)
             self._is_deleted = value
             self._on_attr_changed(self.FIELD_IS_DELETED, self.OP_SET,
@@ -135,7 +157,8 @@ class Task(Changeable, TaskBase):
     @order_num.setter
     def order_num(self, value):
         if value != self._order_num:
-            self._logger.debug('%s: %s -> %s', self, self.order_num, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.order_num, value)
             self._on_attr_changing(self.FIELD_ORDER_NUM, self._order_num)
             self._order_num = value
             self._on_attr_changed(self.FIELD_ORDER_NUM, self.OP_SET,
@@ -148,7 +171,8 @@ class Task(Changeable, TaskBase):
     @deadline.setter
     def deadline(self, value):
         if value != self._deadline:
-            self._logger.debug('%s: %s -> %s', self, self.deadline, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.deadline, value)
             self._on_attr_changing(self.FIELD_DEADLINE, self._deadline)
             self._deadline = value
             self._on_attr_changed(self.FIELD_DEADLINE, self.OP_SET,
@@ -161,8 +185,9 @@ class Task(Changeable, TaskBase):
     @expected_duration_minutes.setter
     def expected_duration_minutes(self, value):
         if value != self._expected_duration_minutes:
-            self._logger.debug('%s: %s -> %s', self,
-                               self.expected_duration_minutes, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self,
+                                   self.expected_duration_minutes, value)
             self._on_attr_changing(self.FIELD_EXPECTED_DURATION_MINUTES,
                                    self._expected_duration_minutes)
             self._expected_duration_minutes = value
@@ -176,8 +201,9 @@ class Task(Changeable, TaskBase):
     @expected_cost.setter
     def expected_cost(self, value):
         if value != self._expected_cost:
-            self._logger.debug('%s: %s -> %s', self, self.expected_cost,
-                               value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.expected_cost,
+                                   value)
             self._on_attr_changing(self.FIELD_EXPECTED_COST,
                                    self._expected_cost)
             self._expected_cost = value
@@ -192,7 +218,8 @@ class Task(Changeable, TaskBase):
 
     def _populate_parent(self):
         if self._parent_lazy:
-            self._logger.debug('populating parent from lazy %s', self)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('populating parent from lazy %s', self)
             value = self._parent_lazy()
             self._parent_lazy = None
             self.parent = value
@@ -204,10 +231,12 @@ class Task(Changeable, TaskBase):
 
     @parent.setter
     def parent(self, value):
-        self._logger.debug('%s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('%s', self)
         self._populate_parent()
         if value != self._parent:
-            self._logger.debug('%s: %s -> %s', self, self._parent, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self._parent, value)
             self._on_attr_changing(self.FIELD_PARENT, self._parent)
             if self._parent is not None:
                 self._parent.children.discard(self)
@@ -218,38 +247,63 @@ class Task(Changeable, TaskBase):
 
     @property
     def children(self):
+        if self._children is None:
+            self._children = InterlinkedChildren(
+                self, lazy=self._pop_lazy('children'))
         return self._children
 
     @property
     def tags(self):
+        if self._tags is None:
+            self._tags = InterlinkedTags(self, lazy=self._pop_lazy('tags'))
         return self._tags
 
     @property
     def users(self):
+        if self._users is None:
+            self._users = InterlinkedUsers(self, lazy=self._pop_lazy('users'))
         return self._users
 
     @property
     def dependees(self):
+        if self._dependees is None:
+            self._dependees = InterlinkedDependees(
+                self, lazy=self._pop_lazy('dependees'))
         return self._dependees
 
     @property
     def dependants(self):
+        if self._dependants is None:
+            self._dependants = InterlinkedDependants(
+                self, lazy=self._pop_lazy('dependants'))
         return self._dependants
 
     @property
     def prioritize_before(self):
+        if self._prioritize_before is None:
+            self._prioritize_before = InterlinkedPrioritizeBefore(
+                self, lazy=self._pop_lazy('prioritize_before'))
         return self._prioritize_before
 
     @property
     def prioritize_after(self):
+        if self._prioritize_after is None:
+            self._prioritize_after = InterlinkedPrioritizeAfter(
+                self, lazy=self._pop_lazy('prioritize_after'))
         return self._prioritize_after
 
     @property
     def comments(self):
+        if self._comments is None:
+            self._comments = InterlinkedComments(
+                self, lazy=self._pop_lazy('comments'))
         return self._comments
 
     @property
     def attachments(self):
+        if self._attachments is None:
+            self._attachments = InterlinkedAttachments(
+                self, lazy=self._pop_lazy('attachments'))
         return self._attachments
 
     @property
@@ -259,7 +313,8 @@ class Task(Changeable, TaskBase):
     @is_public.setter
     def is_public(self, value):
         if value != self._is_public:
-            self._logger.debug('%s: %s -> %s', self, self.is_public, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.is_public, value)
             self._on_attr_changing(self.FIELD_IS_PUBLIC,
                                    self._is_public)
             self._is_public = value
@@ -273,7 +328,9 @@ class Task(Changeable, TaskBase):
     @date_created.setter
     def date_created(self, value):
         if value != self._date_created:
-            self._logger.debug('%s: %s -> %s', self, self.date_created, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug('%s: %s -> %s', self, self.date_created,
+                                   value)
             self._on_attr_changing(self.FIELD_DATE_CREATED,
                                    self._date_created)
             self._date_created = value
@@ -287,8 +344,9 @@ class Task(Changeable, TaskBase):
     @date_last_updated.setter
     def date_last_updated(self, value):
         if value != self._date_last_updated:
-            self._logger.debug(
-                '%s: %s -> %s', self, self.date_last_updated, value)
+            if debug.DEBUG_LOGGING:
+                self._logger.debug(
+                    '%s: %s -> %s', self, self.date_last_updated, value)
             self._on_attr_changing(self.FIELD_DATE_LAST_UPDATED,
                                    self._date_last_updated)
             self._date_last_updated = value
@@ -296,7 +354,8 @@ class Task(Changeable, TaskBase):
                                   self._date_last_updated)
 
     def contains_dependency_cycle(self, visited=None):
-        self._logger.debug('%s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('%s', self)
         if visited is None:
             visited = set()
         if self in visited:
@@ -310,7 +369,8 @@ class Task(Changeable, TaskBase):
         return False
 
     def contains_priority_cycle(self, visited=None):
-        self._logger.debug('%s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('%s', self)
         if visited is None:
             visited = set()
         if self in visited:
@@ -323,7 +383,8 @@ class Task(Changeable, TaskBase):
         return False
 
     def clear_relationships(self):
-        self._logger.debug('%s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('%s', self)
         self.parent = None
         self.children.clear()
         self.tags.clear()
@@ -337,30 +398,35 @@ class Task(Changeable, TaskBase):
 
 
 class InterlinkedChildren(OneToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_CHILDREN
     __attr_counterpart__ = 'parent'
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedChildren')
 
 
 class InterlinkedTags(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_TAGS
     __attr_counterpart__ = 'tasks'
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedTags')
 
 
 class InterlinkedUsers(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_USERS
     __attr_counterpart__ = 'tasks'
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedUsers')
 
 
 class InterlinkedDependees(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_DEPENDEES
     __attr_counterpart__ = 'dependants'
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedDependees')
 
 
 class InterlinkedDependants(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_DEPENDANTS
     __attr_counterpart__ = 'dependees'
     _logger = logging_util.get_logger_by_name(__name__,
@@ -368,6 +434,7 @@ class InterlinkedDependants(ManyToManySet):
 
 
 class InterlinkedPrioritizeBefore(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_PRIORITIZE_BEFORE
     __attr_counterpart__ = 'prioritize_after'
     _logger = logging_util.get_logger_by_name(__name__,
@@ -375,6 +442,7 @@ class InterlinkedPrioritizeBefore(ManyToManySet):
 
 
 class InterlinkedPrioritizeAfter(ManyToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_PRIORITIZE_AFTER
     __attr_counterpart__ = 'prioritize_before'
     _logger = logging_util.get_logger_by_name(__name__,
@@ -382,12 +450,14 @@ class InterlinkedPrioritizeAfter(ManyToManySet):
 
 
 class InterlinkedComments(OneToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_COMMENTS
     __attr_counterpart__ = 'task'
     _logger = logging_util.get_logger_by_name(__name__, 'InterlinkedComments')
 
 
 class InterlinkedAttachments(OneToManySet):
+    __slots__ = ()
     __change_field__ = TaskBase.FIELD_ATTACHMENTS
     __attr_counterpart__ = 'task'
     _logger = logging_util.get_logger_by_name(__name__,
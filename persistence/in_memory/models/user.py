@@ -1,6 +1,7 @@
 
 import logging_util
 from models.user_base import UserBase
+from persistence.in_memory.models import debug
 from persistence.in_memory.models.changeable import Changeable
 from persistence.in_memory.models.interlinking import ManyToManySet
 
@@ -8,12 +9,16 @@ from persistence.in_memory.models.interlinking import ManyToManySet
 class User(Changeable, UserBase):
     _logger = logging_util.get_logger_by_name(__name__, 'User')
 
-    _id = None
-    _email = None
-    _hashed_password = None
-    _is_admin = None
+    __slots__ = ('_id', '_email', '_hashed_password', '_is_admin', '_tasks',
+                 '_is_authenticated', '_is_anonymous')
 
     def __init__(self, email, hashed_password=None, is_admin=False, lazy=None):
+        self._id = None
+        self._email = None
+        self._hashed_password = None
+        self._is_admin = None
+        self._is_authenticated = UserBase._is_authenticated
+        self._is_anonymous = UserBase._is_anonymous
         super(User, self).__init__(email=email,
                                    hashed_password=hashed_password,
                                    is_admin=is_admin)
@@ -72,7 +77,8 @@ class User(Changeable, UserBase):
 
     @property
     def tasks(self):
-        self._logger.debug('%s', self)
+        if debug.DEBUG_LOGGING:
+            self._logger.debug('%s', self)
         return self._tasks
 
     def clear_relationships(self):
@@ -80,6 +86,7 @@ class User(Changeable, UserBase):
 
 
 class InterlinkedTasks(ManyToManySet):
+    __slots__ = ()
     __change_field__ = UserBase.FIELD_TASKS
     __attr_counterpart__ = 'users'
     _logger = logging_util.get_logger_by_name(__name__,
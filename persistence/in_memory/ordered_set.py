@@ -0,0 +1,42 @@
+import collections.abc
+
+
+class OrderedSet(collections.abc.MutableSet):
+    """A set that iterates in the order its items were added, with O(1)
+    adds, removals and membership tests. It's a dict with no values, which
+    keeps insertion order and drops a key without shifting the rest the way
+    removing from a list does."""
+
+    def __init__(self, items=()):
+        self._items = dict.fromkeys(items)
+
+    def __repr__(self):
+        return '{}({})'.format(type(self).__name__, list(self._items))
+
+    def __contains__(self, item):
+        return item in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item):
+        self._items[item] = None
+
+    def discard(self, item):
+        self._items.pop(item, None)
+
+    def remove(self, item):
+        del self._items[item]
+
+    def clear(self):
+        self._items.clear()
+
+    def difference_update(self, items):
+        for item in items:
+            self._items.pop(item, None)
@@ -0,0 +1,74 @@
+from bisect import bisect_left
+import collections
+
+from persistence.search import tokenize
+
+SUMMARY_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+
+
+class InvertedIndex(object):
+    """An inverted index of task summaries and descriptions. Maps each token
+    to the ids of the tasks containing it, along with a weighted term
+    frequency. Query tokens are matched as prefixes, the same way the
+    database-backed indexes match them."""
+
+    def __init__(self):
+        self._postings = {}
+        self._tokens_by_task_id = {}
+        self._sorted_tokens = None
+
+    def _get_weighted_tokens(self, task):
+        weights = collections.Counter()
+        for token in tokenize(task.summary):
+            weights[token] += SUMMARY_WEIGHT
+        for token in tokenize(task.description):
+            weights[token] += DESCRIPTION_WEIGHT
+        return weights
+
+    def add(self, task):
+        self.remove(task.id)
+        weights = self._get_weighted_tokens(task)
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._postings[token] = {}
+                self._sorted_tokens = None
+            self._postings[token][task.id] = weight
+        self._tokens_by_task_id[task.id] = set(weights)
+
+    def remove(self, task_id):
+        tokens = self._tokens_by_task_id.pop(task_id, ())
+        for token in tokens:
+            postings = self._postings[token]
+            del postings[task_id]
+            if not postings:
+                del self._postings[token]
+                self._sorted_tokens = None
+
+    def _get_tokens_with_prefix(self, prefix):
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self._postings)
+        tokens = self._sorted_tokens
+        i = bisect_left(tokens, prefix)
+        while i < len(tokens) and tokens[i].startswith(prefix):
+            yield tokens[i]
+            i += 1
+
+    def search(self, query_tokens):
+        """Return a dict mapping the id of every task that matches all of the
+        query tokens to its score."""
+        scores = None
+        for query_token in query_tokens:
+            token_scores = collections.Counter()
+            for token in self._get_tokens_with_prefix(query_token):
+                token_scores.update(self._postings[token])
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = collections.Counter(
+                    {task_id: score + token_scores[task_id]
+                     for task_id, score in scores.items()
+                     if task_id in token_scores})
+            if not scores:
+                break
+        return dict(scores or {})
@@ -0,0 +1,165 @@
+import collections
+import itertools
+
+from models.task_base import TaskBase
+
+EMPTY = frozenset()
+
+
+class TaskIndex(object):
+    """Secondary indexes over the committed tasks of an
+    InMemoryPersistenceLayer: by parent, by is_done, is_deleted and
+    is_public, by tag, by user, and the set of tasks that have a deadline.
+
+    Tasks are indexed when they are committed, and the indexes follow every
+    change made to them afterwards through task_changing() and
+    task_changed(), which the layer calls from the tasks' "changing" and
+    "changed" listeners: the task is taken out of the index for a field
+    just before the field changes, and put back in just after. Parents, tags
+    and users are keyed by object rather than by id, the same way get_tasks
+    compares them, so a parent being given a new id doesn't leave its
+    children under the old one."""
+
+    INDEXED_FIELDS = frozenset([
+        TaskBase.FIELD_ID, TaskBase.FIELD_PARENT, TaskBase.FIELD_IS_DONE,
+        TaskBase.FIELD_IS_DELETED, TaskBase.FIELD_IS_PUBLIC,
+        TaskBase.FIELD_DEADLINE, TaskBase.FIELD_TAGS, TaskBase.FIELD_USERS])
+
+    def __init__(self):
+        self._sequence = itertools.count()
+        self._positions = {}
+        self._tasks_by_id = {}
+        self._by_parent = collections.defaultdict(set)
+        self._by_is_done = collections.defaultdict(set)
+        self._by_is_deleted = collections.defaultdict(set)
+        self._by_is_public = collections.defaultdict(set)
+        self._by_tag = collections.defaultdict(set)
+        self._by_user = collections.defaultdict(set)
+        self._with_deadline = set()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, task):
+        return task in self._positions
+
+    def add(self, task):
+        if task in self._positions:
+            return
+        self._positions[task] = next(self._sequence)
+        for field in self.INDEXED_FIELDS:
+            self._add_field(task, field)
+
+    def remove(self, task):
+        if task not in self._positions:
+            return
+        for field in self.INDEXED_FIELDS:
+            self._remove_field(task, field)
+        del self._positions[task]
+
+    def position(self, task):
+        """The order in which task was added, relative to the others."""
+        return self._positions[task]
+
+    def task_changing(self, task, field, value):
+        if task in self._positions and field in self.INDEXED_FIELDS:
+            self._remove_field(task, field)
+
+    def task_changed(self, task, field, operation, value):
+        if task in self._positions and field in self.INDEXED_FIELDS:
+            self._add_field(task, field)
+
+    def _add_field(self, task, field):
+        if field == TaskBase.FIELD_ID:
+            self._tasks_by_id[task.id] = task
+        elif field == TaskBase.FIELD_PARENT:
+            self._by_parent[task.parent].add(task)
+        elif field == TaskBase.FIELD_IS_DONE:
+            self._by_is_done[task.is_done].add(task)
+        elif field == TaskBase.FIELD_IS_DELETED:
+            self._by_is_deleted[task.is_deleted].add(task)
+        elif field == TaskBase.FIELD_IS_PUBLIC:
+            self._by_is_public[task.is_public].add(task)
+        elif field == TaskBase.FIELD_DEADLINE:
+            if task.deadline is not None:
+                self._with_deadline.add(task)
+        elif field == TaskBase.FIELD_TAGS:
+            for tag in task.tags:
+                self._by_tag[tag].add(task)
+        elif field == TaskBase.FIELD_USERS:
+            for user in task.users:
+                self._by_user[user].add(task)
+
+    def _remove_field(self, task, field):
+        if field == TaskBase.FIELD_ID:
+            if self._tasks_by_id.get(task.id) is task:
+                del self._tasks_by_id[task.id]
+        elif field == TaskBase.FIELD_PARENT:
+            self._discard(self._by_parent, task.parent, task)
+        elif field == TaskBase.FIELD_IS_DONE:
+            self._discard(self._by_is_done, task.is_done, task)
+        elif field == TaskBase.FIELD_IS_DELETED:
+            self._discard(self._by_is_deleted, task.is_deleted, task)
+        elif field == TaskBase.FIELD_IS_PUBLIC:
+            self._discard(self._by_is_public, task.is_public, task)
+        elif field == TaskBase.FIELD_DEADLINE:
+            self._with_deadline.discard(task)
+        elif field == TaskBase.FIELD_TAGS:
+            for tag in task.tags:
+                self._discard(self._by_tag, tag, task)
+        elif field == TaskBase.FIELD_USERS:
+            for user in task.users:
+                self._discard(self._by_user, user, task)
+
+    @staticmethod
+    def _discard(buckets, key, task):
+        bucket = buckets.get(key)
+        if bucket is not None:
+            bucket.discard(task)
+            if not bucket:
+                del buckets[key]
+
+    def get_by_id(self, task_id):
+        return self._tasks_by_id.get(task_id)
+
+    def get_by_ids(self, task_ids):
+        return set(self._tasks_by_id[_] for _ in task_ids
+                   if _ in self._tasks_by_id)
+
+    def get_by_parent_id(self, parent_id):
+        if parent_id is None:
+            return self._by_parent.get(None, EMPTY)
+        parent = self._tasks_by_id.get(parent_id)
+        if parent is not None:
+            return self._by_parent.get(parent, EMPTY)
+        # the parent hasn't been committed; look through the parents
+        # instead, which are far fewer than the tasks
+        tasks = set()
+        for parent, children in self._by_parent.items():
+            if parent is not None and parent.id == parent_id:
+                tasks.update(children)
+        return tasks
+
+    def get_by_parent_ids(self, parent_ids):
+        tasks = set()
+        for parent_id in parent_ids:
+            tasks.update(self.get_by_parent_id(parent_id))
+        return tasks
+
+    def get_by_is_done(self, is_done):
+        return self._by_is_done.get(is_done, EMPTY)
+
+    def get_by_is_deleted(self, is_deleted):
+        return self._by_is_deleted.get(is_deleted, EMPTY)
+
+    def get_by_is_public(self, is_public):
+        return self._by_is_public.get(is_public, EMPTY)
+
+    def get_by_tag(self, tag):
+        return self._by_tag.get(tag, EMPTY)
+
+    def get_by_user(self, user):
+        return self._by_user.get(user, EMPTY)
+
+    def get_with_deadline(self):
+        return self._with_deadline
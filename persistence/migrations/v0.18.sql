@@ -0,0 +1,11 @@
+CREATE INDEX IF NOT EXISTS ix_task_parent_id_order_num ON task (parent_id, order_num);
+CREATE INDEX IF NOT EXISTS ix_task_parent_id_is_deleted_is_done_order_num ON task (parent_id, is_deleted, is_done, order_num);
+CREATE INDEX IF NOT EXISTS ix_task_deadline ON task (deadline) WHERE deadline IS NOT NULL;
+DELETE FROM users_tasks a USING users_tasks b WHERE a.ctid < b.ctid AND a.user_id = b.user_id AND a.task_id = b.task_id;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_users_tasks_user_id_task_id ON users_tasks (user_id, task_id);
+DROP INDEX IF EXISTS ix_users_tasks_user_id;
+CREATE INDEX IF NOT EXISTS ix_tags_tasks_task_id ON tags_tasks (task_id);
+CREATE INDEX IF NOT EXISTS ix_task_dependencies_dependant_id ON task_dependencies (dependant_id);
+CREATE INDEX IF NOT EXISTS ix_task_prioritize_prioritize_after_id ON task_prioritize (prioritize_after_id);
+CREATE INDEX IF NOT EXISTS ix_comment_task_id ON comment (task_id);
+CREATE INDEX IF NOT EXISTS ix_attachment_task_id ON attachment (task_id);
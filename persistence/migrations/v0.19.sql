@@ -0,0 +1 @@
+UPDATE task SET order_num = ranked.order_num FROM (SELECT id, 1024 * row_number() OVER (PARTITION BY parent_id ORDER BY order_num, id DESC) AS order_num FROM task) AS ranked WHERE task.id = ranked.id;
@@ -1,17 +1,53 @@
 
+import base64
+import json
+
+
+def encode_cursor(order_num, task_id, direction):
+    """Encode a keyset position as an opaque, url-safe string. direction is
+    'n' for "the page after this position" or 'p' for "the page before this
+    position"."""
+    data = json.dumps([order_num, task_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode(
+        'ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor into a tuple of
+    (order_num, task_id, direction). Raises ValueError if the cursor is
+    malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        order_num, task_id, direction = data
+    except Exception:
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    if (not isinstance(order_num, int) or not isinstance(task_id, int) or
+            direction not in ('n', 'p')):
+        raise ValueError('Invalid cursor: {}'.format(cursor))
+    return order_num, task_id, direction
+
+
 class Pager(object):
     page = None
     per_page = None
     items = None
     total = None
 
-    def __init__(self, page, per_page, items, total, num_pages, _pager):
+    def __init__(self, page, per_page, items, total, num_pages, _pager,
+                 is_cursor=False, prev_cursor=None, next_cursor=None):
         self.page = page
         self.per_page = per_page
         self.items = list(items)
         self.total = total
         self.num_pages = num_pages
         self._pager = _pager
+        # In cursor (keyset) mode, there is no page number or total. The
+        # neighbouring pages are identified by opaque cursors instead, which
+        # are None if there is no such page.
+        self.is_cursor = is_cursor
+        self.prev_cursor = prev_cursor
+        self.next_cursor = next_cursor
 
     def iter_pages(self, left_edge=2, left_current=2, right_current=5,
                    right_edge=2):
@@ -49,6 +85,8 @@ class Pager(object):
 
     @property
     def has_prev(self):
+        if self.is_cursor:
+            return self.prev_cursor is not None
         return self.page > 1
 
     @property
@@ -57,8 +95,47 @@ class Pager(object):
 
     @property
     def has_next(self):
+        if self.is_cursor:
+            return self.next_cursor is not None
         return self.page < self.num_pages
 
     @property
     def next_num(self):
         return self.page + 1
+
+
+def generate_cursor_pager(tasks, per_page, direction, position=None):
+    """Build a cursor-mode Pager from the (up to per_page + 1) tasks fetched
+    in keyset order. For direction 'n', tasks are in (order_num, id)
+    descending order; for 'p', they are in ascending order, i.e. walking
+    backwards from the cursor position. The extra task, if present, only
+    signals that there is another page in that direction. position is the
+    (order_num, id) of the cursor the tasks were fetched from, if any; an
+    empty page past either end links back to the page that ends there."""
+    tasks = list(tasks)
+    has_more = len(tasks) > per_page
+    tasks = tasks[:per_page]
+    if direction == 'p':
+        tasks.reverse()
+        has_prev = has_more
+        has_next = True
+    else:
+        has_prev = position is not None
+        has_next = has_more
+    prev_cursor = None
+    next_cursor = None
+    if tasks and has_prev:
+        prev_cursor = encode_cursor(tasks[0].order_num, tasks[0].id, 'p')
+    if tasks and has_next:
+        next_cursor = encode_cursor(tasks[-1].order_num, tasks[-1].id, 'n')
+    if not tasks and position is not None:
+        # cursors are exclusive, so the id is moved by one to take in the
+        # row at the cursor itself, which is the last one the client saw
+        order_num, task_id = position
+        if direction == 'n':
+            prev_cursor = encode_cursor(order_num, task_id - 1, 'p')
+        else:
+            next_cursor = encode_cursor(order_num, task_id + 1, 'n')
+    return Pager(page=None, per_page=per_page, items=tasks, total=None,
+                 num_pages=None, _pager=None, is_cursor=True,
+                 prev_cursor=prev_cursor, next_cursor=next_cursor)
@@ -0,0 +1,68 @@
+import re
+
+# Markers placed around the matched terms in search snippets. They are
+# control characters so that they can't clash with anything in the task
+# text, and the view layer turns them into markup after escaping.
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_MAX_WORDS = 12
+
+_token_re = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into casefolded word tokens."""
+    if not text:
+        return []
+    return _token_re.findall(text.casefold())
+
+
+class SearchResult(object):
+    """A task matched by a full-text search. Higher ranks are better
+    matches. The snippet is a short excerpt of the task's text with the
+    matched terms wrapped in SNIPPET_START and SNIPPET_END."""
+
+    def __init__(self, task, rank, snippet):
+        self.task = task
+        self.rank = rank
+        self.snippet = snippet
+
+    def __repr__(self):
+        return 'SearchResult({!r}, {!r})'.format(self.task, self.rank)
+
+
+def make_snippet(task, query_tokens, max_words=SNIPPET_MAX_WORDS):
+    """Build a snippet for the task in Python, for backends that can't do it
+    in the database. Each query token is treated as a prefix, the same way
+    the indexes match them."""
+
+    def matches(word):
+        folded = word.casefold()
+        return any(folded.startswith(qt) for qt in query_tokens)
+
+    for text in (task.summary, task.description):
+        if not text:
+            continue
+        words = text.split()
+        hits = [i for i, word in enumerate(words)
+                if any(matches(t) for t in _token_re.findall(word))]
+        if not hits:
+            continue
+        start = max(0, min(hits[0] - max_words // 3,
+                           len(words) - max_words))
+        end = min(len(words), start + max_words)
+        parts = []
+        for word in words[start:end]:
+            parts.append(_token_re.sub(
+                lambda m: (SNIPPET_START + m.group(0) + SNIPPET_END
+                           if matches(m.group(0)) else m.group(0)),
+                word))
+        snippet = ' '.join(parts)
+        if start > 0:
+            snippet = SNIPPET_ELLIPSIS + snippet
+        if end < len(words):
+            snippet = snippet + SNIPPET_ELLIPSIS
+        return snippet
+
+    return task.summary or ''
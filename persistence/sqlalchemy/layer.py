@@ -1,20 +1,69 @@
 import collections
+import itertools
+from contextlib import contextmanager
 from datetime import datetime, UTC
 from numbers import Number
 
-from sqlalchemy import or_, select, exists, false, func
+from sqlalchemy import or_, select, exists, false, func, cast, literal, \
+    literal_column, String, Text, tuple_, desc, insert, update, bindparam, \
+    case, delete, event, inspect, and_, not_
+from sqlalchemy.orm import Session, aliased
 
+from models.object_types import ObjectTypes
+
+from persistence.sqlalchemy.models.archive import generate_archive_table, \
+    generate_archived_attachment_class, generate_archived_comment_class, \
+    generate_archived_task_class, reserve_archived_ids
 from persistence.sqlalchemy.models.attachment import generate_attachment_class
 from persistence.sqlalchemy.models.comment import generate_comment_class
 from persistence.sqlalchemy.models.option import generate_option_class
 from persistence.sqlalchemy.models.tag import generate_tag_class
 from persistence.sqlalchemy.models.task import generate_task_class
 from persistence.sqlalchemy.models.user import generate_user_class
-from persistence.pager import Pager
+from persistence.count_cache import CountCache, make_count_key
+from persistence.pager import Pager, decode_cursor, generate_cursor_pager
+from persistence.search import SearchResult, make_snippet, tokenize
+from persistence.sqlalchemy.pool import InstrumentedQueuePool
+from persistence.sqlalchemy.search import get_task_search, \
+    register_task_search_ddl
+from persistence.sqlalchemy.statement_cache import StatementCacheStats, \
+    at_call_site, pad_in_values
+from persistence.transaction import TransactionMixin
 
 import logging_util
 
 
+# how many tasks to renumber with each UPDATE ... CASE statement. a power
+# of two, so that a full batch needs no padding (see pad_in_values)
+ORDER_NUM_BATCH_SIZE = 512
+
+# how many tasks to move between the task and archive tables per statement
+ARCHIVE_BATCH_SIZE = 500
+
+
+# objects whose changes can change the number of tasks a filter matches
+COUNTED_OBJECT_TYPES = (ObjectTypes.Task, ObjectTypes.Tag, ObjectTypes.User)
+
+
+@event.listens_for(Session, 'after_flush')
+def _count_flush(session, flush_context):
+    # read by SqlAlchemyPersistenceLayer to report flushes per unit of work
+    session.info['flush_count'] = session.info.get('flush_count', 0) + 1
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if getattr(obj, 'object_type', None) in COUNTED_OBJECT_TYPES:
+            session.info['tasks_written'] = True
+            break
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _note_bulk_write(orm_execute_state):
+    # INSERT/UPDATE/DELETE statements run through the session bypass the
+    # flush; assume they wrote to the tasks
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or
+            orm_execute_state.is_delete):
+        orm_execute_state.session.info['tasks_written'] = True
+
+
 def is_iterable(x):
     return isinstance(x, collections.abc.Iterable)
 
@@ -25,29 +74,35 @@ def as_iterable(x):
     return (x,)
 
 
-class SqlAlchemyPersistenceLayer(object):
+class SqlAlchemyPersistenceLayer(TransactionMixin):
     _logger = logging_util.get_logger_by_name(__name__,
                                               'SqlAlchemyPersistenceLayer')
 
-    def __init__(self, db):
+    def __init__(self, db, count_cache=None):
         self.db = db
+        if count_cache is None:
+            count_cache = CountCache()
+        self.count_cache = count_cache
+        self.statement_cache_stats = StatementCacheStats()
 
         tags_tasks_table = db.Table(
             'tags_tasks',
             db.Column('tag_id', db.Integer, db.ForeignKey('tag.id'),
                       primary_key=True),
             db.Column('task_id', db.Integer, db.ForeignKey('task.id'),
-                      primary_key=True))
+                      primary_key=True),
+            db.Index('ix_tags_tasks_task_id', 'task_id'))
         self.tags_tasks_table = tags_tasks_table
 
         self.DbTag = generate_tag_class(db, tags_tasks_table)
 
         users_tasks_table = db.Table(
             'users_tasks',
-            db.Column('user_id', db.Integer, db.ForeignKey('user.id'),
-                      index=True),
+            db.Column('user_id', db.Integer, db.ForeignKey('user.id')),
             db.Column('task_id', db.Integer, db.ForeignKey('task.id'),
-                      index=True))
+                      index=True),
+            db.Index('ix_users_tasks_user_id_task_id', 'user_id', 'task_id',
+                     unique=True))
         self.users_tasks_table = users_tasks_table
 
         task_dependencies_table = db.Table(
@@ -55,7 +110,8 @@ class SqlAlchemyPersistenceLayer(object):
             db.Column('dependee_id', db.Integer, db.ForeignKey('task.id'),
                       primary_key=True),
             db.Column('dependant_id', db.Integer, db.ForeignKey('task.id'),
-                      primary_key=True))
+                      primary_key=True),
+            db.Index('ix_task_dependencies_dependant_id', 'dependant_id'))
         self.task_dependencies_table = task_dependencies_table
 
         task_prioritize_table = db.Table(
@@ -63,18 +119,43 @@ class SqlAlchemyPersistenceLayer(object):
             db.Column('prioritize_before_id', db.Integer,
                       db.ForeignKey('task.id'), primary_key=True),
             db.Column('prioritize_after_id', db.Integer,
-                      db.ForeignKey('task.id'), primary_key=True))
+                      db.ForeignKey('task.id'), primary_key=True),
+            db.Index('ix_task_prioritize_prioritize_after_id',
+                     'prioritize_after_id'))
         self.task_prioritize_table = task_prioritize_table
 
         self.DbTask = generate_task_class(self, tags_tasks_table,
                                           users_tasks_table,
                                           task_dependencies_table,
                                           task_prioritize_table)
+        register_task_search_ddl(db.metadata, self.DbTask.__table__)
         self.DbComment = generate_comment_class(db)
         self.DbAttachment = generate_attachment_class(db)
         self.DbUser = generate_user_class(db, users_tasks_table)
         self.DbOption = generate_option_class(db)
 
+        # the cold tier: finished tasks and everything hanging off of them,
+        # moved out of the way of the everyday queries. keyed by the name of
+        # the corresponding table in the hot tier.
+        self.archive_tables = {
+            table.name: generate_archive_table(db, table)
+            for table in [self.DbTask.__table__, tags_tasks_table,
+                          users_tasks_table, task_dependencies_table,
+                          task_prioritize_table, self.DbComment.__table__,
+                          self.DbAttachment.__table__]}
+        self.DbArchivedTask = generate_archived_task_class(
+            db, self.archive_tables)
+        self.DbArchivedComment = generate_archived_comment_class(
+            db, self.archive_tables['comment'])
+        self.DbArchivedAttachment = generate_archived_attachment_class(
+            db, self.archive_tables['attachment'])
+        # the expressions for the next id of the tables with an archive that
+        # holds ids, keyed by the name of the table
+        self._next_ids = {
+            model.__table__.name: reserve_archived_ids(
+                model, self.archive_tables[model.__table__.name])
+            for model in [self.DbTask, self.DbComment, self.DbAttachment]}
+
         self._db_by_domain = {}
         self._domain_by_db = {}
 
@@ -96,11 +177,32 @@ class SqlAlchemyPersistenceLayer(object):
         self.db.session.delete(dbobj)
         self._logger.debug('end')
 
-    def commit(self):
+    def _get_transaction_scope(self):
+        # kept on the session, which is specific to the current app context
+        return self.db.session.info.get('transaction_scope')
+
+    def _set_transaction_scope(self, scope):
+        self.db.session.info['transaction_scope'] = scope
+
+    def _get_flush_count(self):
+        return self.db.session.info.get('flush_count', 0)
+
+    def _flush(self):
+        self.db.session.flush()
+
+    def _commit(self, expire_on_commit=True):
         self._logger.debug('begin')
         ###############
         self._logger.debug('committing the db session/transaction')
-        self.db.session.commit()
+        session = self.db.session()
+        previous = session.expire_on_commit
+        session.expire_on_commit = expire_on_commit
+        try:
+            session.commit()
+        finally:
+            session.expire_on_commit = previous
+        if session.info.pop('tasks_written', False):
+            self.count_cache.invalidate()
         self._logger.debug('committed the db session/transaction')
         ###############
         self._logger.debug('end')
@@ -108,11 +210,563 @@ class SqlAlchemyPersistenceLayer(object):
     def rollback(self):
         self._logger.debug('begin')
         self.db.session.rollback()
+        self.db.session.info.pop('tasks_written', None)
         self._logger.debug('end')
 
     def execute(self, *args, **kwargs):
         self.db.session.execute(*args, **kwargs)
 
+    def get_pool_stats(self):
+        """The checkout counters and current state of the connection pool of
+        each engine, keyed by bind: 'primary', or the key of another bind
+        such as the replica. Engines whose pool isn't an
+        InstrumentedQueuePool are left out."""
+        return {
+            key or 'primary': engine.pool.get_stats()
+            for key, engine in self.db.engines.items()
+            if isinstance(engine.pool, InstrumentedQueuePool)}
+
+    @contextmanager
+    def read_only(self):
+        """Let the queries made inside the block read from the replica, if
+        one is configured (see ReplicaRoutingSession). Anything the block
+        writes still goes to the primary, and pins the rest of the request
+        to it."""
+        info = self.db.session.info
+        previous = info.get('read_only', False)
+        info['read_only'] = True
+        try:
+            yield
+        finally:
+            info['read_only'] = previous
+
+    def _get_table_by_object_type(self, object_type):
+        if object_type == ObjectTypes.Task:
+            return self.DbTask.__table__
+        if object_type == ObjectTypes.Tag:
+            return self.DbTag.__table__
+        if object_type == ObjectTypes.Comment:
+            return self.DbComment.__table__
+        if object_type == ObjectTypes.Attachment:
+            return self.DbAttachment.__table__
+        if object_type == ObjectTypes.User:
+            return self.DbUser.__table__
+        if object_type == ObjectTypes.Option:
+            return self.DbOption.__table__
+        raise Exception('Unknown object type: {}'.format(object_type))
+
+    def bulk_insert(self, object_type, rows):
+        """Insert many objects of one type with a single executemany
+        statement, bypassing the ORM. Each row is a dict of column values,
+        and every row must have the same keys. Rows that don't specify an id
+        are assigned one by the database. Returns the primary keys of the
+        new rows, in the same order as the rows. The new rows are not loaded
+        into the session."""
+        table = self._get_table_by_object_type(object_type)
+        pk = list(table.primary_key.columns)[0]
+        if not rows:
+            return []
+        if all(pk.name in row for row in rows):
+            self.db.session.execute(insert(table), rows)
+            return [row[pk.name] for row in rows]
+        stmt = insert(table)
+        next_id = self._next_ids.get(table.name)
+        if next_id is not None and \
+                not self.db.engine.dialect.supports_sequences:
+            # see reserve_archived_ids
+            stmt = stmt.values({pk.name: next_id})
+        stmt = stmt.returning(pk, sort_by_parameter_order=True)
+        return list(self.db.session.execute(stmt, rows).scalars())
+
+    def _get_task_link_table(self, attr_name):
+        # maps a task relationship to the association table backing it,
+        # along with the columns for the task and for the related object
+        if attr_name == 'tags':
+            table = self.tags_tasks_table
+            return table, table.c.task_id, table.c.tag_id
+        if attr_name == 'users':
+            table = self.users_tasks_table
+            return table, table.c.task_id, table.c.user_id
+        if attr_name == 'dependees':
+            table = self.task_dependencies_table
+            return table, table.c.dependant_id, table.c.dependee_id
+        if attr_name == 'prioritize_before':
+            table = self.task_prioritize_table
+            return table, table.c.prioritize_after_id, \
+                table.c.prioritize_before_id
+        raise Exception('Unknown task relationship: {}'.format(attr_name))
+
+    def bulk_insert_task_links(self, attr_name, pairs):
+        """Add many rows to the association table behind one of a task's
+        many-to-many relationships ('tags', 'users', 'dependees' or
+        'prioritize_before'). pairs is a sequence of (task_id, other_id)."""
+        table, task_col, other_col = self._get_task_link_table(attr_name)
+        rows = [{task_col.name: task_id, other_col.name: other_id}
+                for task_id, other_id in pairs]
+        if rows:
+            self.db.session.execute(insert(table), rows)
+
+    def bulk_set_task_parents(self, pairs):
+        """Set the parent of many tasks at once. pairs is a sequence of
+        (task_id, parent_id)."""
+        table = self.DbTask.__table__
+        rows = [{'_task_id': task_id, '_parent_id': parent_id}
+                for task_id, parent_id in pairs]
+        if rows:
+            stmt = update(table).where(
+                table.c.id == bindparam('_task_id')).values(
+                parent_id=bindparam('_parent_id'))
+            self.db.session.connection().execute(stmt, rows)
+            self.db.session.info['tasks_written'] = True
+
+    def renumber_siblings(self, parent_id, date_last_updated, gap=2):
+        """Renumber the children of parent_id (or the top-level tasks, if
+        parent_id is None) so that, in descending order, they have order_num
+        gap*N, gap*(N-1), ..., gap. Ties are broken by id. This is done with
+        a single UPDATE, and the affected tasks in the session are expired
+        so that they get reloaded."""
+        task = self.DbTask.__table__
+        order_by = [task.c.order_num.desc(), task.c.id]
+        if parent_id is None:
+            is_sibling = task.c.parent_id.is_(None)
+        else:
+            is_sibling = task.c.parent_id == parent_id
+        ranked = select(
+            task.c.id,
+            (func.count().over() -
+             func.row_number().over(order_by=order_by) + 1).label('rank')
+        ).where(is_sibling).subquery('ranked')
+        stmt = update(self.DbTask).where(
+            self.DbTask.id == ranked.c.id).values(
+            order_num=ranked.c.rank * gap,
+            date_last_updated=date_last_updated).execution_options(
+            synchronize_session='fetch')
+        self.db.session.execute(at_call_site(stmt, 'renumber_siblings'))
+
+    def set_task_order_nums(self, order_nums_by_id, date_last_updated):
+        """Set the order_num of many tasks at once. order_nums_by_id maps
+        task ids to the new values. Uses one UPDATE ... CASE statement per
+        ORDER_NUM_BATCH_SIZE tasks. Each batch is padded, so that the
+        statement only takes a handful of shapes and stays in the compiled
+        cache."""
+        ids = list(order_nums_by_id)
+        for i in range(0, len(ids), ORDER_NUM_BATCH_SIZE):
+            batch = pad_in_values(ids[i:i + ORDER_NUM_BATCH_SIZE])
+            whens = [(task_id, order_nums_by_id[task_id])
+                     for task_id in batch]
+            stmt = update(self.DbTask).where(
+                self.DbTask.id.in_(batch)).values(
+                order_num=case(*whens, value=self.DbTask.id),
+                date_last_updated=date_last_updated).execution_options(
+                synchronize_session='fetch')
+            self.db.session.execute(at_call_site(stmt,
+                                                 'set_task_order_nums'))
+
+    def _get_task_link_tables(self):
+        # the association tables, each with its columns that refer to tasks
+        return [(self.tags_tasks_table, ['task_id']),
+                (self.users_tasks_table, ['task_id']),
+                (self.task_dependencies_table,
+                 ['dependee_id', 'dependant_id']),
+                (self.task_prioritize_table,
+                 ['prioritize_before_id', 'prioritize_after_id'])]
+
+    def purge_deleted_tasks(self, task_ids=None):
+        """Permanently remove deleted tasks (all of them, or only those in
+        task_ids if it is not None), together with their comments, their
+        attachment records and their rows in the association tables.
+        Children that are not themselves being purged become top-level
+        tasks, the same as when a single task is deleted. This is a fixed
+        number of set-based statements, regardless of the number of tasks,
+        and is left uncommitted. Returns a dict of counts and the list of
+        attachment paths that are no longer referenced by any remaining
+        attachment."""
+        session = self.db.session
+        session.flush()
+
+        task = self.DbTask.__table__
+        comment = self.DbComment.__table__
+        attachment = self.DbAttachment.__table__
+        purged = select(task.c.id).where(task.c.is_deleted.is_(True))
+        if task_ids is not None:
+            purged = purged.where(task.c.id.in_(task_ids))
+
+        remaining = select(attachment.c.path).where(
+            or_(attachment.c.task_id.is_(None),
+                attachment.c.task_id.notin_(purged)))
+        paths = list(session.execute(
+            select(attachment.c.path).distinct().where(
+                attachment.c.task_id.in_(purged),
+                attachment.c.path.notin_(remaining))).scalars())
+
+        links = 0
+        for table, task_cols in self._get_task_link_tables():
+            stmt = delete(table).where(
+                or_(*(table.c[col].in_(purged) for col in task_cols)))
+            links += session.execute(stmt).rowcount
+
+        comment_ids = list(session.execute(
+            delete(comment).where(comment.c.task_id.in_(purged)).returning(
+                comment.c.id)).scalars())
+        attachment_ids = list(session.execute(
+            delete(attachment).where(
+                attachment.c.task_id.in_(purged)).returning(
+                attachment.c.id)).scalars())
+        children = session.execute(
+            update(task).where(task.c.parent_id.in_(purged),
+                               task.c.id.notin_(purged)).values(
+                parent_id=None)).rowcount
+        purged_ids = list(session.execute(
+            delete(task).where(task.c.id.in_(purged)).returning(
+                task.c.id)).scalars())
+
+        # the statements above bypass the ORM, so drop the purged objects
+        # from the session and reload everything else
+        purged_by_class = {self.DbTask: set(purged_ids),
+                           self.DbComment: set(comment_ids),
+                           self.DbAttachment: set(attachment_ids)}
+        for key, obj in list(session.identity_map.items()):
+            cls, ident = key[0], key[1]
+            if ident[0] in purged_by_class.get(cls, ()):
+                session.expunge(obj)
+        session.expire_all()
+
+        counts = {'tasks': len(purged_ids), 'comments': len(comment_ids),
+                  'attachments': len(attachment_ids), 'links': links,
+                  'children': children}
+        return counts, paths
+
+    def _move_rows(self, src, dest, where):
+        # copy the matching rows from one tier to the other, then remove them
+        # from the first. returns the first column (the id, for the tables
+        # that have one) of each row moved.
+        columns = [c.name for c in src.columns]
+        self.db.session.execute(insert(dest).from_select(
+            columns, select(*(src.c[name] for name in columns)).where(where)))
+        return list(self.db.session.execute(delete(src).where(where).returning(
+            src.c[columns[0]])).scalars())
+
+    def _move_tasks(self, task_ids, to_archive):
+        # move the tasks in task_ids, which are ordered so that no task comes
+        # before its parent (or, when archiving, after it), along with their
+        # comments, attachments and links. returns the number of rows moved
+        # of each kind.
+        session = self.db.session
+        tiers = [self.DbTask.__table__, self.DbComment.__table__,
+                 self.DbAttachment.__table__]
+        tiers.extend(table for table, _ in self._get_task_link_tables())
+        tiers = [(table, self.archive_tables[table.name]) for table in tiers]
+        if not to_archive:
+            tiers = [(dest, src) for src, dest in tiers]
+        (task_src, task_dest), (comment_src, comment_dest), \
+            (attachment_src, attachment_dest) = tiers[:3]
+        link_tiers = list(zip(tiers[3:], self._get_task_link_tables()))
+
+        moved = {'tasks': [], 'comments': [], 'attachments': [], 'links': []}
+        for i in range(0, len(task_ids), ARCHIVE_BATCH_SIZE):
+            batch = task_ids[i:i + ARCHIVE_BATCH_SIZE]
+            if to_archive:
+                # the other rows refer to the tasks, so they go first
+                for (src, dest), (_, task_cols) in link_tiers:
+                    moved['links'].extend(self._move_rows(src, dest, or_(
+                        *(src.c[col].in_(batch) for col in task_cols))))
+            else:
+                moved['tasks'].extend(self._move_rows(
+                    task_src, task_dest, task_src.c.id.in_(batch)))
+            moved['comments'].extend(self._move_rows(
+                comment_src, comment_dest, comment_src.c.task_id.in_(batch)))
+            moved['attachments'].extend(self._move_rows(
+                attachment_src, attachment_dest,
+                attachment_src.c.task_id.in_(batch)))
+            if to_archive:
+                moved['tasks'].extend(self._move_rows(
+                    task_src, task_dest, task_src.c.id.in_(batch)))
+
+        if not to_archive:
+            # a link comes back once the tasks at both of its ends are back
+            hot_ids = select(task_dest.c.id)
+            for i in range(0, len(task_ids), ARCHIVE_BATCH_SIZE):
+                batch = task_ids[i:i + ARCHIVE_BATCH_SIZE]
+                for (src, dest), (_, task_cols) in link_tiers:
+                    moved['links'].extend(self._move_rows(src, dest, and_(
+                        or_(*(src.c[col].in_(batch) for col in task_cols)),
+                        *(src.c[col].in_(hot_ids) for col in task_cols))))
+
+        # the statements above bypass the ORM, so drop the moved objects
+        # from the session and reload everything else
+        moved_by_class = {self.DbTask: set(moved['tasks']),
+                          self.DbArchivedTask: set(moved['tasks']),
+                          self.DbComment: set(moved['comments']),
+                          self.DbArchivedComment: set(moved['comments']),
+                          self.DbAttachment: set(moved['attachments']),
+                          self.DbArchivedAttachment: set(
+                              moved['attachments'])}
+        for key, obj in list(session.identity_map.items()):
+            cls, ident = key[0], key[1]
+            if ident[0] in moved_by_class.get(cls, ()):
+                session.expunge(obj)
+        session.expire_all()
+        session.info['tasks_written'] = True
+        return {name: len(ids) for name, ids in moved.items()}
+
+    @staticmethod
+    def _order_parents_first(parent_ids_by_id):
+        # order the tasks so that each comes after its parent, if the parent
+        # is among them. tasks in a parent cycle go last.
+        children = collections.defaultdict(list)
+        ready = []
+        for task_id, parent_id in parent_ids_by_id.items():
+            if parent_id in parent_ids_by_id:
+                children[parent_id].append(task_id)
+            else:
+                ready.append(task_id)
+        ordered = []
+        while ready:
+            task_id = ready.pop()
+            ordered.append(task_id)
+            ready.extend(children.pop(task_id, ()))
+        ordered_set = set(ordered)
+        ordered.extend(task_id for task_id in parent_ids_by_id
+                       if task_id not in ordered_set)
+        return ordered
+
+    def archive_tasks(self, updated_before):
+        """Move tasks that are done or deleted and were last updated before
+        updated_before into the archive tables, along with their comments,
+        their attachment records and their rows in the association tables.
+
+        Only whole subtrees are archived: a task stays if anything below it
+        is not finished, or was updated too recently. Archived ids are not
+        handed out again (see reserve_archived_ids).
+
+        The rows are moved ARCHIVE_BATCH_SIZE tasks at a time, with an
+        INSERT ... SELECT and a DELETE per table, and are left uncommitted.
+        Returns a dict of counts."""
+        session = self.db.session
+        session.flush()
+
+        task = self.DbTask.__table__
+        is_finished = and_(
+            or_(task.c.is_done.is_(True), task.c.is_deleted.is_(True)),
+            task.c.date_last_updated.isnot(None),
+            task.c.date_last_updated < updated_before)
+
+        # the tasks that have to stay, and all of their ancestors
+        anchor = select(task.c.id, task.c.parent_id).where(not_(is_finished))
+        staying = anchor.cte('staying', recursive=True)
+        parent = task.alias('parent')
+        staying = staying.union(
+            select(parent.c.id, parent.c.parent_id).join(
+                staying, parent.c.id == staying.c.parent_id))
+
+        stmt = select(task.c.id, task.c.parent_id).where(
+            is_finished, task.c.id.notin_(select(staying.c.id)))
+        parent_ids_by_id = dict(session.execute(stmt).all())
+        task_ids = self._order_parents_first(parent_ids_by_id)
+        task_ids.reverse()
+        return self._move_tasks(task_ids, to_archive=True)
+
+    def unarchive_tasks(self, task_ids):
+        """Move archived tasks back into the task table, together with their
+        archived ancestors, comments, attachment records and links. A link
+        between two tasks only comes back once both tasks are back. Ids that
+        aren't archived are ignored. Left uncommitted; returns the ids of the
+        tasks that were moved."""
+        task_ids = [task_id for task_id in task_ids if task_id is not None]
+        if not task_ids:
+            return []
+        self.db.session.flush()
+
+        task_archive = self.archive_tables['task']
+        anchor = select(task_archive.c.id, task_archive.c.parent_id).where(
+            task_archive.c.id.in_(task_ids))
+        ancestors = anchor.cte('ancestors', recursive=True)
+        parent = task_archive.alias('parent')
+        ancestors = ancestors.union(
+            select(parent.c.id, parent.c.parent_id).join(
+                ancestors, parent.c.id == ancestors.c.parent_id))
+        parent_ids_by_id = dict(self.db.session.execute(
+            select(ancestors.c.id, ancestors.c.parent_id)).all())
+        if not parent_ids_by_id:
+            return []
+        moved_ids = self._order_parents_first(parent_ids_by_id)
+        self._move_tasks(moved_ids, to_archive=False)
+        return moved_ids
+
+    def get_archived_task_ids(self, is_deleted=None):
+        task_archive = self.archive_tables['task']
+        stmt = select(task_archive.c.id)
+        if is_deleted is not None:
+            stmt = stmt.where(task_archive.c.is_deleted == is_deleted)
+        return list(self.db.session.execute(stmt).scalars())
+
+    def get_archived_task_ids_owning(self, task_ids=(), comment_ids=(),
+                                     attachment_ids=()):
+        """Get the ids of the archived tasks that have one of task_ids, or
+        that own an archived comment in comment_ids or an archived
+        attachment in attachment_ids. This is how ids about to be written
+        to the task tables are checked against the ones in the archive."""
+        task_archive = self.archive_tables['task']
+        comment_archive = self.archive_tables['comment']
+        attachment_archive = self.archive_tables['attachment']
+        found = set()
+        for id_col, task_id_col, ids in [
+                (task_archive.c.id, task_archive.c.id, list(task_ids)),
+                (comment_archive.c.id, comment_archive.c.task_id,
+                 list(comment_ids)),
+                (attachment_archive.c.id, attachment_archive.c.task_id,
+                 list(attachment_ids))]:
+            for i in range(0, len(ids), ARCHIVE_BATCH_SIZE):
+                batch = ids[i:i + ARCHIVE_BATCH_SIZE]
+                found.update(self.db.session.execute(
+                    select(task_id_col).where(id_col.in_(batch))).scalars())
+        found.discard(None)
+        return sorted(found)
+
+    def _get_link_ids(self, key_col, value_col, keys):
+        # collect value_col for each key_col in keys, with a single query
+        ids_by_key = {key: [] for key in keys}
+        stmt = select(key_col, value_col).where(
+            key_col.in_(keys)).order_by(key_col, value_col)
+        for key, value in self.db.session.execute(stmt):
+            ids_by_key[key].append(value)
+        return ids_by_key
+
+    def get_task_link_ids(self, attr_name, task_ids):
+        """For one of a task's many-to-many relationships ('tags', 'users',
+        'dependees' or 'prioritize_before'), get the ids of the related
+        objects of each of the given tasks with a single query. Returns a
+        dict mapping each task id to a list of ids."""
+        table, task_col, other_col = self._get_task_link_table(attr_name)
+        return self._get_link_ids(task_col, other_col, task_ids)
+
+    def _get_export_fields(self, object_type):
+        if object_type == ObjectTypes.Task:
+            T = self.DbTask
+            return [T.FIELD_ID, T.FIELD_SUMMARY, T.FIELD_DESCRIPTION,
+                    T.FIELD_IS_DONE, T.FIELD_IS_DELETED, T.FIELD_DEADLINE,
+                    T.FIELD_EXPECTED_DURATION_MINUTES, T.FIELD_EXPECTED_COST,
+                    T.FIELD_ORDER_NUM, T.FIELD_IS_PUBLIC,
+                    T.FIELD_DATE_CREATED, T.FIELD_DATE_LAST_UPDATED]
+        if object_type == ObjectTypes.Tag:
+            T = self.DbTag
+            return [T.FIELD_ID, T.FIELD_VALUE, T.FIELD_DESCRIPTION]
+        if object_type == ObjectTypes.Comment:
+            C = self.DbComment
+            return [C.FIELD_ID, C.FIELD_CONTENT, C.FIELD_TIMESTAMP,
+                    C.FIELD_DATE_LAST_UPDATED]
+        if object_type == ObjectTypes.Attachment:
+            A = self.DbAttachment
+            return [A.FIELD_ID, A.FIELD_PATH, A.FIELD_DESCRIPTION,
+                    A.FIELD_TIMESTAMP, A.FIELD_FILENAME]
+        if object_type == ObjectTypes.User:
+            U = self.DbUser
+            return [U.FIELD_ID, U.FIELD_EMAIL, U.FIELD_HASHED_PASSWORD,
+                    U.FIELD_IS_ADMIN]
+        return None
+
+    def _get_both_tiers(self, table):
+        # one of the task tables and its archive counterpart, read as if
+        # they were a single table
+        archive = self.archive_tables[table.name]
+        names = [c.name for c in table.columns]
+        return select(*(table.c[name] for name in names)).union_all(
+            select(*(archive.c[name] for name in names))
+        ).subquery('{}_both_tiers'.format(table.name))
+
+    def _get_export_link_ids(self, object_type, ids):
+        # the relationship ids of a batch of objects, keyed by the name
+        # to_flat_dict() gives them. archived rows are included.
+        tags_tasks = self._get_both_tiers(self.tags_tasks_table)
+        users_tasks = self._get_both_tiers(self.users_tasks_table)
+        if object_type == ObjectTypes.Task:
+            T = self._get_both_tiers(self.DbTask.__table__)
+            td = self._get_both_tiers(self.task_dependencies_table).c
+            tp = self._get_both_tiers(self.task_prioritize_table).c
+            comment = self._get_both_tiers(self.DbComment.__table__)
+            attachment = self._get_both_tiers(self.DbAttachment.__table__)
+            return {
+                'children_ids': self._get_link_ids(T.c.parent_id, T.c.id,
+                                                   ids),
+                'dependee_ids': self._get_link_ids(td.dependant_id,
+                                                   td.dependee_id, ids),
+                'dependant_ids': self._get_link_ids(td.dependee_id,
+                                                    td.dependant_id, ids),
+                'prioritize_before_ids': self._get_link_ids(
+                    tp.prioritize_after_id, tp.prioritize_before_id, ids),
+                'prioritize_after_ids': self._get_link_ids(
+                    tp.prioritize_before_id, tp.prioritize_after_id, ids),
+                'tag_ids': self._get_link_ids(
+                    tags_tasks.c.task_id, tags_tasks.c.tag_id, ids),
+                'user_ids': self._get_link_ids(
+                    users_tasks.c.task_id, users_tasks.c.user_id, ids),
+                'comment_ids': self._get_link_ids(
+                    comment.c.task_id, comment.c.id, ids),
+                'attachment_ids': self._get_link_ids(
+                    attachment.c.task_id, attachment.c.id, ids),
+            }
+        if object_type == ObjectTypes.Tag:
+            return {'task_ids': self._get_link_ids(
+                tags_tasks.c.tag_id, tags_tasks.c.task_id, ids)}
+        if object_type == ObjectTypes.User:
+            return {'task_ids': self._get_link_ids(
+                users_tasks.c.user_id, users_tasks.c.task_id, ids)}
+        return {}
+
+    def get_export_rows(self, object_type, batch_size=1000):
+        """Yield every object of the given type as a dict, the same as
+        to_flat_dict() would give. Objects are loaded batch_size at a time
+        with yield_per, and the ids of their related objects are read from
+        the association tables with one query per relationship per batch,
+        instead of lazy-loading each relationship of each object. Objects
+        are expunged from the session once converted, unless they were
+        already in it, so memory use stays flat however big the table
+        is.
+
+        Tasks, comments and attachments are read from both tiers at once,
+        with a UNION ALL of each table and its archive counterpart, so
+        nothing has to be moved out of the archive first. Archived rows
+        come back as the same class as the ones that aren't."""
+        table = self._get_table_by_object_type(object_type)
+        model = {
+            ObjectTypes.Task: self.DbTask, ObjectTypes.Tag: self.DbTag,
+            ObjectTypes.Comment: self.DbComment,
+            ObjectTypes.Attachment: self.DbAttachment,
+            ObjectTypes.User: self.DbUser, ObjectTypes.Option: self.DbOption,
+        }[object_type]
+        fields = self._get_export_fields(object_type)
+        pk = list(table.primary_key.columns)[0]
+        if table.name in self.archive_tables:
+            model = aliased(model, self._get_both_tiers(table))
+            pk = getattr(model, pk.name)
+        session = self.db.session
+        already_loaded = set(session.identity_map.values())
+        stmt = select(model).order_by(pk).execution_options(
+            yield_per=batch_size)
+        for batch in session.execute(stmt).scalars().partitions():
+            ids = [_.id for _ in batch]
+            link_ids = self._get_export_link_ids(object_type, ids)
+            for obj in batch:
+                d = obj.to_dict(fields=fields)
+                if object_type == ObjectTypes.Task:
+                    if obj.parent_id is None:
+                        d['parent'] = None
+                    else:
+                        d['parent_id'] = obj.parent_id
+                    if d['expected_cost'] is not None:
+                        d['expected_cost'] = str(d['expected_cost'])
+                elif object_type in (ObjectTypes.Comment,
+                                     ObjectTypes.Attachment):
+                    if obj.task_id is None:
+                        d['task'] = None
+                    else:
+                        d['task_id'] = obj.task_id
+                for name, ids_by_key in link_ids.items():
+                    d[name] = ids_by_key[obj.id]
+                if obj not in already_loaded:
+                    session.expunge(obj)
+                yield d
+
     def get_schema_version(self):
         try:
             stmt = select(self.DbOption).where(self.DbOption.key == '__version__')
@@ -133,6 +787,20 @@ class SqlAlchemyPersistenceLayer(object):
     def create_all(self):
         self.db.create_all()
 
+    def ensure_schema(self):
+        """Add the parts of the schema that create_all makes, but that a
+        database created by an earlier version may be missing. Each step is
+        idempotent and works on every dialect, so this is run whenever the
+        app starts. Nothing is done to a database whose tables haven't been
+        created yet."""
+        with self.db.engine.begin() as connection:
+            if not inspect(connection).has_table(
+                    self.DbTask.__tablename__):
+                return
+            for table in self.archive_tables.values():
+                table.create(connection, checkfirst=True)
+            get_task_search(connection.dialect.name).install(connection)
+
     UNSPECIFIED = object()
 
     ASCENDING = object()
@@ -177,14 +845,73 @@ class SqlAlchemyPersistenceLayer(object):
                            date_last_updated=date_last_updated,
                            lazy=lazy)
 
-    def get_task(self, task_id):
-        return self._get_db_task(task_id)
+    def get_task(self, task_id, include_archived=False):
+        """If include_archived is True and the task is not in the task
+        table, it is looked for in the archive tier, and returned as a
+        DbArchivedTask, without being moved back."""
+        task = self._get_db_task(task_id)
+        if task is None and include_archived and task_id is not None:
+            stmt = select(self.DbArchivedTask).where(
+                self.DbArchivedTask.id == task_id)
+            task = self.db.session.execute(
+                at_call_site(stmt, 'get_task')).scalar_one_or_none()
+        return task
 
     def _get_db_task(self, task_id):
         if task_id is None:
             return None
         stmt = select(self.DbTask).where(self.DbTask.id == task_id)
-        return self.db.session.execute(stmt).scalar_one_or_none()
+        return self.db.session.execute(
+            at_call_site(stmt, 'get_task')).scalar_one_or_none()
+
+    def get_tasks_by_ids(self, task_ids):
+        """Get the tasks with the given ids. Tasks already loaded into the
+        session are reused as-is; all others are fetched with a single query.
+        Returns a dict mapping each id to its task; ids that don't exist are
+        left out."""
+        tasks_by_id = {}
+        missing = set()
+        identity_map = self.db.session.identity_map
+        for task_id in set(task_ids):
+            if task_id is None:
+                continue
+            task = identity_map.get(
+                Session.identity_key(self.DbTask, task_id))
+            if task is not None and not inspect(task).expired:
+                tasks_by_id[task_id] = task
+            else:
+                missing.add(task_id)
+        if missing:
+            stmt = select(self.DbTask).where(
+                self.DbTask.id.in_(pad_in_values(missing)))
+            for task in self.db.session.execute(
+                    at_call_site(stmt, 'get_tasks_by_ids')).scalars():
+                tasks_by_id[task.id] = task
+        return tasks_by_id
+
+    def _task_has_user(self, user_id, task_id_col=None, archived=False):
+        """EXISTS predicate: the task is linked to the user. Only looks at the
+        users_tasks table (or its archive counterpart, if archived), so the
+        planner can answer it from the (user_id, task_id) index without
+        joining to user, and it never duplicates task rows the way a join
+        would."""
+        if task_id_col is None:
+            task_id_col = self.DbTask.id
+        users_tasks = self.users_tasks_table
+        if archived:
+            users_tasks = self.archive_tables['users_tasks']
+        return exists().where(users_tasks.c.task_id == task_id_col,
+                              users_tasks.c.user_id == user_id)
+
+    def _task_has_tag(self, tag_id, task_id_col=None, archived=False):
+        """EXISTS predicate: the task has the tag. See _task_has_user."""
+        if task_id_col is None:
+            task_id_col = self.DbTask.id
+        tags_tasks = self.tags_tasks_table
+        if archived:
+            tags_tasks = self.archive_tables['tags_tasks']
+        return exists().where(tags_tasks.c.task_id == task_id_col,
+                              tags_tasks.c.tag_id == tag_id)
 
     def _get_tasks_query(self, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
                          parent_id=UNSPECIFIED, parent_id_in=UNSPECIFIED,
@@ -196,54 +923,60 @@ class SqlAlchemyPersistenceLayer(object):
                          summary_description_search_term=UNSPECIFIED,
                          order_num_greq_than=UNSPECIFIED,
                          order_num_lesseq_than=UNSPECIFIED,
-                         order_by=UNSPECIFIED, limit=UNSPECIFIED):
+                         order_by=UNSPECIFIED, limit=UNSPECIFIED,
+                         archived=False):
 
         """order_by is a list of order directives. Each such directive is
          either a field (e.g. ORDER_NUM) or a sequence of field and direction
           (e.g. [ORDER_NUM, ASCENDING]). Default direction is ASCENDING if not
-           specified."""
+           specified.
+
+        If archived is True, the query is for the archive tier instead of
+        the task table."""
 
         if limit is not self.UNSPECIFIED:
             if limit < 0:
                 raise Exception('limit must not be negative')
 
-        query = select(self.DbTask)
+        T = self.DbArchivedTask if archived else self.DbTask
+
+        query = select(T)
 
+        # the flags are compared to bound parameters; comparing to a python
+        # bool renders a true/false literal, which makes a different
+        # statement for each value
         if is_done is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.is_done == is_done)
+            query = query.where(T.is_done == literal(is_done))
 
         if is_deleted is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.is_deleted == is_deleted)
+            query = query.where(T.is_deleted == literal(is_deleted))
 
         if is_public is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.is_public == is_public)
+            query = query.where(T.is_public == literal(is_public))
 
         if parent_id is not self.UNSPECIFIED:
             if parent_id is None:
-                query = query.where(self.DbTask.parent_id.is_(None))
+                query = query.where(T.parent_id.is_(None))
             else:
-                query = query.where(self.DbTask.parent_id == parent_id)
+                query = query.where(T.parent_id == parent_id)
 
         if parent_id_in is not self.UNSPECIFIED:
             if parent_id_in:
-                query = query.where(self.DbTask.parent_id.in_(parent_id_in))
+                query = query.where(
+                    T.parent_id.in_(pad_in_values(parent_id_in)))
             else:
                 # avoid performance penalty
                 query = query.where(false())
 
         if users_contains is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.users.any(id=users_contains.id))
+            query = query.where(
+                self._task_has_user(users_contains.id, T.id, archived))
 
         if is_public_or_users_contains is not self.UNSPECIFIED:
-            db_user = is_public_or_users_contains
-            query = query.outerjoin(
-                self.users_tasks_table,
-                self.users_tasks_table.c.task_id == self.DbTask.id).where(
-                or_(
-                    self.users_tasks_table.c.user_id == db_user.id,
-                    self.DbTask.is_public
-                )
-            )
+            query = query.where(or_(
+                T.is_public,
+                self._task_has_user(is_public_or_users_contains.id, T.id,
+                                    archived)))
 
         if task_id_in is not self.UNSPECIFIED:
             # Using in_ on an empty set works but is expensive for some db
@@ -251,7 +984,7 @@ class SqlAlchemyPersistenceLayer(object):
             # that always returns an empty set, without the performance
             # penalty.
             if task_id_in:
-                query = query.where(self.DbTask.id.in_(task_id_in))
+                query = query.where(T.id.in_(pad_in_values(task_id_in)))
             else:
                 query = query.where(false())
 
@@ -261,32 +994,35 @@ class SqlAlchemyPersistenceLayer(object):
             # rows. In the case of an empty collection, just use the same query
             # object again, so we won't incur the performance penalty.
             if task_id_not_in:
-                query = query.where(self.DbTask.id.notin_(task_id_not_in))
+                query = query.where(
+                    T.id.notin_(pad_in_values(task_id_not_in)))
             else:
                 query = query
 
         if deadline_is_not_none:
-            query = query.where(self.DbTask.deadline.isnot(None))
+            query = query.where(T.deadline.isnot(None))
 
         if tags_contains is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.tags.any(id=tags_contains.id))
+            query = query.where(
+                self._task_has_tag(tags_contains.id, T.id, archived))
 
         if summary_description_search_term is not self.UNSPECIFIED:
             like_term = '%{}%'.format(summary_description_search_term)
             query = query.where(
-                self.DbTask.summary.ilike(like_term) |
-                self.DbTask.description.ilike(like_term))
+                T.summary.ilike(like_term) |
+                T.description.ilike(like_term))
 
         if order_num_greq_than is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.order_num >= order_num_greq_than)
+            query = query.where(T.order_num >= order_num_greq_than)
 
         if order_num_lesseq_than is not self.UNSPECIFIED:
-            query = query.where(self.DbTask.order_num <=
+            query = query.where(T.order_num <=
                                   order_num_lesseq_than)
 
         if order_by is not self.UNSPECIFIED:
             if not is_iterable(order_by):
-                db_field = self.get_db_field_by_order_field(order_by)
+                db_field = getattr(
+                    T, self.get_db_field_by_order_field(order_by).key)
                 query = query.order_by(db_field)
             else:
                 for ordering in order_by:
@@ -297,7 +1033,8 @@ class SqlAlchemyPersistenceLayer(object):
                             direction = ordering[1]
                     else:
                         order_field = ordering
-                    db_field = self.get_db_field_by_order_field(order_field)
+                    db_field = getattr(
+                        T, self.get_db_field_by_order_field(order_field).key)
                     if direction is self.ASCENDING:
                         query = query.order_by(db_field.asc())
                     elif direction is self.DESCENDING:
@@ -320,8 +1057,10 @@ class SqlAlchemyPersistenceLayer(object):
                   summary_description_search_term=UNSPECIFIED,
                   order_num_greq_than=UNSPECIFIED,
                   order_num_lesseq_than=UNSPECIFIED, order_by=UNSPECIFIED,
-                  limit=UNSPECIFIED):
-        query = self._get_tasks_query(
+                  limit=UNSPECIFIED, include_archived=False):
+        """If include_archived is True, matching tasks from the archive tier
+        are merged in, as DbArchivedTask objects."""
+        filters = dict(
             is_done=is_done, is_deleted=is_deleted, parent_id=parent_id,
             parent_id_in=parent_id_in, users_contains=users_contains,
             task_id_in=task_id_in, task_id_not_in=task_id_not_in,
@@ -330,9 +1069,42 @@ class SqlAlchemyPersistenceLayer(object):
             is_public_or_users_contains=is_public_or_users_contains,
             summary_description_search_term=summary_description_search_term,
             order_num_greq_than=order_num_greq_than,
-             order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
-             limit=limit)
-        return (_ for _ in self.db.session.execute(query).scalars())
+            order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
+            limit=limit)
+        query = at_call_site(self._get_tasks_query(**filters), 'get_tasks')
+        if not include_archived:
+            return (_ for _ in self.db.session.execute(query).scalars())
+        tasks = list(self.db.session.execute(query).scalars())
+        tasks.extend(self.db.session.execute(at_call_site(
+            self._get_tasks_query(archived=True, **filters),
+            'get_tasks')).scalars())
+        tasks = self._sort_tasks(tasks, order_by)
+        if limit is not self.UNSPECIFIED:
+            tasks = tasks[:limit]
+        return (_ for _ in tasks)
+
+    def _sort_tasks(self, tasks, order_by):
+        # put tasks from both tiers in the order that _get_tasks_query's
+        # ORDER BY would have. None sorts last.
+        if order_by is self.UNSPECIFIED:
+            return tasks
+        if not is_iterable(order_by):
+            order_by = [order_by]
+        for ordering in reversed(order_by):
+            direction = self.ASCENDING
+            if is_iterable(ordering):
+                order_field = ordering[0]
+                if len(ordering) > 1:
+                    direction = ordering[1]
+            else:
+                order_field = ordering
+            key = self.get_db_field_by_order_field(order_field).key
+            present = sorted(
+                (t for t in tasks if getattr(t, key) is not None),
+                key=lambda t: getattr(t, key),
+                reverse=(direction is self.DESCENDING))
+            tasks = present + [t for t in tasks if getattr(t, key) is None]
+        return tasks
 
     def get_paginated_tasks(self, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
                             parent_id=UNSPECIFIED, parent_id_in=UNSPECIFIED,
@@ -345,7 +1117,21 @@ class SqlAlchemyPersistenceLayer(object):
                             order_num_greq_than=UNSPECIFIED,
                             order_num_lesseq_than=UNSPECIFIED,
                             order_by=UNSPECIFIED, limit=UNSPECIFIED,
-                            page_num=None, tasks_per_page=None):
+                            page_num=None, tasks_per_page=None,
+                            cursor=UNSPECIFIED, include_archived=False):
+        """Return a Pager for one page of the matching tasks.
+
+        If cursor is specified, keyset pagination is used instead of
+        page_num. The tasks are then always ordered by order_num and id,
+        descending, and neither a total nor a page count is computed. A
+        cursor of None (or empty) yields the first page, and the pager's
+        prev_cursor and next_cursor can be passed back in to get the
+        neighbouring pages.
+
+        If include_archived is True, tasks from the archive tier are merged
+        in. Each page then has to read the pages before it from both tiers,
+        so that is only meant for the listings that ask for finished
+        tasks."""
 
         if page_num is not None and not isinstance(page_num, Number):
             raise TypeError('page_num must be a number')
@@ -362,7 +1148,7 @@ class SqlAlchemyPersistenceLayer(object):
         if tasks_per_page is None:
             tasks_per_page = 20
 
-        query = self._get_tasks_query(
+        filters = dict(
             is_done=is_done, is_deleted=is_deleted, parent_id=parent_id,
             parent_id_in=parent_id_in, users_contains=users_contains,
             task_id_in=task_id_in, task_id_not_in=task_id_not_in,
@@ -371,13 +1157,91 @@ class SqlAlchemyPersistenceLayer(object):
             is_public_or_users_contains=is_public_or_users_contains,
             summary_description_search_term=summary_description_search_term,
             order_num_greq_than=order_num_greq_than,
-            order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
-            limit=limit)
-        pager = self.db.paginate(query, page=page_num, per_page=tasks_per_page)
-        items = list(pager.items)
-        return Pager(page=pager.page, per_page=pager.per_page,
-                     items=items, total=pager.total,
-                     num_pages=pager.pages, _pager=pager)
+            order_num_lesseq_than=order_num_lesseq_than, limit=limit)
+        query = at_call_site(
+            self._get_tasks_query(order_by=order_by, **filters),
+            'get_paginated_tasks')
+        queries = [query]
+        if include_archived:
+            queries.append(at_call_site(self._get_tasks_query(
+                order_by=order_by, archived=True, **filters),
+                'get_paginated_tasks'))
+            filters['include_archived'] = True
+        if cursor is not self.UNSPECIFIED:
+            return self._get_cursor_paginated_tasks(queries, cursor,
+                                                    tasks_per_page)
+        if include_archived:
+            # the first page_num pages of each tier contain the page
+            tasks = []
+            for q in queries:
+                tasks.extend(self.db.session.execute(
+                    q.limit(page_num * tasks_per_page)).scalars())
+            start = (page_num - 1) * tasks_per_page
+            items = self._sort_tasks(tasks, order_by)[
+                start:start + tasks_per_page]
+            pager = None
+        else:
+            pager = self.db.paginate(query, page=page_num,
+                                     per_page=tasks_per_page, count=False)
+            items = list(pager.items)
+        total = self._count_paginated_tasks(queries, filters)
+        num_pages = -(-total // tasks_per_page)
+        return Pager(page=page_num, per_page=tasks_per_page,
+                     items=items, total=total, num_pages=num_pages,
+                     _pager=pager)
+
+    def _count_paginated_tasks(self, queries, filters):
+        def count():
+            total = 0
+            for query in queries:
+                count_query = select(func.count()).select_from(
+                    query.order_by(None).subquery())
+                total += self.db.session.execute(at_call_site(
+                    count_query, 'count_paginated_tasks')).scalar()
+            return total
+
+        if self.db.session.info.get('tasks_written'):
+            # this session has uncommitted writes, which other sessions can't
+            # see, and which may yet be rolled back
+            return count()
+        key = make_count_key(**{
+            name: value for name, value in filters.items()
+            if value is not self.UNSPECIFIED})
+        return self.count_cache.get_or_compute(key, count)
+
+    def _get_cursor_paginated_tasks(self, queries, cursor, tasks_per_page):
+        # queries has one query per tier to read from
+        direction = 'n'
+        cursor_position = None
+        if cursor:
+            cursor_order_num, cursor_task_id, direction = decode_cursor(cursor)
+            cursor_position = (cursor_order_num, cursor_task_id)
+            position = tuple_(cursor_order_num, cursor_task_id)
+        tasks = []
+        for query in queries:
+            T = query.column_descriptions[0]['entity']
+            order_num = T.order_num
+            task_id = T.id
+            query = query.order_by(None).limit(None)
+            if cursor:
+                if direction == 'n':
+                    query = query.where(tuple_(order_num, task_id) < position)
+                else:
+                    query = query.where(tuple_(order_num, task_id) > position)
+            if direction == 'n':
+                query = query.order_by(order_num.desc(), task_id.desc())
+            else:
+                query = query.order_by(order_num.asc(), task_id.asc())
+            # fetch one extra row to find out if there is another page,
+            # instead of counting
+            query = query.limit(tasks_per_page + 1)
+            tasks.extend(self.db.session.execute(query).scalars())
+        if len(queries) > 1:
+            tasks.sort(key=lambda t: (t.order_num, t.id),
+                       reverse=(direction == 'n'))
+            tasks = tasks[:tasks_per_page + 1]
+        return generate_cursor_pager(tasks, tasks_per_page, direction,
+                                     cursor_position)
 
     def count_tasks(self, is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
                     parent_id=UNSPECIFIED, parent_id_in=UNSPECIFIED,
@@ -388,18 +1252,200 @@ class SqlAlchemyPersistenceLayer(object):
                     summary_description_search_term=UNSPECIFIED,
                     order_num_greq_than=UNSPECIFIED,
                     order_num_lesseq_than=UNSPECIFIED, order_by=UNSPECIFIED,
-                    limit=UNSPECIFIED):
-        query = self._get_tasks_query(
-            is_done=is_done, is_deleted=is_deleted, parent_id=parent_id,
-            parent_id_in=parent_id_in, users_contains=users_contains,
-            task_id_in=task_id_in, task_id_not_in=task_id_not_in,
+                    limit=UNSPECIFIED, include_archived=False):
+        total = 0
+        for archived in ([False, True] if include_archived else [False]):
+            query = self._get_tasks_query(
+                is_done=is_done, is_deleted=is_deleted, parent_id=parent_id,
+                parent_id_in=parent_id_in, users_contains=users_contains,
+                task_id_in=task_id_in, task_id_not_in=task_id_not_in,
+                deadline_is_not_none=deadline_is_not_none,
+                tags_contains=tags_contains, is_public=is_public,
+                is_public_or_users_contains=is_public_or_users_contains,
+                summary_description_search_term=(
+                    summary_description_search_term),
+                order_num_greq_than=order_num_greq_than,
+                order_num_lesseq_than=order_num_lesseq_than,
+                order_by=order_by, limit=limit, archived=archived)
+            count_query = select(func.count()).select_from(query.subquery())
+            total += self.db.session.execute(
+                at_call_site(count_query, 'count_tasks')).scalar()
+        if include_archived and limit is not self.UNSPECIFIED:
+            total = min(total, limit)
+        return total
+
+    def _get_subtree_criteria(self, table, is_done=UNSPECIFIED,
+                              is_deleted=UNSPECIFIED, is_public=UNSPECIFIED,
+                              is_public_or_users_contains=UNSPECIFIED,
+                              deadline_is_not_none=False,
+                              include_archived=False):
+        # bound parameters rather than literals, as in _get_tasks_query
+        criteria = []
+        if is_done is not self.UNSPECIFIED:
+            criteria.append(table.c.is_done == literal(is_done))
+        if is_deleted is not self.UNSPECIFIED:
+            criteria.append(table.c.is_deleted == literal(is_deleted))
+        if is_public is not self.UNSPECIFIED:
+            criteria.append(table.c.is_public == literal(is_public))
+        if is_public_or_users_contains is not self.UNSPECIFIED:
+            user_id = is_public_or_users_contains.id
+            has_user = self._task_has_user(user_id, table.c.id)
+            if include_archived:
+                # table is a union of both tiers
+                has_user = or_(has_user, self._task_has_user(
+                    user_id, table.c.id, archived=True))
+            criteria.append(or_(table.c.is_public, has_user))
+        if deadline_is_not_none:
+            criteria.append(table.c.deadline.isnot(None))
+        return criteria
+
+    def _get_subtree_cte(self, root_ids=UNSPECIFIED, max_depth=None,
+                         is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
+                         is_public=UNSPECIFIED,
+                         is_public_or_users_contains=UNSPECIFIED,
+                         deadline_is_not_none=False, include_archived=False):
+        """Build a recursive CTE yielding (id, depth, path) for every task in
+        the subtree(s) below root_ids (or below the top-level tasks, if
+        root_ids is not specified). The filters are applied at every level,
+        so a task that is filtered out also hides its descendants. The path
+        column is a comma-delimited list of the ids on the way down and is
+        only used to stop the recursion on a parent/child cycle. If
+        include_archived is True, the recursion runs over both tiers."""
+
+        filters = dict(
+            is_done=is_done, is_deleted=is_deleted, is_public=is_public,
+            is_public_or_users_contains=is_public_or_users_contains,
             deadline_is_not_none=deadline_is_not_none,
-            tags_contains=tags_contains, is_public=is_public,
+            include_archived=include_archived)
+
+        task = self.DbTask.__table__
+        if include_archived:
+            columns = ['id', 'parent_id', 'is_done', 'is_deleted',
+                       'is_public', 'deadline']
+            task_archive = self.archive_tables['task']
+            task = select(*(task.c[name] for name in columns)).union_all(
+                select(*(task_archive.c[name] for name in columns))
+            ).subquery('task_union')
+        anchor = select(
+            task.c.id,
+            literal_column('0').label('depth'),
+            cast(literal(',') + cast(task.c.id, String) + literal(','),
+                 Text).label('path'))
+        if root_ids is self.UNSPECIFIED:
+            anchor = anchor.where(task.c.parent_id.is_(None))
+        elif root_ids:
+            anchor = anchor.where(task.c.id.in_(pad_in_values(root_ids)))
+        else:
+            anchor = anchor.where(false())
+        anchor = anchor.where(*self._get_subtree_criteria(task, **filters))
+        subtree = anchor.cte('subtree', recursive=True)
+
+        child = task.alias('child')
+        recursive = select(
+            child.c.id,
+            (subtree.c.depth + 1).label('depth'),
+            cast(subtree.c.path + cast(child.c.id, String) + literal(','),
+                 Text).label('path')
+        ).join(
+            subtree, child.c.parent_id == subtree.c.id
+        ).where(
+            subtree.c.path.notlike(
+                literal('%,') + cast(child.c.id, String) + literal(',%')),
+            *self._get_subtree_criteria(child, **filters))
+        if max_depth is not None:
+            recursive = recursive.where(subtree.c.depth < max_depth)
+
+        return subtree.union_all(recursive)
+
+    def get_subtree(self, root_ids=UNSPECIFIED, max_depth=None,
+                    is_done=UNSPECIFIED, is_deleted=UNSPECIFIED,
+                    is_public=UNSPECIFIED,
+                    is_public_or_users_contains=UNSPECIFIED,
+                    deadline_is_not_none=False, include_archived=False):
+        """Return (task, depth) pairs for the given roots and all of their
+        descendants, down to max_depth levels below the roots (unlimited if
+        max_depth is None). Roots are at depth zero. If root_ids is not
+        specified, the top-level tasks are used as roots. Everything is
+        fetched with a single WITH RECURSIVE query, or one per tier if
+        include_archived is True."""
+
+        subtree = self._get_subtree_cte(
+            root_ids=root_ids, max_depth=max_depth, is_done=is_done,
+            is_deleted=is_deleted, is_public=is_public,
             is_public_or_users_contains=is_public_or_users_contains,
-            summary_description_search_term=summary_description_search_term,
-            order_num_greq_than=order_num_greq_than,
-            order_num_lesseq_than=order_num_lesseq_than, order_by=order_by,
-            limit=limit)
+            deadline_is_not_none=deadline_is_not_none,
+            include_archived=include_archived)
+        entities = [self.DbTask]
+        if include_archived:
+            entities.append(self.DbArchivedTask)
+        rows = []
+        for T in entities:
+            query = select(T, subtree.c.depth).join(
+                subtree, T.id == subtree.c.id).order_by(
+                subtree.c.depth, T.order_num.desc(), T.id)
+            rows.extend(self.db.session.execute(
+                at_call_site(query, 'get_subtree')))
+        if include_archived:
+            rows.sort(key=lambda row: (row[1], -row[0].order_num, row[0].id))
+
+        def _generate():
+            seen = set()
+            for task, depth in rows:
+                # a task can be reached more than once if one of the roots is
+                # a descendant of another; keep the shallowest occurrence
+                if task.id in seen:
+                    continue
+                seen.add(task.id)
+                yield task, depth
+
+        return _generate()
+
+    def update_subtree(self, root_id, values):
+        """Set the given column values on a task and all of its descendants
+        with a single UPDATE, using the same recursive CTE as get_subtree.
+        Returns the ids of the tasks that were changed. The affected tasks
+        in the session are updated as well."""
+        subtree = self._get_subtree_cte(root_ids=[root_id])
+        stmt = update(self.DbTask).where(
+            self.DbTask.id.in_(select(subtree.c.id))).values(
+            values).returning(self.DbTask.id).execution_options(
+            synchronize_session='fetch')
+        return list(self.db.session.execute(
+            at_call_site(stmt, 'update_subtree')).scalars())
+
+    def _get_search_query(self, tokens, users_contains=UNSPECIFIED):
+        dialect_name = self.db.session.get_bind().dialect.name
+        query = get_task_search(dialect_name).get_search_query(self.DbTask,
+                                                                tokens)
+        if users_contains is not self.UNSPECIFIED:
+            query = query.where(self._task_has_user(users_contains.id))
+        return query
+
+    def search_tasks(self, term, users_contains=UNSPECIFIED, limit=UNSPECIFIED,
+                     offset=UNSPECIFIED):
+        """Search task summaries and descriptions using the full-text index
+        for the current database engine. Yields SearchResult objects, best
+        matches first. Every word in the term must match, either exactly or
+        as a prefix."""
+        tokens = tokenize(term)
+        if not tokens:
+            return (_ for _ in ())
+        query = self._get_search_query(tokens, users_contains=users_contains)
+        query = query.order_by(desc('rank'), self.DbTask.id)
+        if offset is not self.UNSPECIFIED:
+            query = query.offset(offset)
+        if limit is not self.UNSPECIFIED:
+            query = query.limit(limit)
+        return (SearchResult(task, rank,
+                             snippet or make_snippet(task, tokens))
+                for task, rank, snippet in self.db.session.execute(query))
+
+    def count_search_results(self, term, users_contains=UNSPECIFIED):
+        tokens = tokenize(term)
+        if not tokens:
+            return 0
+        query = self._get_search_query(tokens, users_contains=users_contains)
+        query = query.with_only_columns(self.DbTask.id)
         count_query = select(func.count()).select_from(query.subquery())
         return self.db.session.execute(count_query).scalar()
 
@@ -461,7 +1507,8 @@ class SqlAlchemyPersistenceLayer(object):
             raise ValueError('comment_id acannot be None')
         return self._get_db_comment(comment_id)
 
-    def _get_comments_query(self, comment_id_in=UNSPECIFIED):
+    def _get_comments_query(self, comment_id_in=UNSPECIFIED,
+                            task_id_in=UNSPECIFIED):
         query = select(self.DbComment)
         if comment_id_in is not self.UNSPECIFIED:
             if comment_id_in:
@@ -469,18 +1516,26 @@ class SqlAlchemyPersistenceLayer(object):
             else:
                 # performance improvement
                 query = query.where(false())
+        if task_id_in is not self.UNSPECIFIED:
+            if task_id_in:
+                query = query.where(self.DbComment.task_id.in_(task_id_in))
+            else:
+                # performance improvement
+                query = query.where(false())
         return query
 
-    def get_comments(self, comment_id_in=UNSPECIFIED):
-        query = self._get_comments_query(comment_id_in=comment_id_in)
+    def get_comments(self, comment_id_in=UNSPECIFIED, task_id_in=UNSPECIFIED):
+        query = self._get_comments_query(comment_id_in=comment_id_in,
+                                         task_id_in=task_id_in)
         return (_ for _ in self.db.session.execute(query).scalars())
 
-    def count_comments(self, comment_id_in=UNSPECIFIED):
-        query = self._get_comments_query(comment_id_in=comment_id_in)
+    def count_comments(self, comment_id_in=UNSPECIFIED,
+                       task_id_in=UNSPECIFIED):
+        query = self._get_comments_query(comment_id_in=comment_id_in,
+                                         task_id_in=task_id_in)
         count_query = select(func.count()).select_from(query.subquery())
         return self.db.session.execute(count_query).scalar()
 
-    @property
     def attachment_query(self):
         return self.DbAttachment.query
 
@@ -496,10 +1551,15 @@ class SqlAlchemyPersistenceLayer(object):
         stmt = select(self.DbAttachment).where(self.DbAttachment.id == attachment_id)
         return self.db.session.execute(stmt).scalar_one_or_none()
 
-    def get_attachment(self, attachment_id):
+    def get_attachment(self, attachment_id, include_archived=False):
         if attachment_id is None:
             raise ValueError('attachment_id acannot be None')
-        return self._get_db_attachment(attachment_id)
+        attachment = self._get_db_attachment(attachment_id)
+        if attachment is None and include_archived:
+            stmt = select(self.DbArchivedAttachment).where(
+                self.DbArchivedAttachment.id == attachment_id)
+            attachment = self.db.session.execute(stmt).scalar_one_or_none()
+        return attachment
 
     def _get_attachments_query(self, attachment_id_in=UNSPECIFIED):
         query = select(self.DbAttachment)
@@ -0,0 +1,192 @@
+from sqlalchemy import event, func, select, union_all
+
+import logging_util
+from models.attachment_base import AttachmentBase
+from models.comment_base import CommentBase
+from models.task_base import TaskBase
+
+
+def generate_archive_table(db, table):
+    """Create the archive counterpart of one of the task tables: same name
+    with an "_archive" suffix and the same columns, but no foreign keys, so
+    that rows can reference tasks in either tier. Columns that refer to a
+    task are indexed, for moving rows back out."""
+    # the leading primary key column is already covered by the primary key
+    leading = list(table.primary_key.columns)[:1]
+    columns = []
+    for column in table.columns:
+        refers_to_task = any(fk.column.table.name == 'task'
+                             for fk in column.foreign_keys)
+        columns.append(db.Column(
+            column.name, column.type, primary_key=column.primary_key,
+            nullable=column.nullable, autoincrement=False,
+            index=refers_to_task and not any(
+                column is c for c in leading)))
+    return db.Table('{}_archive'.format(table.name), *columns)
+
+
+def reserve_archived_ids(model, archive_table):
+    """Without a sequence, as on SQLite, a new row gets the highest id in
+    its table plus one, so the id of a row that was moved to the archive
+    could be handed out again, and the archived row couldn't come back.
+    On such databases, new rows of the model are given the next id above
+    both tiers instead. It's worked out by the INSERT itself, so that two
+    writers can't take the same one. Returns that expression, for
+    inserting rows without the ORM."""
+    table = model.__table__
+    both_tiers = union_all(
+        select(func.max(table.c.id).label('id')),
+        select(func.max(archive_table.c.id))).subquery()
+    next_id = select(
+        func.coalesce(func.max(both_tiers.c.id), 0) + 1).scalar_subquery()
+
+    @event.listens_for(model, 'before_insert')
+    def _before_insert(mapper, connection, target):
+        if target.id is None and not connection.dialect.supports_sequences:
+            target.id = next_id
+
+    return next_id
+
+
+def _link_relationships(db, table, task_col, other_col):
+    # the tasks at the other end of a task's archived links can be in either
+    # tier, so there is one relationship per tier
+    def relationship(target):
+        return db.relationship(
+            target, secondary=table, viewonly=True,
+            primaryjoin='DbArchivedTask.id == foreign({}.c.{})'.format(
+                table.name, task_col),
+            secondaryjoin='{}.id == foreign({}.c.{})'.format(
+                target, table.name, other_col))
+    return relationship('DbTask'), relationship('DbArchivedTask')
+
+
+def _both_tiers(hot_name, archived_name):
+    return property(lambda self: (list(getattr(self, hot_name)) +
+                                  list(getattr(self, archived_name))))
+
+
+def generate_archived_task_class(db, archive_tables):
+    class DbArchivedTask(db.Model, TaskBase):
+        """A task in the archive tier. Archived tasks are only read: for the
+        listings that include done or deleted tasks, and when a single task
+        is looked at. They get moved back into the task table before
+        anything changes them. The relationships are read-only."""
+
+        _logger = logging_util.get_logger_by_name(__name__, 'DbArchivedTask')
+
+        __table__ = archive_tables['task']
+
+        is_archived = True
+
+        # the archive tables have no foreign keys, so the joins are spelled
+        # out
+        tags = db.relationship(
+            'DbTag', secondary=archive_tables['tags_tasks'], viewonly=True,
+            primaryjoin='DbArchivedTask.id == '
+                        'foreign(tags_tasks_archive.c.task_id)',
+            secondaryjoin='DbTag.id == foreign(tags_tasks_archive.c.tag_id)')
+        users = db.relationship(
+            'DbUser', secondary=archive_tables['users_tasks'], viewonly=True,
+            primaryjoin='DbArchivedTask.id == '
+                        'foreign(users_tasks_archive.c.task_id)',
+            secondaryjoin='DbUser.id == '
+                          'foreign(users_tasks_archive.c.user_id)')
+
+        # a task's parent can be in either tier
+        _hot_parent = db.relationship(
+            'DbTask', viewonly=True,
+            primaryjoin='foreign(DbArchivedTask.parent_id) == DbTask.id')
+        _archived_parent = db.relationship(
+            'DbArchivedTask', viewonly=True,
+            primaryjoin='foreign(DbArchivedTask.parent_id) == '
+                        'remote(DbArchivedTask.id)')
+
+        @property
+        def parent(self):
+            if self._hot_parent is not None:
+                return self._hot_parent
+            return self._archived_parent
+
+        # whole subtrees are archived, and everything hanging off of a task
+        # is archived along with it, so these are all in the archive tier
+        children = db.relationship(
+            'DbArchivedTask', viewonly=True,
+            primaryjoin='DbArchivedTask.id == '
+                        'foreign(remote(DbArchivedTask.parent_id))')
+        comments = db.relationship(
+            'DbArchivedComment', viewonly=True,
+            primaryjoin='DbArchivedTask.id == '
+                        'foreign(DbArchivedComment.task_id)',
+            order_by='DbArchivedComment.timestamp')
+        attachments = db.relationship(
+            'DbArchivedAttachment', viewonly=True,
+            primaryjoin='DbArchivedTask.id == '
+                        'foreign(DbArchivedAttachment.task_id)',
+            order_by='DbArchivedAttachment.timestamp')
+
+        # a link is archived as soon as either of its tasks is
+        _hot_dependees, _archived_dependees = _link_relationships(
+            db, archive_tables['task_dependencies'], 'dependant_id',
+            'dependee_id')
+        dependees = _both_tiers('_hot_dependees', '_archived_dependees')
+        _hot_dependants, _archived_dependants = _link_relationships(
+            db, archive_tables['task_dependencies'], 'dependee_id',
+            'dependant_id')
+        dependants = _both_tiers('_hot_dependants', '_archived_dependants')
+        _hot_prioritize_before, _archived_prioritize_before = \
+            _link_relationships(db, archive_tables['task_prioritize'],
+                                'prioritize_after_id', 'prioritize_before_id')
+        prioritize_before = _both_tiers('_hot_prioritize_before',
+                                        '_archived_prioritize_before')
+        _hot_prioritize_after, _archived_prioritize_after = \
+            _link_relationships(db, archive_tables['task_prioritize'],
+                                'prioritize_before_id', 'prioritize_after_id')
+        prioritize_after = _both_tiers('_hot_prioritize_after',
+                                       '_archived_prioritize_after')
+
+        def __init__(self):
+            raise TypeError('Archived tasks are created by archiving')
+
+    return DbArchivedTask
+
+
+def generate_archived_comment_class(db, comment_archive_table):
+    class DbArchivedComment(db.Model, CommentBase):
+        """A comment on an archived task. Read-only, like the task."""
+
+        _logger = logging_util.get_logger_by_name(__name__,
+                                                  'DbArchivedComment')
+
+        __table__ = comment_archive_table
+
+        task = db.relationship(
+            'DbArchivedTask', viewonly=True,
+            primaryjoin='foreign(DbArchivedComment.task_id) == '
+                        'DbArchivedTask.id')
+
+        def __init__(self):
+            raise TypeError('Archived comments are created by archiving')
+
+    return DbArchivedComment
+
+
+def generate_archived_attachment_class(db, attachment_archive_table):
+    class DbArchivedAttachment(db.Model, AttachmentBase):
+        """An attachment record of an archived task. Read-only, like the
+        task."""
+
+        _logger = logging_util.get_logger_by_name(__name__,
+                                                  'DbArchivedAttachment')
+
+        __table__ = attachment_archive_table
+
+        task = db.relationship(
+            'DbArchivedTask', viewonly=True,
+            primaryjoin='foreign(DbArchivedAttachment.task_id) == '
+                        'DbArchivedTask.id')
+
+        def __init__(self):
+            raise TypeError('Archived attachments are created by archiving')
+
+    return DbArchivedAttachment
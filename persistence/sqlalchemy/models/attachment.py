@@ -15,7 +15,8 @@ def generate_attachment_class(db):
         filename = db.Column(db.String(100))
         description = db.Column(db.Text, default=None)
 
-        task_id = db.Column(db.Integer, db.ForeignKey('task.id'))
+        task_id = db.Column(db.Integer, db.ForeignKey('task.id'),
+                            index=True)
         task = db.relationship('DbTask',
                                backref=db.backref('attachments',
                                                   lazy='dynamic',
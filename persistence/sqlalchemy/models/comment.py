@@ -14,7 +14,8 @@ def generate_comment_class(db):
         timestamp = db.Column(db.DateTime)
         date_last_updated = db.Column(db.DateTime)
 
-        task_id = db.Column(db.Integer, db.ForeignKey('task.id'))
+        task_id = db.Column(db.Integer, db.ForeignKey('task.id'),
+                            index=True)
         task = db.relationship('DbTask',
                                backref=db.backref('comments', lazy='dynamic',
                                                   order_by=timestamp))
@@ -55,6 +55,20 @@ def generate_task_class(pl, tags_tasks_table, users_tasks_table,
         date_created = db.Column(db.DateTime)
         date_last_updated = db.Column(db.DateTime)
 
+        __table_args__ = (
+            # children of a task (or the top-level tasks), in display order
+            db.Index('ix_task_parent_id_order_num', parent_id, order_num),
+            # the same, restricted by the done/deleted filters that nearly
+            # every listing applies
+            db.Index('ix_task_parent_id_is_deleted_is_done_order_num',
+                     parent_id, is_deleted, is_done, order_num),
+            # the deadlines page. most tasks have no deadline, so leave them
+            # out of the index.
+            db.Index('ix_task_deadline', deadline,
+                     postgresql_where=deadline.isnot(None),
+                     sqlite_where=deadline.isnot(None)),
+        )
+
         def __init__(self, summary, description='', is_done=False,
                      is_deleted=False, deadline=None,
                      expected_duration_minutes=None, expected_cost=None,
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+import logging_util
+
+
+def uses_queue_pool(db_uri):
+    """Whether SQLAlchemy would give an engine for db_uri a QueuePool, which
+    is the pool that InstrumentedQueuePool can stand in for. In-memory
+    SQLite databases get a different kind of pool."""
+    url = make_url(db_uri)
+    return url.get_dialect().get_pool_class(url) is QueuePool
+
+
+class PoolStats(object):
+    """Counts the checkouts from a pool. A checkout waits when every
+    connection is checked out and the pool can't overflow any further;
+    waits and wait_seconds count only those, not the time it takes to open
+    a new connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def record(self, waited, seconds, timed_out):
+        with self._lock:
+            if not timed_out:
+                self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += seconds
+                self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that keeps PoolStats, and logs a warning each time a
+    thread has to wait for another one to give a connection back."""
+
+    _logger = logging_util.get_logger_by_name(__name__,
+                                              'InstrumentedQueuePool')
+
+    # keep SQLAlchemy's own pool logging where it would be for a QueuePool,
+    # which is quiet unless SQLAlchemy logging is turned on
+    _sqla_logger_namespace = 'sqlalchemy.pool.impl.QueuePool'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting from where
+        # the old one left off
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        waited = self._must_wait()
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            seconds = time.perf_counter() - started
+            self.stats.record(True, seconds, timed_out=True)
+            self._logger.warning(
+                'timed out after %.3f s waiting for a connection; %s',
+                seconds, self.status())
+            raise
+        seconds = time.perf_counter() - started
+        self.stats.record(waited, seconds, timed_out=False)
+        if waited:
+            self._logger.warning('waited %.3f s for a connection; %s',
+                                 seconds, self.status())
+        return record
+
+    def _must_wait(self):
+        return (self._max_overflow > -1 and
+                self._overflow >= self._max_overflow and
+                self._pool.empty())
+
+    def get_stats(self):
+        with self.stats._lock:
+            return {
+                'size': self.size(),
+                'checked_out': self.checkedout(),
+                'checked_in': self.checkedin(),
+                'overflow': max(self.overflow(), 0),
+                'max_overflow': self._max_overflow,
+                'checkouts': self.stats.checkouts,
+                'waits': self.stats.waits,
+                'wait_seconds': self.stats.wait_seconds,
+                'max_wait_seconds': self.stats.max_wait_seconds,
+                'timeouts': self.stats.timeouts,
+            }
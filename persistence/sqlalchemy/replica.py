@@ -0,0 +1,52 @@
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+# the key of the read replica in SQLALCHEMY_BINDS. no models are bound to
+# it, so db.create_all() and friends leave it alone.
+REPLICA_BIND_KEY = 'replica'
+
+
+class ReplicaRoutingSession(Session):
+    """A session that sends SELECTs made inside
+    SqlAlchemyPersistenceLayer.read_only() to the read replica, if there is
+    one. Everything else goes to the primary: flushes, INSERT/UPDATE/DELETE
+    statements, and anything that isn't a plain SELECT.
+
+    The first write pins the session to the primary for the rest of its
+    life, which is the current app context (that is, the current request),
+    so a request always sees its own writes even if the replica hasn't
+    caught up with them yet."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['pinned_to_primary'] = True
+            elif self.uses_replica() and getattr(clause, 'is_select', False):
+                replica = self._db.engines.get(REPLICA_BIND_KEY)
+                if replica is not None:
+                    self.info['replica_reads'] = \
+                        self.info.get('replica_reads', 0) + 1
+                    return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind,
+                                **kwargs)
+
+    def uses_replica(self):
+        return (self.info.get('read_only', False) and
+                not self.info.get('pinned_to_primary', False))
+
+
+@event.listens_for(ReplicaRoutingSession, 'do_orm_execute')
+def _pin_to_primary(orm_execute_state):
+    session = orm_execute_state.session
+    if (orm_execute_state.is_insert or orm_execute_state.is_update or
+            orm_execute_state.is_delete):
+        # an ORM UPDATE or DELETE can run a SELECT of its own before the
+        # statement itself reaches get_bind, so pin before anything runs
+        session.info['pinned_to_primary'] = True
+    elif (orm_execute_state.is_select and
+          session.info.get('pinned_to_primary') and
+          session.info.get('replica_reads')):
+        # objects already loaded from the replica would otherwise keep
+        # their possibly out-of-date values
+        orm_execute_state.update_execution_options(populate_existing=True)
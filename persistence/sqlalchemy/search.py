@@ -0,0 +1,164 @@
+from sqlalchemy import event, text, select, literal, literal_column, func, \
+    or_, bindparam, table, column
+
+import logging_util
+from persistence.search import SNIPPET_START, SNIPPET_END, \
+    SNIPPET_ELLIPSIS, SNIPPET_MAX_WORDS
+
+
+class LikeTaskSearch(object):
+    """Fallback for database engines without a supported full-text index.
+    Every token must appear in the summary or description. All matches get
+    the same rank, and the snippet is built in Python."""
+
+    def get_search_query(self, DbTask, tokens):
+        criteria = []
+        for token in tokens:
+            like_term = '%{}%'.format(token)
+            criteria.append(or_(DbTask.summary.ilike(like_term),
+                                DbTask.description.ilike(like_term)))
+        return select(DbTask, literal(0).label('rank'),
+                      literal(None).label('snippet')).where(*criteria)
+
+    def install(self, connection):
+        pass
+
+    def uninstall(self, connection):
+        pass
+
+
+class SqliteTaskSearch(object):
+    """Full-text search using an SQLite FTS5 external-content table. The
+    table is kept in sync with the task table by triggers, so every insert,
+    update and delete of a task (including bulk statements) updates the
+    index."""
+
+    _logger = logging_util.get_logger_by_name(__name__, 'SqliteTaskSearch')
+
+    TABLE_NAME = 'task_fts'
+
+    TRIGGERS = [
+        """CREATE TRIGGER IF NOT EXISTS task_fts_after_insert
+           AFTER INSERT ON task BEGIN
+             INSERT INTO task_fts (rowid, summary, description)
+             VALUES (new.id, new.summary, new.description);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS task_fts_after_delete
+           AFTER DELETE ON task BEGIN
+             INSERT INTO task_fts (task_fts, rowid, summary, description)
+             VALUES ('delete', old.id, old.summary, old.description);
+           END""",
+        """CREATE TRIGGER IF NOT EXISTS task_fts_after_update
+           AFTER UPDATE OF id, summary, description ON task BEGIN
+             INSERT INTO task_fts (task_fts, rowid, summary, description)
+             VALUES ('delete', old.id, old.summary, old.description);
+             INSERT INTO task_fts (rowid, summary, description)
+             VALUES (new.id, new.summary, new.description);
+           END""",
+    ]
+
+    def get_search_query(self, DbTask, tokens):
+        # Quote each token so that FTS5 doesn't interpret any of it as query
+        # syntax, and make it a prefix query. Tokens are implicitly ANDed.
+        match = ' '.join('"{}"*'.format(token) for token in tokens)
+        fts_table = table(self.TABLE_NAME, column('rowid'))
+        fts = literal_column(self.TABLE_NAME)
+        # bm25() returns lower values for better matches. Weight the summary
+        # more heavily than the description.
+        rank = -func.bm25(fts, 10.0, 1.0)
+        snippet = func.snippet(fts, -1, SNIPPET_START, SNIPPET_END,
+                               SNIPPET_ELLIPSIS, SNIPPET_MAX_WORDS)
+        return select(
+            DbTask, rank.label('rank'), snippet.label('snippet')
+        ).select_from(
+            fts_table
+        ).join(
+            DbTask, DbTask.id == fts_table.c.rowid
+        ).where(
+            fts.op('MATCH')(bindparam('fts_match', match)))
+
+    def install(self, connection):
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND "
+                 "name = :name"),
+            {'name': self.TABLE_NAME}).first()
+        if not exists:
+            self._logger.info('Creating the full-text search table')
+            connection.execute(text(
+                "CREATE VIRTUAL TABLE task_fts USING fts5("
+                "summary, description, content='task', content_rowid='id')"))
+            # index any tasks that already exist
+            connection.execute(text(
+                "INSERT INTO task_fts (task_fts) VALUES ('rebuild')"))
+        for trigger in self.TRIGGERS:
+            connection.execute(text(trigger))
+
+    def uninstall(self, connection):
+        connection.execute(text('DROP TABLE IF EXISTS task_fts'))
+
+
+class PostgresqlTaskSearch(object):
+    """Full-text search using a GIN expression index on a weighted tsvector
+    of the summary and description. Because it's an expression index, there
+    is no separate column to keep in sync. The expressions here must match
+    the index definition exactly for the planner to use it."""
+
+    INDEX_NAME = 'ix_task_search_vector'
+
+    VECTOR = ("setweight(to_tsvector('english', "
+              "coalesce({table}summary, '')), 'A') || "
+              "setweight(to_tsvector('english', "
+              "coalesce({table}description, '')), 'B')")
+
+    DOCUMENT = ("coalesce({table}summary, '') || ' ' || "
+                "coalesce({table}description, '')")
+
+    HEADLINE_OPTIONS = 'StartSel="{}", StopSel="{}", MaxWords={}, ' \
+                       'MinWords={}'.format(SNIPPET_START, SNIPPET_END,
+                                            SNIPPET_MAX_WORDS,
+                                            SNIPPET_MAX_WORDS // 2)
+
+    def get_search_query(self, DbTask, tokens):
+        tsquery_text = ' & '.join('{}:*'.format(token) for token in tokens)
+        tsquery = func.to_tsquery(literal_column("'english'"),
+                                  bindparam('ts_query', tsquery_text))
+        vector = literal_column(self.VECTOR.format(table='task.'))
+        document = literal_column(self.DOCUMENT.format(table='task.'))
+        rank = func.ts_rank(vector, tsquery)
+        snippet = func.ts_headline(literal_column("'english'"), document,
+                                   tsquery, self.HEADLINE_OPTIONS)
+        return select(
+            DbTask, rank.label('rank'), snippet.label('snippet')
+        ).where(vector.op('@@')(tsquery))
+
+    def install(self, connection):
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS {} ON task USING gin (({}))'.format(
+                self.INDEX_NAME, self.VECTOR.format(table=''))))
+
+    def uninstall(self, connection):
+        # the index is dropped along with the table
+        pass
+
+
+def get_task_search(dialect_name):
+    if dialect_name == 'sqlite':
+        return SqliteTaskSearch()
+    if dialect_name == 'postgresql':
+        return PostgresqlTaskSearch()
+    return LikeTaskSearch()
+
+
+def register_task_search_ddl(metadata, task_table):
+    """Create the search index whenever the tables are created, and remove it
+    when the task table is dropped. The install step is idempotent, since it
+    is also run on every start by ensure_schema, for databases that were
+    created before the index existed."""
+
+    @event.listens_for(metadata, 'after_create')
+    def _after_create(target, connection, **kwargs):
+        get_task_search(connection.dialect.name).install(connection)
+
+    @event.listens_for(task_table, 'before_drop')
+    def _before_drop(target, connection, **kwargs):
+        get_task_search(connection.dialect.name).uninstall(connection)
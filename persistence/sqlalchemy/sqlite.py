@@ -0,0 +1,243 @@
+import collections
+import random
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+
+import logging_util
+from conversions import bool_from_str
+
+
+# applied to every new connection, in this order. journal_mode=WAL lets
+# readers carry on while a write is in progress, and with WAL,
+# synchronous=NORMAL only syncs on checkpoints instead of on every commit.
+DEFAULT_PRAGMAS = collections.OrderedDict([
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', '5000'),
+    ('mmap_size', '268435456'),
+    ('cache_size', '-65536'),
+    ('temp_store', 'MEMORY'),
+])
+
+DEFAULT_LOCK_RETRIES = 5
+DEFAULT_RETRY_DELAY = 0.05
+
+OPTION_PREFIX = 'sqlite_'
+
+_PRAGMA_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+_WRITE_STATEMENT = re.compile(
+    r'^\s*(INSERT|UPDATE|DELETE|REPLACE|CREATE|DROP|ALTER)\b', re.IGNORECASE)
+_WRITE_IN_CTE = re.compile(r'\b(INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+
+def is_sqlite_uri(db_uri):
+    return db_uri is not None and db_uri.startswith('sqlite')
+
+
+def is_lock_error(exc):
+    """Whether exc is SQLite saying that another connection holds a lock
+    that it needs, which can be retried once that connection is done."""
+    orig = getattr(exc, 'orig', exc)
+    if not isinstance(orig, sqlite3.OperationalError):
+        return False
+    message = str(orig).lower()
+    return 'database is locked' in message or \
+        'database table is locked' in message or \
+        'database is busy' in message
+
+
+def is_write_statement(statement):
+    if _WRITE_STATEMENT.match(statement):
+        return True
+    return statement.lstrip()[:4].upper() == 'WITH' and \
+        _WRITE_IN_CTE.search(statement) is not None
+
+
+class WriteQueue(object):
+    """Lets one thread at a time have a write transaction open, in the order
+    they asked. A thread holds its place from its first write statement
+    until the transaction on that connection commits or rolls back, and can
+    write on more than one connection in the meantime. Reads never wait."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._waiting = collections.deque()
+        self._owner = None
+        self._keys = set()
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def owner(self):
+        return self._owner
+
+    def acquire(self, key):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._keys.add(key)
+                return
+            ticket = object()
+            self._waiting.append(ticket)
+            started = None
+            while self._owner is not None or self._waiting[0] is not ticket:
+                if started is None:
+                    started = time.monotonic()
+                    self.waits += 1
+                self._cond.wait()
+            if started is not None:
+                self.wait_seconds += time.monotonic() - started
+            self._waiting.popleft()
+            self._owner = me
+            self._keys = {key}
+
+    def release(self, key):
+        with self._cond:
+            if key not in self._keys:
+                return
+            self._keys.discard(key)
+            if not self._keys:
+                self._owner = None
+                self._cond.notify_all()
+
+
+class SqliteProfile(object):
+    """Connection settings for running on SQLite with several workers.
+
+    Every new connection gets the pragmas. A statement that starts a
+    transaction and fails because another connection holds a lock is
+    retried up to lock_retries times, with exponential backoff starting at
+    retry_delay seconds; that comes on top of the waiting that SQLite
+    itself does for busy_timeout. Lock errors later in a transaction are
+    raised straight away. If
+    write_queue is given, write transactions within this process take turns
+    through it, instead of contending for the database lock."""
+
+    _logger = logging_util.get_logger_by_name(__name__, 'SqliteProfile')
+
+    def __init__(self, pragmas=None, lock_retries=DEFAULT_LOCK_RETRIES,
+                 retry_delay=DEFAULT_RETRY_DELAY, write_queue=None):
+        if pragmas is None:
+            pragmas = DEFAULT_PRAGMAS
+        for name, value in pragmas.items():
+            if not _PRAGMA_VALUE.match(name) or \
+                    not _PRAGMA_VALUE.match(str(value)):
+                raise ValueError(
+                    'Invalid SQLite pragma: {}={}'.format(name, value))
+        self.pragmas = collections.OrderedDict(pragmas)
+        self.lock_retries = lock_retries
+        self.retry_delay = retry_delay
+        self.write_queue = write_queue
+        self.retries = 0
+        self.failures = 0
+
+    @staticmethod
+    def from_options(opts):
+        """Take the sqlite_* keys out of the engine options that came from
+        the db options string, and build a profile out of them.
+
+        The profile is opt-in, because its pragmas change how the database
+        file is kept: journal_mode=WAL adds -wal and -shm files next to it
+        and stays set on the file, and synchronous=NORMAL means the last
+        commits before a power failure can be lost. It's used if
+        sqlite_profile=true, or if any of the other options below are
+        given. Otherwise, or if sqlite_profile=false, None is returned and
+        the connections are left as SQLite makes them.
+
+            sqlite_profile=true        use the profile with its defaults
+            sqlite_profile=false       don't use the profile at all
+            sqlite_write_queue=true    serialize in-process writes
+            sqlite_lock_retries=N      retries on lock errors
+            sqlite_retry_delay=SECS    initial backoff between retries
+            sqlite_<pragma>=VALUE      override or add a pragma, e.g.
+                                       sqlite_busy_timeout=10000
+        """
+        settings = {}
+        for key in list(opts):
+            if key.startswith(OPTION_PREFIX):
+                settings[key[len(OPTION_PREFIX):]] = str(opts.pop(key))
+        # giving any of the other settings is asking for the profile
+        default = 'true' if set(settings) - {'profile'} else 'false'
+        if not bool_from_str(settings.pop('profile', default)):
+            return None
+        write_queue = None
+        if bool_from_str(settings.pop('write_queue', 'false')):
+            write_queue = WriteQueue()
+        lock_retries = int(settings.pop('lock_retries',
+                                        DEFAULT_LOCK_RETRIES))
+        retry_delay = float(settings.pop('retry_delay', DEFAULT_RETRY_DELAY))
+        pragmas = collections.OrderedDict(DEFAULT_PRAGMAS)
+        pragmas.update(settings)
+        return SqliteProfile(pragmas=pragmas, lock_retries=lock_retries,
+                             retry_delay=retry_delay, write_queue=write_queue)
+
+    def install(self, engine):
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine.dialect, 'do_execute', self._do_execute)
+        event.listen(engine.dialect, 'do_executemany', self._do_executemany)
+        if self.write_queue is not None:
+            event.listen(engine, 'before_cursor_execute',
+                         self._before_cursor_execute)
+            event.listen(engine, 'commit', self._end_transaction)
+            event.listen(engine, 'rollback', self._end_transaction)
+            event.listen(engine.pool, 'checkin', self._on_checkin)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in self.pragmas.items():
+                cursor.execute('PRAGMA {} = {}'.format(name, value))
+        finally:
+            cursor.close()
+
+    def _retry(self, cursor, execute):
+        # only the statement that starts a transaction is retried. it can
+        # simply be run again, because the transaction holds no locks yet.
+        # later on, a lock error can mean that this transaction's read lock
+        # is waiting to become a write lock while the other connection
+        # waits on this one, which retrying the statement can't get out
+        # of; the transaction has to be rolled back and started over.
+        retryable = not cursor.connection.in_transaction
+        attempt = 0
+        while True:
+            try:
+                return execute()
+            except sqlite3.OperationalError as e:
+                if not is_lock_error(e) or not retryable or \
+                        attempt >= self.lock_retries:
+                    if is_lock_error(e):
+                        self.failures += 1
+                    raise
+                delay = self.retry_delay * (2 ** attempt)
+                attempt += 1
+                self.retries += 1
+                self._logger.info('database is locked, retry %d of %d in '
+                                  '%.3f s', attempt, self.lock_retries, delay)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+
+    def _do_execute(self, cursor, statement, parameters, context):
+        self._retry(cursor, lambda: cursor.execute(statement, parameters))
+        return True
+
+    def _do_executemany(self, cursor, statement, parameters, context):
+        self._retry(cursor,
+                    lambda: cursor.executemany(statement, parameters))
+        return True
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        if is_write_statement(statement):
+            self.write_queue.acquire(conn.connection.dbapi_connection)
+
+    def _end_transaction(self, conn):
+        # fires just before the COMMIT or ROLLBACK; the next writer's
+        # busy_timeout covers the short gap until it's done
+        self.write_queue.release(conn.connection.dbapi_connection)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.write_queue.release(dbapi_connection)
@@ -0,0 +1,75 @@
+import collections
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+
+# the execution option naming the persistence layer method that a statement
+# was run from
+CALL_SITE = 'call_site'
+
+
+def at_call_site(stmt, call_site):
+    return stmt.execution_options(**{CALL_SITE: call_site})
+
+
+def pad_in_values(values):
+    """Pad the values for an IN to the next power of two in length, by
+    repeating the last one. SQLAlchemy caches the compiled statement no
+    matter how many values there are, but expands the IN into one bound
+    parameter per value when it runs, so each distinct length is a distinct
+    SQL string to the database and its own statement cache. Padding keeps
+    that down to one string per power of two."""
+    values = list(values)
+    if len(values) < 2:
+        return values
+    size = 1 << (len(values) - 1).bit_length()
+    return values + values[-1:] * (size - len(values))
+
+
+class StatementCacheStats(object):
+    """Counts, per call site, how many of the statements run were found in
+    SQLAlchemy's compiled cache (hits), how many had to be compiled (misses),
+    and how many can't be cached at all (uncached). The call site is set with
+    at_call_site(); statements without one are counted under None."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = collections.defaultdict(self._new_counts)
+
+    @staticmethod
+    def _new_counts():
+        return {'hits': 0, 'misses': 0, 'uncached': 0}
+
+    def install(self, engine):
+        event.listen(engine, 'before_cursor_execute',
+                     self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters,
+                               context, executemany):
+        if context is None:
+            return
+        cache_hit = getattr(context, 'cache_hit', None)
+        if cache_hit == CACHE_HIT:
+            key = 'hits'
+        elif cache_hit == CACHE_MISS:
+            key = 'misses'
+        else:
+            key = 'uncached'
+        call_site = context.execution_options.get(CALL_SITE)
+        with self._lock:
+            self._counts[call_site][key] += 1
+
+    def get(self, call_site):
+        with self._lock:
+            return dict(self._counts.get(call_site) or self._new_counts())
+
+    def as_dict(self):
+        with self._lock:
+            return {call_site: dict(counts)
+                    for call_site, counts in self._counts.items()}
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
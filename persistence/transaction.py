@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+
+import logging_util
+
+
+class TransactionStats(object):
+    """What happened during one unit of work. Each call to commit() made
+    inside the unit of work only flushes, and is counted in commit_calls;
+    commits and rollbacks count what was done when the outermost scope
+    ended. flushes counts every flush, including autoflushes and the one
+    done by the final commit."""
+
+    def __init__(self):
+        self.flushes = 0
+        self.commit_calls = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+    def __repr__(self):
+        return ('TransactionStats(flushes={}, commit_calls={}, commits={}, '
+                'rollbacks={})'.format(self.flushes, self.commit_calls,
+                                       self.commits, self.rollbacks))
+
+
+class TransactionScope(object):
+    def __init__(self, expire_on_commit, flush_count):
+        self.depth = 1
+        self.expire_on_commit = expire_on_commit
+        self.rollback_only = False
+        self.flush_count = flush_count
+        self.after_commit = []
+        self.stats = TransactionStats()
+
+
+class TransactionMixin(object):
+    """Unit-of-work support shared by the persistence layers. Between
+    begin_transaction() and the matching end_transaction(), commit() only
+    flushes, so that helpers which commit on their own can be combined
+    into a single transaction. Scopes nest: an inner scope joins the one
+    already in progress, and only the outermost one commits (or rolls back,
+    if any scope ended with an error).
+
+    Subclasses provide _get_transaction_scope, _set_transaction_scope,
+    _get_flush_count, _flush, _commit and rollback."""
+
+    _transaction_logger = logging_util.get_logger_by_name(
+        __name__, 'TransactionMixin')
+
+    def begin_transaction(self, expire_on_commit=True):
+        scope = self._get_transaction_scope()
+        if scope is not None:
+            scope.depth += 1
+            return scope.stats
+        scope = TransactionScope(expire_on_commit, self._get_flush_count())
+        self._set_transaction_scope(scope)
+        return scope.stats
+
+    def end_transaction(self, error=False):
+        scope = self._get_transaction_scope()
+        if scope is None:
+            raise Exception('There is no transaction in progress.')
+        if error:
+            scope.rollback_only = True
+        scope.depth -= 1
+        if scope.depth > 0:
+            return scope.stats
+
+        self._set_transaction_scope(None)
+        stats = scope.stats
+        if scope.rollback_only:
+            self.rollback()
+            stats.rollbacks += 1
+        else:
+            try:
+                self._commit(expire_on_commit=scope.expire_on_commit)
+            except Exception:
+                self.rollback()
+                raise
+            stats.commits += 1
+        stats.flushes = self._get_flush_count() - scope.flush_count
+        self._transaction_logger.debug('unit of work ended: %r', stats)
+        if not scope.rollback_only:
+            for func in scope.after_commit:
+                func()
+        return stats
+
+    def in_transaction(self):
+        return self._get_transaction_scope() is not None
+
+    @contextmanager
+    def transaction(self, expire_on_commit=True):
+        """Run the body as a single unit of work, or as part of the one
+        already in progress. Yields the TransactionStats of the outermost
+        unit of work."""
+        stats = self.begin_transaction(expire_on_commit=expire_on_commit)
+        try:
+            yield stats
+        except BaseException:
+            self.end_transaction(error=True)
+            raise
+        self.end_transaction()
+
+    def call_after_commit(self, func):
+        """Call func once the current unit of work has been committed, or
+        right away if there is no unit of work in progress. It is not called
+        if the unit of work is rolled back."""
+        scope = self._get_transaction_scope()
+        if scope is None:
+            func()
+        else:
+            scope.after_commit.append(func)
+
+    def commit(self):
+        scope = self._get_transaction_scope()
+        if scope is None:
+            self._commit()
+            return
+        scope.stats.commit_calls += 1
+        self._flush()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+
+import json
+import unittest
+from datetime import datetime, timedelta, UTC
+
+from werkzeug.exceptions import Conflict
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
+
+
+class ArchiveFinishedTasksTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+
+    def test_in_memory_layer_archives_nothing(self):
+        # given
+        task = self.pl.create_task('task', is_done=True,
+                                   date_last_updated=datetime(2020, 1, 1))
+        self.pl.add(task)
+        self.pl.commit()
+        # when
+        counts = self.ll.archive_finished_tasks(30)
+        # then
+        self.assertEqual(0, counts['tasks'])
+        self.assertIs(task, self.pl.get_task(task.id))
+
+
+class SqlAlchemyArchiveFinishedTasksTest(unittest.TestCase):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+        self.admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(self.admin)
+        old = datetime.now(UTC) - timedelta(days=60)
+        self.done = self.pl.create_task('done', is_done=True,
+                                        date_last_updated=old)
+        self.deleted = self.pl.create_task('deleted', is_deleted=True,
+                                           date_last_updated=old)
+        self.recent = self.pl.create_task('recent', is_done=True)
+        for task in [self.done, self.deleted, self.recent]:
+            self.pl.add(task)
+        self.pl.commit()
+        self.done_id = self.done.id
+        self.deleted_id = self.deleted.id
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def test_archives_tasks_finished_for_longer_than_days(self):
+        # when
+        counts = self.ll.archive_finished_tasks(30)
+        # then
+        self.assertEqual(2, counts['tasks'])
+        self.assertEqual([self.done_id, self.deleted_id],
+                         sorted(self.pl.get_archived_task_ids()))
+        self.assertFalse(self.pl.in_transaction())
+
+    def test_load_includes_archived_tasks_only_when_asked(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        unfinished = self.ll.load_no_hierarchy(self.admin)
+        everything = self.ll.load_no_hierarchy(self.admin, include_done=True,
+                                               include_deleted=True)
+        hierarchy = self.ll.load(self.admin, max_depth=None,
+                                 include_deleted=True)
+        # then
+        self.assertEqual([], unfinished)
+        self.assertEqual(['deleted', 'done', 'recent'],
+                         sorted(t.summary for t in everything))
+        self.assertEqual(['deleted'], [t.summary for t in hierarchy])
+
+    def test_viewing_an_archived_task_leaves_it_archived(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        with self.pl.read_only():
+            data = self.ll.get_task_data(self.done_id, self.admin)
+            hierarchy = self.ll.get_task_hierarchy_data(self.done_id,
+                                                        self.admin)
+            edit = self.ll.get_edit_task_data(self.done_id, self.admin)
+            task = self.ll.get_task(self.done_id, self.admin)
+            pl_task = self.ll.pl_get_task(self.done_id)
+        # then
+        for t in [data['task'], hierarchy['task'], edit['task'], task,
+                  pl_task]:
+            self.assertEqual('done', t.summary)
+            self.assertTrue(t.is_archived)
+        self.assertEqual([], list(data['task'].comments))
+        self.assertEqual([], list(data['task'].dependees))
+        self.assertEqual([self.done_id, self.deleted_id],
+                         sorted(self.pl.get_archived_task_ids()))
+
+    def test_purging_an_archived_task(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        task = self.ll.pl_get_task(self.deleted_id)
+        # when
+        counts = self.ll.purge_task(task, self.admin)
+        # then
+        self.assertEqual(1, counts['tasks'])
+        self.assertEqual([self.done_id], self.pl.get_archived_task_ids())
+        self.assertIsNone(self.pl.get_task(self.deleted_id,
+                                           include_archived=True))
+
+    def test_converting_an_archived_task_to_a_tag(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        tag = self.ll.convert_task_to_tag(self.done_id, self.admin)
+        # then
+        self.assertEqual('done', tag.value)
+        self.assertEqual([self.deleted_id], self.pl.get_archived_task_ids())
+        self.assertIsNone(self.pl.get_task(self.done_id))
+
+    def test_undelete_brings_the_task_back(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        task = self.ll.task_unset_deleted(self.deleted_id, self.admin)
+        # then
+        self.assertFalse(task.is_archived)
+        self.assertFalse(task.is_deleted)
+        self.assertEqual([self.done_id], self.pl.get_archived_task_ids())
+
+    def test_undone_brings_the_task_back(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        task = self.ll.task_unset_done(self.done_id, self.admin)
+        # then
+        self.assertFalse(task.is_done)
+        self.assertEqual([self.deleted_id], self.pl.get_archived_task_ids())
+
+    def test_purge_all_includes_archived_tasks(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        counts = self.ll.purge_all_deleted_tasks(self.admin)
+        # then
+        self.assertEqual(1, counts['tasks'])
+        self.assertEqual([self.done_id], self.pl.get_archived_task_ids())
+        self.assertIsNone(self.pl.get_task(self.deleted_id))
+
+    def test_import_leaves_the_archive_alone(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        src = {'format_version': 2,
+               'tasks': [{'id': 1000, 'summary': 'imported'}]}
+        # when
+        self.ll.do_import_data(src)
+        # then
+        self.assertEqual('imported', self.pl.get_task(1000).summary)
+        self.assertEqual([self.done_id, self.deleted_id],
+                         sorted(self.pl.get_archived_task_ids()))
+
+    def test_import_of_an_archived_id_is_a_conflict(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        src = {'format_version': 2,
+               'tasks': [{'id': self.done_id, 'summary': 'imported'}]}
+        # expect
+        self.assertRaises(Conflict, self.ll.do_import_data, src)
+        # and only the clashing task was moved back
+        self.assertEqual([self.deleted_id], self.pl.get_archived_task_ids())
+        self.assertEqual('done', self.pl.get_task(self.done_id).summary)
+
+    def test_export_reads_archived_tasks_where_they_are(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        data = self.ll.do_export_data(['tasks'])
+        # then
+        self.assertEqual(3, len(data['tasks']))
+        self.assertEqual([self.done_id, self.deleted_id],
+                         sorted(self.pl.get_archived_task_ids()))
+
+    def test_streamed_export_reads_archived_tasks_where_they_are(self):
+        # given
+        self.ll.archive_finished_tasks(30)
+        # when
+        data = json.loads(b''.join(self.ll.generate_export_data(['tasks'])))
+        # then
+        self.assertEqual(['deleted', 'done', 'recent'],
+                         sorted(t['summary'] for t in data['tasks']))
+        self.assertEqual([self.done_id, self.deleted_id],
+                         sorted(self.pl.get_archived_task_ids()))
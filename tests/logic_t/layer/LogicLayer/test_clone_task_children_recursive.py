@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+import unittest
+from unittest.mock import patch
+
+from werkzeug.exceptions import NotFound, Forbidden
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
+
+
+class CloneTaskChildrenRecursiveTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+
+    def create_tree(self):
+        # original -> t1 -> t2, original -> t3, target
+        self.user = self.pl.create_user('user@example.com')
+        self.user.id = 1
+        self.pl.add(self.user)
+        self.tasks = {}
+        for i, summary in enumerate(['original', 't1', 't2', 't3', 'target',
+                                     'outside'], start=1):
+            task = self.pl.create_task(summary)
+            task.id = i
+            task.order_num = 10 * i
+            task.users.append(self.user)
+            self.pl.add(task)
+            self.tasks[summary] = task
+        self.tasks['t1'].parent = self.tasks['original']
+        self.tasks['t2'].parent = self.tasks['t1']
+        self.tasks['t3'].parent = self.tasks['original']
+        self.pl.commit()
+
+    def get_copy(self, id_map, summary):
+        return self.pl.get_task(id_map[self.tasks[summary].id])
+
+    def test_copies_the_descendants_under_the_new_parent(self):
+        # given
+        self.create_tree()
+        self.tasks['t2'].is_done = True
+        self.tasks['t3'].is_deleted = True
+        self.tasks['t3'].description = 'description'
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user)
+        # then
+        self.assertEqual({2, 3, 4}, set(id_map))
+        target = self.tasks['target']
+        c1 = self.get_copy(id_map, 't1')
+        c2 = self.get_copy(id_map, 't2')
+        c3 = self.get_copy(id_map, 't3')
+        self.assertEqual(target.id, c1.parent_id)
+        self.assertEqual(c1.id, c2.parent_id)
+        self.assertEqual(target.id, c3.parent_id)
+        self.assertEqual('t2', c2.summary)
+        self.assertEqual('description', c3.description)
+        self.assertEqual(30, c2.order_num)
+        # and
+        self.assertFalse(c2.is_done)
+        self.assertFalse(c3.is_deleted)
+        self.assertEqual([self.user], list(c2.users))
+        # and the originals are untouched
+        self.assertEqual(self.tasks['original'].id,
+                         self.tasks['t1'].parent_id)
+        self.assertEqual(9, self.pl.count_tasks())
+
+    def test_copies_tags(self):
+        # given
+        self.create_tree()
+        tag = self.pl.create_tag('tag')
+        self.pl.add(tag)
+        self.tasks['t2'].tags.append(tag)
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user)
+        # then
+        self.assertEqual([tag], list(self.get_copy(id_map, 't2').tags))
+        self.assertEqual([], list(self.get_copy(id_map, 't1').tags))
+
+    def test_does_not_copy_comments_or_links_by_default(self):
+        # given
+        self.create_tree()
+        comment = self.pl.create_comment('comment')
+        comment.task = self.tasks['t1']
+        self.pl.add(comment)
+        self.tasks['t1'].dependees.append(self.tasks['t2'])
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user)
+        # then
+        c1 = self.get_copy(id_map, 't1')
+        self.assertEqual([], list(c1.comments))
+        self.assertEqual([], list(c1.dependees))
+
+    def test_deep_copies_comments(self):
+        # given
+        self.create_tree()
+        comment = self.pl.create_comment('comment')
+        comment.task = self.tasks['t1']
+        self.pl.add(comment)
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user, deep=True)
+        # then
+        comments = list(self.get_copy(id_map, 't1').comments)
+        self.assertEqual(1, len(comments))
+        self.assertIsNot(comment, comments[0])
+        self.assertEqual('comment', comments[0].content)
+        self.assertEqual(comment.timestamp, comments[0].timestamp)
+        self.assertEqual(2, self.pl.count_comments())
+
+    def test_deep_copies_links_within_the_subtree_to_the_copies(self):
+        # given
+        self.create_tree()
+        self.tasks['t1'].dependees.append(self.tasks['t2'])
+        self.tasks['t3'].prioritize_before.append(self.tasks['t1'])
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user, deep=True)
+        # then
+        c1 = self.get_copy(id_map, 't1')
+        c2 = self.get_copy(id_map, 't2')
+        c3 = self.get_copy(id_map, 't3')
+        self.assertEqual([c2], list(c1.dependees))
+        self.assertEqual([c1], list(c3.prioritize_before))
+
+    def test_deep_copies_links_outside_the_subtree_as_they_are(self):
+        # given
+        self.create_tree()
+        outside = self.tasks['outside']
+        self.tasks['t1'].dependees.append(outside)
+        self.tasks['t2'].prioritize_before.append(outside)
+        self.pl.commit()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            1, self.tasks['target'].id, self.user, deep=True)
+        # then
+        self.assertEqual([outside],
+                         list(self.get_copy(id_map, 't1').dependees))
+        self.assertEqual([outside],
+                         list(self.get_copy(id_map, 't2').prioritize_before))
+        self.assertEqual(2, len(list(outside.dependants)))
+
+    def test_commits_once(self):
+        # given
+        self.create_tree()
+        tag = self.pl.create_tag('tag')
+        self.pl.add(tag)
+        for summary in ['t1', 't2', 't3']:
+            self.tasks[summary].tags.append(tag)
+        self.pl.commit()
+        # when
+        with patch.object(self.pl, 'commit', wraps=self.pl.commit) as commit:
+            self.ll.clone_task_children_recursive(
+                1, self.tasks['target'].id, self.user, deep=True)
+        # then
+        commit.assert_called_once_with()
+
+    def test_no_children_does_nothing(self):
+        # given
+        self.create_tree()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            self.tasks['t3'].id, self.tasks['target'].id, self.user)
+        # then
+        self.assertEqual({}, id_map)
+        self.assertEqual(6, self.pl.count_tasks())
+
+    def test_original_not_found_does_nothing(self):
+        # given
+        self.create_tree()
+        # when
+        id_map = self.ll.clone_task_children_recursive(
+            99, self.tasks['target'].id, self.user)
+        # then
+        self.assertEqual({}, id_map)
+
+    def test_new_parent_not_found_raises(self):
+        # given
+        self.create_tree()
+        # expect
+        self.assertRaises(NotFound, self.ll.clone_task_children_recursive,
+                          1, 99, self.user)
+
+    def test_unauthorized_user_raises(self):
+        # given
+        self.create_tree()
+        other = self.pl.create_user('other@example.com')
+        self.pl.add(other)
+        self.pl.commit()
+        # expect
+        self.assertRaises(Forbidden, self.ll.clone_task_children_recursive,
+                          1, self.tasks['target'].id, other)
+        # and
+        self.assertEqual(6, self.pl.count_tasks())
+
+
+class SqlAlchemyCloneTaskChildrenRecursiveTest(
+        CloneTaskChildrenRecursiveTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
@@ -4,6 +4,7 @@ import unittest
 
 import werkzeug.exceptions
 
+from logic.layer import ORDER_NUM_GAP
 from models.object_types import ObjectTypes
 from tests.logic_t.layer.LogicLayer.util import generate_ll
 
@@ -110,3 +111,37 @@ class CreateNewTaskTest(unittest.TestCase):
         # then
         self.assertIsNotNone(task)
         self.assertEqual(123, task.order_num)
+
+    def test_new_task_goes_below_its_lowest_sibling(self):
+        # given
+        p = self.pl.create_task('p')
+        p.order_num = 0
+        c = self.pl.create_task('c')
+        c.order_num = 500
+        c.parent = p
+        other = self.pl.create_task('other')
+        other.order_num = -5000
+        self.pl.add(p)
+        self.pl.add(c)
+        self.pl.add(other)
+        self.pl.commit()
+
+        # when
+        task = self.ll.create_new_task(summary='c2', parent_id=p.id,
+                                       current_user=self.admin)
+
+        # then
+        self.assertEqual(500 - ORDER_NUM_GAP, task.order_num)
+
+    def test_new_top_level_task_goes_below_lowest_top_level_task(self):
+        # given
+        t1 = self.pl.create_task('t1')
+        t1.order_num = 0
+        self.pl.add(t1)
+        self.pl.commit()
+
+        # when
+        task = self.ll.create_new_task(summary='t2', current_user=self.admin)
+
+        # then
+        self.assertEqual(-ORDER_NUM_GAP, task.order_num)
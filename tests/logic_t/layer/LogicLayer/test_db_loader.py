@@ -264,7 +264,6 @@ class DbLoaderDoneDeletedTest(unittest.TestCase):
         grandchild5.parent = child5
         great_grandchild5 = self.pl.create_task(summary='great_grandchild5')
         great_grandchild5.is_done = True
-        great_grandchild5.id_deleted = True
         great_grandchild5.parent = grandchild5
         great_great_grandchild5 = self.pl.create_task(summary='great_great_grandchild5')
         great_great_grandchild5.parent = great_grandchild5
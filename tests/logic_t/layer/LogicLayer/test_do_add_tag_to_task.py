@@ -146,3 +146,18 @@ class LogicLayerTaskTagsTest(unittest.TestCase):
         self.assertIn(tag, task.tags)
         self.assertIn(task, tag.tasks)
         self.assertIs(tag, result)
+
+    def test_add_tag_to_task_joins_unit_of_work(self):
+        # given
+        task = self.pl.create_task('task')
+        self.pl.add(task)
+        self.pl.commit()
+
+        # when
+        with self.pl.transaction() as stats:
+            self.ll.do_add_tag_to_task(task, 'vwx', self.admin)
+
+        # then
+        self.assertEqual(1, stats.commit_calls)
+        self.assertEqual(1, stats.commits)
+        self.assertEqual(['vwx'], [tag.value for tag in task.tags])
@@ -949,3 +949,23 @@ class LogicLayerDoImportDataTest(unittest.TestCase):
         self.ll._logger.error.assert_called_once_with(
             'Exception while importing data: Error loading option: '
             '{\'value\': \'abc\'}: \'key\'')
+
+    def test_imports_dependees_and_prioritize_before(self):
+        # given
+        src = {
+            'format_version': 2,
+            'tasks': [
+                {'id': 1, 'summary': 'one', 'dependee_ids': [2],
+                 'prioritize_before_ids': [3]},
+                {'id': 2, 'summary': 'two'},
+                {'id': 3, 'summary': 'three'}]}
+        # when
+        self.ll.do_import_data(src)
+        # then
+        t1 = self.pl.get_task(1)
+        t2 = self.pl.get_task(2)
+        t3 = self.pl.get_task(3)
+        self.assertEqual([t2], list(t1.dependees))
+        self.assertEqual([t1], list(t2.dependants))
+        self.assertEqual([t3], list(t1.prioritize_before))
+        self.assertEqual([t1], list(t3.prioritize_after))
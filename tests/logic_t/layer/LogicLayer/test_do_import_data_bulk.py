@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from unittest.mock import Mock
+
+from werkzeug.exceptions import Conflict, BadRequest
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
+
+
+def generate_src():
+    return {
+        'format_version': 2,
+        'tasks': [
+            # the child comes first, to check that order doesn't matter
+            {'id': 12, 'summary': 'child', 'parent_id': 11,
+             'tag_ids': [21], 'user_ids': [31], 'dependee_ids': [13],
+             'prioritize_before_ids': [11], 'order_num': 5},
+            {'id': 11, 'summary': 'parent', 'description': 'desc',
+             'deadline': '2017-01-01', 'is_done': True,
+             'expected_duration_minutes': 60, 'expected_cost': '12.34'},
+            {'id': 13, 'summary': 'other', 'is_deleted': True},
+        ],
+        'tags': [{'id': 21, 'value': 'tag', 'description': 'a tag'}],
+        'users': [{'id': 31, 'email': 'user@example.com',
+                   'hashed_password': None, 'is_admin': False}],
+        'comments': [{'id': 41, 'content': 'comment',
+                      'timestamp': '2018-01-01', 'task_id': 12}],
+        'attachments': [{'id': 51, 'timestamp': '2018-01-02',
+                         'path': 'a.txt', 'filename': 'a.txt',
+                         'description': 'attachment', 'task_id': 11}],
+        'options': [{'key': 'opt', 'value': 'val'}],
+    }
+
+
+class BulkImportTestBase(object):
+    def test_imports_objects_and_links(self):
+        # when
+        self.ll.do_import_data(generate_src(), bulk=True)
+        # then
+        self.assertEqual(3, self.pl.count_tasks())
+        parent = self.pl.get_task(11)
+        child = self.pl.get_task(12)
+        other = self.pl.get_task(13)
+        self.assertEqual('parent', parent.summary)
+        self.assertEqual('desc', parent.description)
+        self.assertEqual(datetime(2017, 1, 1), parent.deadline)
+        self.assertTrue(parent.is_done)
+        self.assertFalse(parent.is_deleted)
+        self.assertEqual(60, parent.expected_duration_minutes)
+        self.assertEqual(Decimal('12.34'), parent.expected_cost)
+        self.assertEqual(0, parent.order_num)
+        self.assertIsNone(parent.parent)
+        self.assertEqual(5, child.order_num)
+        self.assertIs(parent, child.parent)
+        self.assertEqual([child], list(parent.children))
+        self.assertTrue(other.is_deleted)
+        tag = self.pl.get_tag(21)
+        self.assertEqual([tag], list(child.tags))
+        user = self.pl.get_user(31)
+        self.assertEqual([user], list(child.users))
+        self.assertEqual([other], list(child.dependees))
+        self.assertEqual([parent], list(child.prioritize_before))
+        comment = self.pl.get_comment(41)
+        self.assertEqual('comment', comment.content)
+        self.assertEqual(datetime(2018, 1, 1), comment.timestamp)
+        self.assertIs(child, comment.task)
+        attachment = self.pl.get_attachment(51)
+        self.assertEqual('a.txt', attachment.path)
+        self.assertIs(parent, attachment.task)
+        self.assertEqual('val', self.pl.get_option('opt').value)
+
+    def test_tasks_are_stamped_like_the_orm_path(self):
+        # when
+        self.ll.do_import_data(generate_src(), bulk=True)
+        # then
+        for task_id in (11, 12, 13):
+            task = self.pl.get_task(task_id)
+            self.assertIsNotNone(task.date_created)
+            self.assertEqual(task.date_created, task.date_last_updated)
+
+    def test_new_id_numbers_keep_links(self):
+        # given
+        pre = self.pl.create_task('pre-existing')
+        self.pl.add(pre)
+        self.pl.commit()
+        # when
+        self.ll.do_import_data(generate_src(), keep_id_numbers=False,
+                               bulk=True)
+        # then
+        self.assertEqual(4, self.pl.count_tasks())
+        child = list(self.pl.get_tasks(summary_description_search_term=
+                                       'child'))[0]
+        self.assertEqual('parent', child.parent.summary)
+        self.assertEqual(['other'], [t.summary for t in child.dependees])
+        self.assertEqual(['tag'], [t.value for t in child.tags])
+        self.assertEqual(['user@example.com'],
+                         [u.email for u in child.users])
+        self.assertEqual(['comment'], [c.content for c in child.comments])
+
+    def test_chunks_report_progress(self):
+        # given
+        progress = Mock()
+        # when
+        self.ll.do_import_data(generate_src(), bulk=True, chunk_size=2,
+                               progress=progress)
+        # then
+        self.assertEqual(3, self.pl.count_tasks())
+        progress.assert_any_call('tasks', 2, 3)
+        progress.assert_any_call('tasks', 3, 3)
+        progress.assert_any_call('task parents', 1, 1)
+        progress.assert_any_call('task tags', 1, 1)
+
+    def test_conflicting_task_id_raises(self):
+        # given
+        t0 = self.pl.create_task('pre-existing')
+        t0.id = 11
+        self.pl.add(t0)
+        self.pl.commit()
+        # expect
+        with self.assertRaises(Conflict):
+            self.ll.do_import_data(generate_src(), bulk=True)
+        # and
+        self.assertEqual(1, self.pl.count_tasks())
+
+    def test_bad_reference_raises_before_writing_anything(self):
+        # given
+        src = generate_src()
+        src['tasks'][2]['tag_ids'] = [999]
+        # expect
+        with self.assertRaises(BadRequest):
+            self.ll.do_import_data(src, bulk=True, chunk_size=1)
+        # and
+        self.assertEqual(0, self.pl.count_tasks())
+        self.assertEqual(0, self.pl.count_tags())
+
+
+class InMemoryBulkImportTest(BulkImportTestBase, unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+
+
+class SqlAlchemyBulkImportTest(BulkImportTestBase, unittest.TestCase):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
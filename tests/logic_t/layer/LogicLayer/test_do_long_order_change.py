@@ -4,7 +4,9 @@ import unittest
 
 from werkzeug.exceptions import NotFound, Forbidden, Conflict
 
+from logic.layer import ORDER_NUM_GAP
 from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
 
 
 class LongOrderChangeTest(unittest.TestCase):
@@ -31,7 +33,7 @@ class LongOrderChangeTest(unittest.TestCase):
                                               admin)
         self.pl.commit()
         # then
-        self.assertEqual(4, task_to_move.order_num)
+        self.assertEqual(2 + ORDER_NUM_GAP, task_to_move.order_num)
         self.assertEqual(2, target.order_num)
         # and
         self.assertIsInstance(result, tuple)
@@ -196,7 +198,7 @@ class LongOrderChangeTest(unittest.TestCase):
             self.ll.do_long_order_change,
             task_to_move.id, target.id, admin)
 
-    def test_reorders_all_siblings_even_those_not_involved_in_the_move(self):
+    def test_no_room_above_target_spreads_siblings_out(self):
         # given
         task_to_move = self.pl.create_task('task_to_move')
         task_to_move.order_num = 43
@@ -248,13 +250,53 @@ class LongOrderChangeTest(unittest.TestCase):
         self.ll.do_long_order_change(task_to_move.id, target.id, admin)
         self.pl.commit()
         # then
-        self.assertEqual(2, s1.order_num)
-        self.assertEqual(4, s2.order_num)
-        self.assertEqual(6, s3.order_num)
-        self.assertEqual(8, s4.order_num)
-        self.assertEqual(10, s5.order_num)
-        self.assertEqual(12, target.order_num)
-        self.assertEqual(14, task_to_move.order_num)  # this one moved
-        self.assertEqual(16, s6.order_num)
-        self.assertEqual(18, s7.order_num)
-        self.assertEqual(20, s8.order_num)
+        self.assertEqual(1 * ORDER_NUM_GAP, s1.order_num)
+        self.assertEqual(2 * ORDER_NUM_GAP, s2.order_num)
+        self.assertEqual(4 * ORDER_NUM_GAP, s3.order_num)
+        self.assertEqual(5 * ORDER_NUM_GAP, s4.order_num)
+        self.assertEqual(6 * ORDER_NUM_GAP, s5.order_num)
+        self.assertEqual(7 * ORDER_NUM_GAP, target.order_num)
+        self.assertEqual(15 * ORDER_NUM_GAP // 2,
+                         task_to_move.order_num)  # this one moved
+        self.assertEqual(8 * ORDER_NUM_GAP, s6.order_num)
+        self.assertEqual(9 * ORDER_NUM_GAP, s7.order_num)
+        self.assertEqual(10 * ORDER_NUM_GAP, s8.order_num)
+
+    def test_only_the_moved_task_changes_when_there_is_room(self):
+        # given
+        s1 = self.pl.create_task('s1')
+        s1.order_num = 4000
+        self.pl.add(s1)
+        target = self.pl.create_task('target')
+        target.order_num = 3000
+        self.pl.add(target)
+        s2 = self.pl.create_task('s2')
+        s2.order_num = 2000
+        self.pl.add(s2)
+        task_to_move = self.pl.create_task('task_to_move')
+        task_to_move.order_num = 1000
+        self.pl.add(task_to_move)
+        admin = self.pl.create_user('user@example.com', is_admin=True)
+        self.pl.add(admin)
+        self.pl.commit()
+        # when
+        self.ll.do_long_order_change(task_to_move.id, target.id, admin)
+        self.pl.commit()
+        # then
+        self.assertEqual(4000, s1.order_num)
+        self.assertEqual(3500, task_to_move.order_num)  # this one moved
+        self.assertEqual(3000, target.order_num)
+        self.assertEqual(2000, s2.order_num)
+
+
+class SqlAlchemyLongOrderChangeTest(LongOrderChangeTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
@@ -4,6 +4,8 @@ import unittest
 
 from werkzeug.exceptions import NotFound, Forbidden
 
+from logic.layer import ORDER_NUM_GAP
+from tudor import generate_app
 from .util import generate_ll
 
 
@@ -55,47 +57,47 @@ class DoMoveTaskDownTest(unittest.TestCase):
     def test_moves_task_down(self):
         # given
         t1 = self.pl.create_task('t1')
-        t1.order_num = 10
+        t1.order_num = 10000
         t1.users.append(self.user)
         t2 = self.pl.create_task('t2')
-        t2.order_num = 5
+        t2.order_num = 5000
         t2.users.append(self.user)
         self.pl.add(t1)
         self.pl.add(t2)
         self.pl.commit()
         # precondition
-        self.assertEqual(10, t1.order_num)
-        self.assertEqual(5, t2.order_num)
+        self.assertEqual(10000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
         # when
         result = self.ll.do_move_task_down(t1.id, False, self.user)
         # then
         self.assertIs(t1, result)
-        self.assertEqual(5, t1.order_num)
-        self.assertEqual(10, t2.order_num)
+        self.assertEqual(5000 - ORDER_NUM_GAP, t1.order_num)  #
+        self.assertEqual(5000, t2.order_num)
 
     def test_move_does_not_affect_children(self):
         # given
         p1 = self.pl.create_task('p1')
-        p1.order_num = 7
+        p1.order_num = 7000
         p1.users.append(self.user)
         c1 = self.pl.create_task('c1')
         c1.parent = p1
-        c1.order_num = 6
+        c1.order_num = 6000
         c1.users.append(self.user)
         c2 = self.pl.create_task('c2')
         c2.parent = p1
-        c2.order_num = 5
+        c2.order_num = 5000
         c2.users.append(self.user)
         p2 = self.pl.create_task('p2')
-        p2.order_num = 4
+        p2.order_num = 4000
         p2.users.append(self.user)
         c3 = self.pl.create_task('c3')
         c3.parent = p2
-        c3.order_num = 3
+        c3.order_num = 3000
         c3.users.append(self.user)
         c4 = self.pl.create_task('c4')
         c4.parent = p2
-        c4.order_num = 2
+        c4.order_num = 2000
         c4.users.append(self.user)
         self.pl.add(p1)
         self.pl.add(c1)
@@ -105,47 +107,47 @@ class DoMoveTaskDownTest(unittest.TestCase):
         self.pl.add(c4)
         self.pl.commit()
         # precondition
-        self.assertEqual(7, p1.order_num)
-        self.assertEqual(6, c1.order_num)
-        self.assertEqual(5, c2.order_num)
-        self.assertEqual(4, p2.order_num)
-        self.assertEqual(3, c3.order_num)
-        self.assertEqual(2, c4.order_num)
+        self.assertEqual(7000, p1.order_num)
+        self.assertEqual(6000, c1.order_num)
+        self.assertEqual(5000, c2.order_num)
+        self.assertEqual(4000, p2.order_num)
+        self.assertEqual(3000, c3.order_num)
+        self.assertEqual(2000, c4.order_num)
         # when
         result = self.ll.do_move_task_down(p1.id, False, self.user)
         # then
         self.assertIs(p1, result)
-        self.assertEqual(4, p1.order_num)  #
-        self.assertEqual(6, c1.order_num)
-        self.assertEqual(5, c2.order_num)
-        self.assertEqual(7, p2.order_num)  #
-        self.assertEqual(3, c3.order_num)
-        self.assertEqual(2, c4.order_num)
+        self.assertEqual(4000 - ORDER_NUM_GAP, p1.order_num)  #
+        self.assertEqual(6000, c1.order_num)
+        self.assertEqual(5000, c2.order_num)
+        self.assertEqual(4000, p2.order_num)
+        self.assertEqual(3000, c3.order_num)
+        self.assertEqual(2000, c4.order_num)
 
     def test_move_does_not_affect_other_siblings_nor_parent(self):
         # given
         p1 = self.pl.create_task('p1')
-        p1.order_num = 7
+        p1.order_num = 7000
         p1.users.append(self.user)
         c1 = self.pl.create_task('c1')
         c1.parent = p1
-        c1.order_num = 6
+        c1.order_num = 6000
         c1.users.append(self.user)
         c2 = self.pl.create_task('c2')
         c2.parent = p1
-        c2.order_num = 5
+        c2.order_num = 5000
         c2.users.append(self.user)
         c3 = self.pl.create_task('c3')
         c3.parent = p1
-        c3.order_num = 4
+        c3.order_num = 4000
         c3.users.append(self.user)
         c4 = self.pl.create_task('c4')
         c4.parent = p1
-        c4.order_num = 3
+        c4.order_num = 3000
         c4.users.append(self.user)
         c5 = self.pl.create_task('c5')
         c5.parent = p1
-        c5.order_num = 2
+        c5.order_num = 2000
         c5.users.append(self.user)
         self.pl.add(p1)
         self.pl.add(c1)
@@ -155,39 +157,39 @@ class DoMoveTaskDownTest(unittest.TestCase):
         self.pl.add(c5)
         self.pl.commit()
         # precondition
-        self.assertEqual(7, p1.order_num)
-        self.assertEqual(6, c1.order_num)
-        self.assertEqual(5, c2.order_num)
-        self.assertEqual(4, c3.order_num)
-        self.assertEqual(3, c4.order_num)
-        self.assertEqual(2, c5.order_num)
+        self.assertEqual(7000, p1.order_num)
+        self.assertEqual(6000, c1.order_num)
+        self.assertEqual(5000, c2.order_num)
+        self.assertEqual(4000, c3.order_num)
+        self.assertEqual(3000, c4.order_num)
+        self.assertEqual(2000, c5.order_num)
         # when
         result = self.ll.do_move_task_down(c3.id, False, self.user)
         # then
         self.assertIs(c3, result)
-        self.assertEqual(7, p1.order_num)
-        self.assertEqual(6, c1.order_num)
-        self.assertEqual(5, c2.order_num)
-        self.assertEqual(3, c3.order_num)  #
-        self.assertEqual(4, c4.order_num)  #
-        self.assertEqual(2, c5.order_num)
+        self.assertEqual(7000, p1.order_num)
+        self.assertEqual(6000, c1.order_num)
+        self.assertEqual(5000, c2.order_num)
+        self.assertEqual(2500, c3.order_num)  #
+        self.assertEqual(3000, c4.order_num)
+        self.assertEqual(2000, c5.order_num)
 
     def test_move_does_not_affect_other_top_level_tasks(self):
         # given
         t1 = self.pl.create_task('t1')
-        t1.order_num = 6
+        t1.order_num = 6000
         t1.users.append(self.user)
         t2 = self.pl.create_task('t2')
-        t2.order_num = 5
+        t2.order_num = 5000
         t2.users.append(self.user)
         t3 = self.pl.create_task('t3')
-        t3.order_num = 4
+        t3.order_num = 4000
         t3.users.append(self.user)
         t4 = self.pl.create_task('t4')
-        t4.order_num = 3
+        t4.order_num = 3000
         t4.users.append(self.user)
         t5 = self.pl.create_task('t5')
-        t5.order_num = 2
+        t5.order_num = 2000
         t5.users.append(self.user)
         self.pl.add(t1)
         self.pl.add(t2)
@@ -196,58 +198,58 @@ class DoMoveTaskDownTest(unittest.TestCase):
         self.pl.add(t5)
         self.pl.commit()
         # precondition
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
-        self.assertEqual(4, t3.order_num)
-        self.assertEqual(3, t4.order_num)
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
+        self.assertEqual(4000, t3.order_num)
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
         # when
         result = self.ll.do_move_task_down(t3.id, False, self.user)
         # then
         self.assertIs(t3, result)
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
-        self.assertEqual(3, t3.order_num)  #
-        self.assertEqual(4, t4.order_num)  #
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
+        self.assertEqual(2500, t3.order_num)  #
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
 
     def test_move_does_not_move_first_task(self):
         # given
         t1 = self.pl.create_task('t1')
-        t1.order_num = 6
+        t1.order_num = 6000
         t1.users.append(self.user)
         t2 = self.pl.create_task('t2')
-        t2.order_num = 5
+        t2.order_num = 5000
         t2.users.append(self.user)
         self.pl.add(t1)
         self.pl.add(t2)
         self.pl.commit()
         # precondition
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
         # when
         result = self.ll.do_move_task_down(t2.id, False, self.user)
         # then
         self.assertIs(t2, result)
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
 
     def test_move_show_deleted_false_skips_deleted_tasks(self):
         # given
         t1 = self.pl.create_task('t1')
-        t1.order_num = 6
+        t1.order_num = 6000
         t1.users.append(self.user)
         t2 = self.pl.create_task('t2')
-        t2.order_num = 5
+        t2.order_num = 5000
         t2.users.append(self.user)
         t3 = self.pl.create_task('t3', is_deleted=True)
-        t3.order_num = 4
+        t3.order_num = 4000
         t3.users.append(self.user)
         t4 = self.pl.create_task('t4')
-        t4.order_num = 3
+        t4.order_num = 3000
         t4.users.append(self.user)
         t5 = self.pl.create_task('t5')
-        t5.order_num = 2
+        t5.order_num = 2000
         t5.users.append(self.user)
         self.pl.add(t1)
         self.pl.add(t2)
@@ -256,37 +258,37 @@ class DoMoveTaskDownTest(unittest.TestCase):
         self.pl.add(t5)
         self.pl.commit()
         # precondition
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
-        self.assertEqual(4, t3.order_num)
-        self.assertEqual(3, t4.order_num)
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
+        self.assertEqual(4000, t3.order_num)
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
         # when
         result = self.ll.do_move_task_down(t2.id, False, self.user)
         # then
         self.assertIs(t2, result)
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(3, t2.order_num)  #
-        self.assertEqual(4, t3.order_num)  #
-        self.assertEqual(5, t4.order_num)  #
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(2500, t2.order_num)  #
+        self.assertEqual(4000, t3.order_num)
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
 
     def test_move_show_deleted_true_does_not_skip_deleted_tasks(self):
         # given
         t1 = self.pl.create_task('t1')
-        t1.order_num = 6
+        t1.order_num = 6000
         t1.users.append(self.user)
         t2 = self.pl.create_task('t2')
-        t2.order_num = 5
+        t2.order_num = 5000
         t2.users.append(self.user)
         t3 = self.pl.create_task('t3', is_deleted=True)
-        t3.order_num = 4
+        t3.order_num = 4000
         t3.users.append(self.user)
         t4 = self.pl.create_task('t4')
-        t4.order_num = 3
+        t4.order_num = 3000
         t4.users.append(self.user)
         t5 = self.pl.create_task('t5')
-        t5.order_num = 2
+        t5.order_num = 2000
         t5.users.append(self.user)
         self.pl.add(t1)
         self.pl.add(t2)
@@ -295,22 +297,22 @@ class DoMoveTaskDownTest(unittest.TestCase):
         self.pl.add(t5)
         self.pl.commit()
         # precondition
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(5, t2.order_num)
-        self.assertEqual(4, t3.order_num)
-        self.assertEqual(3, t4.order_num)
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(5000, t2.order_num)
+        self.assertEqual(4000, t3.order_num)
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
         # when
         result = self.ll.do_move_task_down(t2.id, True, self.user)
         # then
         self.assertIs(t2, result)
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(4, t2.order_num)  #
-        self.assertEqual(5, t3.order_num)  #
-        self.assertEqual(3, t4.order_num)
-        self.assertEqual(2, t5.order_num)
+        self.assertEqual(6000, t1.order_num)
+        self.assertEqual(3500, t2.order_num)  #
+        self.assertEqual(4000, t3.order_num)
+        self.assertEqual(3000, t4.order_num)
+        self.assertEqual(2000, t5.order_num)
 
-    def test_move_same_order_num_causes_tasks_to_be_reordered(self):
+    def test_move_same_order_num_puts_task_below_the_other(self):
         # given
         t1 = self.pl.create_task('t1')
         t1.order_num = 6
@@ -343,8 +345,47 @@ class DoMoveTaskDownTest(unittest.TestCase):
         result = self.ll.do_move_task_down(t3.id, False, self.user)
         # then
         self.assertIs(t3, result)
-        self.assertEqual(10, t1.order_num)
-        self.assertEqual(8, t2.order_num)
-        self.assertEqual(4, t3.order_num)
-        self.assertEqual(6, t4.order_num)
+        self.assertEqual(6, t1.order_num)
+        self.assertEqual(5, t2.order_num)
+        self.assertEqual(3, t3.order_num)  #
+        self.assertEqual(4, t4.order_num)
         self.assertEqual(2, t5.order_num)
+
+
+    def test_no_room_between_siblings_spreads_them_out(self):
+        # given
+        t1 = self.pl.create_task('t1')
+        t1.order_num = 3
+        t1.users.append(self.user)
+        t2 = self.pl.create_task('t2')
+        t2.order_num = 2
+        t2.users.append(self.user)
+        t3 = self.pl.create_task('t3')
+        t3.order_num = 1
+        t3.users.append(self.user)
+        self.pl.add(t1)
+        self.pl.add(t2)
+        self.pl.add(t3)
+        self.pl.commit()
+        # when
+        result = self.ll.do_move_task_down(t1.id, False, self.user)
+        # then
+        self.assertIs(t1, result)
+        self.assertEqual(3 * ORDER_NUM_GAP // 2, t1.order_num)
+        self.assertEqual(2 * ORDER_NUM_GAP, t2.order_num)
+        self.assertEqual(ORDER_NUM_GAP, t3.order_num)
+
+class SqlAlchemyDoMoveTaskDownTest(DoMoveTaskDownTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+        self.user = self.pl.create_user('name@example.com')
+        self.task = self.pl.create_task('task')
+        self.task.id = 1
+
+    def tearDown(self):
+        self.app_context.pop()
@@ -4,6 +4,7 @@ import unittest
 
 from werkzeug.exceptions import NotFound, Forbidden
 
+from logic.layer import ORDER_NUM_GAP
 from .util import generate_ll
 
 
@@ -75,7 +76,7 @@ class DoMoveTaskToBottomTest(unittest.TestCase):
         result = self.ll.do_move_task_to_bottom(t1.id, self.user)
         # then
         self.assertIs(t1, result)
-        self.assertEqual(3, t1.order_num)  #
+        self.assertEqual(5 - ORDER_NUM_GAP, t1.order_num)  #
         self.assertEqual(10, t2.order_num)
         self.assertEqual(5, t3.order_num)
 
@@ -138,7 +139,7 @@ class DoMoveTaskToBottomTest(unittest.TestCase):
         result = self.ll.do_move_task_to_bottom(p1.id, self.user)
         # then
         self.assertIs(p1, result)
-        self.assertEqual(2, p1.order_num)   #
+        self.assertEqual(4 - ORDER_NUM_GAP, p1.order_num)  #
         self.assertEqual(9, c1.order_num)
         self.assertEqual(8, c2.order_num)
         self.assertEqual(7, p2.order_num)
@@ -193,7 +194,7 @@ class DoMoveTaskToBottomTest(unittest.TestCase):
         self.assertIs(c2, result)
         self.assertEqual(7, p1.order_num)
         self.assertEqual(6, c1.order_num)
-        self.assertEqual(0, c2.order_num)  #
+        self.assertEqual(2 - ORDER_NUM_GAP, c2.order_num)  #
         self.assertEqual(4, c3.order_num)
         self.assertEqual(3, c4.order_num)
         self.assertEqual(2, c5.order_num)
@@ -233,7 +234,7 @@ class DoMoveTaskToBottomTest(unittest.TestCase):
         self.assertIs(t3, result)
         self.assertEqual(6, t1.order_num)
         self.assertEqual(5, t2.order_num)
-        self.assertEqual(0, t3.order_num)  #
+        self.assertEqual(2 - ORDER_NUM_GAP, t3.order_num)  #
         self.assertEqual(3, t4.order_num)
         self.assertEqual(2, t5.order_num)
 
@@ -293,6 +294,6 @@ class DoMoveTaskToBottomTest(unittest.TestCase):
         self.assertIs(t3, result)
         self.assertEqual(6, t1.order_num)
         self.assertEqual(5, t2.order_num)
-        self.assertEqual(0, t3.order_num)  #
+        self.assertEqual(2 - ORDER_NUM_GAP, t3.order_num)  #
         self.assertEqual(3, t4.order_num)
         self.assertEqual(2, t5.order_num)
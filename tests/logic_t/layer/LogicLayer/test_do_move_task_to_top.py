@@ -4,6 +4,7 @@ import unittest
 
 from werkzeug.exceptions import NotFound, Forbidden
 
+from logic.layer import ORDER_NUM_GAP
 from .util import generate_ll
 
 
@@ -77,7 +78,7 @@ class DoMoveTaskToTopTest(unittest.TestCase):
         self.assertIs(t3, result)
         self.assertEqual(15, t1.order_num)
         self.assertEqual(10, t2.order_num)
-        self.assertEqual(16, t3.order_num)  #
+        self.assertEqual(15 + ORDER_NUM_GAP, t3.order_num)  #
 
     def test_move_does_not_affect_children(self):
         # given
@@ -144,7 +145,7 @@ class DoMoveTaskToTopTest(unittest.TestCase):
         self.assertEqual(7, p2.order_num)
         self.assertEqual(6, c3.order_num)
         self.assertEqual(5, c4.order_num)
-        self.assertEqual(11, p3.order_num)  #
+        self.assertEqual(10 + ORDER_NUM_GAP, p3.order_num)  #
         self.assertEqual(3, c5.order_num)
         self.assertEqual(2, c6.order_num)
 
@@ -196,7 +197,7 @@ class DoMoveTaskToTopTest(unittest.TestCase):
         self.assertEqual(5, c2.order_num)
         self.assertEqual(4, c3.order_num)
         self.assertEqual(3, c4.order_num)
-        self.assertEqual(7, c5.order_num)  #
+        self.assertEqual(6 + ORDER_NUM_GAP, c5.order_num)  #
 
     def test_move_does_not_affect_other_top_level_tasks(self):
         # given
@@ -233,7 +234,7 @@ class DoMoveTaskToTopTest(unittest.TestCase):
         self.assertIs(t3, result)
         self.assertEqual(6, t1.order_num)
         self.assertEqual(5, t2.order_num)
-        self.assertEqual(7, t3.order_num)  #
+        self.assertEqual(6 + ORDER_NUM_GAP, t3.order_num)  #
         self.assertEqual(3, t4.order_num)
         self.assertEqual(2, t5.order_num)
 
@@ -293,6 +294,6 @@ class DoMoveTaskToTopTest(unittest.TestCase):
         self.assertIs(t3, result)
         self.assertEqual(6, t1.order_num)
         self.assertEqual(5, t2.order_num)
-        self.assertEqual(7, t3.order_num)  #
+        self.assertEqual(6 + ORDER_NUM_GAP, t3.order_num)  #
         self.assertEqual(3, t4.order_num)
         self.assertEqual(2, t5.order_num)
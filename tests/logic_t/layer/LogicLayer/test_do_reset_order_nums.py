@@ -2,7 +2,9 @@
 
 import unittest
 
+from logic.layer import ORDER_NUM_GAP
 from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
 
 
 class ResetOrderNumsTest(unittest.TestCase):
@@ -72,9 +74,9 @@ class ResetOrderNumsTest(unittest.TestCase):
         results = self.ll.do_reset_order_nums(self.admin)
 
         # then
-        self.assertEqual(6, t1.order_num)
-        self.assertEqual(8, t2.order_num)
-        self.assertEqual(10, t3.order_num)
+        self.assertEqual(ORDER_NUM_GAP, t1.order_num)
+        self.assertEqual(2 * ORDER_NUM_GAP, t2.order_num)
+        self.assertEqual(3 * ORDER_NUM_GAP, t3.order_num)
 
     def test_tasks_with_same_order_num_get_reordered_arbitrarily(self):
 
@@ -130,11 +132,59 @@ class ResetOrderNumsTest(unittest.TestCase):
 
         # then
         self.assertEqual([None, t4, t3, t2], results)
-        self.assertEqual(6, t2.order_num)
-        self.assertEqual(8, t3.order_num)
-        self.assertEqual(10, t4.order_num)
+        self.assertEqual(ORDER_NUM_GAP, t2.order_num)
+        self.assertEqual(2 * ORDER_NUM_GAP, t3.order_num)
+        self.assertEqual(3 * ORDER_NUM_GAP, t4.order_num)
         self.assertEqual(1, t1.order_num)
         self.assertEqual(5, t5.order_num)
         self.assertNotEqual(t1.order_num, t2.order_num)
         self.assertNotEqual(t1.order_num, t3.order_num)
         self.assertNotEqual(t2.order_num, t3.order_num)
+
+
+    def test_children_are_numbered_within_their_parent(self):
+
+        # given
+        p = self.pl.create_task('p')
+        p.order_num = 5
+        q = self.pl.create_task('q')
+        q.order_num = 1
+        c1 = self.pl.create_task('c1')
+        c1.order_num = 3
+        c1.parent = p
+        c2 = self.pl.create_task('c2')
+        c2.order_num = 4
+        c2.parent = p
+
+        self.pl.add(p)
+        self.pl.add(q)
+        self.pl.add(c1)
+        self.pl.add(c2)
+        self.pl.commit()
+
+        # when
+        results = self.ll.do_reset_order_nums(self.admin)
+
+        # then
+        self.assertEqual([None, p, c2, c1, q], results)
+        self.assertEqual(2 * ORDER_NUM_GAP, p.order_num)
+        self.assertEqual(ORDER_NUM_GAP, q.order_num)
+        self.assertEqual(2 * ORDER_NUM_GAP, c2.order_num)
+        self.assertEqual(ORDER_NUM_GAP, c1.order_num)
+
+class SqlAlchemyResetOrderNumsTest(ResetOrderNumsTest):
+
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+        self.admin = self.pl.create_user('name@example.org', None, True)
+        self.pl.add(self.admin)
+        self.user = self.pl.create_user('name2@example.org', None, False)
+        self.pl.add(self.user)
+
+    def tearDown(self):
+        self.app_context.pop()
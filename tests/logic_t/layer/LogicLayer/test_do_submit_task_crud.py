@@ -3,7 +3,10 @@
 import unittest
 from datetime import datetime
 
+from sqlalchemy import event
+
 from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
 
 
 class SubmitTaskCrudTest(unittest.TestCase):
@@ -286,6 +289,43 @@ class SubmitTaskCrudTest(unittest.TestCase):
         # then
         self.assertEqual('something else', task.summary)
 
+    def test_leaves_tasks_not_in_crud_data_alone(self):
+        # given
+        t1 = self.pl.create_task('t1', deadline='2017-01-01', is_done=True)
+        self.pl.add(t1)
+        t2 = self.pl.create_task('t2')
+        self.pl.add(t2)
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        self.pl.commit()
+        crud_data = {'task_{}_summary'.format(t2.id): 't3'}
+        # when
+        self.ll.do_submit_task_crud(crud_data, admin)
+        self.pl.commit()
+        # then
+        self.assertEqual('t1', t1.summary)
+        self.assertEqual(datetime(2017, 1, 1), t1.deadline)
+        self.assertTrue(t1.is_done)
+        self.assertEqual('t3', t2.summary)
+
+    def test_nonexistent_parent_id_clears_parent(self):
+        # given
+        task = self.pl.create_task('task')
+        self.pl.add(task)
+        p1 = self.pl.create_task('p1')
+        self.pl.add(p1)
+        task.parent = p1
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        self.pl.commit()
+        key = 'task_{}_parent_id'.format(task.id)
+        crud_data = {key: p1.id + task.id + 100}
+        # when
+        self.ll.do_submit_task_crud(crud_data, admin)
+        self.pl.commit()
+        # then
+        self.assertIsNone(task.parent)
+
     def test_guest_user_raises(self):
         # given
         user = self.pl.get_guest_user()
@@ -304,3 +344,62 @@ class SubmitTaskCrudTest(unittest.TestCase):
             ValueError,
             self.ll.do_submit_task_crud,
             crud_data, None)
+
+
+class SqlAlchemySubmitTaskCrudTest(SubmitTaskCrudTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
+
+    def count_selects(self, crud_data, current_user):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith('SELECT'):
+                statements.append(statement)
+
+        engine = self.pl.db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            self.ll.do_submit_task_crud(crud_data, current_user)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return len(statements)
+
+    def test_query_count_does_not_depend_on_number_of_tasks(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        parents = []
+        for i in range(5):
+            parent = self.pl.create_task('p{}'.format(i))
+            parent.id = i + 1
+            self.pl.add(parent)
+            parents.append(parent)
+        for i in range(50):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = i + 100
+            task.parent = parents[i % 5]
+            self.pl.add(task)
+        self.pl.commit()
+
+        def crud_data(task_ids):
+            return {'task_{}_parent_id'.format(task_id):
+                    str((task_id + 1) % 5 + 1) for task_id in task_ids}
+
+        # when
+        few = self.count_selects(crud_data(range(100, 105)), admin)
+        self.pl.commit()
+        many = self.count_selects(crud_data(range(100, 150)), admin)
+        self.pl.commit()
+        # then
+        self.assertEqual(few, many)
+        self.assertEqual(parents[(149 + 1) % 5],
+                         self.pl.get_task(149).parent)
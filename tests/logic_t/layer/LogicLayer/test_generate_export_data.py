@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+
+import gzip
+import json
+import unittest
+
+from werkzeug.exceptions import BadRequest
+
+from logic.export_v2 import read_ndjson
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+
+ALL_TYPES = {'tasks', 'tags', 'comments', 'attachments', 'users', 'options'}
+
+
+class GenerateExportDataTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+        self.parent = self.pl.create_task('parent')
+        self.parent.id = 1
+        self.child = self.pl.create_task('child')
+        self.child.id = 2
+        self.child.parent = self.parent
+        tag = self.pl.create_tag('tag')
+        self.child.tags.append(tag)
+        self.pl.add(self.parent)
+        self.pl.add(self.child)
+        self.pl.add(tag)
+        self.pl.add(self.pl.create_option('key', 'value'))
+        self.pl.commit()
+
+    def test_json_matches_do_export_data(self):
+        # when
+        chunks = self.ll.generate_export_data(ALL_TYPES)
+        # then
+        result = json.loads(b''.join(chunks))
+        self.assertEqual(self.ll.do_export_data(ALL_TYPES), result)
+
+    def test_json_only_includes_requested_types(self):
+        # when
+        chunks = self.ll.generate_export_data({'tags'})
+        # then
+        result = json.loads(b''.join(chunks))
+        self.assertEqual({'format_version', 'tags'}, set(result))
+
+    def test_ndjson_round_trips(self):
+        # when
+        chunks = self.ll.generate_export_data(ALL_TYPES, fmt='ndjson')
+        # then
+        lines = b''.join(chunks).splitlines()
+        self.assertEqual(
+            {'format_version': 2,
+             'types': ['tasks', 'tags', 'comments', 'attachments', 'users',
+                       'options']},
+            json.loads(lines[0]))
+        self.assertEqual(
+            {'type': 'tasks', 'data': self.parent.to_flat_dict()},
+            json.loads(lines[1]))
+        self.assertEqual(self.ll.do_export_data(ALL_TYPES),
+                         read_ndjson(lines))
+
+    def test_gzip_compresses_output(self):
+        # when
+        chunks = self.ll.generate_export_data(ALL_TYPES, compress=True)
+        # then
+        result = json.loads(gzip.decompress(b''.join(chunks)))
+        self.assertEqual(self.ll.do_export_data(ALL_TYPES), result)
+
+    def test_unknown_format_raises(self):
+        # expect
+        with self.assertRaises(BadRequest):
+            self.ll.generate_export_data(ALL_TYPES, fmt='xml')
+
+    def test_exported_ndjson_can_be_imported(self):
+        # given
+        chunks = self.ll.generate_export_data({'tasks', 'tags'},
+                                              fmt='ndjson')
+        src = read_ndjson(b''.join(chunks).splitlines())
+        ll2 = generate_ll()
+        # when
+        ll2.do_import_data(src)
+        # then
+        child = ll2.pl.get_task(2)
+        self.assertEqual(1, child.parent.id)
+        self.assertEqual(['tag'], [t.value for t in child.tags])
+
+    def test_unit_of_work_is_held_while_chunks_are_read(self):
+        # given
+        chunks = self.ll.generate_export_data(ALL_TYPES, fmt='ndjson')
+        # precondition
+        self.assertFalse(self.pl.in_transaction())
+        # when
+        next(chunks)
+        # then
+        self.assertTrue(self.pl.in_transaction())
+        # when
+        list(chunks)
+        # then
+        self.assertFalse(self.pl.in_transaction())
+
+    def test_unit_of_work_ends_if_the_export_is_abandoned(self):
+        # given
+        chunks = self.ll.generate_export_data(ALL_TYPES, fmt='ndjson')
+        next(chunks)
+        # when
+        chunks.close()
+        # then
+        self.assertFalse(self.pl.in_transaction())
@@ -2,6 +2,8 @@
 
 import unittest
 
+import werkzeug.exceptions
+
 from tests.logic_t.layer.LogicLayer.util import generate_ll
 
 
@@ -46,6 +48,45 @@ class GetIndexDataTest(unittest.TestCase):
         self.assertEqual([t4, t2, t1], list(data['tasks']))
         self.assertEqual([tag1], data['all_tags'])
 
+    def test_cursor_uses_keyset_pagination(self):
+        # given
+        t1 = self.pl.create_task('t1')
+        t1.order_num = 1
+        t2 = self.pl.create_task('t2')
+        t2.order_num = 2
+        t3 = self.pl.create_task('t3')
+        t3.order_num = 3
+        self.pl.add(t1)
+        self.pl.add(t2)
+        self.pl.add(t3)
+        self.pl.commit()
+
+        # when
+        data = self.ll.get_index_data(True, True, self.admin,
+                                      tasks_per_page=2, cursor='')
+
+        # then
+        self.assertEqual([t3, t2], list(data['tasks']))
+        pager = data['pager']
+        self.assertTrue(pager.is_cursor)
+        self.assertTrue(pager.has_next)
+
+        # when
+        data = self.ll.get_index_data(True, True, self.admin,
+                                      tasks_per_page=2,
+                                      cursor=pager.next_cursor)
+
+        # then
+        self.assertEqual([t1], list(data['tasks']))
+        self.assertFalse(data['pager'].has_next)
+
+    def test_invalid_cursor_raises_bad_request(self):
+        # expect
+        self.assertRaises(
+            werkzeug.exceptions.BadRequest,
+            self.ll.get_index_data,
+            True, True, self.admin, cursor='garbage')
+
     def test_show_deleted_returns_as_is(self):
         # when
         data = self.ll.get_index_data(True, True, self.admin)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+import unittest
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+
+
+class GetSiblingOrderNumTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+
+    def test_sibling_order_nums_only_consider_siblings(self):
+        # given
+        parent = self.pl.create_task('parent')
+        parent.order_num = 100
+        c1 = self.pl.create_task('c1')
+        c1.order_num = 20
+        c1.parent = parent
+        c2 = self.pl.create_task('c2')
+        c2.order_num = 30
+        c2.parent = parent
+        other = self.pl.create_task('other')
+        other.order_num = -5
+        self.pl.add(parent)
+        self.pl.add(c1)
+        self.pl.add(c2)
+        self.pl.add(other)
+        self.pl.commit()
+
+        # when
+        lowest = self.ll.get_lowest_sibling_order_num(parent.id)
+        highest = self.ll.get_highest_sibling_order_num(parent.id)
+        lowest_top_level = self.ll.get_lowest_sibling_order_num(None)
+
+        # then
+        self.assertEqual(20, lowest)
+        self.assertEqual(30, highest)
+        self.assertEqual(-5, lowest_top_level)
+
+    def test_no_siblings_returns_none(self):
+        # given
+        parent = self.pl.create_task('parent')
+        self.pl.add(parent)
+        self.pl.commit()
+
+        # expect
+        self.assertIsNone(self.ll.get_lowest_sibling_order_num(parent.id))
+        self.assertIsNone(self.ll.get_highest_sibling_order_num(parent.id))
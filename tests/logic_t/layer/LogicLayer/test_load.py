@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+
+import unittest
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+
+
+class LoadTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+        self.admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(self.admin)
+
+        self.t1 = self.pl.create_task('t1')
+        self.t2 = self.pl.create_task('t2')
+        self.t2.parent = self.t1
+        self.t3 = self.pl.create_task('t3', is_done=True)
+        self.t3.parent = self.t1
+        self.t4 = self.pl.create_task('t4')
+        self.t4.parent = self.t2
+        self.t5 = self.pl.create_task('t5')
+        self.t5.parent = self.t3
+        self.t6 = self.pl.create_task('t6')
+
+        self.pl.add(self.t1)
+        self.pl.add(self.t2)
+        self.pl.add(self.t3)
+        self.pl.add(self.t4)
+        self.pl.add(self.t5)
+        self.pl.add(self.t6)
+        self.pl.commit()
+
+    def test_max_depth_zero_loads_only_top_level_tasks(self):
+        # when
+        tasks = self.ll.load(current_user=self.admin)
+        # then
+        self.assertEqual({self.t1, self.t6}, set(tasks))
+        self.assertEqual(0, self.t1.depth)
+        self.assertEqual(0, self.t6.depth)
+
+    def test_max_depth_none_loads_all_descendants_with_depth(self):
+        # when
+        tasks = self.ll.load(current_user=self.admin, max_depth=None)
+        # then
+        self.assertEqual({self.t1, self.t2, self.t4, self.t6}, set(tasks))
+        self.assertEqual(0, self.t1.depth)
+        self.assertEqual(1, self.t2.depth)
+        self.assertEqual(2, self.t4.depth)
+        self.assertEqual(0, self.t6.depth)
+
+    def test_include_done_loads_done_tasks_and_their_children(self):
+        # when
+        tasks = self.ll.load(current_user=self.admin, max_depth=None,
+                             include_done=True)
+        # then
+        self.assertEqual(
+            {self.t1, self.t2, self.t3, self.t4, self.t5, self.t6},
+            set(tasks))
+        self.assertEqual(2, self.t5.depth)
+
+    def test_root_task_id_loads_subtree_relative_to_root(self):
+        # when
+        tasks = self.ll.load(current_user=self.admin, root_task_id=self.t2.id,
+                             max_depth=None)
+        # then
+        self.assertEqual({self.t2, self.t4}, set(tasks))
+        self.assertEqual(0, self.t2.depth)
+        self.assertEqual(1, self.t4.depth)
+
+    def test_max_depth_limits_levels(self):
+        # when
+        tasks = self.ll.load(current_user=self.admin, max_depth=1)
+        # then
+        self.assertEqual({self.t1, self.t2, self.t6}, set(tasks))
@@ -1,9 +1,12 @@
 #!/usr/bin/env python
 
+import os
+import tempfile
 import unittest
 
 from werkzeug.exceptions import Forbidden
 
+from tudor import generate_app
 from .util import generate_ll
 
 
@@ -41,7 +44,7 @@ class PurgeAllDeletedTasksTest(unittest.TestCase):
         self.assertEqual(1, self.pl.count_tasks(is_deleted=False))
         self.assertIs(t2, list(self.pl.get_tasks())[0])
         # and
-        self.assertEqual(2, result)
+        self.assertEqual(2, result['tasks'])
 
     def test_non_admin_raises(self):
         # given
@@ -79,4 +82,83 @@ class PurgeAllDeletedTasksTest(unittest.TestCase):
         self.assertEqual(0, self.pl.count_tasks(is_deleted=True))
         self.assertEqual(1, self.pl.count_tasks(is_deleted=False))
         # and
-        self.assertEqual(0, result)
+        self.assertEqual(0, result['tasks'])
+
+    def test_removes_comments_and_attachments(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        task = self.pl.create_task('task')
+        task.is_deleted = True
+        self.pl.add(task)
+        comment = self.pl.create_comment('comment')
+        comment.task = task
+        self.pl.add(comment)
+        attachment = self.pl.create_attachment('a.txt')
+        attachment.task = task
+        self.pl.add(attachment)
+        self.pl.commit()
+        # when
+        result = self.ll.purge_all_deleted_tasks(admin)
+        # then
+        self.assertEqual(1, result['tasks'])
+        self.assertEqual(1, result['comments'])
+        self.assertEqual(1, result['attachments'])
+        self.assertEqual(0, self.pl.count_comments())
+        self.assertEqual(0, self.pl.count_attachments())
+
+    def test_deletes_attachment_files(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        task = self.pl.create_task('task')
+        task.is_deleted = True
+        self.pl.add(task)
+        attachment = self.pl.create_attachment('a.txt')
+        attachment.task = task
+        self.pl.add(attachment)
+        missing = self.pl.create_attachment('missing.txt')
+        missing.task = task
+        self.pl.add(missing)
+        self.pl.commit()
+        with tempfile.TemporaryDirectory() as upload_folder:
+            self.ll.upload_folder = upload_folder
+            path = os.path.join(upload_folder, 'a.txt')
+            with open(path, 'w') as f:
+                f.write('content')
+            # when
+            self.ll.purge_all_deleted_tasks(admin)
+            # then
+            self.assertFalse(os.path.exists(path))
+
+    def test_children_are_moved_to_the_top_level(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        parent = self.pl.create_task('parent')
+        parent.is_deleted = True
+        self.pl.add(parent)
+        child = self.pl.create_task('child')
+        child.parent = parent
+        self.pl.add(child)
+        self.pl.commit()
+        # when
+        result = self.ll.purge_all_deleted_tasks(admin)
+        # then
+        self.assertEqual(1, result['children'])
+        self.assertIsNone(child.parent)
+        self.assertEqual([child], list(self.pl.get_tasks()))
+
+
+class SqlAlchemyPurgeAllDeletedTasksTest(PurgeAllDeletedTasksTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.ll.upload_folder = '/tmp/tudor/uploads'
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
@@ -76,3 +76,80 @@ class SearchTest(unittest.TestCase):
         self.assertIsNotNone(results)
         results2 = list(results)
         self.assertEqual([], results2)
+
+    def test_edited_task_is_found_by_new_summary(self):
+        # given
+        task = self.pl.create_task('one two three')
+        self.pl.add(task)
+        self.pl.commit()
+        # when
+        task.summary = 'four five'
+        self.pl.commit()
+        # then
+        self.assertEqual([task], list(self.ll.search('five', self.admin)))
+        self.assertEqual([], list(self.ll.search('two', self.admin)))
+
+    def test_purged_task_is_not_found(self):
+        # given
+        task = self.pl.create_task('one two three')
+        task.is_deleted = True
+        self.pl.add(task)
+        self.pl.commit()
+        # when
+        self.ll.purge_task(task, self.admin)
+        # then
+        self.assertEqual([], list(self.ll.search('two', self.admin)))
+
+
+class GetSearchDataTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+        self.admin = self.pl.create_user('name@example.org', None, True)
+        self.pl.add(self.admin)
+        self.user = self.pl.create_user('user@example.org', None, False)
+        self.pl.add(self.user)
+        self.tasks = []
+        for i in range(5):
+            task = self.pl.create_task('task {}'.format(i))
+            task.id = i + 1
+            self.pl.add(task)
+            self.tasks.append(task)
+        self.tasks[0].users.append(self.user)
+        self.pl.commit()
+
+    def test_returns_results_and_pager(self):
+        # when
+        data = self.ll.get_search_data('task', self.admin, page_num=2,
+                                       tasks_per_page=2)
+        # then
+        self.assertEqual('task', data['query'])
+        self.assertEqual(2, len(data['results']))
+        pager = data['pager']
+        self.assertEqual(2, pager.page)
+        self.assertEqual(5, pager.total)
+        self.assertEqual(3, pager.pages)
+        self.assertTrue(pager.has_prev)
+        self.assertTrue(pager.has_next)
+        self.assertEqual(data['results'], pager.items)
+
+    def test_results_carry_snippets(self):
+        # when
+        data = self.ll.get_search_data('task', self.admin)
+        # then
+        self.assertEqual(5, len(data['results']))
+        for result in data['results']:
+            self.assertIn('task', result.snippet)
+
+    def test_non_admin_only_sees_own_tasks(self):
+        # when
+        data = self.ll.get_search_data('task', self.user)
+        # then
+        self.assertEqual([self.tasks[0]],
+                         [r.task for r in data['results']])
+        self.assertEqual(1, data['pager'].total)
+
+    def test_invalid_page_num_raises(self):
+        # expect
+        with self.assertRaises(ValueError):
+            self.ll.get_search_data('task', self.admin, page_num=0)
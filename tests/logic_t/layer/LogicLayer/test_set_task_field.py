@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+import unittest
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+
+
+class SetTaskFieldTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+        # t1 -> t2, nobody authorized for either
+        self.t1 = self.pl.create_task('t1')
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.id = 2
+        self.t2.parent = self.t1
+        self.pl.add(self.t1)
+        self.pl.add(self.t2)
+        self.pl.commit()
+
+    def test_sets_only_the_task(self):
+        # when
+        result = self.ll.set_task_field(1, 'is_public', True)
+        # then
+        self.assertEqual([1], result)
+        self.assertTrue(self.t1.is_public)
+        self.assertFalse(self.t2.is_public)
+
+    def test_sets_the_task_and_descendants(self):
+        # when
+        result = self.ll.set_task_field(1, 'is_done', True, descendants=True)
+        # then
+        self.assertEqual({1, 2}, set(result))
+        self.assertTrue(self.t1.is_done)
+        self.assertTrue(self.t2.is_done)
+        self.assertEqual(self.t1.date_last_updated,
+                         self.t2.date_last_updated)
+
+    def test_task_not_found_returns_none(self):
+        # expect
+        self.assertIsNone(self.ll.set_task_field(3, 'is_done', True))
+
+    def test_unknown_field_raises(self):
+        # expect
+        self.assertRaises(ValueError, self.ll.set_task_field,
+                          1, 'summary', 'x')
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+
+import unittest
+
+from werkzeug.exceptions import NotFound, Forbidden
+
+from tests.logic_t.layer.LogicLayer.util import generate_ll
+from tudor import generate_app
+
+
+class UpdateSubtreeTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = generate_ll()
+        self.pl = self.ll.pl
+
+    def create_tasks(self, user):
+        # t1 -> t2 -> t3, t4
+        tasks = []
+        for i in range(1, 5):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = i
+            self.pl.add(task)
+            tasks.append(task)
+        t1, t2, t3, t4 = tasks
+        t1.users.append(user)
+        t2.parent = t1
+        t3.parent = t2
+        self.pl.commit()
+        return tasks
+
+    def test_marks_task_and_descendants_done(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        self.pl.add(user)
+        t1, t2, t3, t4 = self.create_tasks(user)
+        # when
+        result = self.ll.update_subtree(t1.id, user, 'is_done', True)
+        # then
+        self.assertEqual(3, result)
+        self.assertTrue(t1.is_done)
+        self.assertTrue(t2.is_done)
+        self.assertTrue(t3.is_done)
+        self.assertFalse(t4.is_done)
+
+    def test_sets_the_same_date_last_updated_on_every_task(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        self.pl.add(user)
+        t1, t2, t3, t4 = self.create_tasks(user)
+        original = t4.date_last_updated
+        # when
+        self.ll.update_subtree(t1.id, user, 'is_deleted', True)
+        # then
+        self.assertEqual(t1.date_last_updated, t2.date_last_updated)
+        self.assertEqual(t1.date_last_updated, t3.date_last_updated)
+        self.assertEqual(original, t4.date_last_updated)
+
+    def test_only_the_top_task_needs_authorization(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        self.pl.add(user)
+        t1, t2, t3, t4 = self.create_tasks(user)
+        # precondition
+        self.assertNotIn(user, t2.users)
+        # when
+        self.ll.update_subtree(t1.id, user, 'is_public', True)
+        # then
+        self.assertTrue(t2.is_public)
+        self.assertTrue(t3.is_public)
+
+    def test_unauthorized_user_raises(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        self.pl.add(user)
+        t1, t2, t3, t4 = self.create_tasks(user)
+        # expect
+        self.assertRaises(Forbidden, self.ll.update_subtree,
+                          t4.id, user, 'is_done', True)
+        # and
+        self.assertFalse(t4.is_done)
+
+    def test_admin_is_authorized(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(user)
+        self.pl.add(admin)
+        t1, t2, t3, t4 = self.create_tasks(user)
+        # when
+        self.ll.update_subtree(t2.id, admin, 'is_deleted', True)
+        # then
+        self.assertFalse(t1.is_deleted)
+        self.assertTrue(t2.is_deleted)
+        self.assertTrue(t3.is_deleted)
+
+    def test_task_not_found_raises(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        self.pl.commit()
+        # expect
+        self.assertRaises(NotFound, self.ll.update_subtree,
+                          1, admin, 'is_done', True)
+
+    def test_unknown_field_raises(self):
+        # given
+        admin = self.pl.create_user('admin@example.com', is_admin=True)
+        self.pl.add(admin)
+        t1, t2, t3, t4 = self.create_tasks(admin)
+        # expect
+        self.assertRaises(ValueError, self.ll.update_subtree,
+                          t1.id, admin, 'summary', 'changed')
+
+
+class SqlAlchemyUpdateSubtreeTest(UpdateSubtreeTest):
+    def setUp(self):
+        app = generate_app(db_uri='sqlite://')
+        self.app_context = app.app_context()
+        self.app_context.push()
+        app.pl.create_all()
+        self.ll = app.ll
+        self.pl = app.pl
+
+    def tearDown(self):
+        self.app_context.pop()
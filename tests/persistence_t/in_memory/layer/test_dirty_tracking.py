@@ -0,0 +1,89 @@
+from unittest.mock import patch
+
+from persistence.in_memory.models.tag import Tag
+from persistence.in_memory.models.task import Task
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+class DirtyTrackingTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+        self.task1 = self.pl.create_task('task1')
+        self.task2 = self.pl.create_task('task2')
+        self.tag = self.pl.create_tag('tag')
+        self.user = self.pl.create_user('user@example.com')
+        for obj in (self.task1, self.task2, self.tag, self.user):
+            self.pl.add(obj)
+        self.pl.commit()
+
+    def test_nothing_is_dirty_after_commit(self):
+        # expect
+        self.assertEqual(set(), self.pl._changed_objects)
+
+    def test_changes_mark_objects_dirty(self):
+        # when
+        self.task1.summary = 'changed'
+        # then
+        self.assertEqual({self.task1}, self.pl._changed_objects)
+
+    def test_relationship_changes_mark_both_sides_dirty(self):
+        # when
+        self.task2.tags.add(self.tag)
+        # then
+        self.assertEqual({self.task2, self.tag}, self.pl._changed_objects)
+
+    def test_commit_only_looks_at_dirty_objects(self):
+        # given
+        self.task1.summary = 'changed'
+        # when
+        with patch.object(Task, 'to_dict', autospec=True,
+                          side_effect=Task.to_dict) as task_to_dict, \
+                patch.object(Tag, 'to_dict', autospec=True,
+                             side_effect=Tag.to_dict) as tag_to_dict:
+            self.pl.commit()
+        # then
+        self.assertEqual([self.task1],
+                         [_.args[0] for _ in task_to_dict.call_args_list])
+        tag_to_dict.assert_not_called()
+        self.assertEqual(set(), self.pl._changed_objects)
+
+    def test_changed_keys_are_reindexed(self):
+        # given
+        self.tag.value = 'other'
+        self.user.email = 'other@example.com'
+        self.task2.id = 10
+        # when
+        self.pl.commit()
+        # then
+        self.assertIs(self.tag, self.pl.get_tag_by_value('other'))
+        self.assertIsNone(self.pl.get_tag_by_value('tag'))
+        self.assertIs(self.user, self.pl.get_user_by_email('other@example.com'))
+        self.assertIs(self.task2, self.pl.get_task(10))
+        self.assertEqual([self.task2],
+                         [_.task for _ in self.pl.search_tasks('task2')])
+
+    def test_rollback_only_restores_dirty_objects(self):
+        # given
+        self.task1.summary = 'changed'
+        self.task2.tags.add(self.tag)
+        # when
+        self.pl.rollback()
+        # then
+        self.assertEqual('task1', self.task1.summary)
+        self.assertEqual(set(), set(self.task2.tags))
+        self.assertEqual(set(), set(self.tag.tasks))
+        self.assertEqual(set(), self.pl._changed_objects)
+
+    def test_deleted_objects_are_no_longer_tracked(self):
+        # given
+        self.task1.tags.add(self.tag)
+        self.pl.commit()
+        self.pl.delete(self.task1)
+        self.pl.commit()
+        # when
+        self.task1.summary = 'changed'
+        # then
+        self.assertNotIn(self.task1, self.pl._changed_objects)
+        self.assertNotIn(self.task1, self.pl._values_by_object)
+        self.assertEqual(set(), set(self.tag.tasks))
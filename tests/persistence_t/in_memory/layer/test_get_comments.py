@@ -75,3 +75,23 @@ class GetCommentsTest(InMemoryTestBase):
     def test_count_comments_comment_id_in_empty_yields_no_comments(self):
         # expect
         self.assertEqual(0, self.pl.count_comments(comment_id_in=[]))
+
+    def test_get_comments_task_id_in_filters_by_task(self):
+        # given
+        task = self.pl.create_task('task')
+        task.id = 1
+        self.pl.add(task)
+        self.n1.task = task
+        self.pl.commit()
+        # when
+        results = self.pl.get_comments(task_id_in=[task.id])
+        # then
+        self.assertEqual({self.n1}, set(results))
+        # and
+        self.assertEqual(1, self.pl.count_comments(task_id_in=[task.id]))
+
+    def test_get_comments_task_id_in_empty_yields_no_comments(self):
+        # when
+        results = self.pl.get_comments(task_id_in=[])
+        # then
+        self.assertEqual(set(), set(results))
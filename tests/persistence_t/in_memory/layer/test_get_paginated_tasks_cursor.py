@@ -0,0 +1,153 @@
+from persistence.pager import encode_cursor
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+# copied from ../../sqlalchemy/layer/test_get_paginated_tasks_cursor.py
+
+
+class CursorPaginatedTasksTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+        self.t1 = self.pl.create_task('t1')
+        self.t1.order_num = 10
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.order_num = 20
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('t3')
+        self.t3.order_num = 20
+        self.t3.id = 3
+        self.t4 = self.pl.create_task('t4', is_done=True)
+        self.t4.order_num = 40
+        self.t4.id = 4
+        self.t5 = self.pl.create_task('t5')
+        self.t5.order_num = 50
+        self.t5.id = 5
+        self.pl.add(self.t1)
+        self.pl.add(self.t2)
+        self.pl.add(self.t3)
+        self.pl.add(self.t4)
+        self.pl.add(self.t5)
+        self.pl.commit()
+
+    def test_first_page(self):
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=None, tasks_per_page=2)
+        # then
+        self.assertTrue(pager.is_cursor)
+        self.assertEqual([self.t5, self.t4], pager.items)
+        self.assertFalse(pager.has_prev)
+        self.assertIsNone(pager.prev_cursor)
+        self.assertTrue(pager.has_next)
+        self.assertIsNone(pager.total)
+        self.assertIsNone(pager.page)
+
+    def test_empty_cursor_is_first_page(self):
+        # when
+        pager = self.pl.get_paginated_tasks(cursor='', tasks_per_page=2)
+        # then
+        self.assertEqual([self.t5, self.t4], pager.items)
+
+    def test_next_cursor_breaks_ties_by_id(self):
+        # given
+        first = self.pl.get_paginated_tasks(cursor=None, tasks_per_page=3)
+        self.assertEqual([self.t5, self.t4, self.t3], first.items)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=first.next_cursor,
+                                            tasks_per_page=3)
+        # then
+        self.assertEqual([self.t2, self.t1], pager.items)
+        self.assertTrue(pager.has_prev)
+        self.assertFalse(pager.has_next)
+        self.assertIsNone(pager.next_cursor)
+
+    def test_prev_cursor_returns_previous_page(self):
+        # given
+        first = self.pl.get_paginated_tasks(cursor=None, tasks_per_page=2)
+        second = self.pl.get_paginated_tasks(cursor=first.next_cursor,
+                                             tasks_per_page=2)
+        self.assertEqual([self.t3, self.t2], second.items)
+        third = self.pl.get_paginated_tasks(cursor=second.next_cursor,
+                                            tasks_per_page=2)
+        self.assertEqual([self.t1], third.items)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=third.prev_cursor,
+                                            tasks_per_page=2)
+        # then
+        self.assertEqual([self.t3, self.t2], pager.items)
+        self.assertTrue(pager.has_prev)
+        self.assertTrue(pager.has_next)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=pager.prev_cursor,
+                                            tasks_per_page=2)
+        # then
+        self.assertEqual([self.t5, self.t4], pager.items)
+        self.assertFalse(pager.has_prev)
+        self.assertTrue(pager.has_next)
+
+    def test_filters_still_apply(self):
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=None, tasks_per_page=2,
+                                            is_done=False)
+        # then
+        self.assertEqual([self.t5, self.t3], pager.items)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=pager.next_cursor,
+                                            tasks_per_page=2, is_done=False)
+        # then
+        self.assertEqual([self.t2, self.t1], pager.items)
+        self.assertFalse(pager.has_next)
+
+    def test_cursor_overrides_order_by(self):
+        # when
+        pager = self.pl.get_paginated_tasks(
+            cursor=None, tasks_per_page=2,
+            order_by=[[self.pl.ORDER_NUM, self.pl.ASCENDING]])
+        # then
+        self.assertEqual([self.t5, self.t4], pager.items)
+
+    def test_cursor_position_is_exclusive(self):
+        # given
+        cursor = encode_cursor(40, self.t4.id, 'n')
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=cursor, tasks_per_page=10)
+        # then
+        self.assertEqual([self.t3, self.t2, self.t1], pager.items)
+
+    def test_cursor_past_the_last_task_links_back(self):
+        # given
+        cursor = encode_cursor(10, self.t1.id, 'n')
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=cursor, tasks_per_page=2)
+        # then
+        self.assertEqual([], pager.items)
+        self.assertFalse(pager.has_next)
+        self.assertTrue(pager.has_prev)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=pager.prev_cursor,
+                                            tasks_per_page=2)
+        # then
+        self.assertEqual([self.t2, self.t1], pager.items)
+
+    def test_cursor_before_the_first_task_links_forward(self):
+        # given
+        cursor = encode_cursor(50, self.t5.id, 'p')
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=cursor, tasks_per_page=2)
+        # then
+        self.assertEqual([], pager.items)
+        self.assertFalse(pager.has_prev)
+        self.assertTrue(pager.has_next)
+        # when
+        pager = self.pl.get_paginated_tasks(cursor=pager.next_cursor,
+                                            tasks_per_page=2)
+        # then
+        self.assertEqual([self.t5, self.t4], pager.items)
+
+    def test_invalid_cursor_raises(self):
+        # expect
+        self.assertRaises(
+            ValueError,
+            self.pl.get_paginated_tasks,
+            cursor='not a cursor')
@@ -0,0 +1,126 @@
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+# copied from ../../sqlalchemy/layer/test_get_subtree.py
+
+
+class GetSubtreeTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+        self.t1 = self.pl.create_task('t1')
+        self.t1.order_num = 2
+        self.pl.add(self.t1)
+        self.t2 = self.pl.create_task('t2', is_done=True)
+        self.t2.order_num = 4
+        self.t2.parent = self.t1
+        self.pl.add(self.t2)
+        self.t3 = self.pl.create_task('t3', is_public=True)
+        self.t3.order_num = 6
+        self.t3.parent = self.t1
+        self.pl.add(self.t3)
+        self.t4 = self.pl.create_task('t4', is_deleted=True)
+        self.t4.order_num = 8
+        self.t4.parent = self.t3
+        self.pl.add(self.t4)
+        self.t5 = self.pl.create_task('t5')
+        self.t5.order_num = 10
+        self.t5.parent = self.t2
+        self.pl.add(self.t5)
+        self.t6 = self.pl.create_task('t6', is_public=True)
+        self.t6.order_num = 12
+        self.pl.add(self.t6)
+        self.pl.commit()
+
+    def test_no_roots_specified_starts_at_top_level(self):
+        # when
+        results = list(self.pl.get_subtree())
+        # then
+        self.assertEqual([(self.t6, 0), (self.t1, 0), (self.t3, 1),
+                          (self.t2, 1), (self.t5, 2), (self.t4, 2)],
+                         results)
+
+    def test_root_ids_yields_roots_and_descendants(self):
+        # when
+        results = list(self.pl.get_subtree(root_ids=[self.t3.id]))
+        # then
+        self.assertEqual([(self.t3, 0), (self.t4, 1)], results)
+
+    def test_empty_root_ids_yields_nothing(self):
+        # when
+        results = list(self.pl.get_subtree(root_ids=[]))
+        # then
+        self.assertEqual([], results)
+
+    def test_max_depth_zero_yields_only_roots(self):
+        # when
+        results = list(self.pl.get_subtree(max_depth=0))
+        # then
+        self.assertEqual([(self.t6, 0), (self.t1, 0)], results)
+
+    def test_max_depth_limits_depth(self):
+        # when
+        results = list(self.pl.get_subtree(root_ids=[self.t1.id],
+                                           max_depth=1))
+        # then
+        self.assertEqual([(self.t1, 0), (self.t3, 1), (self.t2, 1)], results)
+
+    def test_filtered_task_hides_its_descendants(self):
+        # when
+        results = list(self.pl.get_subtree(is_done=False))
+        # then
+        self.assertEqual({self.t1, self.t3, self.t4, self.t6},
+                         set(t for t, d in results))
+
+    def test_is_deleted_filter(self):
+        # when
+        results = list(self.pl.get_subtree(is_deleted=False))
+        # then
+        self.assertEqual({self.t1, self.t2, self.t3, self.t5, self.t6},
+                         set(t for t, d in results))
+
+    def test_is_public_filter(self):
+        # when
+        results = list(self.pl.get_subtree(is_public=True))
+        # then
+        self.assertEqual([(self.t6, 0)], results)
+
+    def test_is_public_or_users_contains(self):
+        # given
+        user = self.pl.create_user('name@example.com')
+        self.pl.add(user)
+        self.t1.users.add(user)
+        self.t2.users.add(user)
+        self.pl.commit()
+        # when
+        results = list(self.pl.get_subtree(is_public_or_users_contains=user))
+        # then
+        self.assertEqual({self.t1, self.t2, self.t3, self.t6},
+                         set(t for t, d in results))
+
+    def test_deadline_is_not_none(self):
+        # when
+        results = list(self.pl.get_subtree(deadline_is_not_none=True))
+        # then
+        self.assertEqual([], results)
+
+    def test_overlapping_roots_yield_each_task_once(self):
+        # when
+        results = list(self.pl.get_subtree(root_ids=[self.t1.id, self.t3.id]))
+        # then
+        self.assertEqual({self.t1: 0, self.t3: 0, self.t2: 1, self.t4: 1,
+                          self.t5: 2},
+                         dict(results))
+        self.assertEqual(5, len(results))
+
+    def test_cycle_does_not_recurse_forever(self):
+        # given
+        self.t1.parent = self.t5
+        self.pl.commit()
+        # when
+        results = list(self.pl.get_subtree(root_ids=[self.t1.id]))
+        # then
+        self.assertEqual({self.t1: 0, self.t2: 1, self.t3: 1, self.t4: 2,
+                          self.t5: 2},
+                         dict(results))
+        self.assertEqual(5, len(results))
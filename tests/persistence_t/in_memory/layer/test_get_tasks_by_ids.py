@@ -0,0 +1,37 @@
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+# copied from ../../sqlalchemy/layer/test_get_tasks_by_ids.py, with removals
+
+
+class GetTasksByIdsTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+        self.t1 = self.pl.create_task('t1')
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('t3')
+        self.t3.id = 3
+        for task in [self.t1, self.t2, self.t3]:
+            self.pl.add(task)
+        self.pl.commit()
+
+    def test_gets_tasks_by_id(self):
+        # when
+        result = self.pl.get_tasks_by_ids([1, 3])
+        # then
+        self.assertEqual({1: self.t1, 3: self.t3}, result)
+
+    def test_missing_ids_are_left_out(self):
+        # when
+        result = self.pl.get_tasks_by_ids([2, 4, None])
+        # then
+        self.assertEqual({2: self.t2}, result)
+
+    def test_empty_ids_gets_nothing(self):
+        # when
+        result = self.pl.get_tasks_by_ids([])
+        # then
+        self.assertEqual({}, result)
@@ -89,7 +89,7 @@ class GetNextObjectIdsTest(InMemoryTestBase):
         self.pl.commit()
         # precondition
         self.assertEqual(1, len(self.pl._tasks))
-        self.assertEqual(3, self.pl._tasks[0].id)
+        self.assertEqual(3, next(iter(self.pl._tasks)).id)
         # when
         result = self.pl._get_next_task_id()
         # then
@@ -111,7 +111,7 @@ class GetNextObjectIdsTest(InMemoryTestBase):
         self.pl.commit()
         # precondition
         self.assertEqual(1, len(self.pl._tags))
-        self.assertEqual(3, self.pl._tags[0].id)
+        self.assertEqual(3, next(iter(self.pl._tags)).id)
         # when
         result = self.pl._get_next_tag_id()
         # then
@@ -133,7 +133,7 @@ class GetNextObjectIdsTest(InMemoryTestBase):
         self.pl.commit()
         # precondition
         self.assertEqual(1, len(self.pl._attachments))
-        self.assertEqual(3, self.pl._attachments[0].id)
+        self.assertEqual(3, next(iter(self.pl._attachments)).id)
         # when
         result = self.pl._get_next_attachment_id()
         # then
@@ -155,7 +155,7 @@ class GetNextObjectIdsTest(InMemoryTestBase):
         self.pl.commit()
         # precondition
         self.assertEqual(1, len(self.pl._comments))
-        self.assertEqual(3, self.pl._comments[0].id)
+        self.assertEqual(3, next(iter(self.pl._comments)).id)
         # when
         result = self.pl._get_next_comment_id()
         # then
@@ -177,7 +177,7 @@ class GetNextObjectIdsTest(InMemoryTestBase):
         self.pl.commit()
         # precondition
         self.assertEqual(1, len(self.pl._users))
-        self.assertEqual(3, self.pl._users[0].id)
+        self.assertEqual(3, next(iter(self.pl._users)).id)
         # when
         result = self.pl._get_next_user_id()
         # then
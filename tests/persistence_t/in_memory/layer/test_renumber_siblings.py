@@ -0,0 +1,105 @@
+from datetime import datetime
+
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+# copied from ../../sqlalchemy/layer/test_renumber_siblings.py
+
+
+class RenumberSiblingsTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+        self.timestamp = datetime(2020, 1, 1)
+        self.parent = self.pl.create_task('parent')
+        self.parent.id = 1
+        self.pl.add(self.parent)
+
+    def create_children(self, order_nums, first_id=2):
+        tasks = []
+        for i, order_num in enumerate(order_nums):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = first_id + i
+            task.order_num = order_num
+            task.parent = self.parent
+            self.pl.add(task)
+            tasks.append(task)
+        self.pl.commit()
+        return tasks
+
+    def test_renumbers_in_descending_order(self):
+        # given
+        t1, t2, t3 = self.create_children([5, 1, 3])
+        # when
+        self.pl.renumber_siblings(self.parent.id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(6, t1.order_num)
+        self.assertEqual(2, t2.order_num)
+        self.assertEqual(4, t3.order_num)
+
+    def test_ties_are_broken_by_id(self):
+        # given
+        t1, t2, t3 = self.create_children([0, 0, 0])
+        # when
+        self.pl.renumber_siblings(self.parent.id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(6, t1.order_num)
+        self.assertEqual(4, t2.order_num)
+        self.assertEqual(2, t3.order_num)
+
+    def test_sets_date_last_updated(self):
+        # given
+        t1, t2 = self.create_children([1, 2])
+        # when
+        self.pl.renumber_siblings(self.parent.id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(self.timestamp, t1.date_last_updated)
+        self.assertEqual(self.timestamp, t2.date_last_updated)
+
+    def test_does_not_touch_other_tasks(self):
+        # given
+        t1, t2 = self.create_children([1, 2])
+        other = self.pl.create_task('other')
+        other.id = 10
+        other.order_num = 7
+        self.pl.add(other)
+        self.pl.commit()
+        # when
+        self.pl.renumber_siblings(self.parent.id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(2, t1.order_num)
+        self.assertEqual(4, t2.order_num)
+        self.assertEqual(7, other.order_num)
+        self.assertEqual(0, self.parent.order_num)
+
+    def test_parent_id_none_renumbers_top_level_tasks(self):
+        # given
+        t1, = self.create_children([1])
+        other = self.pl.create_task('other')
+        other.id = 10
+        other.order_num = 0
+        self.pl.add(other)
+        self.pl.commit()
+        # when
+        self.pl.renumber_siblings(None, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(4, self.parent.order_num)
+        self.assertEqual(2, other.order_num)
+        self.assertEqual(1, t1.order_num)
+
+    def test_uncommitted_changes_are_included(self):
+        # given
+        t1, t2 = self.create_children([1, 2])
+        t1.order_num = 3
+        # when
+        self.pl.renumber_siblings(self.parent.id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(4, t1.order_num)
+        self.assertEqual(2, t2.order_num)
+
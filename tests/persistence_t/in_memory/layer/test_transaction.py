@@ -0,0 +1,96 @@
+from tests.persistence_t.in_memory.in_memory_test_base import InMemoryTestBase
+
+
+# copied from ../../sqlalchemy/layer/test_transaction.py, with removals
+
+
+class TransactionTest(InMemoryTestBase):
+    def setUp(self):
+        self.pl = self.generate_pl()
+        self.pl.create_all()
+
+    def test_commit_inside_transaction_is_applied_right_away(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction():
+            self.pl.add(task)
+            self.pl.commit()
+            # then
+            self.assertIs(task, self.pl.get_task(task.id))
+
+    def test_commit_inside_transaction_assigns_ids(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction():
+            self.pl.add(task)
+            self.pl.commit()
+            # then
+            self.assertIsNotNone(task.id)
+
+    def test_outermost_transaction_commits(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction() as stats:
+            self.pl.add(task)
+            self.pl.commit()
+        self.pl.rollback()
+        # then
+        self.assertEqual(1, self.pl.count_tasks())
+        self.assertEqual(1, stats.commit_calls)
+        self.assertEqual(1, stats.commits)
+        self.assertEqual(0, stats.rollbacks)
+
+    def test_nested_transactions_join_the_outer_one(self):
+        # given
+        t1 = self.pl.create_task('t1')
+        t2 = self.pl.create_task('t2')
+        # when
+        with self.pl.transaction() as outer:
+            with self.pl.transaction() as inner:
+                self.pl.add(t1)
+                self.pl.commit()
+            self.assertTrue(self.pl.in_transaction())
+            self.pl.add(t2)
+            self.pl.commit()
+        # then
+        self.assertIs(outer, inner)
+        self.assertFalse(self.pl.in_transaction())
+        self.assertEqual(2, outer.commit_calls)
+        self.assertEqual(1, outer.commits)
+        self.assertEqual(2, self.pl.count_tasks())
+
+    def test_end_without_begin_raises(self):
+        # expect
+        self.assertRaises(Exception, self.pl.end_transaction)
+
+    def test_call_after_commit_waits_for_the_commit(self):
+        # given
+        calls = []
+        # when
+        with self.pl.transaction():
+            self.pl.call_after_commit(lambda: calls.append('called'))
+            self.pl.commit()
+            # then
+            self.assertEqual([], calls)
+        self.assertEqual(['called'], calls)
+
+    def test_call_after_commit_is_dropped_on_rollback(self):
+        # given
+        calls = []
+        # when
+        self.pl.begin_transaction()
+        self.pl.call_after_commit(lambda: calls.append('called'))
+        self.pl.end_transaction(error=True)
+        # then
+        self.assertEqual([], calls)
+
+    def test_call_after_commit_outside_a_transaction_calls_right_away(self):
+        # given
+        calls = []
+        # when
+        self.pl.call_after_commit(lambda: calls.append('called'))
+        # then
+        self.assertEqual(['called'], calls)
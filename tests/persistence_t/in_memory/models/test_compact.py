@@ -0,0 +1,114 @@
+import unittest
+from unittest.mock import patch
+
+from persistence.in_memory.models import debug
+from persistence.in_memory.models.attachment import Attachment
+from persistence.in_memory.models.comment import Comment
+from persistence.in_memory.models.tag import Tag
+from persistence.in_memory.models.task import Task
+from persistence.in_memory.models.user import User
+
+
+class SlotsTest(unittest.TestCase):
+    def test_models_have_no_instance_dict(self):
+        for obj in (Task('task'), Tag('tag'), User('user@example.com'),
+                    Comment('comment'), Attachment('path')):
+            with self.subTest(type(obj).__name__):
+                self.assertFalse(hasattr(obj, '__dict__'))
+
+    def test_collections_have_no_instance_dict(self):
+        # expect
+        self.assertFalse(hasattr(Task('task').tags, '__dict__'))
+        self.assertFalse(hasattr(Task('task').children, '__dict__'))
+
+    def test_unknown_attributes_cannot_be_set(self):
+        # given
+        task = Task('task')
+        # expect
+        with self.assertRaises(AttributeError):
+            task.id_deleted = True
+
+    def test_depth_defaults_to_zero_and_can_be_set(self):
+        # given
+        task = Task('task')
+        # precondition
+        self.assertEqual(0, task.depth)
+        # when
+        task.depth = 3
+        # then
+        self.assertEqual(3, task.depth)
+
+    def test_guest_flags_can_still_be_set_on_users(self):
+        # given
+        user = User('user@example.com')
+        # precondition
+        self.assertTrue(user.is_authenticated)
+        self.assertFalse(user.is_anonymous)
+        # when
+        user._is_authenticated = False
+        user._is_anonymous = True
+        # then
+        self.assertFalse(user.is_authenticated)
+        self.assertTrue(user.is_anonymous)
+
+
+class LazyCollectionsTest(unittest.TestCase):
+    def test_collections_are_made_on_first_access(self):
+        # given
+        task = Task('task')
+        # precondition
+        self.assertIsNone(task._tags)
+        self.assertIsNone(task._children)
+        # when
+        tags = task.tags
+        # then
+        self.assertIs(tags, task._tags)
+        self.assertIs(tags, task.tags)
+        self.assertIsNone(task._children)
+
+    def test_backing_set_is_made_on_first_add(self):
+        # given
+        task = Task('task')
+        tag = Tag('tag')
+        # when
+        self.assertEqual(0, len(task.tags))
+        self.assertNotIn(tag, task.tags)
+        self.assertEqual([], list(task.tags))
+        # then
+        self.assertIsNone(task.tags._set)
+        # when
+        task.tags.add(tag)
+        # then
+        self.assertEqual({tag}, task.tags._set)
+        self.assertEqual({task}, set(tag.tasks))
+
+    def test_lazy_source_is_used_when_the_collection_is_made(self):
+        # given
+        tag = Tag('tag')
+        task = Task('task', lazy={'tags': [tag]})
+        # expect
+        self.assertEqual([tag], list(task.tags))
+
+
+class DebugLoggingSwitchTest(unittest.TestCase):
+    def test_no_debug_logging_while_switched_off(self):
+        # given
+        task = Task('task')
+        tag = Tag('tag')
+        # when
+        with patch('logging.Logger.debug') as log_debug:
+            task.summary = 'changed'
+            task.tags.add(tag)
+        # then
+        log_debug.assert_not_called()
+
+    def test_debug_logging_while_switched_on(self):
+        # given
+        task = Task('task')
+        # when
+        with patch.object(debug, 'DEBUG_LOGGING', True), \
+                self.assertLogs('persistence.in_memory.models.task',
+                                'DEBUG') as logs:
+            task.summary = 'changed'
+        # then
+        self.assertTrue(any('changed' in _ for _ in logs.output))
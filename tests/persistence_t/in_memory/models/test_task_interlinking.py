@@ -868,7 +868,6 @@ class CommentsInterlinkingTest(unittest.TestCase):
         self.assertNotIn(self.n2, self.task.comments)
         # when
         self.task.comments.set.add(self.n1)
-        self.n1._parent = self.task
         # then
         self.assertIn(self.n1, self.task.comments)
         self.assertNotIn(self.n2, self.task.comments)
@@ -948,7 +947,6 @@ class AttachmentsInterlinkingTest(unittest.TestCase):
         self.assertNotIn(self.n2, self.task.attachments)
         # when
         self.task.attachments.set.add(self.n1)
-        self.n1._parent = self.task
         # then
         self.assertIn(self.n1, self.task.attachments)
         self.assertNotIn(self.n2, self.task.attachments)
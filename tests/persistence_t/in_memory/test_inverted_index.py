@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import Mock
+
+from persistence.in_memory.search import InvertedIndex, SUMMARY_WEIGHT, \
+    DESCRIPTION_WEIGHT
+
+
+def generate_task(id, summary, description=None):
+    return Mock(id=id, summary=summary, description=description)
+
+
+class InvertedIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+
+    def test_empty_index_yields_nothing(self):
+        # expect
+        self.assertEqual({}, self.index.search(['one']))
+
+    def test_scores_are_weighted_by_field(self):
+        # given
+        self.index.add(generate_task(1, 'one two'))
+        self.index.add(generate_task(2, 'three', 'two two'))
+        # when
+        result = self.index.search(['two'])
+        # then
+        self.assertEqual({1: SUMMARY_WEIGHT, 2: 2 * DESCRIPTION_WEIGHT},
+                         result)
+
+    def test_tokens_match_as_prefixes(self):
+        # given
+        self.index.add(generate_task(1, 'twelve'))
+        self.index.add(generate_task(2, 'twenty'))
+        self.index.add(generate_task(3, 'three'))
+        # expect
+        self.assertEqual({1, 2}, set(self.index.search(['tw'])))
+
+    def test_all_tokens_must_match(self):
+        # given
+        self.index.add(generate_task(1, 'one two'))
+        self.index.add(generate_task(2, 'two three'))
+        # expect
+        self.assertEqual({2}, set(self.index.search(['two', 'three'])))
+
+    def test_remove_drops_task(self):
+        # given
+        self.index.add(generate_task(1, 'one'))
+        self.index.add(generate_task(2, 'one'))
+        # when
+        self.index.remove(1)
+        # then
+        self.assertEqual({2}, set(self.index.search(['one'])))
+
+    def test_re_adding_replaces_old_tokens(self):
+        # given
+        task = generate_task(1, 'one')
+        self.index.add(task)
+        task.summary = 'two'
+        # when
+        self.index.add(task)
+        # then
+        self.assertEqual({}, self.index.search(['one']))
+        self.assertEqual({1}, set(self.index.search(['two'])))
+
+    def test_removing_unknown_id_does_nothing(self):
+        # when
+        self.index.remove(123)
+        # then
+        self.assertEqual({}, self.index.search(['one']))
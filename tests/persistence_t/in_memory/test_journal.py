@@ -0,0 +1,384 @@
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from datetime import datetime, UTC
+from decimal import Decimal
+from unittest.mock import patch
+
+from persistence.in_memory.durable import DurableInMemoryPersistenceLayer, \
+    is_journal_uri
+from persistence.in_memory.journal import Journal, JournalError
+from tudor import generate_app
+
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open(self):
+        journal = Journal(self.path, fsync=False)
+        records = list(journal.load())
+        return journal, records
+
+    def test_records_are_read_back_in_order(self):
+        # given
+        journal, _ = self.open()
+        journal.append([['Option', None, {'key': 'a', 'value': '1'}]], [])
+        journal.append([], [['Option', 'a']])
+        journal.close()
+        # when
+        journal, records = self.open()
+        # then
+        self.assertEqual([1, 2], [_['seq'] for _ in records])
+        self.assertEqual([['Option', 'a']], records[1]['delete'])
+        self.assertEqual(2, journal.seq)
+        journal.close()
+
+    def test_unfinished_last_line_is_dropped(self):
+        # given
+        journal, _ = self.open()
+        journal.append([['Option', None, {'key': 'a', 'value': '1'}]], [])
+        journal.close()
+        with open(journal.journal_path, 'ab') as f:
+            f.write(b'{"seq":2,"put":[["Opt')
+        # when
+        journal, records = self.open()
+        journal.append([], [['Option', 'a']])
+        journal.close()
+        # then
+        self.assertEqual([1], [_['seq'] for _ in records])
+        journal, records = self.open()
+        self.assertEqual([1, 2], [_['seq'] for _ in records])
+        journal.close()
+
+    def test_damaged_line_in_the_middle_raises(self):
+        # given
+        with open(os.path.join(self.path, 'journal'), 'wb') as f:
+            f.write(b'{"seq":1,"put":[],"delete":[]}\n')
+            f.write(b'garbage\n')
+            f.write(b'{"seq":3,"put":[],"delete":[]}\n')
+        journal = Journal(self.path, fsync=False)
+        # expect
+        self.assertRaises(JournalError, list, journal.load())
+        journal.close()
+
+    def test_snapshot_starts_the_journal_over(self):
+        # given
+        journal, _ = self.open()
+        journal.append([['Option', None, {'key': 'a', 'value': '1'}]], [])
+        # when
+        journal.write_snapshot([['Option', None, {'key': 'a', 'value': '1'}]])
+        journal.append([['Option', 'a', {'key': 'a', 'value': '2'}]], [])
+        journal.close()
+        journal, records = self.open()
+        journal.close()
+        # then
+        self.assertEqual([1, 2], [_['seq'] for _ in records])
+        self.assertEqual('1', records[0]['put'][0][2]['value'])
+        self.assertEqual('2', records[1]['put'][0][2]['value'])
+
+    def test_records_covered_by_the_snapshot_are_skipped(self):
+        # given a compaction that stopped before the journal was started
+        # over
+        journal, _ = self.open()
+        journal.append([['Option', None, {'key': 'a', 'value': '1'}]], [])
+        with open(journal.journal_path, 'rb') as f:
+            old_journal = f.read()
+        journal.write_snapshot([['Option', None, {'key': 'a', 'value': '1'}]])
+        journal.close()
+        with open(journal.journal_path, 'wb') as f:
+            f.write(old_journal)
+        # when
+        journal, records = self.open()
+        journal.close()
+        # then
+        self.assertEqual(1, len(records))
+        self.assertIn('format', records[0])
+
+    def test_snapshot_cannot_refer_to_classes(self):
+        # given
+        with open(os.path.join(self.path, 'snapshot'), 'wb') as f:
+            pickle.dump({'format': 1, 'seq': 0, 'put': [os.getcwd],
+                         'delete': []}, f)
+        journal = Journal(self.path, fsync=False)
+        # expect
+        self.assertRaises(pickle.UnpicklingError, list, journal.load())
+        journal.close()
+
+    def test_directory_can_only_be_opened_once(self):
+        # given
+        journal, _ = self.open()
+        # expect
+        self.assertRaises(JournalError, Journal, self.path)
+        journal.close()
+
+
+class DurableInMemoryPersistenceLayerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.tmpdir.name
+        self.pl = self.open()
+
+    def tearDown(self):
+        self.pl.close()
+        self.tmpdir.cleanup()
+
+    def open(self, compact_every=1000):
+        return DurableInMemoryPersistenceLayer(
+            self.path, compact_every=compact_every, fsync=False)
+
+    def reopen(self, compact_every=1000):
+        self.pl.close()
+        self.pl = self.open(compact_every)
+        return self.pl
+
+    def populate(self):
+        pl = self.pl
+        user = pl.create_user('user@example.com', hashed_password='hash',
+                              is_admin=True)
+        tag = pl.create_tag('tag', description='a tag')
+        parent = pl.create_task(
+            'parent', deadline=datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+            expected_cost=Decimal('1.50'), expected_duration_minutes=30,
+            date_created=datetime(2023, 5, 6, tzinfo=UTC))
+        child = pl.create_task('child', is_done=True, is_public=True)
+        child.parent = parent
+        child.tags.add(tag)
+        child.users.add(user)
+        child.dependees.add(parent)
+        child.prioritize_before.add(parent)
+        comment = pl.create_comment(
+            'comment', timestamp=datetime(2024, 2, 3, tzinfo=UTC))
+        comment.task = parent
+        attachment = pl.create_attachment(
+            'path', description='file',
+            timestamp=datetime(2024, 2, 4, tzinfo=UTC))
+        attachment.task = child
+        option = pl.create_option('title', 'Title')
+        for obj in (user, tag, parent, child, comment, attachment, option):
+            pl.add(obj)
+        pl.commit()
+        return parent.id, child.id
+
+    def assert_populated(self, pl, parent_id, child_id):
+        parent = pl.get_task(parent_id)
+        child = pl.get_task(child_id)
+        self.assertEqual('parent', parent.summary)
+        self.assertEqual(datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC),
+                         parent.deadline)
+        self.assertEqual(Decimal('1.50'), parent.expected_cost)
+        self.assertEqual(30, parent.expected_duration_minutes)
+        self.assertEqual(datetime(2023, 5, 6, tzinfo=UTC),
+                         parent.date_created)
+        self.assertIs(parent, child.parent)
+        self.assertTrue(child.is_done)
+        self.assertTrue(child.is_public)
+        self.assertEqual(['tag'], [_.value for _ in child.tags])
+        self.assertEqual(['user@example.com'],
+                         [_.email for _ in child.users])
+        self.assertEqual([parent], list(child.dependees))
+        self.assertEqual([child], list(parent.dependants))
+        self.assertEqual([parent], list(child.prioritize_before))
+        self.assertEqual(['comment'], [_.content for _ in parent.comments])
+        self.assertEqual(datetime(2024, 2, 3, tzinfo=UTC),
+                         next(iter(parent.comments)).timestamp)
+        self.assertEqual(['path'], [_.path for _ in child.attachments])
+        self.assertEqual('a tag', pl.get_tag_by_value('tag').description)
+        user = pl.get_user_by_email('user@example.com')
+        self.assertEqual('hash', user.hashed_password)
+        self.assertTrue(user.is_admin)
+        self.assertEqual('Title', pl.get_option('title').value)
+
+    def test_commits_are_loaded_from_the_journal(self):
+        # given
+        parent_id, child_id = self.populate()
+        # when
+        pl = self.reopen()
+        # then
+        self.assert_populated(pl, parent_id, child_id)
+        self.assertEqual([child_id], [_.id for _ in pl.get_tasks(
+            is_done=True, parent_id=parent_id)])
+        self.assertEqual([parent_id], [_.id for _ in pl.get_tasks(
+            parent_id=None)])
+
+    def test_contents_are_loaded_from_a_snapshot(self):
+        # given
+        parent_id, child_id = self.populate()
+        # when
+        self.pl.compact()
+        pl = self.reopen()
+        # then
+        self.assert_populated(pl, parent_id, child_id)
+        self.assertEqual(0, os.path.getsize(os.path.join(self.path,
+                                                         'journal')))
+
+    def test_changes_and_deletions_are_loaded(self):
+        # given
+        parent_id, child_id = self.populate()
+        self.pl.compact()
+        child = self.pl.get_task(child_id)
+        child.summary = 'renamed'
+        child.parent = None
+        child.tags.clear()
+        self.pl.commit()
+        self.pl.delete(self.pl.get_option('title'))
+        self.pl.commit()
+        # when
+        pl = self.reopen()
+        # then
+        child = pl.get_task(child_id)
+        self.assertEqual('renamed', child.summary)
+        self.assertIsNone(child.parent)
+        self.assertEqual([], list(child.tags))
+        self.assertEqual([], list(pl.get_tag_by_value('tag').tasks))
+        self.assertIsNone(pl.get_option('title'))
+        self.assertEqual({parent_id, child_id},
+                         set(_.id for _ in pl.get_tasks(parent_id=None)))
+
+    def test_new_ids_are_loaded(self):
+        # given
+        parent_id, child_id = self.populate()
+        task = self.pl.get_task(child_id)
+        task.id = 100
+        self.pl.commit()
+        # when
+        pl = self.reopen()
+        # then
+        self.assertIsNone(pl.get_task(child_id))
+        self.assertEqual('child', pl.get_task(100).summary)
+        self.assertEqual(parent_id, pl.get_task(100).parent.id)
+
+    def test_rolled_back_changes_are_not_written(self):
+        # given
+        parent_id, child_id = self.populate()
+        # when
+        with self.pl.transaction():
+            self.pl.get_task(parent_id).summary = 'changed'
+            self.pl.rollback()
+        pl = self.reopen()
+        # then
+        self.assertEqual('parent', pl.get_task(parent_id).summary)
+
+    def test_journal_is_compacted_every_so_many_commits(self):
+        # given
+        pl = self.reopen(compact_every=2)
+        pl.add(pl.create_option('a', '1'))
+        pl.commit()
+        # precondition
+        self.assertFalse(os.path.exists(os.path.join(self.path, 'snapshot')))
+        # when
+        pl.add(pl.create_option('b', '2'))
+        pl.commit()
+        # then
+        self.assertTrue(os.path.exists(os.path.join(self.path, 'snapshot')))
+        pl = self.reopen()
+        self.assertEqual(['1', '2'], [_.value for _ in pl.get_options()])
+
+    def test_compacting_with_uncommitted_changes_raises(self):
+        # given
+        self.pl.add(self.pl.create_option('a', '1'))
+        # expect
+        self.assertRaises(Exception, self.pl.compact)
+
+    def test_snapshot_is_written_if_the_journal_cannot_be_appended_to(self):
+        # given
+        self.pl.add(self.pl.create_option('a', '1'))
+        self.pl.commit()
+        # when
+        with patch.object(self.pl._journal, 'append',
+                          side_effect=OSError('No space left on device')):
+            self.pl.add(self.pl.create_option('b', '2'))
+            self.pl.commit()
+        self.pl.add(self.pl.create_option('c', '3'))
+        self.pl.commit()
+        pl = self.reopen()
+        # then
+        self.assertEqual(['1', '2', '3'], [_.value for _ in pl.get_options()])
+
+    def test_commits_are_refused_until_a_snapshot_can_be_written(self):
+        # given
+        journal = self.pl._journal
+        with patch.object(journal, 'append', side_effect=OSError('disk')), \
+                patch.object(journal, 'write_snapshot',
+                             side_effect=OSError('disk')):
+            self.pl.add(self.pl.create_option('a', '1'))
+            # expect
+            self.assertRaises(OSError, self.pl.commit)
+            self.pl.add(self.pl.create_option('b', '2'))
+            self.assertRaises(JournalError, self.pl.commit)
+            self.pl.rollback()
+            # and the next unit of work still can't write the snapshot
+            with self.pl.transaction():
+                pass
+            self.pl.add(self.pl.create_option('b', '2'))
+            self.assertRaises(JournalError, self.pl.commit)
+            self.pl.rollback()
+        # when the journal is working again
+        with self.pl.transaction():
+            self.pl.add(self.pl.create_option('c', '3'))
+        pl = self.reopen()
+        # then
+        self.assertEqual(['1', '3'], [_.value for _ in pl.get_options()])
+
+    def test_units_of_work_on_other_threads_wait(self):
+        # given
+        events = []
+        self.pl.begin_transaction()
+
+        def other():
+            with self.pl.transaction():
+                events.append('other')
+
+        thread = threading.Thread(target=other)
+        thread.start()
+        thread.join(0.1)
+        # when
+        events.append('first')
+        self.pl.end_transaction()
+        thread.join()
+        # then
+        self.assertEqual(['first', 'other'], events)
+        self.assertFalse(self.pl.in_transaction())
+
+
+class JournalUriTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'store')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_is_journal_uri(self):
+        self.assertTrue(is_journal_uri('memory+journal:///data'))
+        self.assertFalse(is_journal_uri('sqlite:///data'))
+        self.assertFalse(is_journal_uri(None))
+
+    def test_from_uri(self):
+        # when
+        pl = DurableInMemoryPersistenceLayer.from_uri(
+            'memory+journal:///{}?compact_every=5&fsync=false'.format(
+                self.path))
+        pl.close()
+        # then
+        self.assertEqual(5, pl.compact_every)
+        self.assertFalse(pl._journal.fsync)
+        self.assertTrue(os.path.isdir(self.path))
+
+    def test_from_uri_with_unknown_option_raises(self):
+        # expect
+        self.assertRaises(ValueError, DurableInMemoryPersistenceLayer.from_uri,
+                          'memory+journal:///{}?colour=red'.format(self.path))
+
+    def test_generate_app_uses_the_durable_layer(self):
+        # when
+        app = generate_app(db_uri='memory+journal:///' + self.path)
+        app.pl.close()
+        # then
+        self.assertIsInstance(app.pl, DurableInMemoryPersistenceLayer)
@@ -0,0 +1,62 @@
+import unittest
+
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+from persistence.in_memory.ordered_set import OrderedSet
+
+
+class OrderedSetTest(unittest.TestCase):
+    def test_iterates_in_insertion_order(self):
+        # given
+        s = OrderedSet([3, 1, 2])
+        # when
+        s.add(0)
+        s.add(1)
+        # then
+        self.assertEqual([3, 1, 2, 0], list(s))
+        self.assertEqual([0, 2, 1, 3], list(reversed(s)))
+        self.assertEqual(4, len(s))
+
+    def test_removal_keeps_the_order_of_the_rest(self):
+        # given
+        s = OrderedSet(range(6))
+        # when
+        s.remove(2)
+        s.discard(4)
+        s.discard(99)
+        s.difference_update([0, 5])
+        # then
+        self.assertEqual([1, 3], list(s))
+        self.assertNotIn(2, s)
+        self.assertIn(3, s)
+
+    def test_remove_missing_item_raises(self):
+        # expect
+        self.assertRaises(KeyError, OrderedSet().remove, 1)
+
+    def test_re_adding_an_item_moves_it_to_the_end(self):
+        # given
+        s = OrderedSet([1, 2, 3])
+        # when
+        s.remove(1)
+        s.add(1)
+        # then
+        self.assertEqual([2, 3, 1], list(s))
+
+
+class StoreOrderTest(unittest.TestCase):
+    def test_deleting_tasks_keeps_the_others_in_commit_order(self):
+        # given
+        pl = InMemoryPersistenceLayer()
+        tasks = [pl.create_task('task{}'.format(i)) for i in range(10)]
+        for i, task in enumerate(tasks):
+            task.id = i + 1
+            task.is_deleted = (i % 3 == 0)
+            pl.add(task)
+        pl.commit()
+        expected = [task for task in pl.get_tasks() if not task.is_deleted]
+        # when
+        pl.purge_deleted_tasks()
+        pl.commit()
+        # then
+        self.assertEqual(6, len(expected))
+        self.assertEqual(expected, list(pl.get_tasks()))
@@ -0,0 +1,238 @@
+import unittest
+from datetime import datetime
+
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+from persistence.in_memory.models.tag import Tag
+from persistence.in_memory.models.task import Task
+from persistence.in_memory.models.user import User
+from persistence.in_memory.task_index import TaskIndex
+
+
+class TaskIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TaskIndex()
+
+    def add(self, task):
+        # the persistence layer forwards the tasks' changes to the index
+        task.register_changing_listener(self.index.task_changing)
+        task.register_changed_listener(self.index.task_changed)
+        self.index.add(task)
+
+    def test_indexes_the_task_as_it_is_when_added(self):
+        # given
+        parent = Task('parent')
+        parent.id = 1
+        task = Task('task', is_done=True)
+        task.id = 2
+        task.parent = parent
+        tag = Tag('tag')
+        task.tags.add(tag)
+        # when
+        self.index.add(task)
+        # then
+        self.assertIs(task, self.index.get_by_id(2))
+        self.assertEqual({task}, self.index.get_by_is_done(True))
+        self.assertEqual(set(), self.index.get_by_is_done(False))
+        self.assertEqual({task}, self.index.get_by_tag(tag))
+        # the parent itself wasn't added, but is found by id through its
+        # children
+        self.assertEqual({task}, self.index.get_by_parent_id(1))
+        self.assertEqual(set(), self.index.get_with_deadline())
+
+    def test_follows_changes_to_fields(self):
+        # given
+        task = Task('task')
+        task.id = 1
+        self.add(task)
+        # when
+        task.is_done = True
+        task.is_deleted = True
+        task.deadline = datetime(2020, 1, 1)
+        # then
+        self.assertEqual({task}, self.index.get_by_is_done(True))
+        self.assertEqual(set(), self.index.get_by_is_done(False))
+        self.assertEqual({task}, self.index.get_by_is_deleted(True))
+        self.assertEqual({task}, self.index.get_with_deadline())
+
+    def test_follows_changes_to_tags_and_users_from_either_side(self):
+        # given
+        task = Task('task')
+        self.add(task)
+        tag = Tag('tag')
+        user = User('user@example.com')
+        # when
+        task.tags.add(tag)
+        user.tasks.add(task)
+        # then
+        self.assertEqual({task}, self.index.get_by_tag(tag))
+        self.assertEqual({task}, self.index.get_by_user(user))
+        # when
+        tag.tasks.discard(task)
+        task.users.discard(user)
+        # then
+        self.assertEqual(set(), self.index.get_by_tag(tag))
+        self.assertEqual(set(), self.index.get_by_user(user))
+
+    def test_follows_reparenting(self):
+        # given
+        parent1 = Task('parent1')
+        parent1.id = 1
+        parent2 = Task('parent2')
+        parent2.id = 2
+        child = Task('child')
+        child.id = 3
+        for task in (parent1, parent2, child):
+            self.add(task)
+        # when
+        parent2.children.add(child)
+        # then
+        self.assertEqual({parent1, parent2},
+                         self.index.get_by_parent_id(None))
+        self.assertEqual({child}, self.index.get_by_parent_id(2))
+        # when
+        child.parent = parent1
+        # then
+        self.assertEqual(set(), self.index.get_by_parent_id(2))
+        self.assertEqual({child}, self.index.get_by_parent_ids([1, 2]))
+
+    def test_children_follow_a_change_to_the_parent_id(self):
+        # given
+        parent = Task('parent')
+        parent.id = 1
+        child = Task('child')
+        child.id = 2
+        child.parent = parent
+        self.add(parent)
+        self.add(child)
+        # when
+        parent.id = 5
+        # then
+        self.assertEqual(set(), self.index.get_by_parent_id(1))
+        self.assertEqual({child}, self.index.get_by_parent_id(5))
+        self.assertIsNone(self.index.get_by_id(1))
+        self.assertIs(parent, self.index.get_by_id(5))
+
+    def test_removed_task_is_no_longer_followed(self):
+        # given
+        task = Task('task')
+        task.id = 1
+        self.add(task)
+        # when
+        self.index.remove(task)
+        task.is_done = True
+        # then
+        self.assertEqual(0, len(self.index))
+        self.assertNotIn(task, self.index)
+        self.assertEqual(set(), self.index.get_by_is_done(True))
+        self.assertIsNone(self.index.get_by_id(1))
+
+
+class TaskIndexPlannerTest(unittest.TestCase):
+    def setUp(self):
+        self.pl = InMemoryPersistenceLayer()
+        self.tag = self.pl.create_tag('tag')
+        self.user = self.pl.create_user('user@example.com')
+        self.pl.add(self.tag)
+        self.pl.add(self.user)
+        self.tasks = []
+        for i in range(30):
+            task = self.pl.create_task('task{}'.format(i),
+                                       is_done=(i % 3 == 0),
+                                       is_deleted=(i % 5 == 0),
+                                       is_public=(i % 2 == 0))
+            task.order_num = i % 7
+            if i >= 3:
+                task.parent = self.tasks[i % 3]
+            if i % 4 == 0:
+                task.tags.add(self.tag)
+            if i % 6 == 0:
+                task.users.add(self.user)
+            if i % 8 == 0:
+                task.deadline = datetime(2020, 1, i + 1)
+            self.pl.add(task)
+            self.tasks.append(task)
+        self.pl.commit()
+
+    def scan(self, predicate):
+        return [t for t in self.pl._tasks if predicate(t)]
+
+    def assert_same_as_scan(self, predicate, **kwargs):
+        self.assertEqual(self.scan(predicate),
+                         list(self.pl.get_tasks(**kwargs)))
+        self.assertEqual(len(self.scan(predicate)),
+                         self.pl.count_tasks(**kwargs))
+
+    def test_indexed_criteria_give_the_same_tasks_as_a_scan(self):
+        parent_id = self.tasks[1].id
+        self.assert_same_as_scan(lambda t: t.parent_id == parent_id,
+                                 parent_id=parent_id)
+        self.assert_same_as_scan(lambda t: t.parent_id is None,
+                                 parent_id=None)
+        self.assert_same_as_scan(
+            lambda t: t.is_done and not t.is_deleted,
+            is_done=True, is_deleted=False)
+        self.assert_same_as_scan(lambda t: self.tag in t.tags,
+                                 tags_contains=self.tag)
+        self.assert_same_as_scan(
+            lambda t: self.user in t.users and t.parent_id is not None,
+            users_contains=self.user, parent_id_in=[
+                self.tasks[0].id, self.tasks[1].id, self.tasks[2].id])
+        self.assert_same_as_scan(
+            lambda t: t.deadline is not None and t.is_public,
+            deadline_is_not_none=True, is_public=True)
+        self.assert_same_as_scan(
+            lambda t: t.id in {3, 4, 99},
+            task_id_in=[3, 4, 99])
+
+    def test_unindexed_criteria_are_still_applied(self):
+        self.assert_same_as_scan(
+            lambda t: t.parent_id is None and t.order_num >= 1,
+            parent_id=None, order_num_greq_than=1)
+        self.assert_same_as_scan(
+            lambda t: t.is_public or self.user in t.users,
+            is_public_or_users_contains=self.user)
+
+    def test_uncommitted_changes_are_seen(self):
+        # given
+        task = self.tasks[10]
+        # when
+        task.is_done = not task.is_done
+        task.parent = None
+        task.tags.add(self.tag)
+        # then
+        self.assertIn(task, list(self.pl.get_tasks(parent_id=None)))
+        self.assertIn(task, list(self.pl.get_tasks(tags_contains=self.tag)))
+        self.assert_same_as_scan(lambda t: t.is_done, is_done=True)
+
+    def test_rollback_restores_the_index(self):
+        # given
+        task = self.tasks[11]
+        parent_id = task.parent_id
+        # when
+        task.parent = None
+        task.is_deleted = True
+        self.pl.rollback()
+        # then
+        self.assertEqual(parent_id, task.parent_id)
+        self.assertIn(task, list(self.pl.get_tasks(parent_id=parent_id)))
+        self.assertNotIn(task, list(self.pl.get_tasks(is_deleted=True)))
+
+    def test_deleted_tasks_are_dropped_from_the_index(self):
+        # given
+        task = self.tasks[20]
+        # when
+        self.pl.delete(task)
+        self.pl.commit()
+        # then
+        self.assertNotIn(task, self.pl._task_index)
+        self.assertNotIn(task, list(self.pl.get_tasks(is_done=task.is_done)))
+        self.assert_same_as_scan(lambda t: t.parent_id is not None,
+                                 parent_id_in=[_.id for _ in self.tasks[:3]])
+
+    def test_ordering_and_limit_still_apply(self):
+        # when
+        result = list(self.pl.get_tasks(
+            parent_id=None, order_by=[[self.pl.ORDER_NUM,
+                                       self.pl.DESCENDING]], limit=2))
+        # then
+        self.assertEqual([self.tasks[2], self.tasks[1]], result)
@@ -0,0 +1,47 @@
+import os
+
+from sqlalchemy import text
+
+from tudor import generate_app
+
+
+def read_script():
+    import persistence.migration
+    path = os.path.join(os.path.dirname(persistence.migration.__file__),
+                        'migrations', 'v0.19.sql')
+    with open(path) as f:
+        return f.read()
+
+
+def test_order_nums_are_spread_out_within_each_parent():
+    # given
+    app = generate_app(db_uri='sqlite://')
+    pl = app.pl
+    with app.app_context():
+        pl.create_all()
+        order_nums = {'p': 5, 'q': 5, 'c1': 3, 'c2': 4, 'c3': -1}
+        tasks = {}
+        for summary, order_num in order_nums.items():
+            task = pl.create_task(summary)
+            task.order_num = order_num
+            tasks[summary] = task
+        tasks['p'].id = 1
+        tasks['q'].id = 2
+        for summary in ('c1', 'c2', 'c3'):
+            tasks[summary].parent = tasks['p']
+        for task in tasks.values():
+            pl.add(task)
+        pl.commit()
+        ids = {summary: task.id for summary, task in tasks.items()}
+
+        # when
+        pl.execute(text(read_script()))
+        pl.commit()
+
+        # then
+        pl.db.session.expire_all()
+        actual = {summary: pl.get_task(ids[summary]).order_num
+                  for summary in tasks}
+        # ties are broken by id, lowest id first
+        assert actual == {'p': 2048, 'q': 1024,
+                          'c2': 3072, 'c1': 2048, 'c3': 1024}
@@ -0,0 +1,437 @@
+from datetime import datetime, timedelta
+
+from models.object_types import ObjectTypes
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class ArchiveTasksTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.old = datetime(2020, 1, 1)
+        self.cutoff = datetime(2021, 1, 1)
+        self.recent = datetime(2022, 1, 1)
+
+    def add_task(self, summary, task_id, is_done=False, is_deleted=False,
+                 date_last_updated=None, parent=None):
+        if date_last_updated is None:
+            date_last_updated = self.old
+        task = self.pl.create_task(summary, is_done=is_done,
+                                   is_deleted=is_deleted,
+                                   date_last_updated=date_last_updated)
+        task.id = task_id
+        task.parent = parent
+        self.pl.add(task)
+        return task
+
+    def add_newest(self):
+        # an unfinished task, which is never archived
+        return self.add_task('newest', 100)
+
+    def archived_ids(self):
+        return sorted(self.pl.get_archived_task_ids())
+
+    def test_archives_tasks_finished_before_the_cutoff(self):
+        # given
+        self.add_task('done', 1, is_done=True)
+        self.add_task('deleted', 2, is_deleted=True)
+        self.add_task('recent', 3, is_done=True,
+                      date_last_updated=self.recent)
+        self.add_task('open', 4)
+        self.add_newest()
+        self.pl.commit()
+        # when
+        counts = self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # then
+        self.assertEqual(2, counts['tasks'])
+        self.assertEqual([1, 2], self.archived_ids())
+        self.assertEqual([3, 4, 100],
+                         sorted(t.id for t in self.pl.get_tasks()))
+        self.assertIsNone(self.pl.get_task(1))
+
+    def test_archived_ids_are_not_handed_out_again(self):
+        # given the archived rows have the highest ids
+        done = self.pl.create_task('done', is_done=True,
+                                   date_last_updated=self.old)
+        comment = self.pl.create_comment('comment')
+        comment.task = done
+        attachment = self.pl.create_attachment('path')
+        attachment.task = done
+        for obj in [done, comment, attachment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        ids = (done.id, comment.id, attachment.id)
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # precondition
+        self.assertEqual(0, self.pl.count_tasks())
+        # when
+        task = self.pl.create_task('new')
+        comment = self.pl.create_comment('new')
+        comment.task = task
+        attachment = self.pl.create_attachment('new')
+        attachment.task = task
+        for obj in [task, comment, attachment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        # then
+        self.assertGreater(task.id, ids[0])
+        self.assertGreater(comment.id, ids[1])
+        self.assertGreater(attachment.id, ids[2])
+        # and the archived task can still come back
+        self.assertEqual([ids[0]], self.pl.unarchive_tasks([ids[0]]))
+        self.pl.commit()
+        self.assertEqual(2, self.pl.count_tasks())
+
+    def test_bulk_inserts_skip_archived_ids(self):
+        # given
+        done = self.pl.create_task('done', is_done=True,
+                                   date_last_updated=self.old)
+        self.pl.add(done)
+        self.pl.commit()
+        done_id = done.id
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # when
+        ids = self.pl.bulk_insert(ObjectTypes.Task, [
+            {'summary': 'a', 'order_num': 0},
+            {'summary': 'b', 'order_num': 0}])
+        self.pl.commit()
+        # then
+        self.assertEqual(2, len(set(ids)))
+        self.assertTrue(all(task_id > done_id for task_id in ids))
+
+    def test_keeps_subtrees_with_unfinished_tasks(self):
+        # given
+        parent = self.add_task('parent', 1, is_done=True)
+        self.add_task('child', 2, parent=parent)
+        parent2 = self.add_task('parent2', 3, is_done=True)
+        self.add_task('child2', 4, is_done=True, parent=parent2)
+        self.add_task('child3', 5, is_done=True, parent=parent)
+        self.add_newest()
+        self.pl.commit()
+        # when
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # then
+        self.assertEqual([3, 4, 5], self.archived_ids())
+
+    def test_moves_comments_attachments_and_links(self):
+        # given
+        done = self.add_task('done', 1, is_done=True)
+        other = self.add_task('other', 2)
+        newest = self.add_newest()
+        tag = self.pl.create_tag('tag')
+        user = self.pl.create_user('user@example.com')
+        done.tags.append(tag)
+        done.users.append(user)
+        done.dependees.append(other)
+        comment = self.pl.create_comment('comment')
+        comment.task = done
+        attachment = self.pl.create_attachment('path')
+        attachment.task = done
+        newest_comment = self.pl.create_comment('newest')
+        newest_comment.task = newest
+        newest_attachment = self.pl.create_attachment('newest')
+        newest_attachment.task = newest
+        for obj in [tag, user, comment, attachment, newest_comment,
+                    newest_attachment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        # when
+        counts = self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # then
+        self.assertEqual({'tasks': 1, 'comments': 1, 'attachments': 1,
+                          'links': 3}, counts)
+        self.assertEqual(1, self.pl.count_comments())
+        self.assertEqual(1, self.pl.count_attachments())
+        self.assertEqual([], list(self.pl.get_tag(tag.id).tasks))
+        self.assertEqual([], list(self.pl.get_task(2).dependants))
+
+    def test_unarchive_brings_everything_back(self):
+        # given
+        done = self.add_task('done', 1, is_done=True)
+        other = self.add_task('other', 2)
+        newest = self.add_newest()
+        tag = self.pl.create_tag('tag')
+        done.tags.append(tag)
+        done.dependees.append(other)
+        comment = self.pl.create_comment('comment')
+        comment.task = done
+        newest_comment = self.pl.create_comment('newest')
+        newest_comment.task = newest
+        for obj in [tag, comment, newest_comment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # when
+        result = self.pl.unarchive_tasks([1])
+        self.pl.commit()
+        # then
+        self.assertEqual([1], result)
+        self.assertEqual([], self.archived_ids())
+        task = self.pl.get_task(1)
+        self.assertEqual('done', task.summary)
+        self.assertEqual([tag], list(task.tags))
+        self.assertEqual([other], list(task.dependees))
+        self.assertEqual(['comment'], [c.content for c in task.comments])
+
+    def test_unarchive_brings_back_archived_ancestors(self):
+        # given
+        parent = self.add_task('parent', 1, is_done=True)
+        child = self.add_task('child', 2, is_done=True, parent=parent)
+        self.add_task('grandchild', 3, is_done=True, parent=child)
+        self.add_newest()
+        self.pl.commit()
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # when
+        result = self.pl.unarchive_tasks([2])
+        self.pl.commit()
+        # then
+        self.assertEqual([1, 2], result)
+        self.assertEqual([3], self.archived_ids())
+        self.assertEqual(1, self.pl.get_task(2).parent.id)
+
+    def test_link_between_archived_tasks_waits_for_both(self):
+        # given
+        t1 = self.add_task('t1', 1, is_done=True)
+        t2 = self.add_task('t2', 2, is_done=True)
+        t1.dependees.append(t2)
+        self.add_newest()
+        self.pl.commit()
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # when
+        self.pl.unarchive_tasks([1])
+        self.pl.commit()
+        # then
+        self.assertEqual([], list(self.pl.get_task(1).dependees))
+        # when
+        self.pl.unarchive_tasks([2])
+        self.pl.commit()
+        # then
+        self.assertEqual([2], [t.id for t in self.pl.get_task(1).dependees])
+
+    def test_unarchive_ignores_unknown_ids(self):
+        # when
+        result = self.pl.unarchive_tasks([1, None])
+        # then
+        self.assertEqual([], result)
+
+    def test_get_archived_task_ids_by_is_deleted(self):
+        # given
+        self.add_task('done', 1, is_done=True)
+        self.add_task('deleted', 2, is_deleted=True)
+        self.add_newest()
+        self.pl.commit()
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # expect
+        self.assertEqual([2], self.pl.get_archived_task_ids(is_deleted=True))
+        self.assertEqual([1], self.pl.get_archived_task_ids(is_deleted=False))
+
+    def test_get_task_reads_through_to_the_archive(self):
+        # given
+        done = self.add_task('done', 1, is_done=True)
+        child = self.add_task('child', 2, is_done=True, parent=done)
+        other = self.add_task('other', 3)
+        newest = self.add_newest()
+        tag = self.pl.create_tag('tag')
+        done.tags.append(tag)
+        done.dependees.append(other)
+        child.prioritize_before.append(done)
+        comment = self.pl.create_comment('comment')
+        comment.task = done
+        attachment = self.pl.create_attachment('path')
+        attachment.task = done
+        newest_comment = self.pl.create_comment('newest')
+        newest_comment.task = newest
+        newest_attachment = self.pl.create_attachment('newest')
+        newest_attachment.task = newest
+        for obj in [tag, comment, attachment, newest_comment,
+                    newest_attachment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        attachment_id = attachment.id
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # precondition
+        self.assertEqual([1, 2], self.archived_ids())
+        self.assertIsNone(self.pl.get_task(1))
+        # when
+        task = self.pl.get_task(1, include_archived=True)
+        # then
+        self.assertTrue(task.is_archived)
+        self.assertEqual('done', task.summary)
+        self.assertEqual(['tag'], [t.value for t in task.tags])
+        self.assertEqual([3], [t.id for t in task.dependees])
+        self.assertEqual([2], [t.id for t in task.prioritize_after])
+        self.assertEqual([2], [t.id for t in task.children])
+        self.assertEqual(['comment'], [c.content for c in task.comments])
+        self.assertEqual(['path'], [a.path for a in task.attachments])
+        self.assertEqual([1], [t.id for t in task.children[0]
+                               .prioritize_before])
+        self.assertEqual('path', self.pl.get_attachment(
+            attachment_id, include_archived=True).path)
+        self.assertIsNone(self.pl.get_attachment(attachment_id))
+        self.assertEqual([1, 2], self.archived_ids())
+
+    def test_get_archived_task_ids_owning(self):
+        # given
+        self.add_task('done', 1, is_done=True)
+        done2 = self.add_task('done2', 2, is_done=True)
+        self.add_task('done3', 3, is_done=True)
+        newest = self.add_newest()
+        comment = self.pl.create_comment('comment')
+        comment.task = done2
+        newest_comment = self.pl.create_comment('newest')
+        newest_comment.task = newest
+        for obj in [comment, newest_comment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        comment_id = comment.id
+        newest_comment_id = newest_comment.id
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # expect
+        self.assertEqual([1, 2], self.pl.get_archived_task_ids_owning(
+            task_ids=[1, 100, 200],
+            comment_ids=[comment_id, newest_comment_id]))
+        self.assertEqual([], self.pl.get_archived_task_ids_owning())
+
+    def test_export_rows_include_both_tiers(self):
+        # given
+        done = self.add_task('done', 1, is_done=True)
+        other = self.add_task('other', 2)
+        newest = self.add_newest()
+        tag = self.pl.create_tag('tag')
+        done.tags.append(tag)
+        done.dependees.append(other)
+        comment = self.pl.create_comment('comment')
+        comment.task = done
+        newest_comment = self.pl.create_comment('newest')
+        newest_comment.task = newest
+        for obj in [tag, comment, newest_comment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        tag_id = tag.id
+        comment_id = comment.id
+        self.pl.archive_tasks(self.cutoff)
+        self.pl.commit()
+        # when
+        tasks = list(self.pl.get_export_rows(ObjectTypes.Task))
+        comments = list(self.pl.get_export_rows(ObjectTypes.Comment))
+        tags = list(self.pl.get_export_rows(ObjectTypes.Tag))
+        # then
+        self.assertEqual([1, 2, 100], [t['id'] for t in tasks])
+        self.assertEqual('done', tasks[0]['summary'])
+        self.assertEqual([tag_id], tasks[0]['tag_ids'])
+        self.assertEqual([2], tasks[0]['dependee_ids'])
+        self.assertEqual([1], tasks[1]['dependant_ids'])
+        self.assertEqual([comment_id], tasks[0]['comment_ids'])
+        self.assertEqual([1, 100], [c['task_id'] for c in comments])
+        self.assertEqual([1], tags[0]['task_ids'])
+        self.assertEqual([1], self.archived_ids())
+        self.assertIsNone(self.pl.get_task(1))
+
+
+class IncludeArchivedTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        old = datetime(2020, 1, 1)
+        self.user = self.pl.create_user('user@example.com')
+        self.pl.add(self.user)
+        self.tasks = {}
+        for i, (summary, is_done, order_num) in enumerate(
+                [('p1', True, 5), ('c1', True, 1), ('p2', False, 4),
+                 ('c2', True, 3), ('c3', False, 2), ('newest', False, 0)],
+                start=1):
+            task = self.pl.create_task(summary, is_done=is_done,
+                                       date_last_updated=old)
+            task.id = i
+            task.order_num = order_num
+            task.users.append(self.user)
+            self.pl.add(task)
+            self.tasks[summary] = task
+        self.tasks['c1'].parent = self.tasks['p1']
+        self.tasks['c2'].parent = self.tasks['p2']
+        self.tasks['c3'].parent = self.tasks['p2']
+        self.pl.commit()
+        self.pl.archive_tasks(old + timedelta(days=1))
+        self.pl.commit()
+
+    def test_setup(self):
+        self.assertEqual([1, 2, 4], sorted(self.pl.get_archived_task_ids()))
+
+    def test_get_tasks_merges_both_tiers_in_order(self):
+        # when
+        result = list(self.pl.get_tasks(
+            order_by=[[self.pl.ORDER_NUM, self.pl.DESCENDING]],
+            include_archived=True))
+        # then
+        self.assertEqual(['p1', 'p2', 'c2', 'c3', 'c1', 'newest'],
+                         [t.summary for t in result])
+        self.assertEqual([True, False, True, False, True, False],
+                         [t.is_archived for t in result])
+
+    def test_get_tasks_filters_archived_tasks(self):
+        # when
+        result = list(self.pl.get_tasks(
+            is_public_or_users_contains=self.user, parent_id=3,
+            include_archived=True))
+        # then
+        self.assertEqual(['c2', 'c3'], sorted(t.summary for t in result))
+
+    def test_archived_tasks_have_users_and_parent(self):
+        # when
+        c2 = list(self.pl.get_tasks(task_id_in=[4], include_archived=True))[0]
+        # then
+        self.assertEqual([self.user], list(c2.users))
+        self.assertIs(self.tasks['p2'], c2.parent)
+
+    def test_count_tasks(self):
+        # expect
+        self.assertEqual(3, self.pl.count_tasks())
+        self.assertEqual(6, self.pl.count_tasks(include_archived=True))
+
+    def test_get_paginated_tasks(self):
+        # when
+        pager = self.pl.get_paginated_tasks(
+            order_by=[[self.pl.ORDER_NUM, self.pl.DESCENDING]],
+            page_num=2, tasks_per_page=4, include_archived=True)
+        # then
+        self.assertEqual(6, pager.total)
+        self.assertEqual(2, pager.num_pages)
+        self.assertEqual(['c1', 'newest'], [t.summary for t in pager.items])
+
+    def test_get_paginated_tasks_with_cursor(self):
+        # when
+        first = self.pl.get_paginated_tasks(
+            tasks_per_page=4, cursor='', include_archived=True)
+        second = self.pl.get_paginated_tasks(
+            tasks_per_page=4, cursor=first.next_cursor,
+            include_archived=True)
+        # then
+        self.assertEqual(['p1', 'p2', 'c2', 'c3'],
+                         [t.summary for t in first.items])
+        self.assertEqual(['c1', 'newest'], [t.summary for t in second.items])
+
+    def test_get_subtree_crosses_into_the_archive(self):
+        # when
+        result = list(self.pl.get_subtree(
+            is_public_or_users_contains=self.user, include_archived=True))
+        # then
+        self.assertEqual([('p1', 0), ('p2', 0), ('newest', 0), ('c2', 1),
+                          ('c3', 1), ('c1', 1)],
+                         [(t.summary, depth) for t, depth in result])
+
+    def test_get_subtree_without_archive(self):
+        # when
+        result = list(self.pl.get_subtree())
+        # then
+        self.assertEqual(['p2', 'newest', 'c3'],
+                         [t.summary for t, depth in result])
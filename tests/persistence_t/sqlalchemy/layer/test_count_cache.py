@@ -0,0 +1,98 @@
+from sqlalchemy import event
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class PaginatedTasksCountCacheTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        for i in range(1, 8):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = i
+            task.order_num = i
+            self.pl.add(task)
+        self.pl.commit()
+
+    def paginate(self, page_num=1, **kwargs):
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.pl.db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            pager = self.pl.get_paginated_tasks(page_num=page_num,
+                                                tasks_per_page=3, **kwargs)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        counts = [s for s in statements if 'count(' in s.lower()]
+        return pager, len(counts)
+
+    def test_other_pages_of_the_same_listing_do_not_recount(self):
+        # when
+        pager1, counts1 = self.paginate(1, is_done=False)
+        pager2, counts2 = self.paginate(2, is_done=False)
+        pager3, counts3 = self.paginate(3, is_done=False)
+        # then
+        self.assertEqual((1, 0, 0), (counts1, counts2, counts3))
+        self.assertEqual(7, pager3.total)
+        self.assertEqual(3, pager3.num_pages)
+        self.assertEqual(1, len(pager3.items))
+
+    def test_different_filters_are_counted_separately(self):
+        # given
+        self.paginate(is_done=False)
+        # when
+        pager, counts = self.paginate(parent_id=None)
+        # then
+        self.assertEqual(1, counts)
+        self.assertEqual(7, pager.total)
+
+    def test_committed_task_write_invalidates(self):
+        # given
+        self.paginate(is_done=False)
+        task = self.pl.get_task(1)
+        task.is_done = True
+        self.pl.commit()
+        # when
+        pager, counts = self.paginate(is_done=False)
+        # then
+        self.assertEqual(1, counts)
+        self.assertEqual(6, pager.total)
+
+    def test_bulk_write_invalidates(self):
+        # given
+        self.paginate(is_done=False)
+        self.pl.update_subtree(1, {'is_done': True})
+        self.pl.commit()
+        # when
+        pager, counts = self.paginate(is_done=False)
+        # then
+        self.assertEqual(1, counts)
+        self.assertEqual(6, pager.total)
+
+    def test_uncommitted_writes_are_not_cached(self):
+        # given
+        self.paginate(is_done=False)
+        task = self.pl.create_task('t8')
+        task.id = 8
+        self.pl.add(task)
+        # when
+        pager, counts = self.paginate(is_done=False)
+        self.pl.rollback()
+        pager2, counts2 = self.paginate(is_done=False)
+        # then
+        self.assertEqual(8, pager.total)
+        self.assertEqual(1, counts)
+        self.assertEqual(7, pager2.total)
+
+    def test_option_write_does_not_invalidate(self):
+        # given
+        self.paginate(is_done=False)
+        self.pl.add(self.pl.create_option('key', 'value'))
+        self.pl.commit()
+        # when
+        pager, counts = self.paginate(is_done=False)
+        # then
+        self.assertEqual(0, counts)
@@ -0,0 +1,84 @@
+from datetime import datetime
+from decimal import Decimal
+
+from models.object_types import ObjectTypes
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class GetExportRowsTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.t1 = self.pl.create_task('t1', deadline=datetime(2020, 1, 2),
+                                      expected_cost=Decimal('1.50'))
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('t3')
+        self.t3.id = 3
+        self.t2.parent = self.t1
+        self.t3.parent = self.t1
+        self.t2.dependees.append(self.t3)
+        self.t3.prioritize_before.append(self.t2)
+        self.tag = self.pl.create_tag('tag')
+        self.t1.tags.append(self.tag)
+        self.user = self.pl.create_user('user@example.com')
+        self.t2.users.append(self.user)
+        self.comment = self.pl.create_comment('comment')
+        self.comment.id = 1
+        self.comment.task = self.t1
+        self.loose_comment = self.pl.create_comment('loose')
+        self.loose_comment.id = 2
+        self.attachment = self.pl.create_attachment('a.txt')
+        self.attachment.task = self.t3
+        self.option = self.pl.create_option('key', 'value')
+        for obj in (self.t1, self.t2, self.t3, self.tag, self.user,
+                    self.comment, self.loose_comment, self.attachment,
+                    self.option):
+            self.pl.add(obj)
+        self.pl.commit()
+
+    def assert_rows_match(self, object_type, objects, batch_size=1000):
+        # when
+        rows = list(self.pl.get_export_rows(object_type,
+                                            batch_size=batch_size))
+        # then
+        self.assertEqual([o.to_flat_dict() for o in objects], rows)
+
+    def test_task_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.Task, [self.t1, self.t2, self.t3])
+
+    def test_task_rows_match_across_batches(self):
+        self.assert_rows_match(ObjectTypes.Task, [self.t1, self.t2, self.t3],
+                               batch_size=2)
+
+    def test_tag_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.Tag, [self.tag])
+
+    def test_user_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.User, [self.user])
+
+    def test_comment_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.Comment,
+                               [self.comment, self.loose_comment])
+
+    def test_attachment_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.Attachment, [self.attachment])
+
+    def test_option_rows_match_to_flat_dict(self):
+        self.assert_rows_match(ObjectTypes.Option, [self.option])
+
+    def test_loaded_objects_are_expunged(self):
+        # given
+        self.pl.db.session.expunge_all()
+        # when
+        rows = list(self.pl.get_export_rows(ObjectTypes.Task, batch_size=1))
+        # then
+        self.assertEqual(3, len(rows))
+        self.assertEqual(0, len(self.pl.db.session.identity_map))
+
+    def test_objects_already_in_session_are_kept(self):
+        # when
+        list(self.pl.get_export_rows(ObjectTypes.Task))
+        # then
+        self.assertIn(self.t1, self.pl.db.session)
+        self.assertIs(self.t1, self.pl.get_task(1))
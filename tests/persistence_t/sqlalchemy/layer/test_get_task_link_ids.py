@@ -0,0 +1,51 @@
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class GetTaskLinkIdsTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.t1 = self.pl.create_task('t1')
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('t3')
+        self.t3.id = 3
+        self.tag = self.pl.create_tag('tag')
+        self.tag.id = 10
+        for obj in [self.t1, self.t2, self.t3, self.tag]:
+            self.pl.add(obj)
+        self.pl.commit()
+
+    def test_gets_tag_ids_by_task(self):
+        # given
+        self.t1.tags.append(self.tag)
+        self.pl.commit()
+        # when
+        result = self.pl.get_task_link_ids('tags', [1, 2])
+        # then
+        self.assertEqual({1: [10], 2: []}, result)
+
+    def test_gets_dependee_ids_by_task(self):
+        # given
+        self.t1.dependees.append(self.t3)
+        self.t1.dependees.append(self.t2)
+        self.t2.dependees.append(self.t3)
+        self.pl.commit()
+        # when
+        result = self.pl.get_task_link_ids('dependees', [1, 2, 3])
+        # then
+        self.assertEqual({1: [2, 3], 2: [3], 3: []}, result)
+
+    def test_gets_prioritize_before_ids_by_task(self):
+        # given
+        self.t1.prioritize_before.append(self.t2)
+        self.pl.commit()
+        # when
+        result = self.pl.get_task_link_ids('prioritize_before', [1, 2])
+        # then
+        self.assertEqual({1: [2], 2: []}, result)
+
+    def test_unknown_relationship_raises(self):
+        # expect
+        self.assertRaises(Exception, self.pl.get_task_link_ids,
+                          'children', [1])
@@ -0,0 +1,67 @@
+from sqlalchemy import event
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class GetTasksByIdsTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.t1 = self.pl.create_task('t1')
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('t2')
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('t3')
+        self.t3.id = 3
+        for task in [self.t1, self.t2, self.t3]:
+            self.pl.add(task)
+        self.pl.commit()
+
+    def count_selects(self, func, *args):
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.pl.db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            result = func(*args)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        return result, len(statements)
+
+    def test_gets_tasks_by_id(self):
+        # when
+        result = self.pl.get_tasks_by_ids([1, 3])
+        # then
+        self.assertEqual({1: self.t1, 3: self.t3}, result)
+
+    def test_missing_ids_are_left_out(self):
+        # when
+        result = self.pl.get_tasks_by_ids([2, 4, None])
+        # then
+        self.assertEqual({2: self.t2}, result)
+
+    def test_empty_ids_gets_nothing(self):
+        # when
+        result = self.pl.get_tasks_by_ids([])
+        # then
+        self.assertEqual({}, result)
+
+    def test_fetches_all_tasks_with_one_query(self):
+        # when
+        result, count = self.count_selects(self.pl.get_tasks_by_ids,
+                                           [1, 2, 3])
+        # then
+        self.assertEqual({1: self.t1, 2: self.t2, 3: self.t3}, result)
+        self.assertEqual(1, count)
+
+    def test_reuses_loaded_tasks_without_querying(self):
+        # given
+        self.assertEqual('t1', self.t1.summary)
+        self.assertEqual('t2', self.t2.summary)
+        # when
+        result, count = self.count_selects(self.pl.get_tasks_by_ids, [1, 2])
+        # then
+        self.assertEqual({1: self.t1, 2: self.t2}, result)
+        self.assertEqual(0, count)
@@ -0,0 +1,42 @@
+from sqlalchemy import inspect, insert
+from sqlalchemy.exc import IntegrityError
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class IndexesTest(PersistenceLayerTestBase):
+    def get_index_names(self, table_name):
+        inspector = inspect(self.pl.db.session.connection())
+        return {ix['name'] for ix in inspector.get_indexes(table_name)}
+
+    def test_task_indexes_are_created(self):
+        # when
+        names = self.get_index_names('task')
+        # then
+        self.assertIn('ix_task_parent_id_order_num', names)
+        self.assertIn('ix_task_parent_id_is_deleted_is_done_order_num',
+                      names)
+        self.assertIn('ix_task_deadline', names)
+
+    def test_link_table_indexes_are_created(self):
+        # expect
+        self.assertIn('ix_users_tasks_user_id_task_id',
+                      self.get_index_names('users_tasks'))
+        self.assertIn('ix_tags_tasks_task_id',
+                      self.get_index_names('tags_tasks'))
+        self.assertIn('ix_comment_task_id',
+                      self.get_index_names('comment'))
+
+    def test_duplicate_user_task_link_is_rejected(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        task = self.pl.create_task('task')
+        task.users.append(user)
+        self.pl.add(user)
+        self.pl.add(task)
+        self.pl.commit()
+        # expect
+        with self.assertRaises(IntegrityError):
+            self.pl.db.session.execute(
+                insert(self.pl.users_tasks_table).values(
+                    user_id=user.id, task_id=task.id))
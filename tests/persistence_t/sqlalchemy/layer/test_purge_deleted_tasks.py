@@ -0,0 +1,173 @@
+from sqlalchemy import event
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class PurgeDeletedTasksTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.tasks = {}
+        for i, summary in enumerate(['t1', 't2', 't3'], start=1):
+            task = self.pl.create_task(summary)
+            task.id = i
+            self.pl.add(task)
+            self.tasks[summary] = task
+        self.pl.commit()
+
+    def test_purges_only_deleted_tasks(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        t3.is_deleted = True
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual(2, counts['tasks'])
+        self.assertEqual([2], [task.id for task in self.pl.get_tasks()])
+        self.assertIsNone(self.pl.get_task(1))
+        self.assertIsNone(self.pl.get_task(3))
+
+    def test_task_ids_limits_the_purge(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        t3.is_deleted = True
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks(task_ids=[1, 2])
+        self.pl.commit()
+        # then
+        self.assertEqual(1, counts['tasks'])
+        self.assertEqual([2, 3], sorted(task.id for task in
+                                        self.pl.get_tasks()))
+
+    def test_uncommitted_deletions_are_included(self):
+        # given
+        self.tasks['t1'].is_deleted = True
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual(1, counts['tasks'])
+        self.assertEqual(2, self.pl.count_tasks())
+
+    def test_removes_comments_attachments_and_links(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        tag = self.pl.create_tag('tag')
+        user = self.pl.create_user('user@example.com')
+        t1.tags.append(tag)
+        t1.users.append(user)
+        t1.dependees.append(t2)
+        t3.dependees.append(t1)
+        t1.prioritize_before.append(t2)
+        comment = self.pl.create_comment('comment')
+        comment.task = t1
+        attachment = self.pl.create_attachment('a.txt')
+        attachment.task = t1
+        other_attachment = self.pl.create_attachment('b.txt')
+        other_attachment.task = t2
+        for obj in [tag, user, comment, attachment, other_attachment]:
+            self.pl.add(obj)
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual({'tasks': 1, 'comments': 1, 'attachments': 1,
+                          'links': 5, 'children': 0}, counts)
+        self.assertEqual(['a.txt'], paths)
+        self.assertEqual(0, self.pl.count_comments())
+        self.assertEqual([other_attachment],
+                         list(self.pl.get_attachments()))
+        # and
+        self.assertEqual([], list(tag.tasks))
+        self.assertEqual([], list(user.tasks))
+        self.assertEqual([], list(t2.dependants))
+        self.assertEqual([], list(t2.prioritize_after))
+        self.assertEqual([], list(t3.dependees))
+
+    def test_shared_attachment_paths_are_not_returned(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        attachment = self.pl.create_attachment('a.txt')
+        attachment.task = t1
+        other_attachment = self.pl.create_attachment('a.txt')
+        other_attachment.task = t2
+        self.pl.add(attachment)
+        self.pl.add(other_attachment)
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual(1, counts['attachments'])
+        self.assertEqual([], paths)
+
+    def test_surviving_children_become_top_level(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        t2.parent = t1
+        t3.parent = t2
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual(1, counts['children'])
+        self.assertIsNone(t2.parent)
+        self.assertIs(t2, t3.parent)
+
+    def test_deleted_children_are_purged_with_their_parent(self):
+        # given
+        t1, t2, t3 = self.tasks.values()
+        t1.is_deleted = True
+        t2.is_deleted = True
+        t2.parent = t1
+        self.pl.commit()
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual(2, counts['tasks'])
+        self.assertEqual(0, counts['children'])
+        self.assertEqual([t3], list(self.pl.get_tasks()))
+
+    def test_nothing_deleted_does_nothing(self):
+        # when
+        counts, paths = self.pl.purge_deleted_tasks()
+        self.pl.commit()
+        # then
+        self.assertEqual({'tasks': 0, 'comments': 0, 'attachments': 0,
+                          'links': 0, 'children': 0}, counts)
+        self.assertEqual(3, self.pl.count_tasks())
+
+    def test_statement_count_does_not_depend_on_number_of_tasks(self):
+        # given
+        for i in range(100, 300):
+            task = self.pl.create_task('deleted {}'.format(i))
+            task.id = i
+            task.is_deleted = True
+            self.pl.add(task)
+        self.pl.commit()
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.pl.db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            # when
+            counts, paths = self.pl.purge_deleted_tasks()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.pl.commit()
+        # then
+        self.assertEqual(200, counts['tasks'])
+        self.assertEqual(9, len(statements))
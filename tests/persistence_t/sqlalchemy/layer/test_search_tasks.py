@@ -0,0 +1,114 @@
+from persistence.search import SNIPPET_START, SNIPPET_END
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class SearchTasksTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.t1 = self.pl.create_task('one two three')
+        self.t1.id = 1
+        self.t2 = self.pl.create_task('four', description='two five')
+        self.t2.id = 2
+        self.t3 = self.pl.create_task('six', description='seven')
+        self.t3.id = 3
+        self.t4 = self.pl.create_task('twice two')
+        self.t4.id = 4
+        self.pl.add(self.t1)
+        self.pl.add(self.t2)
+        self.pl.add(self.t3)
+        self.pl.add(self.t4)
+        self.pl.commit()
+
+    def test_empty_term_yields_nothing(self):
+        # when
+        results = list(self.pl.search_tasks(''))
+        # then
+        self.assertEqual([], results)
+        self.assertEqual(0, self.pl.count_search_results(''))
+
+    def test_summary_matches_rank_above_description_matches(self):
+        # when
+        results = list(self.pl.search_tasks('two'))
+        # then
+        self.assertEqual({self.t1, self.t2, self.t4},
+                         set(r.task for r in results))
+        self.assertIs(self.t2, results[-1].task)
+        self.assertGreater(results[0].rank, results[-1].rank)
+
+    def test_tokens_match_as_prefixes(self):
+        # when
+        results = list(self.pl.search_tasks('sev'))
+        # then
+        self.assertEqual([self.t3], [r.task for r in results])
+
+    def test_all_tokens_must_match(self):
+        # when
+        results = list(self.pl.search_tasks('two three'))
+        # then
+        self.assertEqual([self.t1], [r.task for r in results])
+
+    def test_search_is_case_insensitive(self):
+        # when
+        results = list(self.pl.search_tasks('THREE'))
+        # then
+        self.assertEqual([self.t1], [r.task for r in results])
+
+    def test_query_syntax_is_not_interpreted(self):
+        # when
+        results = list(self.pl.search_tasks('"two" OR (six) NOT*'))
+        # then
+        self.assertEqual([], results)
+
+    def test_snippet_marks_matched_terms(self):
+        # when
+        results = list(self.pl.search_tasks('three'))
+        # then
+        self.assertEqual(1, len(results))
+        self.assertIn('{}three{}'.format(SNIPPET_START, SNIPPET_END),
+                      results[0].snippet)
+
+    def test_limit_and_offset(self):
+        # given
+        expected = [r.task for r in self.pl.search_tasks('two')]
+        # when
+        results = list(self.pl.search_tasks('two', limit=1, offset=1))
+        # then
+        self.assertEqual(expected[1:2], [r.task for r in results])
+
+    def test_count_search_results(self):
+        # expect
+        self.assertEqual(3, self.pl.count_search_results('two'))
+        self.assertEqual(1, self.pl.count_search_results('seven'))
+        self.assertEqual(0, self.pl.count_search_results('eight'))
+
+    def test_users_contains_filters_results(self):
+        # given
+        user = self.pl.create_user('user@example.com')
+        self.pl.add(user)
+        self.t2.users.append(user)
+        self.pl.commit()
+        # when
+        results = list(self.pl.search_tasks('two', users_contains=user))
+        # then
+        self.assertEqual([self.t2], [r.task for r in results])
+        self.assertEqual(
+            1, self.pl.count_search_results('two', users_contains=user))
+
+    def test_edited_task_is_reindexed(self):
+        # given
+        self.t3.summary = 'eight'
+        self.pl.commit()
+        # when
+        results = list(self.pl.search_tasks('eight'))
+        # then
+        self.assertEqual([self.t3], [r.task for r in results])
+        self.assertEqual([], list(self.pl.search_tasks('six')))
+
+    def test_deleted_task_is_removed_from_index(self):
+        # given
+        self.pl.delete(self.t3)
+        self.pl.commit()
+        # when
+        results = list(self.pl.search_tasks('seven'))
+        # then
+        self.assertEqual([], results)
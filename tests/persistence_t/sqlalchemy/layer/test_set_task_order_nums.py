@@ -0,0 +1,52 @@
+from datetime import datetime
+from unittest.mock import patch
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class SetTaskOrderNumsTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.timestamp = datetime(2020, 1, 1)
+        self.tasks = []
+        for i in range(1, 6):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = i
+            task.order_num = i
+            self.pl.add(task)
+            self.tasks.append(task)
+        self.pl.commit()
+
+    def test_sets_order_nums_and_date_last_updated(self):
+        # given
+        t1, t2, t3, t4, t5 = self.tasks
+        # when
+        self.pl.set_task_order_nums({1: 10, 3: 30}, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual(10, t1.order_num)
+        self.assertEqual(30, t3.order_num)
+        self.assertEqual(self.timestamp, t1.date_last_updated)
+        self.assertEqual(self.timestamp, t3.date_last_updated)
+        # and
+        self.assertEqual(2, t2.order_num)
+        self.assertNotEqual(self.timestamp, t2.date_last_updated)
+
+    def test_empty_does_nothing(self):
+        # when
+        self.pl.set_task_order_nums({}, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual([1, 2, 3, 4, 5],
+                         [task.order_num for task in self.tasks])
+
+    def test_more_tasks_than_batch_size(self):
+        # given
+        order_nums_by_id = {task.id: 100 - task.id for task in self.tasks}
+        # when
+        with patch('persistence.sqlalchemy.layer.ORDER_NUM_BATCH_SIZE', 2):
+            self.pl.set_task_order_nums(order_nums_by_id, self.timestamp)
+        self.pl.commit()
+        # then
+        self.assertEqual([99, 98, 97, 96, 95],
+                         [task.order_num for task in self.tasks])
@@ -0,0 +1,151 @@
+import random
+
+from sqlalchemy import or_, select
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class TaskAccessFiltersTest(PersistenceLayerTestBase):
+    """The users_contains, tags_contains and is_public_or_users_contains
+    filters are EXISTS predicates on the link tables. Check them against
+    the join-based queries they replaced, and against the objects
+    themselves, on a random but fixed data set."""
+
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(1234)
+        self.users = []
+        for i in range(1, 6):
+            user = self.pl.create_user('user{}@example.com'.format(i))
+            user.id = i
+            self.pl.add(user)
+            self.users.append(user)
+        self.tags = []
+        for i in range(1, 5):
+            tag = self.pl.create_tag('tag{}'.format(i))
+            tag.id = i
+            self.pl.add(tag)
+            self.tags.append(tag)
+        self.tasks = []
+        for i in range(1, 121):
+            task = self.pl.create_task('task{}'.format(i),
+                                       is_public=rng.random() < 0.3,
+                                       is_done=rng.random() < 0.3)
+            task.id = i
+            # several users per task, so that a join would duplicate rows
+            for user in rng.sample(self.users, rng.randint(0, 3)):
+                task.users.append(user)
+            for tag in rng.sample(self.tags, rng.randint(0, 2)):
+                task.tags.append(tag)
+            self.pl.add(task)
+            self.tasks.append(task)
+        self.pl.commit()
+
+    def ids(self, tasks):
+        return sorted(task.id for task in tasks)
+
+    def legacy_ids(self, query):
+        return sorted(self.pl.db.session.execute(
+            query.with_only_columns(self.pl.DbTask.id)).scalars())
+
+    def test_users_contains_matches_objects_and_legacy_query(self):
+        DbTask = self.pl.DbTask
+        for user in self.users:
+            # when
+            result = self.ids(self.pl.get_tasks(users_contains=user))
+            # then
+            expected = self.ids(t for t in self.tasks if user in t.users)
+            legacy = self.legacy_ids(
+                select(DbTask).where(DbTask.users.any(id=user.id)))
+            self.assertEqual(expected, result)
+            self.assertEqual(legacy, result)
+            self.assertEqual(len(expected),
+                             self.pl.count_tasks(users_contains=user))
+
+    def test_tags_contains_matches_objects_and_legacy_query(self):
+        DbTask = self.pl.DbTask
+        for tag in self.tags:
+            # when
+            result = self.ids(self.pl.get_tasks(tags_contains=tag))
+            # then
+            expected = self.ids(t for t in self.tasks if tag in t.tags)
+            legacy = self.legacy_ids(
+                select(DbTask).where(DbTask.tags.any(id=tag.id)))
+            self.assertEqual(expected, result)
+            self.assertEqual(legacy, result)
+            self.assertEqual(len(expected),
+                             self.pl.count_tasks(tags_contains=tag))
+
+    def test_is_public_or_users_contains_matches_objects(self):
+        for user in self.users:
+            # when
+            result = self.ids(self.pl.get_tasks(
+                is_public_or_users_contains=user))
+            # then
+            expected = self.ids(t for t in self.tasks
+                                if t.is_public or user in t.users)
+            self.assertEqual(expected, result)
+            self.assertEqual(len(expected), self.pl.count_tasks(
+                is_public_or_users_contains=user))
+
+    def test_is_public_or_users_contains_matches_distinct_legacy_query(self):
+        DbTask = self.pl.DbTask
+        users_tasks = self.pl.users_tasks_table
+        for user in self.users:
+            # when
+            result = self.ids(self.pl.get_tasks(
+                is_public_or_users_contains=user, is_done=False))
+            # then
+            legacy = self.legacy_ids(
+                select(DbTask).outerjoin(
+                    users_tasks, users_tasks.c.task_id == DbTask.id).where(
+                    or_(users_tasks.c.user_id == user.id, DbTask.is_public),
+                    DbTask.is_done.is_(False)).distinct())
+            self.assertEqual(legacy, result)
+
+    def test_combined_filters_match_objects(self):
+        for user in self.users:
+            for tag in self.tags:
+                # when
+                result = self.ids(self.pl.get_tasks(
+                    is_public_or_users_contains=user, tags_contains=tag,
+                    is_done=False))
+                # then
+                expected = self.ids(
+                    t for t in self.tasks
+                    if (t.is_public or user in t.users) and
+                    tag in t.tags and not t.is_done)
+                self.assertEqual(expected, result)
+
+    def test_public_task_with_several_users_is_not_duplicated(self):
+        # given
+        task = self.pl.create_task('shared', is_public=True)
+        task.id = 1000
+        task.users.extend(self.users[:3])
+        self.pl.add(task)
+        self.pl.commit()
+        user = self.users[4]
+        # when
+        tasks = list(self.pl.get_tasks(is_public_or_users_contains=user,
+                                       task_id_in=[1000]))
+        count = self.pl.count_tasks(is_public_or_users_contains=user,
+                                    task_id_in=[1000])
+        pager = self.pl.get_paginated_tasks(
+            is_public_or_users_contains=user, task_id_in=[1000])
+        # then
+        self.assertEqual([task], tasks)
+        self.assertEqual(1, count)
+        self.assertEqual(1, pager.total)
+        self.assertEqual([task], list(pager.items))
+
+    def test_filters_do_not_join_other_tables(self):
+        # when
+        query = self.pl._get_tasks_query(
+            is_public_or_users_contains=self.users[0],
+            users_contains=self.users[1], tags_contains=self.tags[0])
+        # then
+        sql = str(query).upper()
+        self.assertNotIn('JOIN', sql)
+        self.assertNotIn('"USER"', sql)
+        self.assertNotIn('TAG.', sql)
+        self.assertEqual(3, sql.count('EXISTS'))
@@ -0,0 +1,142 @@
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class TransactionTest(PersistenceLayerTestBase):
+    def test_commit_inside_transaction_is_deferred(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        self.pl.begin_transaction()
+        self.pl.add(task)
+        self.pl.commit()
+        self.pl.end_transaction(error=True)
+        # then
+        self.assertEqual(0, self.pl.count_tasks())
+
+    def test_commit_inside_transaction_assigns_ids(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction():
+            self.pl.add(task)
+            self.pl.commit()
+            # then
+            self.assertIsNotNone(task.id)
+
+    def test_outermost_transaction_commits(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction() as stats:
+            self.pl.add(task)
+            self.pl.commit()
+        self.pl.rollback()
+        # then
+        self.assertEqual(1, self.pl.count_tasks())
+        self.assertEqual(1, stats.commit_calls)
+        self.assertEqual(1, stats.commits)
+        self.assertEqual(0, stats.rollbacks)
+
+    def test_nested_transactions_join_the_outer_one(self):
+        # given
+        t1 = self.pl.create_task('t1')
+        t2 = self.pl.create_task('t2')
+        # when
+        with self.pl.transaction() as outer:
+            with self.pl.transaction() as inner:
+                self.pl.add(t1)
+                self.pl.commit()
+            self.assertTrue(self.pl.in_transaction())
+            self.pl.add(t2)
+            self.pl.commit()
+        # then
+        self.assertIs(outer, inner)
+        self.assertFalse(self.pl.in_transaction())
+        self.assertEqual(2, outer.commit_calls)
+        self.assertEqual(1, outer.commits)
+        self.assertEqual(2, self.pl.count_tasks())
+
+    def test_exception_rolls_back(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.assertRaises(ValueError):
+            with self.pl.transaction() as stats:
+                self.pl.add(task)
+                self.pl.commit()
+                raise ValueError()
+        # then
+        self.assertFalse(self.pl.in_transaction())
+        self.assertEqual(0, self.pl.count_tasks())
+        self.assertEqual(0, stats.commits)
+        self.assertEqual(1, stats.rollbacks)
+
+    def test_error_in_inner_transaction_rolls_back_the_outer_one(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction() as stats:
+            self.pl.add(task)
+            self.pl.commit()
+            try:
+                with self.pl.transaction():
+                    raise ValueError()
+            except ValueError:
+                pass
+        # then
+        self.assertEqual(0, self.pl.count_tasks())
+        self.assertEqual(1, stats.rollbacks)
+
+    def test_counts_flushes(self):
+        # when
+        with self.pl.transaction() as stats:
+            for summary in ['t1', 't2']:
+                self.pl.add(self.pl.create_task(summary))
+                self.pl.commit()
+        # then
+        self.assertEqual(2, stats.flushes)
+
+    def test_end_without_begin_raises(self):
+        # expect
+        self.assertRaises(Exception, self.pl.end_transaction)
+
+    def test_call_after_commit_waits_for_the_commit(self):
+        # given
+        calls = []
+        # when
+        with self.pl.transaction():
+            self.pl.call_after_commit(lambda: calls.append('called'))
+            self.pl.commit()
+            # then
+            self.assertEqual([], calls)
+        self.assertEqual(['called'], calls)
+
+    def test_call_after_commit_is_dropped_on_rollback(self):
+        # given
+        calls = []
+        # when
+        self.pl.begin_transaction()
+        self.pl.call_after_commit(lambda: calls.append('called'))
+        self.pl.end_transaction(error=True)
+        # then
+        self.assertEqual([], calls)
+
+    def test_call_after_commit_outside_a_transaction_calls_right_away(self):
+        # given
+        calls = []
+        # when
+        self.pl.call_after_commit(lambda: calls.append('called'))
+        # then
+        self.assertEqual(['called'], calls)
+
+    def test_expire_on_commit_false_keeps_loaded_state(self):
+        # given
+        task = self.pl.create_task('task')
+        # when
+        with self.pl.transaction(expire_on_commit=False):
+            self.pl.add(task)
+        # then
+        self.assertIn('summary', task.__dict__)
+        # and the session goes back to expiring on commit
+        self.pl.commit()
+        self.assertNotIn('summary', task.__dict__)
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from sqlalchemy import event
+
+from tests.persistence_t.sqlalchemy.util import PersistenceLayerTestBase
+
+
+class UpdateSubtreeTest(PersistenceLayerTestBase):
+    def setUp(self):
+        super().setUp()
+        self.timestamp = datetime(2020, 1, 1)
+        # t1 -> t2 -> t3, t1 -> t4, t5
+        self.tasks = {}
+        for i in range(1, 6):
+            task = self.pl.create_task('t{}'.format(i))
+            task.id = i
+            self.pl.add(task)
+            self.tasks[i] = task
+        self.tasks[2].parent = self.tasks[1]
+        self.tasks[3].parent = self.tasks[2]
+        self.tasks[4].parent = self.tasks[1]
+        self.pl.commit()
+
+    def test_updates_task_and_descendants(self):
+        # when
+        ids = self.pl.update_subtree(
+            1, {'is_done': True, 'date_last_updated': self.timestamp})
+        self.pl.commit()
+        # then
+        self.assertEqual([1, 2, 3, 4], sorted(ids))
+        for i in [1, 2, 3, 4]:
+            self.assertTrue(self.tasks[i].is_done)
+            self.assertEqual(self.timestamp,
+                             self.tasks[i].date_last_updated)
+        self.assertFalse(self.tasks[5].is_done)
+
+    def test_inner_task_does_not_update_ancestors_or_siblings(self):
+        # when
+        ids = self.pl.update_subtree(2, {'is_public': True})
+        self.pl.commit()
+        # then
+        self.assertEqual([2, 3], sorted(ids))
+        self.assertFalse(self.tasks[1].is_public)
+        self.assertTrue(self.tasks[2].is_public)
+        self.assertTrue(self.tasks[3].is_public)
+        self.assertFalse(self.tasks[4].is_public)
+
+    def test_deleted_and_done_descendants_are_included(self):
+        # given
+        self.tasks[2].is_deleted = True
+        self.tasks[4].is_done = True
+        self.pl.commit()
+        # when
+        ids = self.pl.update_subtree(1, {'is_public': True})
+        self.pl.commit()
+        # then
+        self.assertEqual([1, 2, 3, 4], sorted(ids))
+        self.assertTrue(self.tasks[3].is_public)
+
+    def test_uncommitted_changes_are_included(self):
+        # given
+        self.tasks[5].parent = self.tasks[4]
+        # when
+        ids = self.pl.update_subtree(1, {'is_deleted': True})
+        self.pl.commit()
+        # then
+        self.assertEqual([1, 2, 3, 4, 5], sorted(ids))
+        self.assertTrue(self.tasks[5].is_deleted)
+
+    def test_non_existent_root_updates_nothing(self):
+        # when
+        ids = self.pl.update_subtree(99, {'is_done': True})
+        self.pl.commit()
+        # then
+        self.assertEqual([], ids)
+        self.assertFalse(any(task.is_done for task in self.tasks.values()))
+
+    def test_uses_a_single_statement(self):
+        # given
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = self.pl.db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            # when
+            ids = self.pl.update_subtree(1, {'is_done': True})
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.pl.commit()
+        # then
+        self.assertEqual(4, len(ids))
+        self.assertEqual(1, len(statements))
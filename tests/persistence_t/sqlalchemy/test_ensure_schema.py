@@ -0,0 +1,87 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text, inspect
+
+from tudor import generate_app
+
+
+class EnsureSchemaTest(unittest.TestCase):
+    """Open an SQLite file that was created by an earlier version, without
+    the parts of the schema that were added since."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_uri = 'sqlite:///{}'.format(
+            os.path.join(self.tmpdir.name, 'tudor.sqlite'))
+        app = generate_app(db_uri=self.db_uri)
+        with app.app_context():
+            app.pl.create_all()
+            task = app.pl.create_task('one two')
+            task.id = 1
+            app.pl.add(task)
+            app.pl.commit()
+            app.pl.db.engine.dispose()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def execute(self, *statements):
+        app = generate_app(db_uri=self.db_uri)
+        with app.app_context():
+            with app.pl.db.engine.begin() as connection:
+                for statement in statements:
+                    connection.execute(text(statement))
+            app.pl.db.engine.dispose()
+
+    def test_search_table_is_created_and_filled(self):
+        # given
+        self.execute('DROP TRIGGER task_fts_after_insert',
+                     'DROP TRIGGER task_fts_after_delete',
+                     'DROP TRIGGER task_fts_after_update',
+                     'DROP TABLE task_fts')
+        # when
+        app = generate_app(db_uri=self.db_uri)
+        # then
+        with app.app_context():
+            self.assertEqual(
+                [1], [r.task.id for r in app.pl.search_tasks('two')])
+            # and new tasks are indexed too
+            task = app.pl.create_task('two three')
+            task.id = 2
+            app.pl.add(task)
+            app.pl.commit()
+            self.assertEqual(
+                [2], [r.task.id for r in app.pl.search_tasks('three')])
+            app.pl.db.engine.dispose()
+
+    def test_archive_tables_are_created(self):
+        # given
+        self.execute(*('DROP TABLE {}_archive'.format(name) for name in (
+            'task', 'tags_tasks', 'users_tasks', 'task_dependencies',
+            'task_prioritize', 'comment', 'attachment')))
+        # when
+        app = generate_app(db_uri=self.db_uri)
+        # then
+        with app.app_context():
+            self.assertEqual(
+                set(app.pl.archive_tables),
+                {name[:-len('_archive')] for name in inspect(
+                    app.pl.db.engine).get_table_names()
+                 if name.endswith('_archive')})
+            # and reads that include the archive work
+            self.assertEqual(1, app.pl.get_task(1, include_archived=True).id)
+            self.assertIsNone(app.pl.get_task(2, include_archived=True))
+            app.pl.db.engine.dispose()
+
+    def test_database_without_tables_is_left_alone(self):
+        # given
+        db_uri = 'sqlite:///{}'.format(
+            os.path.join(self.tmpdir.name, 'empty.sqlite'))
+        # when
+        app = generate_app(db_uri=db_uri)
+        # then
+        with app.app_context():
+            self.assertEqual([], inspect(app.pl.db.engine).get_table_names())
+            app.pl.db.engine.dispose()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import exc
+
+from persistence.sqlalchemy.pool import InstrumentedQueuePool, \
+    uses_queue_pool
+from tudor import generate_app
+
+
+class UsesQueuePoolTest(unittest.TestCase):
+    def test_file_database_uses_queue_pool(self):
+        self.assertTrue(uses_queue_pool('sqlite:////tmp/tudor.db'))
+        self.assertTrue(uses_queue_pool('postgresql://user@host/tudor'))
+
+    def test_in_memory_database_does_not(self):
+        self.assertFalse(uses_queue_pool('sqlite://'))
+
+
+class InstrumentedQueuePoolTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_uri = 'sqlite:///' + os.path.join(self.tmpdir.name,
+                                                  'tudor.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def generate_app(self, **db_pool_options):
+        app = generate_app(db_uri=self.db_uri,
+                           db_pool_options=db_pool_options)
+        with app.app_context():
+            app.pl.create_all()
+        return app
+
+    def get_engine(self, app):
+        with app.app_context():
+            return app.pl.db.engine
+
+    def test_pool_settings_are_applied(self):
+        # when
+        app = self.generate_app(pool_size=3, max_overflow=2,
+                                pool_timeout=7)
+        # then
+        pool = self.get_engine(app).pool
+        self.assertIsInstance(pool, InstrumentedQueuePool)
+        self.assertEqual(3, pool.size())
+        self.assertEqual(2, pool._max_overflow)
+        self.assertEqual(7, pool._timeout)
+
+    def test_pool_settings_override_db_options(self):
+        # when
+        app = generate_app(db_uri=self.db_uri, db_options='pool_size=5',
+                           db_pool_options={'pool_size': 2})
+        # then
+        self.assertEqual(2, self.get_engine(app).pool.size())
+
+    def test_get_pool_stats(self):
+        # given
+        app = self.generate_app(pool_size=2)
+        # when
+        with app.app_context():
+            app.pl.count_tasks()
+            stats = app.pl.get_pool_stats()
+        # then
+        self.assertEqual(['primary'], list(stats))
+        self.assertEqual(2, stats['primary']['size'])
+        self.assertGreater(stats['primary']['checkouts'], 0)
+        self.assertEqual(0, stats['primary']['waits'])
+        self.assertEqual(0, stats['primary']['overflow'])
+
+    def test_in_memory_database_has_no_pool_stats(self):
+        # given
+        app = generate_app(db_uri='sqlite://')
+        # expect
+        with app.app_context():
+            self.assertEqual({}, app.pl.get_pool_stats())
+
+    def test_checkout_that_waits_is_counted_and_logged(self):
+        # given
+        app = self.generate_app(pool_size=1, max_overflow=0, pool_timeout=10)
+        engine = self.get_engine(app)
+        held = engine.connect()
+
+        def give_back():
+            time.sleep(0.2)
+            held.close()
+
+        thread = threading.Thread(target=give_back)
+        thread.start()
+        # when
+        with self.assertLogs('persistence.sqlalchemy.pool', 'WARNING') as logs:
+            with engine.connect():
+                stats = engine.pool.get_stats()
+        thread.join()
+        # then
+        self.assertEqual(1, stats['waits'])
+        self.assertGreater(stats['wait_seconds'], 0.1)
+        self.assertEqual(1, stats['checked_out'])
+        self.assertIn('waited', logs.output[0])
+
+    def test_checkout_that_times_out_is_counted(self):
+        # given
+        app = self.generate_app(pool_size=1, max_overflow=0, pool_timeout=0)
+        engine = self.get_engine(app)
+        held = engine.connect()
+        try:
+            # expect
+            with self.assertLogs('persistence.sqlalchemy.pool', 'WARNING'):
+                self.assertRaises(exc.TimeoutError, engine.connect)
+        finally:
+            held.close()
+        self.assertEqual(1, engine.pool.get_stats()['timeouts'])
+
+    def test_overflow_is_reported(self):
+        # given
+        app = self.generate_app(pool_size=1, max_overflow=2)
+        engine = self.get_engine(app)
+        # when
+        first = engine.connect()
+        second = engine.connect()
+        stats = engine.pool.get_stats()
+        second.close()
+        first.close()
+        # then
+        self.assertEqual(2, stats['checked_out'])
+        self.assertEqual(1, stats['overflow'])
+        self.assertEqual(0, stats['waits'])
+
+    def test_stats_survive_dispose(self):
+        # given
+        app = self.generate_app()
+        engine = self.get_engine(app)
+        engine.connect().close()
+        checkouts = engine.pool.get_stats()['checkouts']
+        # when
+        engine.dispose()
+        # then
+        self.assertEqual(checkouts, engine.pool.get_stats()['checkouts'])
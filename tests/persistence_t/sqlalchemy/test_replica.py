@@ -0,0 +1,189 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+
+from tudor import generate_app
+
+
+class ReplicaTestBase(unittest.TestCase):
+    """Two SQLite files stand in for the primary and the replica. They are
+    filled separately, with different tasks, so that the results show which
+    one a query went to."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.primary_uri = self.create_db('primary.db', ['primary task'])
+        self.replica_uri = self.create_db('replica.db', ['replica task'])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def create_db(self, filename, summaries):
+        db_uri = 'sqlite:///' + os.path.join(self.tmpdir.name, filename)
+        app = generate_app(db_uri=db_uri)
+        with app.app_context():
+            app.pl.create_all()
+            admin = app.pl.create_user('admin@example.com', is_admin=True)
+            app.pl.add(admin)
+            for summary in summaries:
+                app.pl.add(app.pl.create_task(summary))
+            app.pl.commit()
+            app.pl.db.engine.dispose()
+        return db_uri
+
+    def generate_app(self, db_replica_uri=None):
+        return generate_app(db_uri=self.primary_uri,
+                            db_replica_uri=db_replica_uri)
+
+    def summaries(self, pl):
+        return sorted(t.summary for t in pl.get_tasks())
+
+
+class ReadOnlyRoutingTest(ReplicaTestBase):
+    def setUp(self):
+        super().setUp()
+        self.app = self.generate_app(db_replica_uri=self.replica_uri)
+        self.pl = self.app.pl
+
+    def test_reads_inside_read_only_go_to_the_replica(self):
+        with self.app.app_context():
+            # when
+            with self.pl.read_only():
+                result = self.summaries(self.pl)
+            # then
+            self.assertEqual(['replica task'], result)
+            self.assertEqual(1, self.pl.db.session.info['replica_reads'])
+
+    def test_reads_outside_read_only_go_to_the_primary(self):
+        with self.app.app_context():
+            # expect
+            self.assertEqual(['primary task'], self.summaries(self.pl))
+
+    def test_writes_inside_read_only_go_to_the_primary(self):
+        with self.app.app_context():
+            # when
+            with self.pl.read_only():
+                self.pl.add(self.pl.create_task('new task'))
+                self.pl.commit()
+            # then
+            self.assertEqual(['new task', 'primary task'],
+                             self.summaries(self.pl))
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        with self.app.app_context():
+            # given
+            self.pl.add(self.pl.create_task('new task'))
+            self.pl.commit()
+            # when
+            with self.pl.read_only():
+                result = self.summaries(self.pl)
+            # then
+            self.assertEqual(['new task', 'primary task'], result)
+            self.assertTrue(self.pl.db.session.info['pinned_to_primary'])
+
+    def test_bulk_write_pins_to_the_primary(self):
+        with self.app.app_context():
+            # given
+            with self.pl.read_only():
+                task = list(self.pl.get_tasks())[0]
+                self.pl.set_task_order_nums({task.id: 5},
+                                            datetime(2020, 1, 1))
+                # when
+                result = self.summaries(self.pl)
+            # then
+            self.assertEqual(['primary task'], result)
+
+    def test_next_app_context_goes_back_to_the_replica(self):
+        # given
+        with self.app.app_context():
+            self.pl.add(self.pl.create_task('new task'))
+            self.pl.commit()
+        # when
+        with self.app.app_context():
+            with self.pl.read_only():
+                result = self.summaries(self.pl)
+        # then
+        self.assertEqual(['replica task'], result)
+
+    def test_read_only_blocks_nest(self):
+        with self.app.app_context():
+            # when
+            with self.pl.read_only():
+                with self.pl.read_only():
+                    pass
+                result = self.summaries(self.pl)
+            # then
+            self.assertEqual(['replica task'], result)
+            self.assertFalse(self.pl.db.session.info['read_only'])
+
+    def test_create_all_leaves_the_replica_alone(self):
+        # given
+        empty_uri = 'sqlite:///' + os.path.join(self.tmpdir.name, 'empty.db')
+        app = self.generate_app(db_replica_uri=empty_uri)
+        with app.app_context():
+            # when
+            app.pl.create_all()
+            # then
+            tables = app.pl.db.engines['replica'].dialect.get_table_names(
+                app.pl.db.engines['replica'].connect())
+        self.assertEqual([], tables)
+
+
+class NoReplicaTest(ReplicaTestBase):
+    def test_read_only_reads_from_the_primary(self):
+        # given
+        app = self.generate_app()
+        with app.app_context():
+            # when
+            with app.pl.read_only():
+                result = self.summaries(app.pl)
+        # then
+        self.assertEqual(['primary task'], result)
+
+
+class LogicLayerReplicaTest(ReplicaTestBase):
+    def setUp(self):
+        super().setUp()
+        self.app = self.generate_app(db_replica_uri=self.replica_uri)
+        self.ll = self.app.ll
+        self.pl = self.app.pl
+
+    def test_index_reads_from_the_replica(self):
+        with self.app.app_context():
+            # given
+            admin = self.pl.get_user_by_email('admin@example.com')
+            # when
+            data = self.ll.get_index_data(False, False, admin)
+            # then
+            self.assertEqual(['replica task'],
+                             [t.summary for t in data['tasks']])
+
+    def test_index_reads_its_own_writes(self):
+        with self.app.app_context():
+            # given
+            admin = self.pl.get_user_by_email('admin@example.com')
+            self.ll.create_new_task('new task', admin)
+            # when
+            data = self.ll.get_index_data(False, False, admin)
+            # then
+            self.assertEqual(['new task', 'primary task'],
+                             sorted(t.summary for t in data['tasks']))
+
+    def test_search_reads_from_the_replica(self):
+        with self.app.app_context():
+            # given
+            admin = self.pl.get_user_by_email('admin@example.com')
+            # when
+            result = list(self.ll.search('task', admin))
+            # then
+            self.assertEqual(['replica task'], [t.summary for t in result])
+
+    def test_task_pages_read_from_the_primary(self):
+        with self.app.app_context():
+            # given
+            admin = self.pl.get_user_by_email('admin@example.com')
+            # when
+            data = self.ll.get_task_data(1, admin)
+            # then
+            self.assertEqual('primary task', data['task'].summary)
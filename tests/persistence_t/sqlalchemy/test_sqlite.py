@@ -0,0 +1,284 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import text
+
+from persistence.sqlalchemy.sqlite import SqliteProfile, WriteQueue, \
+    is_write_statement, is_lock_error
+from tudor import generate_app
+
+
+class SqliteProfileOptionsTest(unittest.TestCase):
+    def test_profile_is_opt_in(self):
+        # given
+        opts = {'pool_size': '5'}
+        # when
+        profile = SqliteProfile.from_options(opts)
+        # then
+        self.assertIsNone(profile)
+        self.assertEqual({'pool_size': '5'}, opts)
+
+    def test_defaults(self):
+        # given
+        opts = {'pool_size': '5', 'sqlite_profile': 'true'}
+        # when
+        profile = SqliteProfile.from_options(opts)
+        # then
+        self.assertEqual({'pool_size': '5'}, opts)
+        self.assertEqual('WAL', profile.pragmas['journal_mode'])
+        self.assertEqual('NORMAL', profile.pragmas['synchronous'])
+        self.assertIsNone(profile.write_queue)
+
+    def test_sqlite_options_are_taken_out(self):
+        # given
+        opts = {'pool_size': '5', 'sqlite_busy_timeout': '100',
+                'sqlite_write_queue': 'true', 'sqlite_lock_retries': '2'}
+        # when
+        profile = SqliteProfile.from_options(opts)
+        # then
+        self.assertEqual({'pool_size': '5'}, opts)
+        self.assertEqual('100', profile.pragmas['busy_timeout'])
+        self.assertIsInstance(profile.write_queue, WriteQueue)
+        self.assertEqual(2, profile.lock_retries)
+
+    def test_profile_can_be_turned_off(self):
+        # when
+        profile = SqliteProfile.from_options({'sqlite_profile': 'false',
+                                              'sqlite_write_queue': 'true'})
+        # then
+        self.assertIsNone(profile)
+
+    def test_invalid_pragma_value_raises(self):
+        # expect
+        self.assertRaises(ValueError, SqliteProfile.from_options,
+                          {'sqlite_cache_size': '1; DROP TABLE task'})
+
+    def test_is_write_statement(self):
+        self.assertTrue(is_write_statement('INSERT INTO task VALUES (1)'))
+        self.assertTrue(is_write_statement('  update task set x=1'))
+        self.assertTrue(is_write_statement(
+            'WITH t AS (SELECT 1) DELETE FROM task'))
+        self.assertFalse(is_write_statement('SELECT * FROM task'))
+        self.assertFalse(is_write_statement(
+            'WITH RECURSIVE t AS (SELECT 1) SELECT * FROM t'))
+
+    def test_is_lock_error(self):
+        self.assertTrue(is_lock_error(
+            sqlite3.OperationalError('database is locked')))
+        self.assertFalse(is_lock_error(
+            sqlite3.OperationalError('no such table: task')))
+
+
+class SqliteProfileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'tudor.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def generate_app(self, db_options=None):
+        app = generate_app(db_uri='sqlite:///' + self.db_path,
+                           db_options=db_options)
+        with app.app_context():
+            app.pl.create_all()
+        return app
+
+    def get_pragma(self, app, name):
+        with app.app_context():
+            return app.pl.db.session.execute(
+                text('PRAGMA {}'.format(name))).scalar()
+
+    def test_profile_is_off_by_default(self):
+        # when
+        app = self.generate_app()
+        # then
+        self.assertIsNone(app.sqlite_profile)
+        self.assertEqual('delete', self.get_pragma(app, 'journal_mode'))
+        self.assertEqual(2, self.get_pragma(app, 'synchronous'))
+
+    def test_pragmas_are_set_on_connect(self):
+        # when
+        app = self.generate_app('sqlite_profile=true')
+        # then
+        self.assertEqual('wal', self.get_pragma(app, 'journal_mode'))
+        self.assertEqual(1, self.get_pragma(app, 'synchronous'))
+        self.assertEqual(5000, self.get_pragma(app, 'busy_timeout'))
+        self.assertEqual(268435456, self.get_pragma(app, 'mmap_size'))
+        self.assertEqual(-65536, self.get_pragma(app, 'cache_size'))
+        self.assertEqual(2, self.get_pragma(app, 'temp_store'))
+
+    def test_pragmas_can_be_overridden(self):
+        # when
+        app = self.generate_app('sqlite_busy_timeout=1234')
+        # then
+        self.assertEqual(1234, self.get_pragma(app, 'busy_timeout'))
+        self.assertEqual('wal', self.get_pragma(app, 'journal_mode'))
+
+    def test_profile_off_leaves_defaults(self):
+        # when
+        app = self.generate_app('sqlite_profile=false '
+                                'sqlite_busy_timeout=1234')
+        # then
+        self.assertIsNone(app.sqlite_profile)
+        self.assertEqual('delete', self.get_pragma(app, 'journal_mode'))
+
+    def test_write_is_retried_while_the_database_is_locked(self):
+        # given
+        app = self.generate_app('sqlite_busy_timeout=0 '
+                                'sqlite_retry_delay=0.05 '
+                                'sqlite_lock_retries=10')
+        other = sqlite3.connect(self.db_path, isolation_level=None,
+                                check_same_thread=False)
+        other.execute('BEGIN IMMEDIATE')
+
+        def release_lock_after_first_retry():
+            deadline = time.monotonic() + 10
+            while app.sqlite_profile.retries == 0 and \
+                    time.monotonic() < deadline:
+                time.sleep(0.01)
+            other.execute('COMMIT')
+
+        releaser = threading.Thread(target=release_lock_after_first_retry)
+        releaser.start()
+        try:
+            # when
+            with app.app_context():
+                app.pl.add(app.pl.create_task('task'))
+                app.pl.commit()
+                count = app.pl.count_tasks()
+        finally:
+            releaser.join()
+            other.close()
+        # then
+        self.assertEqual(1, count)
+        self.assertGreater(app.sqlite_profile.retries, 0)
+        self.assertEqual(0, app.sqlite_profile.failures)
+
+    def test_write_fails_after_running_out_of_retries(self):
+        # given
+        app = self.generate_app('sqlite_busy_timeout=0 '
+                                'sqlite_retry_delay=0.01 '
+                                'sqlite_lock_retries=1')
+        other = sqlite3.connect(self.db_path, isolation_level=None)
+        other.execute('BEGIN IMMEDIATE')
+        try:
+            with app.app_context():
+                app.pl.add(app.pl.create_task('task'))
+                # expect
+                with self.assertRaises(Exception) as cm:
+                    app.pl.commit()
+                self.assertTrue(is_lock_error(cm.exception))
+                app.pl.rollback()
+        finally:
+            other.execute('ROLLBACK')
+            other.close()
+        self.assertEqual(1, app.sqlite_profile.failures)
+
+    def test_lock_error_inside_a_transaction_is_not_retried(self):
+        # given
+        profile = SqliteProfile(pragmas={'busy_timeout': '0'},
+                                retry_delay=0.01, lock_retries=5)
+        conn = sqlite3.connect(self.db_path, isolation_level=None)
+        other = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            profile._on_connect(conn, None)
+            conn.execute('CREATE TABLE t (x INTEGER)')
+            conn.execute('INSERT INTO t VALUES (1)')
+            # a transaction that has read, and then wants to write while
+            # another connection is writing
+            conn.execute('BEGIN')
+            conn.execute('SELECT x FROM t').fetchall()
+            other.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            # expect
+            with self.assertRaises(sqlite3.OperationalError) as cm:
+                profile._do_execute(cursor, 'UPDATE t SET x = 2', (), None)
+            self.assertTrue(is_lock_error(cm.exception))
+            self.assertEqual(0, profile.retries)
+            self.assertEqual(1, profile.failures)
+        finally:
+            other.close()
+            conn.close()
+
+    def test_write_queue_is_released_after_commit(self):
+        # given
+        app = self.generate_app('sqlite_write_queue=true')
+        queue = app.sqlite_profile.write_queue
+        with app.app_context():
+            app.pl.add(app.pl.create_task('task'))
+            app.pl.db.session.flush()
+            # precondition
+            self.assertEqual(threading.get_ident(), queue.owner)
+            # when
+            app.pl.commit()
+            # then
+            self.assertIsNone(queue.owner)
+
+    def test_write_queue_lets_reads_through(self):
+        # given
+        app = self.generate_app('sqlite_write_queue=true')
+        queue = app.sqlite_profile.write_queue
+        # when
+        with app.app_context():
+            count = app.pl.count_tasks()
+        # then
+        self.assertEqual(0, count)
+        self.assertIsNone(queue.owner)
+        self.assertEqual(0, queue.waits)
+
+
+class WriteQueueTest(unittest.TestCase):
+    def test_same_thread_can_reenter(self):
+        # given
+        queue = WriteQueue()
+        queue.acquire('a')
+        # when
+        queue.acquire('b')
+        queue.release('a')
+        # then
+        self.assertEqual(threading.get_ident(), queue.owner)
+        # when
+        queue.release('b')
+        # then
+        self.assertIsNone(queue.owner)
+
+    def test_release_of_unknown_key_is_ignored(self):
+        # given
+        queue = WriteQueue()
+        queue.acquire('a')
+        # when
+        queue.release('b')
+        # then
+        self.assertEqual(threading.get_ident(), queue.owner)
+
+    def test_writers_take_turns_in_order(self):
+        # given
+        queue = WriteQueue()
+        order = []
+        queue.acquire('main')
+
+        def write(name):
+            queue.acquire(name)
+            order.append(name)
+            queue.release(name)
+
+        threads = []
+        for name in ['t1', 't2', 't3']:
+            thread = threading.Thread(target=write, args=(name,))
+            thread.start()
+            threads.append(thread)
+            # let it get in line
+            while len(queue._waiting) < len(threads):
+                time.sleep(0.001)
+        # when
+        queue.release('main')
+        for thread in threads:
+            thread.join()
+        # then
+        self.assertEqual(['t1', 't2', 't3'], order)
+        self.assertEqual(3, queue.waits)
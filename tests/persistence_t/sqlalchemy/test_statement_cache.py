@@ -0,0 +1,95 @@
+import unittest
+from datetime import datetime
+
+from sqlalchemy import event
+
+from persistence.sqlalchemy.statement_cache import pad_in_values
+from tudor import generate_app
+
+
+class PadInValuesTest(unittest.TestCase):
+    def test_pads_to_the_next_power_of_two(self):
+        self.assertEqual([1, 2, 3, 3], pad_in_values([1, 2, 3]))
+        self.assertEqual([1, 2, 3, 4, 5, 5, 5, 5],
+                         pad_in_values([1, 2, 3, 4, 5]))
+
+    def test_leaves_powers_of_two_alone(self):
+        self.assertEqual([], pad_in_values([]))
+        self.assertEqual([1], pad_in_values([1]))
+        self.assertEqual([1, 2], pad_in_values([1, 2]))
+        self.assertEqual([1, 2, 3, 4], pad_in_values([1, 2, 3, 4]))
+
+    def test_takes_any_iterable(self):
+        self.assertEqual([7, 7], pad_in_values(iter([7, 7])))
+
+
+class StatementCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.app = generate_app(db_uri='sqlite://')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.pl = self.app.pl
+        self.pl.create_all()
+        self.tasks = []
+        for i in range(8):
+            task = self.pl.create_task('task{}'.format(i))
+            task.order_num = i
+            self.pl.add(task)
+            self.tasks.append(task)
+        self.pl.commit()
+        self.task_ids = [task.id for task in self.tasks]
+        self.stats = self.pl.statement_cache_stats
+        self.stats.reset()
+        self.statements = []
+        event.listen(self.pl.db.engine, 'before_cursor_execute',
+                     self.record_statement)
+
+    def tearDown(self):
+        event.remove(self.pl.db.engine, 'before_cursor_execute',
+                     self.record_statement)
+        self.app_context.pop()
+
+    def record_statement(self, conn, cursor, statement, parameters, context,
+                         executemany):
+        self.statements.append(statement)
+
+    def ids(self, count):
+        return self.task_ids[:count]
+
+    def test_in_lists_of_similar_length_give_the_same_sql(self):
+        # when
+        list(self.pl.get_tasks(task_id_in=self.ids(3)))
+        result = list(self.pl.get_tasks(task_id_in=self.ids(4)))
+        # then
+        self.assertEqual(4, len(result))
+        self.assertEqual(2, len(self.statements))
+        self.assertEqual(self.statements[0], self.statements[1])
+        self.assertEqual({'hits': 1, 'misses': 1, 'uncached': 0},
+                         self.stats.get('get_tasks'))
+
+    def test_set_task_order_nums_reuses_the_compiled_statement(self):
+        # when
+        self.pl.set_task_order_nums(
+            {task_id: 10 + i for i, task_id in enumerate(self.ids(3))},
+            datetime(2020, 1, 1))
+        self.pl.set_task_order_nums(
+            {task_id: 20 + i for i, task_id in enumerate(self.ids(4))},
+            datetime(2020, 1, 1))
+        self.pl.commit()
+        # then
+        self.assertEqual({'hits': 1, 'misses': 1, 'uncached': 0},
+                         self.stats.get('set_task_order_nums'))
+        self.assertEqual([20, 21, 22, 23, 4, 5, 6, 7],
+                         [t.order_num for t in self.tasks])
+
+    def test_counts_are_kept_per_call_site(self):
+        # when
+        self.pl.count_tasks(is_done=False)
+        self.pl.count_tasks(is_done=True)
+        list(self.pl.get_subtree())
+        # then
+        self.assertEqual(2, sum(self.stats.get('count_tasks').values()))
+        self.assertEqual(1, self.stats.get('count_tasks')['hits'])
+        self.assertEqual(1, sum(self.stats.get('get_subtree').values()))
+        self.assertEqual({'hits': 0, 'misses': 0, 'uncached': 0},
+                         self.stats.get('renumber_siblings'))
@@ -0,0 +1,133 @@
+import unittest
+
+from models.object_types import ObjectTypes
+from persistence.count_cache import CountCache, make_count_key
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeUser(object):
+    object_type = ObjectTypes.User
+
+    def __init__(self, id):
+        self.id = id
+
+
+class CountCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = CountCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_missing_returns_none(self):
+        # expect
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(1, self.cache.misses)
+
+    def test_get_returns_stored_count(self):
+        # given
+        self.cache.set('key', 12, self.cache.generation)
+        # when
+        result = self.cache.get('key')
+        # then
+        self.assertEqual(12, result)
+        self.assertEqual(1, self.cache.hits)
+
+    def test_zero_is_a_hit(self):
+        # given
+        self.cache.set('key', 0, self.cache.generation)
+        # expect
+        self.assertEqual(0, self.cache.get('key'))
+
+    def test_invalidate_empties_the_cache(self):
+        # given
+        self.cache.set('key', 12, self.cache.generation)
+        # when
+        self.cache.invalidate()
+        # then
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_set_after_invalidation_is_ignored(self):
+        # given
+        generation = self.cache.generation
+        self.cache.invalidate()
+        # when
+        self.cache.set('key', 12, generation)
+        # then
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_entries_expire(self):
+        # given
+        self.cache.set('key', 12, self.cache.generation)
+        # when
+        self.clock.now = 10
+        # then
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        # given
+        self.cache.set('a', 1, self.cache.generation)
+        self.cache.set('b', 2, self.cache.generation)
+        self.cache.get('a')
+        # when
+        self.cache.set('c', 3, self.cache.generation)
+        # then
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(3, self.cache.get('c'))
+
+    def test_get_or_compute_computes_once(self):
+        # given
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 7
+
+        # when
+        first = self.cache.get_or_compute('key', compute)
+        second = self.cache.get_or_compute('key', compute)
+        # then
+        self.assertEqual((7, 7), (first, second))
+        self.assertEqual(1, len(calls))
+
+    def test_get_or_compute_does_not_store_if_invalidated_meanwhile(self):
+        # given
+        def compute():
+            self.cache.invalidate()
+            return 7
+
+        # when
+        result = self.cache.get_or_compute('key', compute)
+        # then
+        self.assertEqual(7, result)
+        self.assertIsNone(self.cache.get('key'))
+
+
+class MakeCountKeyTest(unittest.TestCase):
+    def test_users_are_reduced_to_ids(self):
+        # expect
+        self.assertEqual(
+            make_count_key(is_public_or_users_contains=FakeUser(3)),
+            make_count_key(is_public_or_users_contains=FakeUser(3)))
+        self.assertNotEqual(
+            make_count_key(is_public_or_users_contains=FakeUser(3)),
+            make_count_key(is_public_or_users_contains=FakeUser(4)))
+
+    def test_order_of_collections_does_not_matter(self):
+        # expect
+        self.assertEqual(make_count_key(task_id_in=[1, 2, 3]),
+                         make_count_key(task_id_in={3, 2, 1}))
+
+    def test_different_filters_give_different_keys(self):
+        # expect
+        self.assertNotEqual(make_count_key(parent_id=None, is_done=False),
+                            make_count_key(parent_id=None))
+        self.assertNotEqual(make_count_key(parent_id=None),
+                            make_count_key(parent_id=1))
@@ -0,0 +1,33 @@
+import unittest
+
+from persistence.pager import decode_cursor, encode_cursor
+
+
+class CursorTest(unittest.TestCase):
+    def test_round_trip(self):
+        # when
+        cursor = encode_cursor(-12, 345, 'p')
+        # then
+        self.assertEqual((-12, 345, 'p'), decode_cursor(cursor))
+
+    def test_cursor_is_url_safe(self):
+        # when
+        cursor = encode_cursor(2 ** 40, 2 ** 40, 'n')
+        # then
+        self.assertRegex(cursor, '^[A-Za-z0-9_-]+$')
+
+    def test_garbage_raises(self):
+        # expect
+        self.assertRaises(ValueError, decode_cursor, 'not a cursor')
+
+    def test_wrong_shape_raises(self):
+        # given
+        cursor = encode_cursor('a', 1, 'n')
+        # expect
+        self.assertRaises(ValueError, decode_cursor, cursor)
+
+    def test_unknown_direction_raises(self):
+        # given
+        cursor = encode_cursor(1, 1, 'x')
+        # expect
+        self.assertRaises(ValueError, decode_cursor, cursor)
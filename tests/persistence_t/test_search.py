@@ -0,0 +1,59 @@
+import unittest
+from unittest.mock import Mock
+
+from persistence.search import tokenize, make_snippet, SNIPPET_START, \
+    SNIPPET_END, SNIPPET_ELLIPSIS
+
+
+class TokenizeTest(unittest.TestCase):
+    def test_none_yields_no_tokens(self):
+        # expect
+        self.assertEqual([], tokenize(None))
+
+    def test_splits_on_non_word_characters(self):
+        # expect
+        self.assertEqual(['one', 'two', 'three'],
+                         tokenize('One, two-THREE!'))
+
+    def test_query_syntax_is_discarded(self):
+        # expect
+        self.assertEqual(['a', 'b'], tokenize('"a" *(b)'))
+
+
+class MakeSnippetTest(unittest.TestCase):
+    def test_marks_prefix_matches_in_summary(self):
+        # given
+        task = Mock(summary='one two three', description=None)
+        # when
+        result = make_snippet(task, ['tw'])
+        # then
+        self.assertEqual('one {}two{} three'.format(SNIPPET_START,
+                                                    SNIPPET_END), result)
+
+    def test_falls_back_to_description(self):
+        # given
+        task = Mock(summary='one', description='two three')
+        # when
+        result = make_snippet(task, ['three'])
+        # then
+        self.assertEqual('two {}three{}'.format(SNIPPET_START, SNIPPET_END),
+                         result)
+
+    def test_long_text_is_truncated_around_the_match(self):
+        # given
+        words = ['w{}'.format(i) for i in range(30)]
+        words[20] = 'needle'
+        task = Mock(summary=' '.join(words), description=None)
+        # when
+        result = make_snippet(task, ['needle'], max_words=6)
+        # then
+        self.assertTrue(result.startswith(SNIPPET_ELLIPSIS))
+        self.assertTrue(result.endswith(SNIPPET_ELLIPSIS))
+        self.assertIn('{}needle{}'.format(SNIPPET_START, SNIPPET_END),
+                      result)
+
+    def test_no_match_yields_summary(self):
+        # given
+        task = Mock(summary='one', description='two')
+        # expect
+        self.assertEqual('one', make_snippet(task, ['four']))
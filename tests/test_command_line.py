@@ -3,9 +3,15 @@ import unittest
 from unittest.mock import patch, MagicMock
 
 from persistence.in_memory.layer import InMemoryPersistenceLayer
-from tudor import make_task_public, make_task_private, Config, \
+from tudor import make_task_public, make_task_private, mark_task_done, \
+    mark_task_undone, mark_task_deleted, mark_task_undeleted, Config, \
     get_config_from_command_line, create_user, get_db_uri, ConfigError, \
-    get_secret_key, split_db_options, get_db_options
+    get_secret_key, split_db_options, get_db_options, get_db_pool_options, \
+    get_db_pool_options_from_config
+
+POOL_ENVVARS = ['TUDOR_DB_POOL_SIZE', 'TUDOR_DB_POOL_MAX_OVERFLOW',
+                'TUDOR_DB_POOL_RECYCLE', 'TUDOR_DB_POOL_PRE_PING',
+                'TUDOR_DB_POOL_TIMEOUT']
 
 
 class CommandLineTests(unittest.TestCase):
@@ -173,6 +179,96 @@ class CommandLineTests(unittest.TestCase):
                           'Made task 3, "t3", private',
                           'Made task 4, "t4", private'}, output)
 
+    def create_tree(self, **kwargs):
+        # t1 -> t2 -> t3, t4
+        tasks = []
+        for i in range(1, 5):
+            task = self.pl.create_task('t{}'.format(i), **kwargs)
+            task.id = i
+            self.pl.add(task)
+            tasks.append(task)
+        tasks[1].parent = tasks[0]
+        tasks[2].parent = tasks[1]
+        self.pl.commit()
+        return tasks
+
+    def test_mark_task_done(self):
+        # given
+        t1, t2, t3, t4 = self.create_tree()
+        output = []
+        # when
+        mark_task_done(self.pl, t1.id, printer=output.append)
+        # then
+        self.assertTrue(t1.is_done)
+        self.assertFalse(t2.is_done)
+        self.assertEqual(['Marked task 1, "t1", done'], output)
+
+    def test_mark_task_done_and_descendants(self):
+        # given
+        t1, t2, t3, t4 = self.create_tree()
+        output = []
+        # when
+        mark_task_done(self.pl, t1.id, printer=output.append,
+                       descendants=True)
+        # then
+        self.assertTrue(t1.is_done)
+        self.assertTrue(t2.is_done)
+        self.assertTrue(t3.is_done)
+        self.assertFalse(t4.is_done)
+        self.assertEqual(['Marked task 1, "t1", done',
+                          'Marked task 2, "t2", done',
+                          'Marked task 3, "t3", done'], output)
+
+    def test_mark_task_undone_and_descendants(self):
+        # given
+        t1, t2, t3, t4 = self.create_tree(is_done=True)
+        output = []
+        # when
+        mark_task_undone(self.pl, t2.id, printer=output.append,
+                         descendants=True)
+        # then
+        self.assertTrue(t1.is_done)
+        self.assertFalse(t2.is_done)
+        self.assertFalse(t3.is_done)
+        self.assertEqual(['Marked task 2, "t2", not done',
+                          'Marked task 3, "t3", not done'], output)
+
+    def test_mark_task_deleted_and_descendants(self):
+        # given
+        t1, t2, t3, t4 = self.create_tree()
+        output = []
+        # when
+        mark_task_deleted(self.pl, t1.id, printer=output.append,
+                          descendants=True)
+        # then
+        self.assertTrue(t1.is_deleted)
+        self.assertTrue(t2.is_deleted)
+        self.assertTrue(t3.is_deleted)
+        self.assertFalse(t4.is_deleted)
+        self.assertEqual(3, len(output))
+
+    def test_mark_task_undeleted_and_descendants(self):
+        # given
+        t1, t2, t3, t4 = self.create_tree(is_deleted=True)
+        output = []
+        # when
+        mark_task_undeleted(self.pl, t1.id, printer=output.append,
+                            descendants=True)
+        # then
+        self.assertFalse(t1.is_deleted)
+        self.assertFalse(t2.is_deleted)
+        self.assertFalse(t3.is_deleted)
+        self.assertTrue(t4.is_deleted)
+        self.assertEqual('Undeleted task 1, "t1"', output[0])
+
+    def test_mark_task_done_non_existent(self):
+        # given
+        output = []
+        # when
+        mark_task_done(self.pl, 1, printer=output.append)
+        # then
+        self.assertEqual(['No task found by the id "1"'], output)
+
     def test_create_user(self):
         # precondition
         self.assertEqual(0, self.pl.count_users())
@@ -293,6 +389,8 @@ class ConfigFromEnvironTest(unittest.TestCase):
             os.environ.pop('TUDOR_ALLOWED_EXTENSIONS')
         if 'TUDOR_SECRET_KEY' in os.environ:
             os.environ.pop('TUDOR_SECRET_KEY')
+        for name in POOL_ENVVARS:
+            os.environ.pop(name, None)
 
     def tearDown(self):
         if 'TUDOR_DEBUG' in os.environ:
@@ -309,6 +407,8 @@ class ConfigFromEnvironTest(unittest.TestCase):
             os.environ.pop('TUDOR_ALLOWED_EXTENSIONS')
         if 'TUDOR_SECRET_KEY' in os.environ:
             os.environ.pop('TUDOR_SECRET_KEY')
+        for name in POOL_ENVVARS:
+            os.environ.pop(name, None)
 
     def test_from_environ_no_envvars_returns_none(self):
         # when
@@ -344,6 +444,22 @@ class ConfigFromEnvironTest(unittest.TestCase):
         self.assertEqual('zip,exe', result.ALLOWED_EXTENSIONS)
         self.assertEqual('12345', result.SECRET_KEY)
 
+    def test_from_environ_with_pool_envvars_returns_pool_settings(self):
+        # given
+        os.environ['TUDOR_DB_POOL_SIZE'] = '10'
+        os.environ['TUDOR_DB_POOL_MAX_OVERFLOW'] = '-1'
+        os.environ['TUDOR_DB_POOL_RECYCLE'] = '3600'
+        os.environ['TUDOR_DB_POOL_PRE_PING'] = 'false'
+        os.environ['TUDOR_DB_POOL_TIMEOUT'] = '5'
+        # when
+        result = Config.from_environ()
+        # then
+        self.assertEqual(10, result.DB_POOL_SIZE)
+        self.assertEqual(-1, result.DB_POOL_MAX_OVERFLOW)
+        self.assertEqual(3600, result.DB_POOL_RECYCLE)
+        self.assertIs(False, result.DB_POOL_PRE_PING)
+        self.assertEqual(5, result.DB_POOL_TIMEOUT)
+
 
 class GetConfigFromCommandLineTest(unittest.TestCase):
     def setUp(self):
@@ -469,6 +585,27 @@ class GetConfigFromCommandLineTest(unittest.TestCase):
         self.assertEqual('abcdefg', result.SECRET_KEY)
         self.assertIsNotNone(result.args)
 
+    def test_db_pool_args_yield_pool_settings(self):
+        # when
+        result = get_config_from_command_line(
+            ['--db-pool-size', '10', '--db-pool-max-overflow', '5',
+             '--db-pool-recycle', '3600', '--db-pool-pre-ping',
+             '--db-pool-timeout', '5'], self.env_configs)
+        # then
+        self.assertEqual(10, result.DB_POOL_SIZE)
+        self.assertEqual(5, result.DB_POOL_MAX_OVERFLOW)
+        self.assertEqual(3600, result.DB_POOL_RECYCLE)
+        self.assertIs(True, result.DB_POOL_PRE_PING)
+        self.assertEqual(5, result.DB_POOL_TIMEOUT)
+
+    def test_no_db_pool_args_yields_none(self):
+        # when
+        result = get_config_from_command_line([], self.env_configs)
+        # then
+        self.assertIsNone(result.DB_POOL_SIZE)
+        self.assertIsNone(result.DB_POOL_PRE_PING)
+        self.assertEqual({}, get_db_pool_options_from_config(result))
+
     def test_create_secret_key_yields_command(self):
         # when
         result = get_config_from_command_line(
@@ -509,6 +646,14 @@ class GetConfigFromCommandLineTest(unittest.TestCase):
         self.assertIsNotNone(result.args)
         self.assertTrue(result.args.descendants)
 
+    def test_archive_tasks_yields_command(self):
+        # when
+        result = get_config_from_command_line(
+            ['--archive-tasks', '30'], self.env_configs)
+        # then
+        self.assertIsNotNone(result.args)
+        self.assertEqual(30, result.args.archive_tasks)
+
     def test_test_db_conn_yields_command(self):
         # when
         result = get_config_from_command_line(
@@ -800,3 +945,18 @@ class GetConfigFromCommandLineTest(unittest.TestCase):
         # then
         self.assertIsInstance(result, dict)
         self.assertEqual(result, {})
+
+    def test_get_db_pool_options_leaves_out_unset_settings(self):
+        # when
+        result = get_db_pool_options(pool_size=10, pre_ping=False)
+        # then
+        self.assertEqual({'pool_size': 10, 'pool_pre_ping': False}, result)
+
+    def test_get_db_pool_options_uses_engine_option_names(self):
+        # when
+        result = get_db_pool_options(pool_size=1, max_overflow=2, recycle=3,
+                                     pre_ping=True, timeout=4)
+        # then
+        self.assertEqual({'pool_size': 1, 'max_overflow': 2,
+                          'pool_recycle': 3, 'pool_pre_ping': True,
+                          'pool_timeout': 4}, result)
@@ -20,7 +20,10 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual(result,
                          'Config(DEBUG: None, HOST: None, PORT: None, '
                          'DB_URI: None, DB_URI_FILE: None, DB_OPTIONS: None, '
-                         'DB_OPTIONS_FILE: None, UPLOAD_FOLDER: None, '
+                         'DB_OPTIONS_FILE: None, DB_REPLICA_URI: None, '
+                         'DB_POOL_SIZE: None, DB_POOL_MAX_OVERFLOW: None, '
+                         'DB_POOL_RECYCLE: None, DB_POOL_PRE_PING: None, '
+                         'DB_POOL_TIMEOUT: None, UPLOAD_FOLDER: None, '
                          'ALLOWED_EXTENSIONS: None, SECRET_KEY: None, '
                          'SECRET_KEY_FILE: None, args: None)')
 
@@ -33,6 +36,9 @@ class ConfigTest(unittest.TestCase):
         self.assertEqual(result,
                          'DEBUG: None, HOST: None, PORT: None, DB_URI: None, '
                          'DB_URI_FILE: None, DB_OPTIONS: None, '
-                         'DB_OPTIONS_FILE: None, UPLOAD_FOLDER: None, '
+                         'DB_OPTIONS_FILE: None, DB_REPLICA_URI: None, '
+                         'DB_POOL_SIZE: None, DB_POOL_MAX_OVERFLOW: None, '
+                         'DB_POOL_RECYCLE: None, DB_POOL_PRE_PING: None, '
+                         'DB_POOL_TIMEOUT: None, UPLOAD_FOLDER: None, '
                          'ALLOWED_EXTENSIONS: None, SECRET_KEY: None, '
                          'SECRET_KEY_FILE: None, args: None')
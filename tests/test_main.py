@@ -13,8 +13,9 @@ class MainFunctionTests(unittest.TestCase):
                 patch('tudor.__version__', 'unknown'):
             app = mock_generate.return_value
             from models.option_base import OptionBase
+            from persistence.migration import get_highest_migration_version
             app.pl.get_schema_version.return_value = \
-                OptionBase('__version__', '0.16')
+                OptionBase('__version__', get_highest_migration_version())
             folder = os.path.abspath(
                 os.path.join(os.path.dirname(__file__), '..'))
 
@@ -43,6 +44,8 @@ class MainFunctionTests(unittest.TestCase):
             mock_generate.assert_called_once_with(
                 db_uri='sqlite:////tmp/test.db',
                 db_options=None,
+                db_replica_uri=None,
+                db_pool_options={},
                 upload_folder='/tmp/tudor/uploads',
                 secret_key=None,
                 allowed_extensions='txt,pdf,png,jpg,jpeg,gif')
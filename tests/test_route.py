@@ -23,8 +23,9 @@ class RouteTest(unittest.TestCase):
             'task_id_remove_dependee', 'task_pick_user', 'show_hide_done',
             'export', 'task_id_remove_prioritize_after', 'task_edit',
             'task_new_post', 'option_delete', 'task_crud', 'import_',
-            'task_undelete', 'comment_new_post', 'task_mark_done',
-            'task_delete_tag', 'attachment', 'task_id_remove_dependant',
+            'task_undelete', 'task_update_subtree', 'comment_new_post',
+            'task_mark_done', 'task_delete_tag', 'attachment',
+            'task_id_remove_dependant',
             'task_id_remove_prioritize_before', 'task_authorize_user_user',
             'tags_id_get', 'users', 'tags', 'task_authorize_user',
             'users_user_get', 'attachment_new', 'show_hide_deleted', 'logout',
@@ -124,6 +125,16 @@ class RouteTest(unittest.TestCase):
         self.assertEqual(405, resp.status_code)
         self.vl.task_undelete.assert_not_called()
 
+    def test_task_update_subtree_get(self):
+        resp = self.client.get('/task/1/subtree/mark_done')
+        self.assertEqual(606, resp.status_code)
+        self.vl.task_update_subtree.assert_called()
+
+    def test_task_update_subtree_post(self):
+        resp = self.client.post('/task/1/subtree/mark_done')
+        self.assertEqual(405, resp.status_code)
+        self.vl.task_update_subtree.assert_not_called()
+
     def test_task_purge_get(self):
         resp = self.client.get('/task/1/purge')
         self.assertEqual(606, resp.status_code)
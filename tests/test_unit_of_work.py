@@ -0,0 +1,61 @@
+import unittest
+
+from tudor import generate_app
+
+
+class UnitOfWorkTest(unittest.TestCase):
+    def setUp(self):
+        self.app = generate_app(db_uri='sqlite://', secret_key='12345',
+                                flask_configs={'LOGIN_DISABLED': True},
+                                disable_admin_check=True)
+        self.pl = self.app.pl
+        self.stats = []
+        with self.app.app_context():
+            self.pl.create_all()
+
+        pl = self.pl
+        stats = self.stats
+
+        def add_two_tasks(status):
+            stats.append(pl._get_transaction_scope().stats)
+            pl.add(pl.create_task('t1'))
+            pl.commit()
+            pl.add(pl.create_task('t2'))
+            pl.commit()
+            return 'ok', int(status)
+
+        self.app.add_url_rule('/test/add-two-tasks/<status>',
+                              view_func=add_two_tasks)
+        self.client = self.app.test_client()
+
+    def count_tasks(self):
+        with self.app.app_context():
+            return self.pl.count_tasks()
+
+    def test_request_commits_once(self):
+        # when
+        response = self.client.get('/test/add-two-tasks/200')
+        # then
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, self.count_tasks())
+        stats = self.stats[0]
+        self.assertEqual(2, stats.commit_calls)
+        self.assertEqual(1, stats.commits)
+        self.assertEqual(0, stats.rollbacks)
+
+    def test_error_response_rolls_back(self):
+        # when
+        response = self.client.get('/test/add-two-tasks/400')
+        # then
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0, self.count_tasks())
+        stats = self.stats[0]
+        self.assertEqual(0, stats.commits)
+        self.assertEqual(1, stats.rollbacks)
+
+    def test_no_transaction_left_open_after_request(self):
+        # when
+        self.client.get('/test/add-two-tasks/200')
+        # then
+        with self.app.app_context():
+            self.assertFalse(self.pl.in_transaction())
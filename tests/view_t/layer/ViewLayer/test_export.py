@@ -0,0 +1,52 @@
+import unittest
+
+from unittest.mock import Mock, patch
+
+from logic.layer import LogicLayer
+from tests.view_t.layer.ViewLayer.util import generate_mock_request
+from view.layer import ViewLayer, DefaultRenderer
+
+
+class ExportTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = Mock(spec=LogicLayer)
+        self.ll.generate_export_data.return_value = iter([b'{"a": ', b'1}'])
+        self.r = Mock(spec=DefaultRenderer)
+        self.vl = ViewLayer(self.ll, None, renderer=self.r)
+
+    def test_get_renders_form(self):
+        # given
+        request = generate_mock_request(method='GET')
+        # when
+        result = self.vl.export(request, Mock())
+        # then
+        self.r.render_template.assert_called_once_with('export.t.html',
+                                                       results=None)
+        self.assertIs(self.r.render_template.return_value, result)
+
+    @patch('view.layer.stream_with_context', lambda x: x)
+    def test_post_streams_export(self):
+        # given
+        request = generate_mock_request(
+            form={'tasks': 'all', 'tags': 'none', 'format': 'ndjson'})
+        # when
+        result = self.vl.export(request, Mock())
+        # then
+        self.ll.generate_export_data.assert_called_once_with(
+            {'tasks'}, fmt='ndjson', compress=False)
+        self.assertEqual('application/x-ndjson', result.mimetype)
+        self.assertEqual(b'{"a": 1}', result.get_data())
+
+    @patch('view.layer.stream_with_context', lambda x: x)
+    def test_post_gzip_is_an_attachment(self):
+        # given
+        request = generate_mock_request(
+            form={'tasks': 'all', 'gzip': 'true'})
+        # when
+        result = self.vl.export(request, Mock())
+        # then
+        self.ll.generate_export_data.assert_called_once_with(
+            {'tasks'}, fmt='json', compress=True)
+        self.assertEqual('application/gzip', result.mimetype)
+        self.assertIn('tudor-export.json.gz',
+                      result.headers['Content-Disposition'])
@@ -0,0 +1,62 @@
+import unittest
+
+from unittest.mock import Mock
+
+from logic.layer import LogicLayer
+from persistence.search import SNIPPET_START, SNIPPET_END
+from tests.view_t.layer.ViewLayer.util import generate_mock_request
+from view.layer import ViewLayer, DefaultRenderer, highlight_snippet
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.ll = Mock(spec=LogicLayer)
+        self.return_value = {
+            'query': 'two',
+            'results': [],
+            'pager': None,
+        }
+        self.ll.get_search_data = Mock(return_value=self.return_value)
+        self.r = Mock(spec=DefaultRenderer)
+        self.vl = ViewLayer(self.ll, None, renderer=self.r)
+
+    def test_gets_search_data_from_logic_layer(self):
+        # given
+        request = generate_mock_request(args={'page': '2', 'per_page': '5'})
+        user = Mock()
+        # when
+        result = self.vl.search(request, user, 'two')
+        # then
+        self.assertIs(self.r.render_template.return_value, result)
+        self.ll.get_search_data.assert_called_once_with(
+            'two', user, page_num=2, tasks_per_page=5)
+        self.r.render_template.assert_called_once_with(
+            'search.t.html', query='two', results=[], pager=None,
+            pager_link_page='search',
+            pager_link_args={'search_query': 'two'},
+            highlight=highlight_snippet)
+
+    def test_query_is_read_from_form_on_post(self):
+        # given
+        request = generate_mock_request(method='POST', args={},
+                                        form={'query': 'three'})
+        user = Mock()
+        # when
+        self.vl.search(request, user, None)
+        # then
+        self.ll.get_search_data.assert_called_once_with(
+            'three', user, page_num=None, tasks_per_page=None)
+
+
+class HighlightSnippetTest(unittest.TestCase):
+    def test_marks_matches_and_escapes_text(self):
+        # given
+        snippet = '<b>{}two{}</b>'.format(SNIPPET_START, SNIPPET_END)
+        # when
+        result = highlight_snippet(snippet)
+        # then
+        self.assertEqual('&lt;b&gt;<mark>two</mark>&lt;/b&gt;', str(result))
+
+    def test_none_yields_empty_markup(self):
+        # expect
+        self.assertEqual('', str(highlight_snippet(None)))
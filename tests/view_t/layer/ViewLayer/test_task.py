@@ -32,7 +32,8 @@ class TaskTest(unittest.TestCase):
         self.ll.get_task_data.assert_called_with(TASK_ID, user,
                                                  include_deleted=None,
                                                  include_done=None,
-                                                 page_num=1, tasks_per_page=20)
+                                                 page_num=1, tasks_per_page=20,
+                                                 cursor=None)
         self.r.render_template.assert_called()
 
     def test_page_num_not_int_defaults_to_one(self):
@@ -47,7 +48,8 @@ class TaskTest(unittest.TestCase):
         self.ll.get_task_data.assert_called_with(TASK_ID, user,
                                                  include_deleted=None,
                                                  include_done=None,
-                                                 page_num=1, tasks_per_page=20)
+                                                 page_num=1, tasks_per_page=20,
+                                                 cursor=None)
         self.r.render_template.assert_called()
 
     def test_task_per_page_not_int_default_to_twenty(self):
@@ -62,5 +64,22 @@ class TaskTest(unittest.TestCase):
         self.ll.get_task_data.assert_called_with(TASK_ID, user,
                                                  include_deleted=None,
                                                  include_done=None,
-                                                 page_num=1, tasks_per_page=20)
+                                                 page_num=1, tasks_per_page=20,
+                                                 cursor=None)
+        self.r.render_template.assert_called()
+
+    def test_cursor_is_passed_to_logic_layer(self):
+        # given
+        request = generate_mock_request(args={'cursor': 'abc'}, cookies={})
+        user = Mock()
+        TASK_ID = 1
+        # when
+        result = self.vl.task(request, user, TASK_ID)
+        # then
+        self.assertIsNotNone(result)
+        self.ll.get_task_data.assert_called_with(TASK_ID, user,
+                                                 include_deleted=None,
+                                                 include_done=None,
+                                                 page_num=1, tasks_per_page=20,
+                                                 cursor='abc')
         self.r.render_template.assert_called()
@@ -2,7 +2,7 @@ import unittest
 
 from unittest.mock import Mock
 
-from logic.layer import LogicLayer
+from logic.layer import LogicLayer, ORDER_NUM_GAP
 from persistence.in_memory.models.user import User
 from persistence.in_memory.layer import InMemoryPersistenceLayer
 from tests.view_t.layer.ViewLayer.util import generate_mock_request
@@ -20,7 +20,7 @@ class TaskNewPostTest(unittest.TestCase):
     def test_creates_new_task(self):
         # given
         request = generate_mock_request(method="POST")
-        self.ll.get_lowest_order_num.return_value = 0
+        self.ll.get_lowest_sibling_order_num.return_value = 0
         # when
         result = self.vl.task_new_post(request, self.admin)
         # then
@@ -33,7 +33,7 @@ class TaskNewPostTest(unittest.TestCase):
     def test_tag_in_form_adds_tag(self):
         # given
         request = generate_mock_request(method="POST", form={'tags': 'tag1'})
-        self.ll.get_lowest_order_num.return_value = 0
+        self.ll.get_lowest_sibling_order_num.return_value = 0
         # when
         result = self.vl.task_new_post(request, self.admin)
         # then
@@ -48,7 +48,7 @@ class TaskNewPostTest(unittest.TestCase):
         # given
         request = generate_mock_request(method="POST",
                                         form={'tags': 'tag1,tag2'})
-        self.ll.get_lowest_order_num.return_value = 0
+        self.ll.get_lowest_sibling_order_num.return_value = 0
         # when
         result = self.vl.task_new_post(request, self.admin)
         # then
@@ -61,3 +61,37 @@ class TaskNewPostTest(unittest.TestCase):
         self.r.url_for.assert_called()
         self.r.redirect.assert_called()
         self.assertIs(self.r.redirect.return_value, result)
+
+    def test_bottom_goes_below_lowest_sibling(self):
+        # given
+        request = generate_mock_request(method="POST",
+                                        form={'parent_id': '3'})
+        self.ll.get_lowest_sibling_order_num.return_value = 5000
+        # when
+        self.vl.task_new_post(request, self.admin)
+        # then
+        self.ll.get_lowest_sibling_order_num.assert_called_once_with(3)
+        _, kwargs = self.ll.create_new_task.call_args
+        self.assertEqual(5000 - ORDER_NUM_GAP, kwargs['order_num'])
+
+    def test_top_goes_above_highest_sibling(self):
+        # given
+        request = generate_mock_request(method="POST",
+                                        form={'order_type': 'top'})
+        self.ll.get_highest_sibling_order_num.return_value = 5000
+        # when
+        self.vl.task_new_post(request, self.admin)
+        # then
+        self.ll.get_highest_sibling_order_num.assert_called_once_with(None)
+        _, kwargs = self.ll.create_new_task.call_args
+        self.assertEqual(5000 + ORDER_NUM_GAP, kwargs['order_num'])
+
+    def test_no_siblings_gets_zero(self):
+        # given
+        request = generate_mock_request(method="POST")
+        self.ll.get_lowest_sibling_order_num.return_value = None
+        # when
+        self.vl.task_new_post(request, self.admin)
+        # then
+        _, kwargs = self.ll.create_new_task.call_args
+        self.assertEqual(0, kwargs['order_num'])
@@ -0,0 +1,69 @@
+import unittest
+
+from unittest.mock import Mock
+
+from werkzeug.exceptions import NotFound
+
+from logic.layer import LogicLayer
+from persistence.in_memory.layer import InMemoryPersistenceLayer
+from tests.view_t.layer.ViewLayer.util import generate_mock_request
+from view.layer import ViewLayer, DefaultRenderer
+
+
+class TaskUpdateSubtreeTest(unittest.TestCase):
+    def setUp(self):
+        self.pl = Mock(spec=InMemoryPersistenceLayer)
+        self.ll = Mock(spec=LogicLayer)
+        self.r = Mock(spec=DefaultRenderer)
+        self.vl = ViewLayer(self.ll, None, renderer=self.r)
+
+    def test_operations_map_to_fields(self):
+        user = self.pl.create_user('admin@example.com', is_admin=True)
+        for operation, field, value in [
+                ('mark_done', 'is_done', True),
+                ('mark_undone', 'is_done', False),
+                ('delete', 'is_deleted', True),
+                ('undelete', 'is_deleted', False),
+                ('make_public', 'is_public', True),
+                ('make_private', 'is_public', False)]:
+            with self.subTest(operation=operation):
+                # given
+                self.ll.reset_mock()
+                req = generate_mock_request(method='GET', args={})
+                # when
+                self.vl.task_update_subtree(req, user, 1, operation)
+                # then
+                self.ll.update_subtree.assert_called_once_with(
+                    1, user, field, value)
+
+    def test_redirects_to_next_if_available(self):
+        # given
+        user = self.pl.create_user('admin@example.com', is_admin=True)
+        req = generate_mock_request(method='GET',
+                                    args={'next': 'http://example2.org/'})
+        # when
+        self.vl.task_update_subtree(req, user, 1, 'mark_done')
+        # then
+        self.r.url_for.assert_not_called()
+        self.r.redirect.assert_called_once_with('http://example2.org/')
+
+    def test_redirects_to_index_otherwise(self):
+        # given
+        user = self.pl.create_user('admin@example.com', is_admin=True)
+        req = generate_mock_request(method='GET', args={})
+        self.r.url_for.return_value = 'http://example.com/'
+        # when
+        self.vl.task_update_subtree(req, user, 1, 'mark_done')
+        # then
+        self.r.url_for.assert_called_once_with('index')
+        self.r.redirect.assert_called_once_with('http://example.com/')
+
+    def test_unknown_operation_raises(self):
+        # given
+        user = self.pl.create_user('admin@example.com', is_admin=True)
+        req = generate_mock_request(method='GET', args={})
+        # expect
+        self.assertRaises(NotFound, self.vl.task_update_subtree,
+                          req, user, 1, 'purge')
+        # and
+        self.ll.update_subtree.assert_not_called()
@@ -3,6 +3,8 @@ import argparse
 import base64
 import random
 import sys
+import threading
+import time
 import traceback
 from functools import wraps
 from os import environ
@@ -18,8 +20,15 @@ from markdown_util import gfm_to_html
 
 from conversions import bool_from_str, int_from_str
 from logic.layer import LogicLayer
+from persistence.in_memory.durable import DurableInMemoryPersistenceLayer, \
+    is_journal_uri
 from persistence.migration import auto_migrate
 from persistence.sqlalchemy.layer import SqlAlchemyPersistenceLayer
+from persistence.sqlalchemy.pool import InstrumentedQueuePool, \
+    uses_queue_pool
+from persistence.sqlalchemy.replica import REPLICA_BIND_KEY, \
+    ReplicaRoutingSession
+from persistence.sqlalchemy.sqlite import SqliteProfile, is_sqlite_uri
 from view.layer import ViewLayer
 
 try:
@@ -46,6 +55,9 @@ DEFAULT_TUDOR_UPLOAD_FOLDER = '/tmp/tudor/uploads'
 DEFAULT_TUDOR_ALLOWED_EXTENSIONS = 'txt,pdf,png,jpg,jpeg,gif'
 DEFAULT_TUDOR_SECRET_KEY = None
 
+# how often the background archiving started by --archive-after-days runs
+ARCHIVE_INTERVAL_SECONDS = 60 * 60
+
 
 class Config(object):
     def __init__(self,
@@ -56,6 +68,12 @@ class Config(object):
                  db_uri_file=None,
                  db_options=None,
                  db_options_file=None,
+                 db_replica_uri=None,
+                 db_pool_size=None,
+                 db_pool_max_overflow=None,
+                 db_pool_recycle=None,
+                 db_pool_pre_ping=None,
+                 db_pool_timeout=None,
                  upload_folder=None,
                  allowed_extensions=None,
                  secret_key=None,
@@ -68,6 +86,12 @@ class Config(object):
         self.DB_URI_FILE = db_uri_file
         self.DB_OPTIONS = db_options
         self.DB_OPTIONS_FILE = db_options_file
+        self.DB_REPLICA_URI = db_replica_uri
+        self.DB_POOL_SIZE = db_pool_size
+        self.DB_POOL_MAX_OVERFLOW = db_pool_max_overflow
+        self.DB_POOL_RECYCLE = db_pool_recycle
+        self.DB_POOL_PRE_PING = db_pool_pre_ping
+        self.DB_POOL_TIMEOUT = db_pool_timeout
         self.UPLOAD_FOLDER = upload_folder
         self.ALLOWED_EXTENSIONS = allowed_extensions  # TODO: remove this
         self.SECRET_KEY = secret_key
@@ -85,6 +109,12 @@ class Config(object):
                 f'DB_URI_FILE: {self.DB_URI_FILE}, '
                 f'DB_OPTIONS: {self.DB_OPTIONS}, '
                 f'DB_OPTIONS_FILE: {self.DB_OPTIONS_FILE}, '
+                f'DB_REPLICA_URI: {self.DB_REPLICA_URI}, '
+                f'DB_POOL_SIZE: {self.DB_POOL_SIZE}, '
+                f'DB_POOL_MAX_OVERFLOW: {self.DB_POOL_MAX_OVERFLOW}, '
+                f'DB_POOL_RECYCLE: {self.DB_POOL_RECYCLE}, '
+                f'DB_POOL_PRE_PING: {self.DB_POOL_PRE_PING}, '
+                f'DB_POOL_TIMEOUT: {self.DB_POOL_TIMEOUT}, '
                 f'UPLOAD_FOLDER: {self.UPLOAD_FOLDER}, '
                 f'ALLOWED_EXTENSIONS: {self.ALLOWED_EXTENSIONS}, '
                 f'SECRET_KEY: {self.SECRET_KEY}, '
@@ -96,6 +126,9 @@ class Config(object):
         debug = environ.get('TUDOR_DEBUG')
         if debug is not None:
             debug = bool_from_str(debug)
+        db_pool_pre_ping = environ.get('TUDOR_DB_POOL_PRE_PING')
+        if db_pool_pre_ping is not None:
+            db_pool_pre_ping = bool_from_str(db_pool_pre_ping)
         return Config(
             debug=debug,
             host=environ.get('TUDOR_HOST'),
@@ -104,6 +137,15 @@ class Config(object):
             db_uri_file=environ.get('TUDOR_DB_URI_FILE'),
             db_options=environ.get('TUDOR_DB_OPTIONS'),
             db_options_file=environ.get('TUDOR_DB_OPTIONS_FILE'),
+            db_replica_uri=environ.get('TUDOR_DB_REPLICA_URI'),
+            db_pool_size=int_from_str(environ.get('TUDOR_DB_POOL_SIZE')),
+            db_pool_max_overflow=int_from_str(
+                environ.get('TUDOR_DB_POOL_MAX_OVERFLOW')),
+            db_pool_recycle=int_from_str(
+                environ.get('TUDOR_DB_POOL_RECYCLE')),
+            db_pool_pre_ping=db_pool_pre_ping,
+            db_pool_timeout=int_from_str(
+                environ.get('TUDOR_DB_POOL_TIMEOUT')),
             upload_folder=environ.get('TUDOR_UPLOAD_FOLDER'),
             allowed_extensions=environ.get('TUDOR_ALLOWED_EXTENSIONS'),
             secret_key=environ.get('TUDOR_SECRET_KEY'),
@@ -141,6 +183,16 @@ class Config(object):
             db_options=ifn(first.DB_OPTIONS, second.DB_OPTIONS),
             db_options_file=ifn(first.DB_OPTIONS_FILE,
                                 second.DB_OPTIONS_FILE),
+            db_replica_uri=ifn(first.DB_REPLICA_URI, second.DB_REPLICA_URI),
+            db_pool_size=ifn(first.DB_POOL_SIZE, second.DB_POOL_SIZE),
+            db_pool_max_overflow=ifn(first.DB_POOL_MAX_OVERFLOW,
+                                     second.DB_POOL_MAX_OVERFLOW),
+            db_pool_recycle=ifn(first.DB_POOL_RECYCLE,
+                                second.DB_POOL_RECYCLE),
+            db_pool_pre_ping=ifn(first.DB_POOL_PRE_PING,
+                                 second.DB_POOL_PRE_PING),
+            db_pool_timeout=ifn(first.DB_POOL_TIMEOUT,
+                                second.DB_POOL_TIMEOUT),
             upload_folder=ifn(first.UPLOAD_FOLDER, second.UPLOAD_FOLDER),
             allowed_extensions=ifn(first.ALLOWED_EXTENSIONS,
                                    second.ALLOWED_EXTENSIONS),
@@ -167,6 +219,32 @@ def get_config_from_command_line(argv, defaults=None):
     parser.add_argument('--db-uri-file', action='store', default=None)
     parser.add_argument('--db-options', action='store')
     parser.add_argument('--db-options-file', action='store', default=None)
+    parser.add_argument('--db-replica-uri', action='store',
+                        help='A read-only replica of the database, for the '
+                             'pages that only read from it.')
+    parser.add_argument('--db-pool-size', metavar='N', action='store',
+                        type=int,
+                        help='How many connections to keep open to the '
+                             'database.')
+    parser.add_argument('--db-pool-max-overflow', metavar='N',
+                        action='store', type=int,
+                        help='How many connections to open beyond the pool '
+                             'size when they are all in use. -1 for no '
+                             'limit.')
+    parser.add_argument('--db-pool-recycle', metavar='SECONDS',
+                        action='store', type=int,
+                        help='Replace connections that have been open for '
+                             'longer than SECONDS.')
+    parser.add_argument('--db-pool-pre-ping', action='store_true',
+                        default=None,
+                        help='Test each connection when it is taken from '
+                             'the pool, and replace it if it has gone '
+                             'stale.')
+    parser.add_argument('--db-pool-timeout', metavar='SECONDS',
+                        action='store', type=int,
+                        help='How long to wait for a connection to be '
+                             'given back when they are all in use, before '
+                             'giving up.')
     parser.add_argument('--upload-folder', action='store')
     parser.add_argument('--allowed-extensions', action='store')
     parser.add_argument('--secret-key', action='store')
@@ -181,10 +259,28 @@ def get_config_from_command_line(argv, defaults=None):
                              'authorized users of that task who are logged '
                              'in.',
                         type=int)
+    parser.add_argument('--mark-done', metavar='TASK_ID', action='store',
+                        help='Mark a given task as done.', type=int)
+    parser.add_argument('--mark-undone', metavar='TASK_ID', action='store',
+                        help='Mark a given task as not done.', type=int)
+    parser.add_argument('--delete-task', metavar='TASK_ID', action='store',
+                        help='Delete a given task. It can be undeleted '
+                             'until it is purged.', type=int)
+    parser.add_argument('--undelete-task', metavar='TASK_ID', action='store',
+                        help='Undelete a given task.', type=int)
     parser.add_argument('--descendants', action='store_true',
                         help='When performing an operation on a given task, '
-                             'also traverse all descendants and perform the '
-                             'operation on them as well.')
+                             'also perform the operation on all of its '
+                             'descendants, with a single update.')
+    parser.add_argument('--archive-tasks', metavar='DAYS', action='store',
+                        help='Move tasks that have been done or deleted for '
+                             'more than DAYS days into the archive tables.',
+                        type=int)
+    parser.add_argument('--archive-after-days', metavar='DAYS',
+                        action='store', type=int,
+                        help='While the server is running, archive tasks '
+                             'that have been done or deleted for more than '
+                             'DAYS days, once an hour.')
     parser.add_argument('--test-db-conn', action='store_true',
                         help='Try to make a connection to the database. '
                              'Useful for diagnosing connection problems.')
@@ -198,6 +294,22 @@ def get_config_from_command_line(argv, defaults=None):
                         help='Read json formatted items from stdin and '
                              'insert them into the database. Reverse of '
                              '"import".')
+    parser.add_argument('--format', action='store', default='json',
+                        choices=('json', 'ndjson'),
+                        help='The format of the data written by --export-db '
+                             'or read by --import-db.')
+    parser.add_argument('--gzip', action='store_true',
+                        help='Compress the output of --export-db, or '
+                             'decompress the input of --import-db, with '
+                             'gzip.')
+    parser.add_argument('--bulk', action='store_true',
+                        help='With --import-db, insert rows in batches '
+                             'instead of one object at a time. Much faster '
+                             'for large exports.')
+    parser.add_argument('--chunk-size', metavar='N', action='store',
+                        type=int, default=None,
+                        help='With --import-db --bulk, commit after every N '
+                             'rows instead of once at the end.')
 
     args = parser.parse_args(args=argv)
 
@@ -209,6 +321,12 @@ def get_config_from_command_line(argv, defaults=None):
         db_uri_file=args.db_uri_file,
         db_options=args.db_options,
         db_options_file=args.db_options_file,
+        db_replica_uri=args.db_replica_uri,
+        db_pool_size=args.db_pool_size,
+        db_pool_max_overflow=args.db_pool_max_overflow,
+        db_pool_recycle=args.db_pool_recycle,
+        db_pool_pre_ping=args.db_pool_pre_ping,
+        db_pool_timeout=args.db_pool_timeout,
         upload_folder=args.upload_folder,
         secret_key=args.secret_key,
         secret_key_file=args.secret_key_file,
@@ -234,8 +352,31 @@ def split_db_options(db_options):
     return rv
 
 
+def get_db_pool_options(pool_size=None, max_overflow=None, recycle=None,
+                        pre_ping=None, timeout=None):
+    """The engine options for whichever of the pool settings were given."""
+    opts = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_recycle': recycle,
+        'pool_pre_ping': pre_ping,
+        'pool_timeout': timeout,
+    }
+    return {k: v for k, v in opts.items() if v is not None}
+
+
+def get_db_pool_options_from_config(config):
+    return get_db_pool_options(pool_size=config.DB_POOL_SIZE,
+                               max_overflow=config.DB_POOL_MAX_OVERFLOW,
+                               recycle=config.DB_POOL_RECYCLE,
+                               pre_ping=config.DB_POOL_PRE_PING,
+                               timeout=config.DB_POOL_TIMEOUT)
+
+
 def generate_app(db_uri=None,
                  db_options=None,
+                 db_replica_uri=None,
+                 db_pool_options=None,
                  upload_folder=None,
                  secret_key=None,
                  allowed_extensions=None,
@@ -260,14 +401,35 @@ def generate_app(db_uri=None,
     bcrypt = Bcrypt(app)
     app.bcrypt = bcrypt
 
+    if pl is None and is_journal_uri(db_uri):
+        pl = DurableInMemoryPersistenceLayer.from_uri(db_uri)
     if pl is None:
         app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
+        if db_replica_uri:
+            app.config['SQLALCHEMY_BINDS'] = {
+                REPLICA_BIND_KEY: db_replica_uri}
 
         opts = split_db_options(db_options)
+        if db_pool_options:
+            opts.update(db_pool_options)
+        if 'poolclass' not in opts and uses_queue_pool(db_uri):
+            opts['poolclass'] = InstrumentedQueuePool
+        sqlite_profile = None
+        if is_sqlite_uri(db_uri):
+            sqlite_profile = SqliteProfile.from_options(opts)
         app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opts
 
-        db = SQLAlchemy(app)
+        db = SQLAlchemy(app, session_options={
+            'class_': ReplicaRoutingSession})
         pl = SqlAlchemyPersistenceLayer(db)
+        with app.app_context():
+            for engine in db.engines.values():
+                pl.statement_cache_stats.install(engine)
+                if sqlite_profile is not None and \
+                        engine.dialect.name == 'sqlite':
+                    sqlite_profile.install(engine)
+            pl.ensure_schema()
+        app.sqlite_profile = sqlite_profile
     app.pl = pl
 
     class Options(object):
@@ -352,6 +514,28 @@ def generate_app(db_uri=None,
     def setup_options():
         return {'opts': Options}
 
+    # Each request is a single unit of work. The commits made by the logic
+    # layer along the way only flush, and the request commits once at the
+    # end, or rolls back if it failed.
+
+    @app.before_request
+    def begin_unit_of_work():
+        pl.begin_transaction()
+
+    @app.after_request
+    def end_unit_of_work(response):
+        if pl.in_transaction():
+            stats = pl.end_transaction(error=response.status_code >= 400)
+            app.logger.debug('%s %s: %r', request.method, request.path,
+                             stats)
+        return response
+
+    @app.teardown_request
+    def abandon_unit_of_work(exc):
+        # only reached with a transaction still open if the request raised
+        if pl.in_transaction():
+            pl.end_transaction(error=True)
+
     # Error pages
 
     @app.errorhandler(404)
@@ -402,6 +586,11 @@ def generate_app(db_uri=None,
     def undelete_task(id):
         return vl.task_undelete(request, Options.get_user(), id)
 
+    @login_required
+    def update_task_subtree(id, operation):
+        return vl.task_update_subtree(request, Options.get_user(), id,
+                                      operation)
+
     @login_required
     @admin_required
     def purge_task(id):
@@ -614,6 +803,8 @@ def generate_app(db_uri=None,
     app.add_url_rule('/task/<int:id>/mark_undone', None, task_undo)
     app.add_url_rule('/task/<int:id>/delete', None, delete_task)
     app.add_url_rule('/task/<int:id>/undelete', None, undelete_task)
+    app.add_url_rule('/task/<int:id>/subtree/<operation>', None,
+                     update_task_subtree)
     app.add_url_rule('/task/<int:id>/purge', None, purge_task)
     app.add_url_rule('/purge_all', None, purge_deleted_tasks)
     app.add_url_rule('/task/<int:id>', None, view_task)
@@ -765,47 +956,76 @@ def default_printer(*args):
     print(args)
 
 
-def make_task_public(pl, task_id, printer=default_printer, descendants=False):
-    task = pl.get_task(task_id)
-    if not task:
+def update_task(pl, task_id, field, value, message,
+                printer=default_printer, descendants=False):
+    # the command line acts with the authority of whoever can open the
+    # database, so nobody's authorization is checked
+    ll = LogicLayer(None, None, pl)
+    ids = ll.set_task_field(task_id, field, value, descendants=descendants)
+    if ids is None:
         printer('No task found by the id "{}"'.format(task_id))
-    else:
-        if descendants:
-            def recurse(task):
-                task.is_public = True
-                printer(
-                    'Made task {}, "{}", public'.format(task.id, task.summary))
-                for child in task.children:
-                    recurse(child)
-
-            recurse(task)
-        else:
-            task.is_public = True
-            printer('Made task {}, "{}", public'.format(task.id, task.summary))
-        pl.commit()
+        return
+    for task in pl.get_tasks(task_id_in=ids, order_by=pl.TASK_ID):
+        printer(message.format(task.id, task.summary))
+
+
+def make_task_public(pl, task_id, printer=default_printer, descendants=False):
+    update_task(pl, task_id, 'is_public', True, 'Made task {}, "{}", public',
+                printer=printer, descendants=descendants)
 
 
 def make_task_private(pl, task_id, printer=default_printer,
                       descendants=False):
-    task = pl.get_task(task_id)
-    if not task:
-        printer('No task found by the id "{}"'.format(task_id))
-    else:
-        if descendants:
-            def recurse(task):
-                task.is_public = False
-                printer(
-                    'Made task {}, "{}", private'.format(task.id,
-                                                         task.summary))
-                for child in task.children:
-                    recurse(child)
-
-            recurse(task)
-        else:
-            task.is_public = False
-            printer('Made task {}, "{}", private'.format(task.id,
-                                                         task.summary))
-        pl.commit()
+    update_task(pl, task_id, 'is_public', False,
+                'Made task {}, "{}", private', printer=printer,
+                descendants=descendants)
+
+
+def mark_task_done(pl, task_id, printer=default_printer, descendants=False):
+    update_task(pl, task_id, 'is_done', True, 'Marked task {}, "{}", done',
+                printer=printer, descendants=descendants)
+
+
+def mark_task_undone(pl, task_id, printer=default_printer, descendants=False):
+    update_task(pl, task_id, 'is_done', False,
+                'Marked task {}, "{}", not done', printer=printer,
+                descendants=descendants)
+
+
+def mark_task_deleted(pl, task_id, printer=default_printer,
+                      descendants=False):
+    update_task(pl, task_id, 'is_deleted', True, 'Deleted task {}, "{}"',
+                printer=printer, descendants=descendants)
+
+
+def mark_task_undeleted(pl, task_id, printer=default_printer,
+                        descendants=False):
+    update_task(pl, task_id, 'is_deleted', False, 'Undeleted task {}, "{}"',
+                printer=printer, descendants=descendants)
+
+
+def archive_tasks(ll, days, printer=default_printer):
+    counts = ll.archive_finished_tasks(days)
+    printer('Archived {} tasks, {} comments, {} attachments and {} '
+            'links'.format(counts['tasks'], counts['comments'],
+                           counts['attachments'], counts['links']))
+
+
+def start_archiving(app, days, interval=ARCHIVE_INTERVAL_SECONDS):
+    """Archive the tasks that have been finished for more than the given
+    number of days every interval seconds, in a daemon thread."""
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    app.ll.archive_finished_tasks(days)
+            except Exception:
+                app.logger.exception('Error while archiving tasks')
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='archive-tasks', daemon=True)
+    thread.start()
+    return thread
 
 
 def test_db_conn(pl, debug):
@@ -883,6 +1103,31 @@ def get_secret_key(secret_key, secret_key_file):
     return secret_key
 
 
+def check_schema_version(app):
+    print('Checking database schema version', file=sys.stderr)
+    from packaging.version import parse, InvalidVersion
+    with app.app_context():
+        current = app.pl.get_schema_version()
+        if current:
+            current = current.value
+        if not current:
+            current = '0.0'
+        current = parse(parse(current).base_version)
+        from persistence.migration import get_highest_migration_version
+        highest = get_highest_migration_version()
+        if highest:
+            desired = parse(highest)
+        else:
+            desired = current
+        if current < desired:
+            print(f'Wrong DB schema version. Expected {desired.public} but got '
+                  f'{current.public}. Will auto-migrate.', file=sys.stderr)
+            auto_migrate(app.pl, desired.public)
+            print('Migration complete.', file=sys.stderr)
+        else:
+            print('Database schema version is up-to-date.', file=sys.stderr)
+
+
 def main(argv):
     import os
     arg_config = get_config_from_command_line(argv)
@@ -908,36 +1153,23 @@ def main(argv):
     if arg_config.DEBUG:
         print(f'DB_URI: {arg_config.DB_URI}', file=sys.stderr)
         print(f'DB_OPTIONS: {arg_config.DB_OPTIONS}', file=sys.stderr)
+        print(f'DB_REPLICA_URI: {arg_config.DB_REPLICA_URI}',
+              file=sys.stderr)
         print(f'SECRET_KEY: {arg_config.SECRET_KEY}', file=sys.stderr)
 
     app = generate_app(db_uri=arg_config.DB_URI,
                        db_options=arg_config.DB_OPTIONS,
+                       db_replica_uri=arg_config.DB_REPLICA_URI,
+                       db_pool_options=get_db_pool_options_from_config(
+                           arg_config),
                        upload_folder=arg_config.UPLOAD_FOLDER,
                        secret_key=arg_config.SECRET_KEY,
                        allowed_extensions=arg_config.ALLOWED_EXTENSIONS)
 
-    print('Checking database schema version')
-    from packaging.version import parse, InvalidVersion
-    with app.app_context():
-        current = app.pl.get_schema_version()
-        if current:
-            current = current.value
-        if not current:
-            current = '0.0'
-        current = parse(parse(current).base_version)
-        from persistence.migration import get_highest_migration_version
-        highest = get_highest_migration_version()
-        if highest:
-            desired = parse(highest)
-        else:
-            desired = current
-        if current < desired:
-            print(f'Wrong DB schema version. Expected {desired.public} but got '
-                  f'{current.public}. Will auto-migrate.')
-            auto_migrate(app.pl, desired.public)
-            print('Migration complete.')
-        else:
-            print('Database schema version is up-to-date.')
+    if is_journal_uri(arg_config.DB_URI):
+        print('The in-memory store has no schema to check', file=sys.stderr)
+    else:
+        check_schema_version(app)
 
     args = arg_config.args
 
@@ -952,11 +1184,32 @@ def main(argv):
     elif args.hash_password is not None:
         print(app.bcrypt.generate_password_hash(args.hash_password).decode())
     elif args.make_public is not None:
-        make_task_public(app.pl, args.make_public,
-                         descendants=args.descendants)
+        with app.app_context():
+            make_task_public(app.pl, args.make_public,
+                             descendants=args.descendants)
     elif args.make_private is not None:
-        make_task_private(app.pl, args.make_private,
-                          descendants=args.descendants)
+        with app.app_context():
+            make_task_private(app.pl, args.make_private,
+                              descendants=args.descendants)
+    elif args.mark_done is not None:
+        with app.app_context():
+            mark_task_done(app.pl, args.mark_done,
+                           descendants=args.descendants)
+    elif args.mark_undone is not None:
+        with app.app_context():
+            mark_task_undone(app.pl, args.mark_undone,
+                             descendants=args.descendants)
+    elif args.delete_task is not None:
+        with app.app_context():
+            mark_task_deleted(app.pl, args.delete_task,
+                              descendants=args.descendants)
+    elif args.undelete_task is not None:
+        with app.app_context():
+            mark_task_undeleted(app.pl, args.undelete_task,
+                                descendants=args.descendants)
+    elif args.archive_tasks is not None:
+        with app.app_context():
+            archive_tasks(app.ll, args.archive_tasks)
     elif args.test_db_conn:
         test_db_conn(app.pl, args.debug)
     elif args.create_user:
@@ -971,16 +1224,34 @@ def main(argv):
         with app.app_context():
             types_to_export = ('tasks', 'tags', 'comments', 'attachments',
                                'users', 'options')
-            result = app.ll.do_export_data(types_to_export)
-            import json
-            print(json.dumps(result))
+            chunks = app.ll.generate_export_data(
+                types_to_export, fmt=args.format, compress=args.gzip)
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
     elif args.import_db:
         with app.app_context():
             import json
-            data = json.load(sys.stdin)
-            app.ll.do_import_data(data)
+            infile = sys.stdin.buffer
+            if args.gzip:
+                import gzip
+                infile = gzip.GzipFile(fileobj=infile)
+            if args.format == 'ndjson':
+                from logic.export_v2 import read_ndjson
+                data = read_ndjson(infile)
+            else:
+                data = json.load(infile)
+
+            def print_progress(stage, done, total):
+                print(f'Imported {done}/{total} {stage}', file=sys.stderr)
+
+            app.ll.do_import_data(data, bulk=args.bulk,
+                                  chunk_size=args.chunk_size,
+                                  progress=print_progress)
             print('Finished')
     else:
+        if args.archive_after_days is not None:
+            start_archiving(app, args.archive_after_days)
         app.run(debug=arg_config.DEBUG, host=arg_config.HOST,
                 port=arg_config.PORT)
 
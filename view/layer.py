@@ -2,13 +2,24 @@
 import itertools
 import re
 
-from flask import jsonify, json
+from flask import jsonify, json, Response, stream_with_context
+from markupsafe import escape, Markup
 from werkzeug.exceptions import NotFound, BadRequest
 
 import logging_util
 from conversions import int_from_str, money_from_str, bool_from_str
 
+from logic.layer import ORDER_NUM_GAP
 from models.task_user_ops import TaskUserOps
+from persistence.search import SNIPPET_START, SNIPPET_END
+
+
+def highlight_snippet(snippet):
+    """Escape a search snippet and mark up the matched terms."""
+    if not snippet:
+        return Markup('')
+    return Markup(str(escape(snippet)).replace(
+        SNIPPET_START, '<mark>').replace(SNIPPET_END, '</mark>'))
 
 
 class DefaultRenderer(object):
@@ -110,10 +121,12 @@ class ViewLayer(object):
             tasks_per_page = int(self.get_form_or_arg(request, 'per_page'))
         except:
             pass
+        cursor = self.get_form_or_arg(request, 'cursor')
 
         data = self.ll.get_index_data(show_deleted, show_done, current_user,
                                       page_num=page_num,
-                                      tasks_per_page=tasks_per_page)
+                                      tasks_per_page=tasks_per_page,
+                                      cursor=cursor)
 
         resp = self.make_response(
             self.render_template('index.t.html',
@@ -195,17 +208,19 @@ class ViewLayer(object):
 
         self._logger.debug('calculating order_num')
         if order_type == 'top':
-            order_num = self.ll.get_highest_order_num()
+            order_num = self.ll.get_highest_sibling_order_num(
+                int_from_str(parent_id))
             if order_num is not None:
-                order_num += 2
+                order_num += ORDER_NUM_GAP
             else:
                 order_num = 0
         elif order_type == 'order_num':
             order_num = self.get_form_or_arg(request, 'order_num') or None
         else:  # bottom
-            order_num = self.ll.get_lowest_order_num()
+            order_num = self.ll.get_lowest_sibling_order_num(
+                int_from_str(parent_id))
             if order_num is not None:
-                order_num -= 2
+                order_num -= ORDER_NUM_GAP
             else:
                 order_num = 0
         self._logger.debug('calculated order_num: %d', order_num)
@@ -225,9 +240,12 @@ class ViewLayer(object):
 
         clone_id = self.get_form_or_arg(request, 'clone_id') or None
         clone_children = self.get_form_or_arg(request, 'clone_children') or None
+        clone_deep = bool(self.get_form_or_arg(request, 'clone_deep'))
         if clone_id and clone_children:
             self._logger.debug('cloning children of task %s to new task %s', clone_id, task.id)
-            self.ll.clone_task_children_recursive(int(clone_id), task.id, current_user)
+            self.ll.clone_task_children_recursive(int(clone_id), task.id,
+                                                  current_user,
+                                                  deep=clone_deep)
 
         self._logger.debug('getting next_url')
         next_url = self.get_form_or_arg(request, 'next_url')
@@ -254,6 +272,23 @@ class ViewLayer(object):
         self.ll.task_unset_deleted(task_id, current_user)
         return self.redirect(request.args.get('next') or self.url_for('index'))
 
+    # maps the operations in the subtree url to (field, value)
+    subtree_operations = {
+        'mark_done': ('is_done', True),
+        'mark_undone': ('is_done', False),
+        'delete': ('is_deleted', True),
+        'undelete': ('is_deleted', False),
+        'make_public': ('is_public', True),
+        'make_private': ('is_public', False),
+    }
+
+    def task_update_subtree(self, request, current_user, task_id, operation):
+        if operation not in self.subtree_operations:
+            raise NotFound("Unknown operation '{}'".format(operation))
+        field, value = self.subtree_operations[operation]
+        self.ll.update_subtree(task_id, current_user, field, value)
+        return self.redirect(request.args.get('next') or self.url_for('index'))
+
     def task_purge(self, request, current_user, task_id):
         task = self.ll.pl_get_task(task_id)
         if not task:
@@ -283,11 +318,13 @@ class ViewLayer(object):
             tasks_per_page = int(request.args.get('per_page', 20))
         except Exception:
             tasks_per_page = 20
+        cursor = request.args.get('cursor')
         data = self.ll.get_task_data(task_id, current_user,
                                      include_deleted=show_deleted,
                                      include_done=show_done,
                                      page_num=page_num,
-                                     tasks_per_page=tasks_per_page)
+                                     tasks_per_page=tasks_per_page,
+                                     cursor=cursor)
 
         return self.render_template('task.t.html',
                                     task=data['task'],
@@ -608,8 +645,19 @@ class ViewLayer(object):
             return self.render_template('export.t.html', results=None)
         types_to_export = set(k for k in request.form.keys() if
                               k in request.form and request.form[k] == 'all')
-        results = self.ll.do_export_data(types_to_export)
-        return jsonify(results)
+        fmt = request.form.get('format') or 'json'
+        compress = bool_from_str(request.form.get('gzip'))
+        chunks = self.ll.generate_export_data(types_to_export, fmt=fmt,
+                                              compress=compress)
+        mimetype = {'json': 'application/json',
+                    'ndjson': 'application/x-ndjson'}[fmt]
+        headers = {}
+        if compress:
+            mimetype = 'application/gzip'
+            headers['Content-Disposition'] = \
+                'attachment; filename=tudor-export.{}.gz'.format(fmt)
+        return Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers=headers)
 
     def import_(self, request, current_user):
         if request.method == 'GET':
@@ -691,10 +739,31 @@ class ViewLayer(object):
         if search_query is None and request.method == 'POST':
             search_query = request.form['query']
 
-        results = self.ll.search(search_query, current_user)
+        page_num = None
+        try:
+            page_num = int(request.args.get('page'))
+        except Exception:
+            pass
+        tasks_per_page = None
+        try:
+            tasks_per_page = int(request.args.get('per_page'))
+        except Exception:
+            pass
+
+        data = self.ll.get_search_data(search_query, current_user,
+                                       page_num=page_num,
+                                       tasks_per_page=tasks_per_page)
+
+        pager_link_args = {}
+        if search_query:
+            pager_link_args['search_query'] = search_query
 
         return self.render_template('search.t.html', query=search_query,
-                                    results=results)
+                                    results=data['results'],
+                                    pager=data['pager'],
+                                    pager_link_page='search',
+                                    pager_link_args=pager_link_args,
+                                    highlight=highlight_snippet)
 
     def task_id_add_dependee(self, request, current_user, task_id,
                              dependee_id):